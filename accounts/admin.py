@@ -48,21 +48,29 @@ class AccountsAdmin(BaseUserAdmin):
 
 @admin.register(ProfessionalPhoto)
 class ProfessionalPhotoAdmin(admin.ModelAdmin):
-    list_display = ("user", "uploaded_at")
+    list_display = ("user", "status", "uploaded_at")
+    list_filter = ("status",)
     search_fields = ("user__email",)
 
-from .models import AudioAcapellaCover, VideoAcapellaCover
+from .models import AudioAcapellaCover, MediaJob, VideoAcapellaCover
 
 @admin.register(AudioAcapellaCover)
 class AudioAcapellaCoverAdmin(admin.ModelAdmin):
-    list_display = ("user", "title", "uploaded_at")
+    list_display = ("user", "title", "status", "uploaded_at")
+    list_filter = ("status",)
     search_fields = ("user__email", "title")
 
 @admin.register(VideoAcapellaCover)
 class VideoAcapellaCoverAdmin(admin.ModelAdmin):
-    list_display = ("user", "title", "uploaded_at")
+    list_display = ("user", "title", "status", "uploaded_at")
+    list_filter = ("status",)
     search_fields = ("user__email", "title")
 
+@admin.register(MediaJob)
+class MediaJobAdmin(admin.ModelAdmin):
+    list_display = ("target", "object_id", "status", "attempts", "run_after", "error")
+    list_filter = ("status", "target")
+
 
 
 
@@ -2,11 +2,15 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from showdan.tree import children_by_parent
+from .. import images, news
 from ..models import (
     Profession, AccountPhoto, ProfessionalPhoto,
     AudioAcapellaCover, VideoAcapellaCover, Review,
     FavoriteProfessional, NewsPost, NewsRead, Language, Currency,
-    ExchangeRate
+    ExchangeRate, MediaStatus
 )
 from events.models import Event, BusyTime, OfferThread, OfferMessage, EventCategory
 import calendar
@@ -19,11 +23,12 @@ class UserBasicSerializer(serializers.ModelSerializer):
     """Minimal user info for public profiles"""
     full_name = serializers.SerializerMethodField()
     profile_picture_url = serializers.SerializerMethodField()
+    profile_picture_urls = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = ('id', 'public_id', 'first_name', 'last_name', 'full_name',
-                  'profile_picture_url', 'account_type', 'nickname')
+                  'profile_picture_url', 'profile_picture_urls', 'account_type', 'nickname')
         read_only_fields = fields
 
     def get_full_name(self, obj):
@@ -34,12 +39,18 @@ class UserBasicSerializer(serializers.ModelSerializer):
             return obj.profile_picture.url
         return None
 
+    def get_profile_picture_urls(self, obj):
+        """Original plus resized copies by width and format (see accounts.images.url_map)"""
+        return images.url_map(obj.profile_picture, obj.profile_picture_variants)
+
 
 class UserProfileSerializer(serializers.ModelSerializer):
     """Full user profile for authenticated users"""
     full_name = serializers.SerializerMethodField()
     profile_picture_url = serializers.SerializerMethodField()
+    profile_picture_urls = serializers.SerializerMethodField()
     professional_picture_url = serializers.SerializerMethodField()
+    professional_picture_urls = serializers.SerializerMethodField()
     professions = serializers.PrimaryKeyRelatedField(many=True, queryset=Profession.objects.all())
     communication_languages = serializers.PrimaryKeyRelatedField(many=True, queryset=Language.objects.all())
     event_languages = serializers.PrimaryKeyRelatedField(many=True, queryset=Language.objects.all())
@@ -50,8 +61,8 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'public_id', 'email', 'first_name', 'last_name', 'full_name',
             'nickname', 'phone', 'country', 'city', 'address', 'gender',
-            'date_of_birth', 'profile_picture', 'profile_picture_url',
-            'professional_picture', 'professional_picture_url',
+            'date_of_birth', 'profile_picture', 'profile_picture_url', 'profile_picture_urls',
+            'professional_picture', 'professional_picture_url', 'professional_picture_urls',
             'account_type', 'professions', 'years_of_experience',
             'about_me', 'communication_languages', 'event_languages',
             'accepted_event_categories', 'currency', 'cost_per_hour',
@@ -67,11 +78,19 @@ class UserProfileSerializer(serializers.ModelSerializer):
             return obj.profile_picture.url
         return None
 
+    def get_profile_picture_urls(self, obj):
+        """Original plus resized copies by width and format (see accounts.images.url_map)"""
+        return images.url_map(obj.profile_picture, obj.profile_picture_variants)
+
     def get_professional_picture_url(self, obj):
         if obj.professional_picture and hasattr(obj.professional_picture, 'url'):
             return obj.professional_picture.url
         return None
 
+    def get_professional_picture_urls(self, obj):
+        """Original plus resized copies by width and format (see accounts.images.url_map)"""
+        return images.url_map(obj.professional_picture, obj.professional_picture_variants)
+
 
 class ProfessionSerializer(serializers.ModelSerializer):
     """Serializer for Profession model"""
@@ -83,42 +102,61 @@ class ProfessionSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'parent', 'path', 'depth_level', 'children')
 
     def get_depth_level(self, obj):
-        return obj.get_depth()
+        return obj.depth
 
     def get_children(self, obj):
-        children = obj.children.all()
-        return ProfessionSerializer(children, many=True).data if children else []
+        children = self._children_by_parent().get(obj.pk)
+        return ProfessionSerializer(children, many=True, context=self.context).data if children else []
+
+    def _children_by_parent(self):
+        # One query for the whole tree, shared through the root serializer's
+        # context so nested/listed professions never query per node.
+        children_map = self.context.get('_profession_children')
+        if children_map is None:
+            children_map = children_by_parent(Profession.objects.filter(parent__isnull=False).order_by('path'))
+            self.context['_profession_children'] = children_map
+        return children_map
 
 
 class AccountPhotoSerializer(serializers.ModelSerializer):
     """Serializer for normal photos"""
     image_url = serializers.SerializerMethodField()
+    image_urls = serializers.SerializerMethodField()
 
     class Meta:
         model = AccountPhoto
-        fields = ('id', 'user', 'image', 'image_url', 'uploaded_at')
-        read_only_fields = ('user', 'uploaded_at')
+        fields = ('id', 'user', 'image', 'image_url', 'image_urls', 'status', 'uploaded_at')
+        read_only_fields = ('user', 'status', 'uploaded_at')
 
     def get_image_url(self, obj):
         if obj.image and hasattr(obj.image, 'url'):
             return obj.image.url
         return None
 
+    def get_image_urls(self, obj):
+        """Original plus resized copies by width and format (see accounts.images.url_map)"""
+        return images.url_map(obj.image, obj.image_variants)
+
 
 class ProfessionalPhotoSerializer(serializers.ModelSerializer):
     """Serializer for professional photos"""
     image_url = serializers.SerializerMethodField()
+    image_urls = serializers.SerializerMethodField()
 
     class Meta:
         model = ProfessionalPhoto
-        fields = ('id', 'user', 'image', 'image_url', 'uploaded_at')
-        read_only_fields = ('user', 'uploaded_at')
+        fields = ('id', 'user', 'image', 'image_url', 'image_urls', 'status', 'uploaded_at')
+        read_only_fields = ('user', 'status', 'uploaded_at')
 
     def get_image_url(self, obj):
         if obj.image and hasattr(obj.image, 'url'):
             return obj.image.url
         return None
 
+    def get_image_urls(self, obj):
+        """Original plus resized copies by width and format (see accounts.images.url_map)"""
+        return images.url_map(obj.image, obj.image_variants)
+
 
 class AudioCoverSerializer(serializers.ModelSerializer):
     """Serializer for audio acapella covers"""
@@ -126,8 +164,8 @@ class AudioCoverSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = AudioAcapellaCover
-        fields = ('id', 'user', 'title', 'audio_file', 'audio_url', 'uploaded_at')
-        read_only_fields = ('user', 'uploaded_at')
+        fields = ('id', 'user', 'title', 'audio_file', 'audio_url', 'status', 'uploaded_at')
+        read_only_fields = ('user', 'status', 'uploaded_at')
 
     def get_audio_url(self, obj):
         if obj.audio_file and hasattr(obj.audio_file, 'url'):
@@ -141,8 +179,8 @@ class VideoCoverSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = VideoAcapellaCover
-        fields = ('id', 'user', 'title', 'video_file', 'video_url', 'uploaded_at')
-        read_only_fields = ('user', 'uploaded_at')
+        fields = ('id', 'user', 'title', 'video_file', 'video_url', 'status', 'uploaded_at')
+        read_only_fields = ('user', 'status', 'uploaded_at')
 
     def get_video_url(self, obj):
         if obj.video_file and hasattr(obj.video_file, 'url'):
@@ -194,29 +232,48 @@ class FavoriteSerializer(serializers.ModelSerializer):
 
 
 # ============ END ADDITION ============
+class NewsPostListSerializer(serializers.ListSerializer):
+    """Looks up the read status of a whole page of posts at once"""
+
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, 'all') else data)
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            self.child.read_ids = news.read_post_ids(request.user, posts)
+        return super().to_representation(posts)
+
+
 class NewsPostSerializer(serializers.ModelSerializer):
     """Serializer for news posts"""
     image_url = serializers.SerializerMethodField()
+    image_urls = serializers.SerializerMethodField()
     read_status = serializers.SerializerMethodField()
 
     class Meta:
         model = NewsPost
         fields = ('id', 'title', 'slug', 'excerpt', 'body', 'image',
-                  'image_url', 'is_published', 'published_at',
+                  'image_url', 'image_urls', 'is_published', 'published_at',
                   'created_by', 'created_at', 'updated_at', 'read_status')
-        read_only_fields = ('created_by', 'slug', 'created_at', 'updated_at')
+        # set when the post is published (see NewsPost.save)
+        read_only_fields = ('created_by', 'slug', 'published_at', 'created_at', 'updated_at')
+        list_serializer_class = NewsPostListSerializer
 
     def get_image_url(self, obj):
         if obj.image and hasattr(obj.image, 'url'):
             return obj.image.url
         return None
 
+    def get_image_urls(self, obj):
+        """Original plus resized copies by width and format (see accounts.images.url_map)"""
+        return images.url_map(obj.image, obj.image_variants)
+
     def get_read_status(self, obj):
+        read_ids = getattr(self, 'read_ids', None)
+        if read_ids is not None:
+            return obj.pk in read_ids
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return NewsRead.objects.filter(
-                user=request.user, post=obj
-            ).exists()
+            return obj.pk in news.read_post_ids(request.user, [obj])
         return False
 
 
@@ -298,16 +355,59 @@ class OfferMessageSerializer(serializers.ModelSerializer):
         read_only_fields = ('sender', 'created_at')
 
 
+def _count_subquery(model, fk='user'):
+    counts = (
+        model.objects.filter(**{fk: OuterRef('pk')}, status=MediaStatus.READY)
+        .order_by()
+        .values(fk)
+        .annotate(c=Count('pk'))
+        .values('c')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def annotate_media_counts(queryset):
+    """
+    Annotate the four media counts PublicProfileSerializer exposes.
+    Correlated subqueries keep them independent of any joins already on
+    the queryset (professions filters etc.), so no distinct/row blow-up.
+    """
+    return queryset.annotate(
+        normal_photos_count=_count_subquery(AccountPhoto),
+        professional_photos_count=_count_subquery(ProfessionalPhoto),
+        audio_covers_count=_count_subquery(AudioAcapellaCover),
+        video_covers_count=_count_subquery(VideoAcapellaCover),
+    )
+
+
+def favorite_ids_for(user, professionals):
+    """
+    One query: ids among `professionals` that `user` has favorited.
+    Pass the result as context['favorite_ids'] to PublicProfileSerializer.
+    """
+    if not user or not user.is_authenticated:
+        return set()
+    pro_ids = [p.pk for p in professionals]
+    if not pro_ids:
+        return set()
+    return set(
+        FavoriteProfessional.objects.filter(
+            user=user, professional_id__in=pro_ids
+        ).values_list('professional_id', flat=True)
+    )
+
+
 class PublicProfileSerializer(serializers.ModelSerializer):
     """Serializer for public professional profiles"""
     full_name = serializers.SerializerMethodField()
     profile_picture_url = serializers.SerializerMethodField()
+    profile_picture_urls = serializers.SerializerMethodField()
     professions_list = ProfessionSerializer(source='professions', many=True, read_only=True)
     currency_info = CurrencySerializer(source='currency', read_only=True)
 
     # Stats
-    avg_rating = serializers.SerializerMethodField()
-    review_count = serializers.SerializerMethodField()
+    avg_rating = serializers.FloatField(read_only=True)
+    review_count = serializers.IntegerField(source='rating_count', read_only=True)
 
     # Media counts
     normal_photos_count = serializers.SerializerMethodField()
@@ -321,7 +421,7 @@ class PublicProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'public_id', 'full_name', 'first_name', 'last_name',
-                  'nickname', 'profile_picture_url', 'account_type',
+                  'nickname', 'profile_picture_url', 'profile_picture_urls', 'account_type',
                   'professions_list', 'years_of_experience', 'about_me',
                   'currency_info', 'cost_per_hour', 'cost_per_5_hours',
                   'country', 'city', 'avg_rating', 'review_count',
@@ -337,27 +437,33 @@ class PublicProfileSerializer(serializers.ModelSerializer):
             return obj.profile_picture.url
         return None
 
-    def get_avg_rating(self, obj):
-        from django.db.models import Avg
-        avg = obj.reviews_received.aggregate(avg=Avg('rating'))['avg']
-        return avg or 0
-
-    def get_review_count(self, obj):
-        return obj.reviews_received.count()
+    def get_profile_picture_urls(self, obj):
+        """Original plus resized copies by width and format (see accounts.images.url_map)"""
+        return images.url_map(obj.profile_picture, obj.profile_picture_variants)
 
+    # Counts come from annotate_media_counts(); the fallbacks only run for
+    # instances that were not loaded through it.
     def get_normal_photos_count(self, obj):
-        return obj.normal_photos.count()
+        count = getattr(obj, 'normal_photos_count', None)
+        return obj.normal_photos.filter(status=MediaStatus.READY).count() if count is None else count
 
     def get_professional_photos_count(self, obj):
-        return obj.professional_photos.count()
+        count = getattr(obj, 'professional_photos_count', None)
+        return obj.professional_photos.filter(status=MediaStatus.READY).count() if count is None else count
 
     def get_audio_covers_count(self, obj):
-        return obj.audio_acapella_covers.count()
+        count = getattr(obj, 'audio_covers_count', None)
+        return obj.audio_acapella_covers.filter(status=MediaStatus.READY).count() if count is None else count
 
     def get_video_covers_count(self, obj):
-        return obj.video_acapella_covers.count()
+        count = getattr(obj, 'video_covers_count', None)
+        return obj.video_acapella_covers.filter(status=MediaStatus.READY).count() if count is None else count
 
     def get_is_favorite(self, obj):
+        favorite_ids = self.context.get('favorite_ids')
+        if favorite_ids is not None:
+            return obj.pk in favorite_ids
+
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return FavoriteProfessional.objects.filter(
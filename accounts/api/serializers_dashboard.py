@@ -2,6 +2,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
+from .. import images
 from ..models import (
     Profession, AccountPhoto, ProfessionalPhoto,
     AudioAcapellaCover, VideoAcapellaCover,
@@ -62,8 +63,8 @@ class SwitchProfileSerializer(serializers.ModelSerializer):
 
     def get_profession_options(self, obj):
         # Build profession tree options
-        from ..views_dashboard import _build_profession_tree_options
-        options = _build_profession_tree_options()
+        from ..utils import profession_tree_options
+        options = profession_tree_options()
         return [{'id': id, 'label': label} for id, label in options]
 
     def update(self, instance, validated_data):
@@ -198,15 +199,12 @@ class MediaSectionSerializer(serializers.Serializer):
 
 class EventCategorySerializer(serializers.ModelSerializer):
     """Serializer for EventCategory CRUD"""
-    depth = serializers.SerializerMethodField()
+    depth = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = EventCategory
         fields = ('id', 'name', 'parent', 'path', 'depth')
 
-    def get_depth(self, obj):
-        return obj.get_depth()
-
 
 class AdminUserUpdateSerializer(serializers.ModelSerializer):
     """Serializer for admin user updates"""
@@ -258,19 +256,25 @@ class ExchangeRateCRUDSerializer(serializers.ModelSerializer):
 class NewsPostCRUDSerializer(serializers.ModelSerializer):
     """Serializer for NewsPost CRUD"""
     image_url = serializers.SerializerMethodField()
+    image_urls = serializers.SerializerMethodField()
 
     class Meta:
         model = NewsPost
-        fields = ('id', 'title', 'slug', 'excerpt', 'body', 'image', 'image_url',
+        fields = ('id', 'title', 'slug', 'excerpt', 'body', 'image', 'image_url', 'image_urls',
                   'is_published', 'published_at', 'created_by', 'created_at',
                   'updated_at')
-        read_only_fields = ('created_by', 'slug', 'created_at', 'updated_at')
+        # set when the post is published (see NewsPost.save)
+        read_only_fields = ('created_by', 'slug', 'published_at', 'created_at', 'updated_at')
 
     def get_image_url(self, obj):
         if obj.image and hasattr(obj.image, 'url'):
             return obj.image.url
         return None
 
+    def get_image_urls(self, obj):
+        """Original plus resized copies by width and format (see accounts.images.url_map)"""
+        return images.url_map(obj.image, obj.image_variants)
+
     def create(self, validated_data):
         validated_data['created_by'] = self.context['request'].user
         return super().create(validated_data)
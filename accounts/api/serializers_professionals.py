@@ -2,7 +2,9 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.db.models import Avg, Min, Max
+from .. import images
 from ..models import Profession, Language, Currency
+from ..rates import base_currency_id, display_amount, requested_currency
 from .serializers import UserBasicSerializer, ProfessionSerializer, LanguageSerializer, CurrencySerializer
 
 User = get_user_model()
@@ -12,37 +14,40 @@ class ProfessionalListSerializer(serializers.ModelSerializer):
     """Serializer for professional listing with filters"""
     full_name = serializers.SerializerMethodField()
     profile_picture_url = serializers.SerializerMethodField()
+    profile_picture_urls = serializers.SerializerMethodField()
     professions_list = ProfessionSerializer(source='professions', many=True, read_only=True)
     communication_languages_list = LanguageSerializer(source='communication_languages', many=True, read_only=True)
     currency_info = CurrencySerializer(source='currency', read_only=True)
-    avg_rating = serializers.SerializerMethodField()
-    review_count = serializers.SerializerMethodField()
+    avg_rating = serializers.FloatField(read_only=True)
+    review_count = serializers.IntegerField(source='rating_count', read_only=True)
+    display_price = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = (
             'id', 'public_id', 'full_name', 'first_name', 'last_name', 'nickname',
-            'profile_picture_url', 'account_type', 'professions_list',
+            'profile_picture_url', 'profile_picture_urls', 'account_type', 'professions_list',
             'communication_languages_list', 'years_of_experience', 'about_me',
-            'currency_info', 'cost_per_hour', 'cost_per_5_hours', 'country',
+            'currency_info', 'cost_per_hour', 'cost_per_5_hours', 'display_price', 'country',
             'city', 'gender', 'avg_rating', 'review_count'
         )
 
     def get_full_name(self, obj):
         return f"{obj.first_name} {obj.last_name}"
 
+    def get_display_price(self, obj):
+        """cost_per_hour in the viewer's currency (see accounts.rates.requested_currency)"""
+        request = self.context.get('request')
+        return display_amount(obj.cost_per_hour_base, requested_currency(request) if request else None)
+
     def get_profile_picture_url(self, obj):
         if obj.profile_picture and hasattr(obj.profile_picture, 'url'):
             return obj.profile_picture.url
         return None
 
-    def get_avg_rating(self, obj):
-        from django.db.models import Avg
-        avg = obj.reviews_received.aggregate(avg=Avg('rating'))['avg']
-        return avg or 0
-
-    def get_review_count(self, obj):
-        return obj.reviews_received.count()
+    def get_profile_picture_urls(self, obj):
+        """Original plus resized copies by width and format (see accounts.images.url_map)"""
+        return images.url_map(obj.profile_picture, obj.profile_picture_variants)
 
 
 class FilterOptionsSerializer(serializers.Serializer):
@@ -54,8 +59,8 @@ class FilterOptionsSerializer(serializers.Serializer):
 
     def get_professions(self, obj):
         """Build hierarchical profession tree"""
-        from ..views import _build_profession_tree_options
-        options = _build_profession_tree_options()
+        from ..utils import profession_tree_options
+        options = profession_tree_options()
         return [{'id': id, 'label': label} for id, label in options]
 
     def get_languages(self, obj):
@@ -69,15 +74,16 @@ class FilterOptionsSerializer(serializers.Serializer):
         bounds = User.objects.filter(
             account_type=User.AccountType.PROFESSIONAL,
             is_active=True,
-            cost_per_hour__isnull=False
+            cost_per_hour_base__isnull=False
         ).aggregate(
-            min_price=Min('cost_per_hour'),
-            max_price=Max('cost_per_hour')
+            min_price=Min('cost_per_hour_base'),
+            max_price=Max('cost_per_hour_base')
         )
 
         return {
             'min': bounds['min_price'] or 0,
             'max': bounds['max_price'] or 1000,
+            'currency': base_currency_id(),
         }
 
     def get_gender_options(self, obj):
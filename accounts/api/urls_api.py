@@ -141,6 +141,8 @@ def api_root(request):
             'languages': f'{base_url}/api/v1/dashboard/languages/',
             'media_section': f'{base_url}/api/v1/dashboard/media/{{kind}}/',
             'upload': f'{base_url}/api/v1/upload/normal_photos/'.replace('normal_photos/', '{media_type}/'),
+            'upload_status': f'{base_url}/api/v1/upload/{{media_type}}/{{id}}/status/',
+            'upload_session': f'{base_url}/api/v1/upload-sessions/',
             'terms': f'{base_url}/api/v1/dashboard/terms/',
             'support': f'{base_url}/api/v1/dashboard/support/',
         },
@@ -255,6 +257,11 @@ urlpatterns = [
 
     # Media Upload
     path('upload/<str:media_type>/', views.MediaUploadView.as_view(), name='api-media-upload'),
+    path('upload/<str:media_type>/<int:pk>/status/', views.MediaStatusView.as_view(), name='api-media-status'),
+    path('upload-sessions/', views.UploadSessionStartView.as_view(), name='api-upload-session-start'),
+    path('upload-sessions/<uuid:pk>/', views.UploadSessionView.as_view(), name='api-upload-session'),
+    path('upload-sessions/<uuid:pk>/finalize/', views.UploadSessionFinalizeView.as_view(),
+         name='api-upload-session-finalize'),
 
     # Search
     path('search/professionals/', views.ProfessionalSearchView.as_view(), name='api-search-professionals'),
@@ -43,6 +43,7 @@ urlpatterns = [
 
     # News (public/authenticated)
     path('news/', views_dashboard_api.NewsListView.as_view(), name='api-news-list'),
+    path('news/mark-all-read/', views_dashboard_api.NewsMarkAllReadView.as_view(), name='api-news-mark-all-read'),
     path('news/<str:slug>/', views_dashboard_api.NewsDetailView.as_view(), name='api-news-detail'),
 
     # Admin CRUD Home
@@ -50,6 +51,7 @@ urlpatterns = [
 
     # Admin User Management
     path('admin/crud/users/', views_dashboard_api.UserCRUDView.as_view(), name='api-admin-users'),
+    path('admin/crud/users/import/', views_dashboard_api.UserImportView.as_view(), name='api-admin-users-import'),
     path('admin/crud/users/<int:pk>/', views_dashboard_api.UserCRUDDetailView.as_view(), name='api-admin-user-detail'),
     path('admin/crud/users/<int:pk>/toggle-active/', views_dashboard_api.UserToggleActiveView.as_view(),
          name='api-admin-user-toggle-active'),
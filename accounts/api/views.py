@@ -1,3 +1,5 @@
+import io
+
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
@@ -8,19 +10,22 @@ from rest_framework.pagination import PageNumberPagination
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.db.models import Avg, Count, Q
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-import calendar
-from datetime import date, datetime, timedelta
 
 from accounts.models import (
      Profession, AccountPhoto, ProfessionalPhoto,
     AudioAcapellaCover, VideoAcapellaCover, Review,
     FavoriteProfessional, NewsPost, NewsRead, Language,
-    Currency, ExchangeRate
+    Currency, ExchangeRate, MediaStatus, UploadSession
 )
-from events.models import Event, BusyTime, OfferThread, OfferMessage, EventCategory
+from events.models import Event, OfferThread, OfferMessage, EventCategory
+from events.calendar_projection import BOOKED, BUSY, get_month, month_grid
+from accounts import chunked_uploads, media_jobs, news
+from accounts.rates import base_amount_param, requested_currency
+from accounts.search import search_professionals
 from .serializers import *
 
 User = get_user_model()
@@ -254,16 +259,10 @@ class UserProfileViewSet(viewsets.ViewSet):
         avg_rating = 0
         if is_pro:
             reviews = Review.objects.filter(professional=user).order_by('-created_at')[:5]
-            avg = Review.objects.filter(professional=user).aggregate(avg=Avg('rating'))['avg']
-            avg_rating = avg or 0
+            avg_rating = user.avg_rating
 
-        # Get unread news count
-        unread_news_count = 0
-        if NewsPost.objects.filter(is_published=True).exists():
-            read_posts = NewsRead.objects.filter(user=user).values_list('post_id', flat=True)
-            unread_news_count = NewsPost.objects.filter(
-                is_published=True
-            ).exclude(id__in=read_posts).count()
+        # Get unread news count (cached, see accounts.news)
+        unread_news_count = news.unread_count(user)
 
         data = {
             'user': UserBasicSerializer(user).data,
@@ -297,12 +296,15 @@ class PublicProfileViewSet(viewsets.ViewSet):
         200 OK: Profile data with specified tab
         404 Not Found: Profile not found
         """
+        profiles = annotate_media_counts(
+            User.objects.select_related('currency').prefetch_related('professions')
+        )
         try:
             # Try to get by public_id first, then by pk
             if pk and len(pk) == 8 and pk.isdigit():
-                prof = User.objects.get(public_id=pk, account_type=User.AccountType.PROFESSIONAL, is_active=True)
+                prof = profiles.get(public_id=pk, account_type=User.AccountType.PROFESSIONAL, is_active=True)
             else:
-                prof = User.objects.get(pk=pk, account_type=User.AccountType.PROFESSIONAL, is_active=True)
+                prof = profiles.get(pk=pk, account_type=User.AccountType.PROFESSIONAL, is_active=True)
         except User.DoesNotExist:
             return Response({'error': _('Profile not found')}, status=status.HTTP_404_NOT_FOUND)
 
@@ -328,13 +330,15 @@ class PublicProfileViewSet(viewsets.ViewSet):
             if prof_profession_ids:
                 similar_pros = similar_pros.filter(professions__id__in=prof_profession_ids).distinct()
 
-            similar_pros = similar_pros.annotate(
-                avg_rating=Avg('reviews_received__rating'),
-                review_count=Count('reviews_received')
-            ).order_by('-id')[:8]
+            similar_pros = list(annotate_media_counts(
+                similar_pros.select_related('currency').prefetch_related('professions')
+            ).order_by('-id')[:8])
 
             data['similar_professionals'] = PublicProfileSerializer(
-                similar_pros, many=True, context={'request': request}
+                similar_pros, many=True, context={
+                    'request': request,
+                    'favorite_ids': favorite_ids_for(request.user, similar_pros),
+                }
             ).data
 
         elif tab == 'calendar':
@@ -348,78 +352,16 @@ class PublicProfileViewSet(viewsets.ViewSet):
         year = int(request.query_params.get('year', today.year))
         month = int(request.query_params.get('month', today.month))
 
-        # Get first and last day of month
-        _, last_day = calendar.monthrange(year, month)
-        first_day = date(year, month, 1)
-        last_day = date(year, month, last_day)
-
-        # Generate calendar weeks
-        cal = calendar.Calendar(firstweekday=0)  # Monday
-        weeks = cal.monthdatescalendar(year, month)
-
-        # Get events
-        events_qs = Event.objects.filter(
-            is_locked=True,
-            accepted_thread__professional=prof
-        ).select_related('accepted_thread', 'accepted_thread__professional', 'created_by')
-
-        # Get busy times
-        busy_qs = BusyTime.objects.filter(
-            user=prof,
-            start_datetime__date__lte=last_day,
-            end_datetime__date__gte=first_day
-        )
-
-        # Process events for each day
-        booked_map = {}
-        for event in events_qs:
-            if not event.start_datetime or not event.end_datetime:
-                continue
-
-            start_local = timezone.localtime(event.start_datetime)
-            end_local = timezone.localtime(event.end_datetime)
-
-            d1 = start_local.date()
-            d2 = end_local.date()
-
-            # Generate date range
-            current = d1
-            while current <= d2:
-                booked_map.setdefault(current, [])
-                current += timedelta(days=1)
-
-        # Process busy times
-        busy_map = {}
-        for busy in busy_qs:
-            s = timezone.localtime(busy.start_datetime)
-            e = timezone.localtime(busy.end_datetime)
-
-            current = s.date()
-            while current <= e.date():
-                busy_map.setdefault(current, []).append({
-                    'is_all_day': busy.is_all_day,
-                    'start': s.strftime('%H:%M'),
-                    'end': e.strftime('%H:%M'),
-                    'note': busy.note
-                })
-                current += timedelta(days=1)
-
-        # Prepare response
-        prev_month = (date(year, month, 1) - timedelta(days=1)).replace(day=1)
-        next_month = (date(year, month, 28) + timedelta(days=10)).replace(day=1)
+        # Booked days and busy times of the visible grid (cached per month)
+        projection = get_month(prof.pk, year, month, parts=(BOOKED, BUSY))
+        grid = month_grid(year, month)
 
         return {
-            'year': year,
-            'month': month,
-            'month_name': date(year, month, 1).strftime('%B'),
-            'weeks': [[d.isoformat() for d in week] for week in weeks],
-            'prev_year': prev_month.year,
-            'prev_month': prev_month.month,
-            'next_year': next_month.year,
-            'next_month': next_month.month,
+            **grid,
+            'weeks': [[d.isoformat() for d in week] for week in grid['weeks']],
             'today': today.isoformat(),
-            'booked_days': list(booked_map.keys()),
-            'busy_days': {str(k): v for k, v in busy_map.items()}
+            'booked_days': sorted(projection[BOOKED]),
+            'busy_days': {str(k): v for k, v in projection[BUSY].items()}
         }
 
     @action(detail=True, methods=['POST'], permission_classes=[IsAuthenticated])
@@ -481,22 +423,22 @@ class PublicProfileViewSet(viewsets.ViewSet):
         tab = request.query_params.get('tab', 'studio')
 
         if tab == 'studio':
-            queryset = ProfessionalPhoto.objects.filter(user=prof)
+            queryset = ProfessionalPhoto.objects.filter(user=prof, status=MediaStatus.READY)
             serializer_class = ProfessionalPhotoSerializer
             title = 'Studio Photos'
 
         elif tab == 'work':
-            queryset = AccountPhoto.objects.filter(user=prof)
+            queryset = AccountPhoto.objects.filter(user=prof, status=MediaStatus.READY)
             serializer_class = AccountPhotoSerializer
             title = 'Work Photos'
 
         elif tab == 'audio':
-            queryset = AudioAcapellaCover.objects.filter(user=prof)
+            queryset = AudioAcapellaCover.objects.filter(user=prof, status=MediaStatus.READY)
             serializer_class = AudioCoverSerializer
             title = 'Audio Covers'
 
         elif tab == 'video':
-            queryset = VideoAcapellaCover.objects.filter(user=prof)
+            queryset = VideoAcapellaCover.objects.filter(user=prof, status=MediaStatus.READY)
             serializer_class = VideoCoverSerializer
             title = 'Video Covers'
 
@@ -598,6 +540,14 @@ class ReviewViewSet(viewsets.ModelViewSet):
 
 # ==================== Media Upload Views ====================
 
+MEDIA_UPLOAD_MODELS = {
+    'normal_photos': AccountPhoto,
+    'professional_photos': ProfessionalPhoto,
+    'audio': AudioAcapellaCover,
+    'video': VideoAcapellaCover,
+}
+
+
 class MediaUploadView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -613,7 +563,8 @@ class MediaUploadView(APIView):
         - titles: Optional list of titles (for audio/video)
 
         Response:
-        201 Created: Files uploaded successfully
+        201 Created: Files stored; each item is "processing" until the media
+            worker has validated and processed it (poll its status_url)
         400 Bad Request: Invalid media type or no files
         """
         if media_type not in ['normal_photos', 'professional_photos', 'audio', 'video']:
@@ -639,6 +590,10 @@ class MediaUploadView(APIView):
                 uploaded_items.append({
                     'id': photo.id,
                     'url': photo.image.url if photo.image else None,
+                    'status': photo.status,
+                    'status_url': request.build_absolute_uri(
+                        reverse('api-media-status', args=[media_type, photo.id])
+                    ),
                     'uploaded_at': photo.uploaded_at
                 })
 
@@ -648,6 +603,10 @@ class MediaUploadView(APIView):
                 uploaded_items.append({
                     'id': photo.id,
                     'url': photo.image.url if photo.image else None,
+                    'status': photo.status,
+                    'status_url': request.build_absolute_uri(
+                        reverse('api-media-status', args=[media_type, photo.id])
+                    ),
                     'uploaded_at': photo.uploaded_at
                 })
 
@@ -663,6 +622,10 @@ class MediaUploadView(APIView):
                     'id': audio.id,
                     'title': audio.title,
                     'url': audio.audio_file.url if audio.audio_file else None,
+                    'status': audio.status,
+                    'status_url': request.build_absolute_uri(
+                        reverse('api-media-status', args=[media_type, audio.id])
+                    ),
                     'uploaded_at': audio.uploaded_at
                 })
 
@@ -678,6 +641,10 @@ class MediaUploadView(APIView):
                     'id': video.id,
                     'title': video.title,
                     'url': video.video_file.url if video.video_file else None,
+                    'status': video.status,
+                    'status_url': request.build_absolute_uri(
+                        reverse('api-media-status', args=[media_type, video.id])
+                    ),
                     'uploaded_at': video.uploaded_at
                 })
 
@@ -688,6 +655,183 @@ class MediaUploadView(APIView):
         }, status=status.HTTP_201_CREATED)
 
 
+class MediaStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, media_type, pk):
+        """
+        Processing status of one of your uploads
+
+        Path Parameters:
+        - media_type: "normal_photos", "professional_photos", "audio", or "video"
+        - pk: Item id from the upload response
+
+        Response:
+        200 OK: {id, status ("processing", "ready" or "failed"), checksum, url, error}
+        404 Not Found: Unknown media type or item
+        """
+        model = MEDIA_UPLOAD_MODELS.get(media_type)
+        if model is None:
+            return Response({'error': _('Invalid media type')}, status=status.HTTP_404_NOT_FOUND)
+        item = model.objects.filter(user=request.user, pk=pk).first()
+        if item is None:
+            return Response({'error': _('Media not found')}, status=status.HTTP_404_NOT_FOUND)
+
+        field, _kind = media_jobs.MEDIA_FIELDS[model._meta.label]
+        fieldfile = getattr(item, field)
+        return Response({
+            'id': item.id,
+            'status': item.status,
+            'checksum': item.checksum or None,
+            'url': fieldfile.url if fieldfile else None,
+            'error': media_jobs.failed_error(item) if item.status == MediaStatus.FAILED else None,
+        })
+
+
+# ==================== Resumable Uploads ====================
+
+def _upload_session_data(request, session):
+    return {
+        'id': session.pk,
+        'kind': session.kind,
+        'filename': session.filename,
+        'offset': session.received,
+        'size': session.size,
+        'chunk_size': chunked_uploads.CHUNK_SIZE,
+        'upload_url': request.build_absolute_uri(reverse('api-upload-session', args=[session.pk])),
+        'finalize_url': request.build_absolute_uri(reverse('api-upload-session-finalize', args=[session.pk])),
+    }
+
+
+def _offset_conflict(exc):
+    return Response(
+        {'error': _('Offset mismatch'), 'offset': exc.offset},
+        status=status.HTTP_409_CONFLICT,
+        headers={'Upload-Offset': str(exc.offset)},
+    )
+
+
+class UploadSessionStartView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """
+        Start a resumable audio/video cover upload
+
+        Request Body:
+        - kind: "audio" or "video"
+        - filename: Original file name
+        - size: Total size in bytes
+        - title: Optional cover title
+
+        Response:
+        201 Created: {id, offset, size, chunk_size, upload_url, finalize_url}
+        400 Bad Request: Invalid kind, name or size, or too many unfinished uploads
+        """
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            return Response({'error': _('size must be a number of bytes')}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            session = chunked_uploads.start(
+                request.user,
+                request.data.get('kind'),
+                request.data.get('filename'),
+                size,
+                request.data.get('title', ''),
+            )
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(_upload_session_data(request, session), status=status.HTTP_201_CREATED)
+
+
+class UploadSessionView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def _session(self, request, pk):
+        return UploadSession.objects.filter(pk=pk, user=request.user).first()
+
+    def get(self, request, pk):
+        """
+        Offset to resume from after a dropped connection
+
+        Response:
+        200 OK: {id, offset, size, chunk_size, upload_url, finalize_url}
+        404 Not Found: Unknown, finished or expired session
+        """
+        session = self._session(request, pk)
+        if session is None:
+            return Response({'error': _('Upload not found')}, status=status.HTTP_404_NOT_FOUND)
+        return Response(_upload_session_data(request, session), headers={'Upload-Offset': str(session.received)})
+
+    def put(self, request, pk):
+        """
+        Store the next chunk; the request body is the raw bytes
+
+        Headers:
+        - Upload-Offset: Offset of the chunk, which must be the current offset
+
+        Response:
+        200 OK: {offset, size}
+        400 Bad Request: Missing offset, or more bytes than the declared size
+        404 Not Found: Unknown, finished or expired session
+        409 Conflict: Wrong offset; resume from the offset returned
+        """
+        session = self._session(request, pk)
+        if session is None:
+            return Response({'error': _('Upload not found')}, status=status.HTTP_404_NOT_FOUND)
+        offset = request.headers.get('Upload-Offset', '')
+        if not offset.isdigit():
+            return Response({'error': _('Upload-Offset header required')}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # the body is streamed to disk, never loaded whole
+            received = chunked_uploads.append(session, int(offset), request.stream or io.BytesIO())
+        except chunked_uploads.UploadConflict as exc:
+            return _offset_conflict(exc)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'offset': received, 'size': session.size}, headers={'Upload-Offset': str(received)})
+
+    def delete(self, request, pk):
+        """Abandon an upload: 204 No Content"""
+        session = self._session(request, pk)
+        if session is None:
+            return Response({'error': _('Upload not found')}, status=status.HTTP_404_NOT_FOUND)
+        chunked_uploads.discard(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadSessionFinalizeView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        """
+        Finish an upload and create the cover
+
+        Request Body:
+        - checksum: Optional sha256 (hex) of the whole file, verified
+
+        Response:
+        201 Created: The new cover (status "ready")
+        400 Bad Request: Checksum mismatch; the upload is discarded
+        404 Not Found: Unknown, finished or expired session
+        409 Conflict: Bytes are missing; resume from the offset returned
+        """
+        session = UploadSession.objects.filter(pk=pk, user=request.user).first()
+        if session is None:
+            return Response({'error': _('Upload not found')}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            cover = chunked_uploads.finalize(session, request.data.get('checksum'))
+        except chunked_uploads.UploadConflict as exc:
+            return _offset_conflict(exc)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer_class = AudioCoverSerializer if session.kind == UploadSession.Kind.AUDIO else VideoCoverSerializer
+        return Response(serializer_class(cover, context={'request': request}).data, status=status.HTTP_201_CREATED)
+
+
 # ==================== Profession Views ====================
 
 class ProfessionViewSet(viewsets.ReadOnlyModelViewSet):
@@ -727,28 +871,24 @@ class ProfessionalSearchView(APIView):
         - city: City filter
         - country: Country filter
         - min_rating: Minimum average rating
-        - min_price: Minimum cost per hour
-        - max_price: Maximum cost per hour
+        - min_price: Minimum cost per hour (in `currency`)
+        - max_price: Maximum cost per hour (in `currency`)
+        - currency: Currency ID prices are entered in (default: the user's, else the base currency)
         - page: Page number
         - page_size: Items per page
 
         Response:
         200 OK: Paginated list of professionals
         """
-        queryset = User.objects.filter(
+        queryset = annotate_media_counts(User.objects.filter(
             account_type=User.AccountType.PROFESSIONAL,
             is_active=True
-        ).select_related('currency').prefetch_related('professions')
+        ).select_related('currency').prefetch_related('professions'))
 
         # Apply filters
-        search_query = request.query_params.get('q', '')
+        search_query = request.query_params.get('q', '').strip()
         if search_query:
-            queryset = queryset.filter(
-                Q(first_name__icontains=search_query) |
-                Q(last_name__icontains=search_query) |
-                Q(nickname__icontains=search_query) |
-                Q(professions__name__icontains=search_query)
-            ).distinct()
+            queryset = search_professionals(queryset, search_query)
 
         profession_id = request.query_params.get('profession')
         if profession_id:
@@ -764,25 +904,23 @@ class ProfessionalSearchView(APIView):
 
         min_rating = request.query_params.get('min_rating')
         if min_rating:
-            queryset = queryset.annotate(
-                avg_rating=Avg('reviews_received__rating')
-            ).filter(avg_rating__gte=float(min_rating))
-        else:
-            queryset = queryset.annotate(
-                avg_rating=Avg('reviews_received__rating')
-            )
+            queryset = queryset.filter(avg_rating__gte=float(min_rating))
 
-        min_price = request.query_params.get('min_price')
-        if min_price:
-            queryset = queryset.filter(cost_per_hour__gte=float(min_price))
+        # prices in the viewer's currency, compared in the base currency
+        currency = requested_currency(request)
+        min_price = base_amount_param(request.query_params.get('min_price', ''), currency)
+        if min_price is not None:
+            queryset = queryset.filter(cost_per_hour_base__gte=min_price)
 
-        max_price = request.query_params.get('max_price')
-        if max_price:
-            queryset = queryset.filter(cost_per_hour__lte=float(max_price))
+        max_price = base_amount_param(request.query_params.get('max_price', ''), currency)
+        if max_price is not None:
+            queryset = queryset.filter(cost_per_hour_base__lte=max_price)
 
         # Order by rating or date joined
-        order_by = request.query_params.get('order_by', '-avg_rating')
-        if order_by in ['avg_rating', '-avg_rating', 'date_joined', '-date_joined']:
+        order_by = request.query_params.get('order_by', 'relevance' if search_query else '-avg_rating')
+        if order_by == 'relevance' and search_query:
+            queryset = queryset.order_by('search_rank', 'id')
+        elif order_by in ['avg_rating', '-avg_rating', 'date_joined', '-date_joined']:
             queryset = queryset.order_by(order_by)
         else:
             queryset = queryset.order_by('-avg_rating')
@@ -792,10 +930,17 @@ class ProfessionalSearchView(APIView):
         page = paginator.paginate_queryset(queryset, request)
 
         if page is not None:
-            serializer = PublicProfileSerializer(page, many=True, context={'request': request})
+            serializer = PublicProfileSerializer(page, many=True, context={
+                'request': request,
+                'favorite_ids': favorite_ids_for(request.user, page),
+            })
             return paginator.get_paginated_response(serializer.data)
 
-        serializer = PublicProfileSerializer(queryset, many=True, context={'request': request})
+        queryset = list(queryset)
+        serializer = PublicProfileSerializer(queryset, many=True, context={
+            'request': request,
+            'favorite_ids': favorite_ids_for(request.user, queryset),
+        })
         return Response(serializer.data)
 
 
@@ -886,7 +1031,7 @@ class NewsViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        NewsRead.objects.get_or_create(user=request.user, post=news_post)
+        news.mark_read(request.user, news_post)
 
         return Response({'message': _('Marked as read')})
 
@@ -898,8 +1043,7 @@ class NewsViewSet(viewsets.ReadOnlyModelViewSet):
         Response:
         200 OK: List of unread news posts
         """
-        read_posts = NewsRead.objects.filter(user=request.user).values_list('post_id', flat=True)
-        unread_posts = self.get_queryset().exclude(id__in=read_posts)
+        unread_posts = news.unread_queryset(request.user).order_by('-published_at')
 
         page = self.paginate_queryset(unread_posts)
         if page is not None:
@@ -10,6 +10,7 @@ from django.contrib.auth import get_user_model
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext_lazy as _
+import io
 import json
 from django.utils import timezone
 
@@ -20,6 +21,7 @@ from ..models import (
     Currency, ExchangeRate
 )
 from events.models import EventCategory
+from .. import importer, news
 from .serializers_dashboard import *
 
 User = get_user_model()
@@ -68,10 +70,10 @@ class SwitchProfileView(APIView):
 
     def get(self, request):
         """Get current profile and profession options"""
-        from ..views_dashboard import _build_profession_tree_options
+        from ..utils import profession_tree_options
 
         user = request.user
-        profession_options = _build_profession_tree_options()
+        profession_options = profession_tree_options()
         selected_prof_ids = list(user.professions.values_list('id', flat=True))
 
         data = {
@@ -419,6 +421,7 @@ class MediaSectionView(APIView):
                 uploaded_files.append({
                     'id': photo.id,
                     'url': photo.image.url if photo.image else None,
+                    'status': photo.status,
                 })
         elif kind == 'professional':
             files = request.FILES.getlist('files', [])
@@ -427,6 +430,7 @@ class MediaSectionView(APIView):
                 uploaded_files.append({
                     'id': photo.id,
                     'url': photo.image.url if photo.image else None,
+                    'status': photo.status,
                 })
         elif kind == 'audio':
             files = request.FILES.getlist('files', [])
@@ -442,6 +446,7 @@ class MediaSectionView(APIView):
                     'id': audio.id,
                     'title': audio.title,
                     'url': audio.audio_file.url if audio.audio_file else None,
+                    'status': audio.status,
                 })
         elif kind == 'video':
             files = request.FILES.getlist('files', [])
@@ -457,6 +462,7 @@ class MediaSectionView(APIView):
                     'id': video.id,
                     'title': video.title,
                     'url': video.video_file.url if video.video_file else None,
+                    'status': video.status,
                 })
 
         return Response({
@@ -539,16 +545,25 @@ class NewsDetailView(generics.RetrieveAPIView):
         instance = self.get_object()
 
         # Mark as read
-        NewsRead.objects.update_or_create(
-            user=request.user,
-            post=instance,
-            defaults={'read_at': timezone.now()},
-        )
+        news.mark_read(request.user, instance)
 
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
 
+class NewsMarkAllReadView(APIView):
+    """
+    Mark every published news post as read
+
+    POST /api/v1/news/mark-all-read/
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        news.mark_all_read(request.user)
+        return Response({'message': _('All news marked as read')})
+
+
 # ==================== Admin CRUD Views ====================
 
 class CRUDPagination(PageNumberPagination):
@@ -712,6 +727,56 @@ class UserToggleStaffView(APIView):
         })
 
 
+class UserImportView(APIView):
+    """
+    Bulk-import accounts from a CSV or JSON Lines file (admin only)
+
+    POST /api/v1/admin/crud/users/import/
+
+    Request Body (multipart/form-data):
+    - file: .csv or .jsonl file (columns: see accounts.importer)
+    - format: 'csv' or 'jsonl' (default: from the file name)
+    - dry_run: 'true' to validate without writing
+    - batch_size: Rows per batch (default: 1000)
+
+    Response:
+    200 OK: Import report (rows, created, skipped, error_count, errors, seconds, rows_per_second)
+    400 Bad Request: No file or unknown format
+    """
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({'error': _('No file provided')}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = request.data.get('format') or importer.detect_format(upload.name)
+        if fmt not in importer.FORMATS:
+            return Response(
+                {'error': _('Unknown format, use csv or jsonl')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        batch_size = request.data.get('batch_size', '')
+        batch_size = int(batch_size) if batch_size.isdigit() and int(batch_size) > 0 else importer.BATCH_SIZE
+
+        # the upload is read as a stream (large files are spooled to disk by Django)
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            report = importer.import_accounts(
+                importer.read_rows(stream, fmt),
+                batch_size=batch_size,
+                dry_run=request.data.get('dry_run', '').lower() == 'true',
+            )
+        except UnicodeDecodeError:
+            return Response({'error': _('The file must be UTF-8 encoded')}, status=status.HTTP_400_BAD_REQUEST)
+        finally:
+            stream.detach()
+
+        return Response(report)
+
+
 # ==================== CRUD Home ====================
 
 class CRUDHomeView(APIView):
@@ -4,23 +4,32 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
+from showdan.pagination import KeysetPaginationMixin
 from django.contrib.auth import get_user_model
 from django.db.models import Q, Avg, Count, Min, Max
 from django.shortcuts import get_object_or_404
 
 from ..models import Profession, Language, Currency
+from ..rates import base_amount_param, requested_currency
+from ..search import search_professionals
+from showdan import filter_options
+from showdan.filter_options import bundle_response
+from showdan.tree import build_tree, subtree_filter
+from events.calendar_utils import availability_window, available_between
 from .serializers_professionals import *
 from .serializers import PublicProfileSerializer
 
 User = get_user_model()
 
 
-class StandardPagination(PageNumberPagination):
+class StandardPagination(KeysetPaginationMixin, PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
 
     def get_paginated_response(self, data):
+        if self.cursor_mode:
+            return super().get_paginated_response(data)  # keyset payload
         return Response({
             'count': self.page.paginator.count,
             'next': self.get_next_link(),
@@ -39,14 +48,21 @@ class ProfessionalsListView(generics.ListAPIView):
 
     Query Parameters:
     - q: Search query (name, nickname, location, professions)
-    - profession: Profession ID filter
-    - min_price: Minimum cost per hour
-    - max_price: Maximum cost per hour
+    - profession: Profession ID filter (includes sub-professions)
+    - min_price: Minimum cost per hour (in `currency`)
+    - max_price: Maximum cost per hour (in `currency`)
+    - currency: Currency ID prices are entered and displayed in (default: the user's, else the base currency)
     - languages: List of language IDs (communication languages)
     - gender: 'male' or 'female'
-    - order_by: 'rating', '-rating', 'price', '-price', 'experience', '-experience', 'name', '-name'
+    - available_from / available_to: ISO date or datetime; only professionals with no
+      busy time or locked booking overlapping that window (a bare date for available_to
+      covers the whole day)
+    - order_by: 'relevance' (default when q is set), 'rating', '-rating', 'price', '-price',
+      'experience', '-experience', 'name', '-name'
     - page: Page number
     - page_size: Items per page (1-100)
+    - cursor: Keyset mode instead of page numbers ('' for the first page, then next_cursor)
+    - with_count: 'true' to include the total count in keyset mode
 
     Example: /api/v1/professionals/?q=music&profession=2&min_price=50&max_price=200&order_by=-rating
     """
@@ -63,37 +79,26 @@ class ProfessionalsListView(generics.ListAPIView):
         # Apply filters from query parameters
         params = self.request.query_params
 
-        # Search query
+        # Search query (full-text index, see accounts.search)
         q = params.get('q', '').strip()
         if q:
-            queryset = queryset.filter(
-                Q(first_name__icontains=q) |
-                Q(last_name__icontains=q) |
-                Q(nickname__icontains=q) |
-                Q(city__icontains=q) |
-                Q(country__icontains=q) |
-                Q(professions__name__icontains=q)
-            )
+            queryset = search_professionals(queryset, q)
 
         # Profession filter
         profession_id = params.get('profession')
         if profession_id and profession_id.isdigit():
-            queryset = queryset.filter(professions__id=int(profession_id))
-
-        # Price range filters
-        min_price = params.get('min_price')
-        if min_price:
-            try:
-                queryset = queryset.filter(cost_per_hour__gte=float(min_price))
-            except (ValueError, TypeError):
-                pass
-
-        max_price = params.get('max_price')
-        if max_price:
-            try:
-                queryset = queryset.filter(cost_per_hour__lte=float(max_price))
-            except (ValueError, TypeError):
-                pass
+            queryset = queryset.filter(subtree_filter(User, 'professions', int(profession_id)))
+
+        # Price range filters, typed in the viewer's currency and compared in
+        # the base currency across every professional's own currency
+        currency = requested_currency(self.request)
+        min_price = base_amount_param(params.get('min_price', ''), currency)
+        if min_price is not None:
+            queryset = queryset.filter(cost_per_hour_base__gte=min_price)
+
+        max_price = base_amount_param(params.get('max_price', ''), currency)
+        if max_price is not None:
+            queryset = queryset.filter(cost_per_hour_base__lte=max_price)
 
         # Language filters
         lang_ids = params.getlist('languages', [])
@@ -110,25 +115,26 @@ class ProfessionalsListView(generics.ListAPIView):
         if gender in ['male', 'female']:
             queryset = queryset.filter(gender=gender)
 
+        # Availability window (anti-join on busy times and locked bookings)
+        window = availability_window(params.get('available_from'), params.get('available_to'))
+        if window:
+            queryset = queryset.filter(available_between(*window))
+
         # Remove duplicates
         queryset = queryset.distinct()
 
-        # Add annotations for ratings
-        queryset = queryset.annotate(
-            avg_rating=Avg('reviews_received__rating'),
-            review_count=Count('reviews_received')
-        )
-
-        # Apply ordering
-        order_by = params.get('order_by', '-avg_rating')
-        if order_by == 'rating':
+        # Apply ordering (searches default to relevance)
+        order_by = params.get('order_by', 'relevance' if q else '-avg_rating')
+        if order_by == 'relevance' and q:
+            queryset = queryset.order_by('search_rank', 'id')
+        elif order_by == 'rating':
             queryset = queryset.order_by('avg_rating')
         elif order_by == '-rating':
             queryset = queryset.order_by('-avg_rating')
         elif order_by == 'price':
-            queryset = queryset.order_by('cost_per_hour')
+            queryset = queryset.order_by('cost_per_hour_base')
         elif order_by == '-price':
-            queryset = queryset.order_by('-cost_per_hour')
+            queryset = queryset.order_by('-cost_per_hour_base')
         elif order_by == 'experience':
             queryset = queryset.order_by('years_of_experience')
         elif order_by == '-experience':
@@ -151,7 +157,10 @@ class ProfessionalsListView(generics.ListAPIView):
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            response = self.get_paginated_response(serializer.data)
+            # Filter options are served separately (filter-options/), by version
+            response.data['filter_options_version'] = filter_options.get_version(filter_options.PROFESSIONALS)
+            return response
 
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
@@ -200,7 +209,9 @@ class ProfessionalDetailView(generics.RetrieveAPIView):
             account_type=User.AccountType.PROFESSIONAL,
             is_active=True,
             professions__id__in=profession_ids
-        ).exclude(pk=professional.pk).distinct()[:8]
+        ).exclude(pk=professional.pk).prefetch_related(
+            'professions', 'communication_languages'
+        ).select_related('currency').distinct()[:8]
 
         return ProfessionalListSerializer(similar, many=True, context={'request': self.request}).data
 
@@ -221,13 +232,14 @@ class FilterOptionsView(generics.RetrieveAPIView):
     Get filter options for professionals search
 
     GET /api/v1/professionals/filter-options/
+
+    Cached per version and language; send If-None-Match with the ETag to get 304.
     """
     serializer_class = FilterOptionsSerializer
     permission_classes = [AllowAny]
 
     def get(self, request, *args, **kwargs):
-        serializer = self.get_serializer({})
-        return Response(serializer.data)
+        return bundle_response(request, filter_options.PROFESSIONALS)
 
 
 class TopProfessionalsView(generics.ListAPIView):
@@ -238,7 +250,7 @@ class TopProfessionalsView(generics.ListAPIView):
 
     Query Parameters:
     - limit: Number of professionals to return (default: 10, max: 50)
-    - profession: Filter by profession ID
+    - profession: Filter by profession ID (includes sub-professions)
     """
     serializer_class = ProfessionalListSerializer
     permission_classes = [AllowAny]
@@ -250,20 +262,17 @@ class TopProfessionalsView(generics.ListAPIView):
         queryset = User.objects.filter(
             account_type=User.AccountType.PROFESSIONAL,
             is_active=True
-        ).prefetch_related('professions').select_related('currency')
+        ).prefetch_related('professions', 'communication_languages').select_related('currency')
 
         # Filter by profession if specified
         if profession_id and profession_id.isdigit():
-            queryset = queryset.filter(professions__id=int(profession_id))
+            queryset = queryset.filter(subtree_filter(User, 'professions', int(profession_id)))
 
         # Get top rated
-        queryset = queryset.annotate(
-            avg_rating=Avg('reviews_received__rating'),
-            review_count=Count('reviews_received')
-        ).filter(
+        queryset = queryset.filter(
             avg_rating__gte=4.0,  # Only include professionals with rating >= 4
-            review_count__gte=3  # Minimum 3 reviews
-        ).order_by('-avg_rating', '-review_count')[:limit]
+            rating_count__gte=3  # Minimum 3 reviews
+        ).order_by('-avg_rating', '-rating_count')[:limit]
 
         return queryset
 
@@ -290,7 +299,7 @@ class RecommendedProfessionalsView(generics.ListAPIView):
         queryset = User.objects.filter(
             account_type=User.AccountType.PROFESSIONAL,
             is_active=True
-        ).exclude(pk=user.pk).prefetch_related('professions').select_related('currency')
+        ).exclude(pk=user.pk).prefetch_related('professions', 'communication_languages').select_related('currency')
 
         # Filter by user's location if available
         if user.city or user.country:
@@ -314,10 +323,7 @@ class RecommendedProfessionalsView(generics.ListAPIView):
                 queryset = location_professionals
 
         # Add ratings and order
-        queryset = queryset.annotate(
-            avg_rating=Avg('reviews_received__rating'),
-            review_count=Count('reviews_received')
-        ).order_by('-avg_rating', '-review_count')
+        queryset = queryset.order_by('-avg_rating', '-rating_count')
 
         return queryset
 
@@ -331,55 +337,13 @@ class ProfessionTreeView(generics.RetrieveAPIView):
     permission_classes = [AllowAny]
 
     def get(self, request, *args, **kwargs):
-        from ..views import _build_profession_tree_options
-
-        options = _build_profession_tree_options()
-
-        # Convert to hierarchical structure
-        tree = self._build_tree(options)
-
+        professions = Profession.objects.only('id', 'name', 'path', 'parent_id')
+        tree = build_tree(
+            professions,
+            lambda prof: {'id': prof.id, 'name': prof.name, 'path': prof.path, 'children': []},
+        )
         return Response(tree)
 
-    def _build_tree(self, options):
-        """Convert flat list to hierarchical tree"""
-        professions = Profession.objects.all().select_related('parent')
-
-        # Build a map of profession by ID
-        prof_map = {p.id: p for p in professions}
-
-        # Build tree
-        def build_node(prof_id):
-            prof = prof_map.get(prof_id)
-            if not prof:
-                return None
-
-            node = {
-                'id': prof.id,
-                'name': prof.name,
-                'path': prof.path,
-                'children': []
-            }
-
-            # Find children
-            children = [p for p in professions if p.parent_id == prof_id]
-            for child in children:
-                child_node = build_node(child.id)
-                if child_node:
-                    node['children'].append(child_node)
-
-            return node
-
-        # Find root nodes (no parent)
-        roots = [p for p in professions if p.parent is None]
-        tree = []
-
-        for root in roots:
-            node = build_node(root.id)
-            if node:
-                tree.append(node)
-
-        return tree
-
 
 class PriceRangeView(generics.RetrieveAPIView):
     """
@@ -388,30 +352,14 @@ class PriceRangeView(generics.RetrieveAPIView):
     GET /api/v1/professionals/price-range/
 
     Query Parameters:
-    - profession: Filter by profession ID (optional)
+    - profession: Filter by profession ID, sub-professions included (optional)
     """
     permission_classes = [AllowAny]
 
     def get(self, request, *args, **kwargs):
         profession_id = request.query_params.get('profession')
 
-        queryset = User.objects.filter(
-            account_type=User.AccountType.PROFESSIONAL,
-            is_active=True,
-            cost_per_hour__isnull=False
-        )
-
-        # Filter by profession if specified
-        if profession_id and profession_id.isdigit():
-            queryset = queryset.filter(professions__id=int(profession_id))
+        # Filter by profession if specified (cached per profession)
+        profession_id = int(profession_id) if profession_id and profession_id.isdigit() else None
 
-        bounds = queryset.aggregate(
-            min_price=Min('cost_per_hour'),
-            max_price=Max('cost_per_hour')
-        )
-
-        return Response({
-            'min': bounds['min_price'] or 0,
-            'max': bounds['max_price'] or 1000,
-            'currency': 'USD'  # Default, you might want to get this from user preferences
-        })
\ No newline at end of file
+        return bundle_response(request, 'price_range', extra=profession_id)
\ No newline at end of file
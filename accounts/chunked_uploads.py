@@ -0,0 +1,258 @@
+"""
+Resumable chunked uploads for audio and video covers.
+
+A cover can be hundreds of megabytes; as one multipart POST a dropped mobile
+connection starts it over, and the request holds a web worker for the whole
+transfer. Instead the client
+
+1. opens an ``UploadSession`` with the file name and size (``start()``);
+2. PUTs the bytes in chunks, each at the offset the server has so far
+   (``append()``); after a drop it asks for that offset and carries on;
+3. finalizes (``finalize()``), which creates the cover row.
+
+Chunks are streamed into a temporary file under ``CHUNKED_UPLOAD_DIR``, then
+appended to the session's part file and a sha256 under an exclusive lock on
+the part file (``flock``): two PUTs at the same offset are serialized, and the
+second gets the new offset back instead of overwriting or truncating the
+first one's bytes. Reading the request body, the slow part, holds no lock.
+A hash object cannot be stored, so each process keeps the hashes of the
+sessions it served; a chunk landing on another process first re-hashes the
+part file once. Finalizing hard-links the part file into local storage (other
+storages get a copy), so the file is not read again: the cover is ``ready``
+with its checksum at once and skips the ``media_jobs`` queue.
+
+Sessions untouched for ``SESSION_TTL`` are abandoned; the
+``clean_upload_sessions`` command deletes them and their part files.
+"""
+import hashlib
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows (development)
+    fcntl = None
+    import msvcrt
+
+CHUNK_SIZE = getattr(settings, "CHUNKED_UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024)  # advised to clients
+MAX_SIZE = getattr(settings, "CHUNKED_UPLOAD_MAX_SIZE", 2 * 1024 ** 3)
+MAX_OPEN_SESSIONS = 5  # per user
+SESSION_TTL = timedelta(hours=24)
+
+READ_SIZE = 64 * 1024
+
+# kind -> (model label, file field)
+KIND_FIELDS = {
+    "audio": ("accounts.AudioAcapellaCover", "audio_file"),
+    "video": ("accounts.VideoAcapellaCover", "video_file"),
+}
+
+# session id -> (offset, sha256 of the bytes before it), for sessions this process served
+_hashes = {}
+
+
+class UploadConflict(Exception):
+    """The chunk is not at the session's current offset (or the upload is incomplete)."""
+
+    def __init__(self, offset):
+        super().__init__(f"expected offset {offset}")
+        self.offset = offset
+
+
+def part_dir():
+    # next to MEDIA_ROOT by default, so finalizing is a link, not a copy
+    return getattr(settings, "CHUNKED_UPLOAD_DIR", None) or os.path.join(settings.MEDIA_ROOT, ".chunked")
+
+
+def part_path(session):
+    return os.path.join(part_dir(), f"{session.pk}.part")
+
+
+def _lock(part):
+    """Hold an exclusive lock on an open part file until it is closed."""
+    if fcntl is not None:
+        fcntl.flock(part, fcntl.LOCK_EX)
+    else:
+        msvcrt.locking(part.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def start(user, kind, filename, size, title=""):
+    """Open a session; ValueError if the request cannot be accepted."""
+    from .models import UploadSession
+
+    if kind not in KIND_FIELDS:
+        raise ValueError("kind must be audio or video")
+    filename = os.path.basename(str(filename or "").replace("\\", "/")).strip()
+    if not filename:
+        raise ValueError("filename is required")
+    if size <= 0 or size > MAX_SIZE:
+        raise ValueError(f"size must be between 1 and {MAX_SIZE} bytes")
+    if UploadSession.objects.filter(user=user).count() >= MAX_OPEN_SESSIONS:
+        raise ValueError("too many unfinished uploads")
+
+    session = UploadSession.objects.create(
+        user=user, kind=kind, filename=filename[:255], title=(title or "")[:150], size=size
+    )
+    os.makedirs(part_dir(), exist_ok=True)
+    open(part_path(session), "wb").close()
+    _hashes[session.pk] = (0, hashlib.sha256())
+    return session
+
+
+def _hash_up_to_offset(session):
+    """A sha256 of the bytes before ``session.received``; reads the part file only if this process lacks it."""
+    offset, digest = _hashes.get(session.pk, (None, None))
+    if offset == session.received:
+        return digest.copy()
+    digest, remaining = hashlib.sha256(), session.received
+    with open(part_path(session), "rb") as part:
+        while remaining:
+            chunk = part.read(min(READ_SIZE, remaining))
+            if not chunk:
+                raise UploadConflict(session.received - remaining)
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest
+
+
+def append(session, offset, stream):
+    """
+    Write the bytes of ``stream`` at ``offset``, which must be the session's
+    current offset (UploadConflict otherwise). Returns the new offset.
+    """
+    from .models import UploadSession
+
+    if offset != session.received:
+        raise UploadConflict(session.received)
+    with tempfile.TemporaryFile(dir=part_dir(), suffix=".chunk") as chunk_file:
+        written = 0
+        while chunk := stream.read(READ_SIZE):
+            if offset + written + len(chunk) > session.size:
+                raise ValueError(f"more than the declared {session.size} bytes")
+            chunk_file.write(chunk)
+            written += len(chunk)
+        chunk_file.seek(0)
+
+        with open(part_path(session), "r+b") as part:
+            _lock(part)
+            # another request may have stored this chunk while ours was read
+            session.refresh_from_db(fields=["received"])
+            if session.received != offset:
+                raise UploadConflict(session.received)
+            digest = _hash_up_to_offset(session)
+            part.seek(offset)
+            while chunk := chunk_file.read(READ_SIZE):
+                part.write(chunk)
+                digest.update(chunk)
+            part.truncate()  # drop the rest of an earlier, interrupted attempt
+            part.flush()
+            UploadSession.objects.filter(pk=session.pk, received=offset).update(
+                received=offset + written, updated_at=timezone.now()
+            )
+            session.received = offset + written
+            _hashes[session.pk] = (session.received, digest)
+    return session.received
+
+
+def _link_into(part, storage, name, max_length):
+    """Hard-link ``part`` to a free name in a local storage. NotImplementedError/OSError if it cannot."""
+    while True:
+        name = storage.get_available_name(name, max_length=max_length)
+        target = storage.path(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(part, target)  # unlike a rename, never replaces a file that took the name meanwhile
+        except FileExistsError:
+            continue
+        if storage.file_permissions_mode is not None:
+            os.chmod(target, storage.file_permissions_mode)
+        return name
+
+
+def finalize(session, checksum=None):
+    """
+    Turn a complete upload into its cover (``ready``, with its sha256) and
+    close the session. UploadConflict if bytes are missing; ValueError (and
+    the session is discarded) if ``checksum`` does not match.
+    """
+    from django.apps import apps
+
+    from .models import MediaStatus, UploadSession
+
+    if session.received != session.size:
+        raise UploadConflict(session.received)
+    digest = _hash_up_to_offset(session).hexdigest()
+    if checksum and checksum.strip().lower() != digest:
+        discard(session)
+        raise ValueError("checksum mismatch")
+
+    label, field_name = KIND_FIELDS[session.kind]
+    model = apps.get_model(label)
+    field = model._meta.get_field(field_name)
+    session_id, part = session.pk, part_path(session)
+    name = field.generate_filename(None, session.filename)
+    with transaction.atomic():
+        # closing the session first makes a concurrent finalize a no-op
+        if not UploadSession.objects.filter(pk=session_id).delete()[0]:
+            raise UploadConflict(session.size)
+        try:
+            name = _link_into(part, field.storage, name, field.max_length)
+        except (NotImplementedError, OSError):  # not a local storage, or another device
+            with open(part, "rb") as stream:
+                name = field.storage.save(name, File(stream), max_length=field.max_length)
+        cover = model.objects.create(
+            user_id=session.user_id,
+            title=session.title,
+            status=MediaStatus.READY,
+            checksum=digest,
+            **{field_name: name},
+        )
+    _remove_part(session_id, part)
+    return cover
+
+
+def _remove_part(session_id, path):
+    _hashes.pop(session_id, None)
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def discard(session):
+    """Delete a session and its part file."""
+    session_id, part = session.pk, part_path(session)
+    session.delete()
+    _remove_part(session_id, part)
+
+
+def clean_expired(now=None):
+    """
+    Discard sessions idle for ``SESSION_TTL`` and part files no session owns
+    (a process that died right after finalizing). Returns
+    ``(sessions, files)`` removed.
+    """
+    from .models import UploadSession
+
+    now = now or timezone.now()
+    expired = list(UploadSession.objects.filter(updated_at__lt=now - SESSION_TTL))
+    for session in expired:
+        discard(session)
+
+    orphans = 0
+    directory = part_dir()
+    if os.path.isdir(directory):
+        live = {f"{pk}.part" for pk in UploadSession.objects.values_list("pk", flat=True)}
+        cutoff = time.time() - SESSION_TTL.total_seconds()
+        for entry in os.scandir(directory):
+            if entry.name.endswith(".part") and entry.name not in live and entry.stat().st_mtime < cutoff:
+                _remove_part(None, entry.path)
+                orphans += 1
+    return len(expired), orphans
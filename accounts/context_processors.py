@@ -1,15 +1,16 @@
+from functools import cache
+
+from . import news
 
-from .models import NewsPost
 
 def news_unread_count(request):
     # Always show a number. If not logged in, return 0.
-    if not getattr(request, "user", None) or not request.user.is_authenticated:
-        return {"news_unread_count": 0}
-
-    unread = (
-        NewsPost.objects
-        .filter(is_published=True)
-        .exclude(reads__user=request.user)
-        .count()
-    )
+    # Templates call the value when they render it; others never pay for it.
+    @cache
+    def unread():
+        user = getattr(request, "user", None)
+        if not user or not user.is_authenticated:
+            return 0
+        return news.unread_count(user)
+
     return {"news_unread_count": unread}
@@ -0,0 +1,196 @@
+"""
+Resized, re-encoded copies ("derivatives") of uploaded images.
+
+Pictures are uploaded at camera size but mostly shown as small cards. For each
+image field listed in ``IMAGE_FIELDS`` the upload gets copies at the widths in
+``settings.IMAGE_DERIVATIVE_WIDTHS`` (never wider than the original) in every
+format of ``settings.IMAGE_DERIVATIVE_FORMATS`` that Pillow can write. They
+are stored next to the original: ``avatars/me.jpg`` -> ``avatars/me.320w.webp``.
+
+What was generated is recorded in a JSON field beside the image field
+(``profile_picture`` -> ``profile_picture_variants``)::
+
+    {"name": "avatars/me.jpg", "width": 1800, "height": 1200,
+     "widths": [160, 320, 640, 1280], "formats": ["avif", "webp"]}
+
+so URLs are built without touching storage. A record whose ``name`` no longer
+matches the field (the picture was replaced) is ignored until regenerated.
+``accounts.signals`` generates on save; ``generate_image_derivatives``
+backfills existing rows. Serializers expose ``url_map()``, templates use the
+``{% picture %}`` tag (``account_extras``).
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+WIDTHS = tuple(getattr(settings, "IMAGE_DERIVATIVE_WIDTHS", (160, 320, 640, 1280)))
+# preferred first: <picture> sources are tried in this order
+FORMATS = tuple(getattr(settings, "IMAGE_DERIVATIVE_FORMATS", ("avif", "webp")))
+
+ENCODER_OPTIONS = {
+    "avif": {"quality": 55},
+    "webp": {"quality": 80, "method": 4},
+}
+
+# model label -> (image field, variants field) pairs
+IMAGE_FIELDS = {
+    "accounts.Accounts": (
+        ("profile_picture", "profile_picture_variants"),
+        ("professional_picture", "professional_picture_variants"),
+    ),
+    "accounts.AccountPhoto": (("image", "image_variants"),),
+    "accounts.ProfessionalPhoto": (("image", "image_variants"),),
+    "accounts.NewsPost": (("image", "image_variants"),),
+}
+
+
+def available_formats():
+    return [fmt for fmt in FORMATS if features.check(fmt)]
+
+
+def derivative_name(name, width, fmt):
+    root, _ext = os.path.splitext(name)
+    return f"{root}.{width}w.{fmt}"
+
+
+def _target_widths(original_width):
+    widths = [width for width in WIDTHS if width < original_width]
+    if original_width <= WIDTHS[-1]:
+        widths.append(original_width)  # same size, smaller format
+    return widths
+
+
+def generate(fieldfile, write=True):
+    """
+    Write the derivatives of ``fieldfile`` (an ImageField value) and return the
+    variants record. Existing derivative files are reused: upload names are
+    unique, so a name always has the same content. With ``write=False`` the
+    record is returned only if every derivative already exists, else None.
+    """
+    storage, name = fieldfile.storage, fieldfile.name
+    with storage.open(name, "rb") as stream:
+        image = Image.open(stream)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+
+    formats = available_formats()
+    widths = _target_widths(image.width)
+    if not write:
+        targets = [derivative_name(name, width, fmt) for width in widths for fmt in formats]
+        if not all(storage.exists(target) for target in targets):
+            return None
+        return {"name": name, "width": image.width, "height": image.height, "widths": widths, "formats": formats}
+
+    for width in widths:
+        resized = None
+        for fmt in formats:
+            target = derivative_name(name, width, fmt)
+            if storage.exists(target):
+                continue
+            if resized is None:
+                height = max(1, round(image.height * width / image.width))
+                resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            buffer = BytesIO()
+            resized.save(buffer, format=fmt.upper(), **ENCODER_OPTIONS.get(fmt, {}))
+            storage.save(target, ContentFile(buffer.getvalue()))
+
+    return {"name": name, "width": image.width, "height": image.height, "widths": widths, "formats": formats}
+
+
+# records of field defaults (e.g. the default avatar) shared by many rows
+_default_records = {}
+
+
+def _default_record(fieldfile):
+    """
+    The record of a field default, read once per process. Defaults are not
+    generated on save (every new row would write them); the backfill command
+    writes them once.
+    """
+    if fieldfile.name not in _default_records:
+        try:
+            record = generate(fieldfile, write=False)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            record = None
+        _default_records[fieldfile.name] = record or {}
+    return _default_records[fieldfile.name]
+
+
+def refresh(instance, fields=None, force=False, write_defaults=False):
+    """
+    Regenerate stale variant records of ``instance`` and store them with an
+    UPDATE (no save() signals). Returns the names of the updated fields.
+    """
+    updates = {}
+    for field, variants_field in IMAGE_FIELDS.get(instance._meta.label, ()):
+        if fields is not None and field not in fields:
+            continue
+        fieldfile = getattr(instance, field)
+        current = getattr(instance, variants_field) or {}
+        if not fieldfile:
+            record = {}
+        elif current.get("name") == fieldfile.name and not force:
+            continue
+        elif fieldfile.name == instance._meta.get_field(field).default and not write_defaults:
+            record = _default_record(fieldfile)
+        else:
+            try:
+                record = generate(fieldfile)
+            except (OSError, ValueError, Image.DecompressionBombError) as exc:
+                # missing or unreadable file: remember it, serve the original
+                logger.warning("No derivatives for %s: %s", fieldfile.name, exc)
+                record = {"name": fieldfile.name, "widths": [], "formats": []}
+            if fieldfile.name == instance._meta.get_field(field).default:
+                _default_records[fieldfile.name] = record
+        if record != current:
+            setattr(instance, variants_field, record)
+            updates[variants_field] = record
+    if updates:
+        type(instance).objects.filter(pk=instance.pk).update(**updates)
+    return list(updates)
+
+
+def _current(fieldfile, variants):
+    variants = variants or {}
+    if not fieldfile or variants.get("name") != fieldfile.name:
+        return None
+    return variants
+
+
+def srcset(fieldfile, variants, fmt):
+    """``"url 160w, url 320w"`` for one format, or "" when there are none."""
+    variants = _current(fieldfile, variants)
+    if not variants or fmt not in variants.get("formats", ()):
+        return ""
+    storage = fieldfile.storage
+    return ", ".join(
+        f"{storage.url(derivative_name(fieldfile.name, width, fmt))} {width}w" for width in variants["widths"]
+    )
+
+
+def url_map(fieldfile, variants):
+    """
+    ``{"original": url, "width": w, "height": h, "sizes": {"320": {"webp": url, ...}, ...}}``
+    for serializers, or None without a file. ``sizes`` is empty until the
+    derivatives exist.
+    """
+    if not fieldfile:
+        return None
+    data = {"original": fieldfile.url, "sizes": {}}
+    variants = _current(fieldfile, variants)
+    if variants:
+        data.update(width=variants.get("width"), height=variants.get("height"))
+        storage = fieldfile.storage
+        for width in variants["widths"]:
+            data["sizes"][str(width)] = {
+                fmt: storage.url(derivative_name(fieldfile.name, width, fmt)) for fmt in variants["formats"]
+            }
+    return data
@@ -0,0 +1,306 @@
+"""
+Bulk account import from CSV or JSON Lines.
+
+Creating accounts one ``save()`` at a time costs an INSERT, the public id
+collision checks and one more write per many-to-many link. For onboarding a
+partner's whole roster the import works in batches instead:
+
+- ``read_rows()`` streams the file, one row at a time, so memory does not
+  grow with the file;
+- each row is validated in memory against the model fields' limits and
+  lookups loaded once (currencies, professions, languages), and each batch is
+  checked for existing emails in one query (and again if an insert still
+  finds one taken);
+- ``Accounts.assign_public_ids()`` gives the batch its public ids with one
+  set-based collision query, and the accounts and their profession and
+  language links are written with ``bulk_create``;
+- ``bulk_create`` skips model signals, so the search index is refreshed once
+  per batch and the professionals filter options once per import.
+
+Imported accounts get an unusable password; they set one through password
+reset. Columns (CSV header or JSON keys): ``email``, ``first_name`` and
+``last_name`` are required; ``account_type`` (default professional),
+``nickname``, ``phone``, ``gender``, ``years_of_experience``, ``about_me``,
+``country``, ``city``, ``address``, ``currency`` (id or name),
+``cost_per_hour``, ``cost_per_5_hours``, and ``professions`` / ``languages``
+(ids or names; a list in JSON, ``;``-separated in CSV).
+"""
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.backends.base.operations import BaseDatabaseOperations
+
+from showdan import filter_options
+
+from . import rates, search
+from .models import Accounts, Currency, Language, Profession
+
+FORMATS = ("csv", "jsonl")
+BATCH_SIZE = 1000
+# errors listed in the report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+TEXT_FIELDS = ("nickname", "phone", "about_me", "country", "city", "address")
+# checked against the model field's validators (max_length, max_digits, range),
+# so a bad row is reported instead of failing its whole batch in the database
+CHECKED_FIELDS = (
+    "email", "first_name", "last_name", "years_of_experience", "cost_per_hour", "cost_per_5_hours", *TEXT_FIELDS,
+)
+# SQLite's field validators have no integer bounds; Postgres and MySQL do
+MAX_YEARS = BaseDatabaseOperations.integer_field_ranges["PositiveSmallIntegerField"][1]
+
+
+def detect_format(filename):
+    """``csv`` or ``jsonl`` from a file name, or None."""
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return None
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line, row, error)`` for each record of a text stream."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError as exc:
+            yield line, None, f"invalid JSON: {exc}"
+            continue
+        if not isinstance(row, dict):
+            yield line, None, "expected a JSON object"
+            continue
+        yield line, row, None
+
+
+class _Lookups:
+    """Currencies, professions and languages by id and by lower-cased name."""
+
+    def __init__(self):
+        self.currencies = self._index(Currency.objects.all())
+        self.professions = self._index(Profession.objects.order_by("path"))
+        self.languages = self._index(Language.objects.all())
+
+    @staticmethod
+    def _index(queryset):
+        by_key = {}
+        for pk, name in queryset.values_list("pk", "name"):
+            by_key[str(pk)] = pk
+            by_key.setdefault(name.strip().lower(), pk)  # first in tree order wins
+        return by_key
+
+    @staticmethod
+    def resolve(index, value, label):
+        pk = index.get(str(value).strip().lower())
+        if pk is None:
+            raise ValueError(f"unknown {label}: {value}")
+        return pk
+
+    def resolve_many(self, index, value, label):
+        if value in (None, ""):
+            return []
+        values = value if isinstance(value, list) else str(value).split(";")
+        return sorted({self.resolve(index, item, label) for item in values if str(item).strip()})
+
+
+def _text(row, name):
+    value = row.get(name)
+    return "" if value is None else str(value).strip()
+
+
+def _decimal(row, name):
+    value = _text(row, name)
+    if not value:
+        return None
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"{name} is not a number: {value}")
+    if not amount.is_finite() or amount < 0:
+        raise ValueError(f"{name} must be a non-negative number")
+    return amount
+
+
+def _check_fields(account):
+    for name in CHECKED_FIELDS:
+        value = getattr(account, name)
+        if value in (None, ""):
+            continue
+        try:
+            Accounts._meta.get_field(name).run_validators(value)
+        except ValidationError as exc:
+            raise ValueError(f"{name}: {' '.join(exc.messages)}")
+
+
+def build_account(row, lookups):
+    """``(account, profession_ids, language_ids)`` for a row; ValueError if invalid."""
+    email = Accounts.objects.normalize_email(_text(row, "email"))
+    try:
+        validate_email(email)
+    except ValidationError:
+        raise ValueError(f"invalid email: {email or '(empty)'}")
+    first_name, last_name = _text(row, "first_name"), _text(row, "last_name")
+    if not first_name or not last_name:
+        raise ValueError("first_name and last_name are required")
+
+    account_type = _text(row, "account_type").lower() or Accounts.AccountType.PROFESSIONAL
+    if account_type not in Accounts.AccountType.values:
+        raise ValueError(f"unknown account_type: {account_type}")
+    gender = _text(row, "gender").lower() or None
+    if gender is not None and gender not in Accounts.Gender.values:
+        raise ValueError(f"unknown gender: {gender}")
+    years = _text(row, "years_of_experience")
+    if years and not years.isdigit():
+        raise ValueError(f"years_of_experience is not a whole number: {years}")
+    if years and int(years) > MAX_YEARS:
+        raise ValueError(f"years_of_experience must be at most {MAX_YEARS}")
+
+    currency = _text(row, "currency")
+    account = Accounts(
+        email=email,
+        first_name=first_name,
+        last_name=last_name,
+        account_type=account_type,
+        gender=gender,
+        years_of_experience=int(years) if years else 0,
+        currency_id=lookups.resolve(lookups.currencies, currency, "currency") if currency else None,
+        cost_per_hour=_decimal(row, "cost_per_hour"),
+        cost_per_5_hours=_decimal(row, "cost_per_5_hours"),
+        **{name: _text(row, name) for name in TEXT_FIELDS},
+    )
+    account.nickname = account.nickname or None
+    _check_fields(account)
+    account.set_unusable_password()
+    account.cost_per_hour_base = rates.to_base(account.cost_per_hour, account.currency_id)
+    return (
+        account,
+        lookups.resolve_many(lookups.professions, row.get("professions"), "profession"),
+        lookups.resolve_many(lookups.languages, row.get("languages"), "language"),
+    )
+
+
+def _link(through, source, target, pairs):
+    through.objects.bulk_create(
+        [through(**{source: account_id, target: target_id}) for account_id, target_id in pairs],
+        ignore_conflicts=True,
+    )
+
+
+def _write_batch(batch):
+    """Insert one batch of ``(line, account, profession_ids, language_ids)``; returns the new ids."""
+    accounts = [account for _line, account, _professions, _languages in batch]
+    Accounts.assign_public_ids(accounts)
+    with transaction.atomic():
+        Accounts.objects.bulk_create(accounts)
+        if any(account.pk is None for account in accounts):  # backends without RETURNING
+            ids = dict(Accounts.objects.filter(email__in=[a.email for a in accounts]).values_list("email", "pk"))
+            for account in accounts:
+                account.pk = ids[account.email]
+        _link(
+            Accounts.professions.through, "accounts_id", "profession_id",
+            [(account.pk, pk) for _line, account, professions, _languages in batch for pk in professions],
+        )
+        _link(
+            Accounts.communication_languages.through, "accounts_id", "language_id",
+            [(account.pk, pk) for _line, account, _professions, languages in batch for pk in languages],
+        )
+    ids = [account.pk for account in accounts]
+    search.get_backend().index(ids)
+    return ids
+
+
+def import_accounts(rows, batch_size=BATCH_SIZE, dry_run=False, progress=None):
+    """
+    Import ``(line, row, error)`` records (see ``read_rows``) in batches.
+    ``progress(report)`` is called after every batch. Returns the report: row,
+    created, skipped (email already present) and error counts, the first
+    errors, and the elapsed time and rate.
+    """
+    lookups = _Lookups()
+    report = {"rows": 0, "created": 0, "skipped": 0, "error_count": 0, "errors": [], "dry_run": dry_run}
+    seen = set()
+    started = time.perf_counter()
+
+    def stamp():
+        report["seconds"] = round(time.perf_counter() - started, 3)
+        report["rows_per_second"] = round(report["rows"] / report["seconds"], 1) if report["seconds"] else 0.0
+
+    def fail(line, email, message):
+        report["error_count"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"line": line, "email": email, "error": message})
+
+    def unclaimed(batch):
+        existing = set(
+            Accounts.objects.filter(email__in=[account.email for _line, account, *_rest in batch])
+            .values_list("email", flat=True)
+        )
+        return [item for item in batch if item[1].email not in existing]
+
+    def flush(batch):
+        fresh, failed = unclaimed(batch), []
+        if fresh and not dry_run:
+            try:
+                _write_batch(fresh)
+            except IntegrityError:
+                # an email (or public id) was taken by another writer since the
+                # check: check again and retry once with new public ids
+                fresh = unclaimed(fresh)
+                for _line, account, *_rest in fresh:
+                    account.public_id = None
+                try:
+                    if fresh:
+                        _write_batch(fresh)
+                except IntegrityError as exc:
+                    for line, account, *_rest in fresh:
+                        fail(line, account.email, f"not imported: {exc}")
+                    fresh, failed = [], fresh
+        report["skipped"] += len(batch) - len(fresh) - len(failed)
+        report["created"] += len(fresh)
+        stamp()
+        if progress:
+            progress(report)
+
+    batch = []
+    for line, row, error in rows:
+        report["rows"] += 1
+        if error:
+            fail(line, None, error)
+            continue
+        if not batch:
+            rates.get_matrix(fresh=True)  # base prices are stored: check the rates once per batch
+        try:
+            item = build_account(row, lookups)
+        except ValueError as exc:
+            fail(line, _text(row, "email") or None, str(exc))
+            continue
+        email = item[0].email
+        if email.lower() in seen:
+            fail(line, email, "duplicate email in this file")
+            continue
+        seen.add(email.lower())
+        batch.append((line, *item))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    stamp()
+
+    if report["created"] and not dry_run:
+        filter_options.bump_version(filter_options.PROFESSIONALS)
+    return report
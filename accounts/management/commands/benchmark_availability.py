@@ -0,0 +1,142 @@
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Accounts
+from events.calendar_utils import available_between
+from events.models import BusyTime, Event
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the professionals availability filter: the NOT EXISTS anti-join "
+        "on busy times and locked bookings against checking every professional in "
+        "Python. Synthetic rows are inserted inside a transaction that is rolled "
+        "back afterwards; still, do not run this against production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--professionals", type=int, default=50_000, help="Professionals (default: 50000).")
+        parser.add_argument("--busy", type=int, default=2_000_000, help="Busy intervals (default: 2000000).")
+        parser.add_argument(
+            "--booked", type=int, default=200_000, help="Locked bookings (default: 200000).",
+        )
+        parser.add_argument("--days", type=int, default=730, help="Days the intervals spread over (default: 730).")
+        parser.add_argument(
+            "--python-sample", type=int, default=2_000,
+            help="Professionals checked one by one for the Python baseline, extrapolated (default: 2000).",
+        )
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per query (default: 3).")
+
+    def handle(self, *args, **options):
+        if min(options["professionals"], options["days"], options["python_sample"]) <= 0:
+            raise CommandError("--professionals, --days and --python-sample must be positive.")
+        if options["busy"] < 0 or options["booked"] < 0:
+            raise CommandError("--busy and --booked must be non-negative.")
+
+        start_day = timezone.localdate()
+        with transaction.atomic():
+            started = time.perf_counter()
+            pro_ids = self._populate(options, start_day)
+            self.stdout.write(
+                f"{len(pro_ids):,} professionals, {options['busy']:,} busy times, "
+                f"{options['booked']:,} bookings ({time.perf_counter() - started:.1f}s)"
+            )
+            pros = Accounts.objects.filter(pk__in=pro_ids)
+
+            self.stdout.write(
+                f"\n{'window':<12}{'anti-join ms':>14}{'python ms':>12}{'available':>11}"
+            )
+            for hours in (2, 24, 24 * 7):
+                window_start = timezone.make_aware(
+                    datetime.combine(start_day + timedelta(days=options["days"] // 2), datetime.min.time())
+                ) + timedelta(hours=18)
+                window_end = window_start + timedelta(hours=hours)
+
+                anti_join = lambda: list(
+                    pros.filter(available_between(window_start, window_end)).values_list("pk", flat=True)
+                )
+                joined_ms = self._time(anti_join, options["repeat"])
+                available = len(anti_join())
+
+                sample = pro_ids[:options["python_sample"]]
+                python_ms = self._time(
+                    lambda: self._python_check(sample, window_start, window_end), 1,
+                ) * len(pro_ids) / len(sample)
+
+                self.stdout.write(f"{f'{hours}h':<12}{joined_ms:>14.1f}{python_ms:>12.1f}{available:>11,}")
+
+            self.stdout.write("\nQuery plan (24h window):")
+            self.stdout.write(pros.filter(available_between(window_start, window_start + timedelta(hours=24)))
+                              .values("pk").explain())
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("\nDone (synthetic data rolled back)."))
+
+    def _populate(self, options, start_day, batch_size=10_000):
+        rng = random.Random(0)
+        creator = Accounts.objects.create(
+            email="bench-availability-creator@bench.invalid", first_name="B", last_name="C", password="!",
+        )
+        pro_ids = []
+        for offset in range(0, options["professionals"], batch_size):
+            pro_ids += [pro.pk for pro in Accounts.objects.bulk_create([
+                Accounts(
+                    email=f"bench-availability-{i}@bench.invalid", first_name="B", last_name=str(i),
+                    account_type=Accounts.AccountType.PROFESSIONAL, password="!",
+                )
+                for i in range(offset, min(offset + batch_size, options["professionals"]))
+            ])]
+
+        origin = timezone.make_aware(datetime.combine(start_day, datetime.min.time()))
+        minutes = options["days"] * 24 * 60
+
+        def slot():
+            start = origin + timedelta(minutes=rng.randrange(minutes))
+            return start, start + timedelta(hours=rng.choice((1, 3, 8, 24, 48)))
+
+        for offset in range(0, options["busy"], batch_size):
+            rows = []
+            for _ in range(min(batch_size, options["busy"] - offset)):
+                start, end = slot()
+                rows.append(BusyTime(user_id=rng.choice(pro_ids), start_datetime=start, end_datetime=end))
+            BusyTime.objects.bulk_create(rows)
+
+        for offset in range(0, options["booked"], batch_size):
+            rows = []
+            for i in range(offset, min(offset + batch_size, options["booked"])):
+                start, end = slot()
+                rows.append(Event(
+                    name=f"bench-{i}", created_by=creator, is_locked=True,
+                    accepted_professional_id=rng.choice(pro_ids), start_datetime=start, end_datetime=end,
+                ))
+            Event.objects.bulk_create(rows)
+        return pro_ids
+
+    @staticmethod
+    def _python_check(pro_ids, start, end):
+        """The per-professional approach: load each calendar and test overlaps in Python."""
+        free = []
+        for pk in pro_ids:
+            intervals = list(BusyTime.objects.filter(user_id=pk).values_list("start_datetime", "end_datetime"))
+            intervals += Event.objects.filter(accepted_professional_id=pk, is_locked=True).values_list(
+                "start_datetime", "end_datetime",
+            )
+            if not any(s < end and e > start for s, e in intervals):
+                free.append(pk)
+        return free
+
+    @staticmethod
+    def _time(func, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
@@ -0,0 +1,144 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts import rates
+from accounts.models import Currency, ExchangeRate
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark currency conversion: the previous per-call lookup (up to two "
+        "queries, direct or inverse pairs only) against the in-process rate matrix, "
+        "one call at a time and through the batch API. Synthetic currencies and rates "
+        "are inserted inside a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--conversions", type=int, default=100_000, help="Conversions (default: 100000).")
+        parser.add_argument("--currencies", type=int, default=40, help="Currencies (default: 40).")
+        parser.add_argument(
+            "--cross-rates", type=int, default=60,
+            help="Stored pairs besides the rates to the base currency (default: 60).",
+        )
+        parser.add_argument(
+            "--query-sample", type=int, default=10_000,
+            help="Conversions timed for the query baseline, extrapolated (default: 10000).",
+        )
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per in-memory strategy (default: 3).")
+
+    def handle(self, *args, **options):
+        if min(options["conversions"], options["query_sample"], options["repeat"]) <= 0:
+            raise CommandError("--conversions, --query-sample and --repeat must be positive.")
+        if options["currencies"] < 2 or options["cross_rates"] < 0:
+            raise CommandError("--currencies must be at least 2 and --cross-rates non-negative.")
+
+        rng = random.Random(0)
+        with transaction.atomic():
+            currencies = self._populate(rng, options["currencies"], options["cross_rates"])
+            items = [
+                (Decimal(rng.randrange(100, 1_000_000)) / 100, rng.choice(currencies))
+                for _ in range(options["conversions"])
+            ]
+            targets = [rng.choice(currencies) for _ in items]
+            cent = Decimal("0.01")
+
+            sample = options["query_sample"]
+            started = time.perf_counter()
+            query_results = [
+                self._query_rate(source, target) for (_amount, source), target in zip(items[:sample], targets)
+            ]
+            query_ms = (time.perf_counter() - started) * 1000 * len(items) / min(sample, len(items))
+
+            rates.bump_version()
+            started = time.perf_counter()
+            rates.get_matrix()
+            load_ms = (time.perf_counter() - started) * 1000
+
+            def one_by_one():
+                out = []
+                for (amount, source), target in zip(items, targets):
+                    rate = rates.get_rate(source, target)
+                    out.append((amount * rate).quantize(cent) if rate is not None else None)
+                return out
+
+            target = targets[0]
+            single_ms = self._time(one_by_one, options["repeat"])
+            batch_ms = self._time(lambda: rates.convert_many(items, target, cent), options["repeat"])
+
+            matrix_results = [rates.get_rate(source, target) for (_amount, source), target in zip(items[:sample], targets)]
+            resolved_before = sum(rate is not None for rate in query_results)
+            resolved_after = sum(rate is not None for rate in matrix_results)
+            mismatched = sum(
+                1 for before, after in zip(query_results, matrix_results)
+                if before is not None and before != after
+            )
+
+            count = len(items)
+            self.stdout.write(f"{count:,} conversions over {len(currencies)} currencies\n")
+            self.stdout.write(f"{'strategy':<28}{'total ms':>12}{'per 1k ms':>12}")
+            for name, ms in (
+                ("queries per call (before)", query_ms),
+                ("matrix, one call each", single_ms),
+                ("matrix, batch to one target", batch_ms),
+            ):
+                self.stdout.write(f"{name:<28}{ms:>12.1f}{ms * 1000 / count:>12.3f}")
+            self.stdout.write(f"\nmatrix load: {load_ms:.1f} ms")
+            self.stdout.write(
+                f"pairs resolved in the {sample:,}-conversion sample: {resolved_before:,} before, "
+                f"{resolved_after:,} after (triangulation); {mismatched} direct/inverse mismatches"
+            )
+
+            transaction.set_rollback(True)
+        rates.bump_version()
+
+        self.stdout.write(self.style.SUCCESS("\nDone (synthetic data rolled back)."))
+
+    @staticmethod
+    def _populate(rng, count, cross_rates):
+        currencies = Currency.objects.bulk_create([
+            Currency(name=f"Bench currency {i}", sign=f"B{i}") for i in range(count)
+        ])
+        base, others = currencies[0], currencies[1:]
+        value = {base.pk: Decimal("1")}
+        rows = []
+        for currency in others:
+            value[currency.pk] = Decimal(rng.randrange(10, 500_000)) / 1000
+            rows.append(ExchangeRate(from_currency=base, to_currency=currency, rate=value[currency.pk]))
+        pairs = {(row.from_currency_id, row.to_currency_id) for row in rows}
+        while len(rows) < len(others) + cross_rates and len(pairs) < len(others) * (len(others) - 1):
+            a, b = rng.sample(others, 2)
+            if (a.pk, b.pk) in pairs or (b.pk, a.pk) in pairs:
+                continue
+            pairs.add((a.pk, b.pk))
+            rate = (value[b.pk] / value[a.pk]).quantize(Decimal("0.000001"))
+            rows.append(ExchangeRate(from_currency=a, to_currency=b, rate=rate))
+        # bulk_create skips the signals; the benchmark bumps the version itself
+        ExchangeRate.objects.bulk_create(rows)
+        return currencies
+
+    @staticmethod
+    def _query_rate(from_currency, to_currency):
+        """The lookup ``accounts.utils.get_rate`` did before the matrix."""
+        if from_currency == to_currency:
+            return Decimal("1")
+        direct = ExchangeRate.objects.filter(from_currency=from_currency, to_currency=to_currency).first()
+        if direct:
+            return direct.rate
+        inverse = ExchangeRate.objects.filter(from_currency=to_currency, to_currency=from_currency).first()
+        if inverse and inverse.rate:
+            return Decimal("1") / inverse.rate
+        return None
+
+    @staticmethod
+    def _time(func, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
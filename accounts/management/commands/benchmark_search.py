@@ -0,0 +1,108 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.models import Accounts, Profession
+from accounts.search import DatabaseLikeBackend, get_backend, search_professionals
+
+FIRST_NAMES = ["Amina", "Jean", "Paul", "Grace", "Chantal", "Eric", "Nadia", "Samuel", "Brice", "Linda"]
+LAST_NAMES = ["Mbarga", "Nkemelu", "Fotso", "Tchami", "Kouam", "Essomba", "Ngono", "Abena"]
+CITIES = ["Yaounde", "Douala", "Bafoussam", "Garoua", "Limbe", "Paris", "Lagos", "Accra"]
+COUNTRIES = ["Cameroon", "France", "Nigeria", "Ghana"]
+PROFESSIONS = ["Singer", "Drummer", "Guitarist", "Photographer", "Videographer", "DJ", "Dancer", "MC"]
+# StandardPagination.page_size
+PAGE_SIZE = 20
+QUERIES = ["amina", "mbar", "douala singer", "photo", "dj paris", "grace dancer", "zzz"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare icontains search with the full-text index at several table sizes, "
+        "timing what the professionals list runs for ?q=: the count and the first "
+        "page of search_professionals() ordered by rank. Synthetic professionals are inserted inside a transaction that is rolled "
+        "back afterwards; still, do not run this against production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+            help="Professional counts to benchmark (default: 10k 100k 1M).",
+        )
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per query (default: 5).")
+
+    def handle(self, *args, **options):
+        sizes = sorted(options["sizes"])
+        if not sizes or sizes[0] <= 0:
+            raise CommandError("--sizes must be positive integers.")
+
+        backend = get_backend()
+        legacy = DatabaseLikeBackend()
+        self.stdout.write(f"Index backend: {type(backend).__name__}")
+
+        with transaction.atomic():
+            professions = [
+                Profession.objects.get_or_create(name=f"bench-{name}", parent=None)[0]
+                for name in PROFESSIONS
+            ]
+            created = 0
+            for size in sizes:
+                self._populate(created, size, professions)
+                created = size
+                backend.rebuild()
+
+                self.stdout.write(f"\n{size:,} professionals")
+                self.stdout.write(f"{'query':<16}{'icontains ms':>14}{'index ms':>12}{'hits':>8}")
+                for query in QUERIES:
+                    like_ms = self._time(lambda: self._list_page(legacy, query), options["repeat"])
+                    index_ms = self._time(lambda: self._list_page(backend, query), options["repeat"])
+                    hits = self._list_page(backend, query)[0]
+                    self.stdout.write(f"{query:<16}{like_ms:>14.2f}{index_ms:>12.2f}{hits:>8}")
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("\nDone (synthetic data rolled back)."))
+
+    def _populate(self, start, stop, professions, batch_size=5_000):
+        rng = random.Random(start)
+        through = Accounts.professions.through
+        for offset in range(start, stop, batch_size):
+            batch = [
+                Accounts(
+                    email=f"bench-{i}@bench.invalid",
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    city=rng.choice(CITIES),
+                    country=rng.choice(COUNTRIES),
+                    account_type=Accounts.AccountType.PROFESSIONAL,
+                    password="!",
+                )
+                for i in range(offset, min(offset + batch_size, stop))
+            ]
+            # bulk_create skips signals; the index is rebuilt after each size step
+            accounts = Accounts.objects.bulk_create(batch)
+            through.objects.bulk_create([
+                through(accounts_id=account.pk, profession_id=rng.choice(professions).pk)
+                for account in accounts
+            ])
+
+    @staticmethod
+    def _list_page(backend, query, page_size=PAGE_SIZE):
+        """ProfessionalsListView for ``?q=query``: the paginator's count, then page one."""
+        queryset = search_professionals(
+            Accounts.objects.filter(account_type=Accounts.AccountType.PROFESSIONAL, is_active=True),
+            query,
+            backend=backend,
+        ).order_by("search_rank", "id")
+        return queryset.count(), list(queryset.values_list("id", flat=True)[:page_size])
+
+    @staticmethod
+    def _time(func, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
@@ -0,0 +1,123 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Accounts
+from events.models import Event, EventCategory
+from showdan.tree import subtree_filter
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark descendant-aware category filtering on a synthetic category "
+        "tree: exact id match, walking the children level by level into an id "
+        "list, and the path-range subquery the list views use. Synthetic rows "
+        "are inserted inside a transaction that is rolled back afterwards; "
+        "still, do not run this against production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--nodes", type=int, default=5_000, help="Tree size (default: 5000).")
+        parser.add_argument("--fanout", type=int, default=8, help="Children per node (default: 8).")
+        parser.add_argument("--events", type=int, default=50_000, help="Events to attach (default: 50000).")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per filter (default: 5).")
+
+    def handle(self, *args, **options):
+        if options["nodes"] <= 0 or options["fanout"] <= 0 or options["events"] < 0:
+            raise CommandError("--nodes and --fanout must be positive, --events non-negative.")
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            levels = self._build_tree(options["nodes"], options["fanout"])
+            self.stdout.write(
+                f"Built {options['nodes']:,} categories in {len(levels)} levels "
+                f"({time.perf_counter() - started:.1f}s)"
+            )
+            self._populate_events(options["events"], [pk for level in levels for pk in level])
+
+            self.stdout.write(
+                f"\n{'node':<10}{'depth':>6}{'exact ms':>10}{'walk ms':>10}{'range ms':>10}{'hits':>8}"
+            )
+            rng = random.Random(0)
+            for depth, level in enumerate(levels):
+                node_pk = rng.choice(level)
+                exact = Event.objects.filter(event_type_id=node_pk)
+                exact_ms = self._time(lambda: list(exact.values_list("pk", flat=True)), options["repeat"])
+                walk_ms = self._time(
+                    lambda: list(Event.objects.filter(event_type_id__in=self._walk(node_pk)).values_list("pk", flat=True)),
+                    options["repeat"],
+                )
+                ranged_ms = self._time(
+                    lambda: list(
+                        Event.objects.filter(subtree_filter(Event, "event_type", node_pk)).values_list("pk", flat=True)
+                    ),
+                    options["repeat"],
+                )
+                hits = Event.objects.filter(subtree_filter(Event, "event_type", node_pk)).count()
+                self.stdout.write(
+                    f"{node_pk:<10}{depth:>6}{exact_ms:>10.2f}{walk_ms:>10.2f}{ranged_ms:>10.2f}{hits:>8}"
+                )
+
+            root_pk = levels[0][0]
+            self.stdout.write("\nQuery plan (category subtree):")
+            self.stdout.write(
+                Event.objects.filter(subtree_filter(Event, "event_type", root_pk)).values("pk").explain()
+            )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("\nDone (synthetic data rolled back)."))
+
+    def _build_tree(self, total, fanout):
+        """Breadth-first tree of ``total`` categories; returns pks per level."""
+        levels = []
+        parents = [None]
+        created = 0
+        while created < total:
+            level = []
+            for parent in parents:
+                for _ in range(fanout):
+                    if created >= total:
+                        break
+                    node = EventCategory(name=f"bench-{created}", parent_id=parent)
+                    node.save()
+                    level.append(node.pk)
+                    created += 1
+            levels.append(level)
+            parents = level
+        return levels
+
+    def _populate_events(self, count, category_pks, batch_size=5_000):
+        rng = random.Random(count)
+        creator = Accounts.objects.create(email="bench-tree@bench.invalid", first_name="B", last_name="T", password="!")
+        end = timezone.now()
+        for offset in range(0, count, batch_size):
+            Event.objects.bulk_create([
+                Event(
+                    name=f"bench-{i}", created_by=creator, end_datetime=end,
+                    event_type_id=rng.choice(category_pks),
+                )
+                for i in range(offset, min(offset + batch_size, count))
+            ])
+
+    @staticmethod
+    def _walk(node_pk):
+        """Ids of ``node_pk`` and its descendants, one children query per level."""
+        ids, frontier = [node_pk], [node_pk]
+        while frontier:
+            frontier = list(EventCategory.objects.filter(parent_id__in=frontier).values_list("pk", flat=True))
+            ids += frontier
+        return ids
+
+    @staticmethod
+    def _time(func, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from accounts import chunked_uploads
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete resumable cover uploads nobody touched for "
+        f"{chunked_uploads.SESSION_TTL}, and their part files. Run it from cron."
+    )
+
+    def handle(self, *args, **options):
+        sessions, files = chunked_uploads.clean_expired()
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {sessions} abandoned upload session(s) and {files} orphaned part file(s)."
+        ))
@@ -0,0 +1,59 @@
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from accounts import images
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the resized WebP/AVIF copies of every stored picture (see "
+        "accounts.images). Uploads get theirs on save; run this after enabling "
+        "the feature, changing IMAGE_DERIVATIVE_WIDTHS/FORMATS (with --force) or "
+        "restoring media. Also writes the shared default avatars' copies."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Regenerate records that look current.")
+        parser.add_argument(
+            "--card-width", type=int, default=320,
+            help="Width compared against the originals in the summary (default: 320).",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        updated = 0
+        original_bytes = card_bytes = 0
+        for label, pairs in images.IMAGE_FIELDS.items():
+            model = apps.get_model(label)
+            for instance in model.objects.order_by("pk").iterator(chunk_size=500):
+                if images.refresh(instance, force=options["force"], write_defaults=True):
+                    updated += 1
+                for field, variants_field in pairs:
+                    sizes = self._sizes(getattr(instance, field), getattr(instance, variants_field), options["card_width"])
+                    if sizes:
+                        original_bytes += sizes[0]
+                        card_bytes += sizes[1]
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} row(s) in {elapsed:.2f}s."))
+        if original_bytes:
+            self.stdout.write(
+                f"A {options['card_width']}px card downloads {card_bytes / original_bytes:.1%} of the original "
+                f"bytes ({card_bytes:,} of {original_bytes:,})."
+            )
+
+    @staticmethod
+    def _sizes(fieldfile, variants, card_width):
+        """(original bytes, smallest derivative bytes a card of ``card_width`` picks), or None."""
+        if not fieldfile or not variants or variants.get("name") != fieldfile.name or not variants["widths"]:
+            return None
+        storage = fieldfile.storage
+        width = next((w for w in variants["widths"] if w >= card_width), variants["widths"][-1])
+        try:
+            return storage.size(fieldfile.name), min(
+                storage.size(images.derivative_name(fieldfile.name, width, fmt)) for fmt in variants["formats"]
+            )
+        except OSError:
+            return None
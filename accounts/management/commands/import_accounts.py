@@ -0,0 +1,70 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import importer
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-import accounts from a CSV or JSON Lines file ('-' reads stdin). The "
+        "file is streamed and written in batches: one email check, one public id "
+        "collision check and one INSERT per batch plus one per many-to-many table. "
+        "Rows whose email already exists are skipped. See accounts.importer for the "
+        "columns."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSONL file, or '-' for stdin.")
+        parser.add_argument(
+            "--format", choices=importer.FORMATS,
+            help="Input format (default: from the file extension).",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=importer.BATCH_SIZE,
+            help=f"Rows per batch (default: {importer.BATCH_SIZE}).",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Validate only, write nothing.")
+
+    def handle(self, *args, **options):
+        fmt = options["format"] or importer.detect_format(options["path"])
+        if fmt is None:
+            raise CommandError("Cannot tell the format from the file name; pass --format.")
+        if options["batch_size"] <= 0:
+            raise CommandError("--batch-size must be positive.")
+
+        def progress(report):
+            self.stdout.write(
+                f"{report['rows']} rows, {report['created']} created, {report['skipped']} skipped, "
+                f"{report['error_count']} errors ({report['rows_per_second']:.0f} rows/s)"
+            )
+
+        if options["path"] == "-":
+            report = self._import(sys.stdin, fmt, options, progress)
+        else:
+            try:
+                with open(options["path"], encoding="utf-8-sig", newline="") as stream:
+                    report = self._import(stream, fmt, options, progress)
+            except OSError as exc:
+                raise CommandError(f"Cannot read {options['path']}: {exc}")
+
+        for error in report["errors"]:
+            self.stderr.write(f"line {error['line']} ({error['email'] or '-'}): {error['error']}")
+        if report["error_count"] > len(report["errors"]):
+            self.stderr.write(f"... and {report['error_count'] - len(report['errors'])} more errors")
+
+        verb = "Would create" if options["dry_run"] else "Created"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {report['created']} of {report['rows']} rows in {report['seconds']:.2f}s "
+            f"({report['rows_per_second']:.0f} rows/s); {report['skipped']} existing, "
+            f"{report['error_count']} invalid."
+        ))
+
+    @staticmethod
+    def _import(stream, fmt, options, progress):
+        return importer.import_accounts(
+            importer.read_rows(stream, fmt),
+            batch_size=options["batch_size"],
+            dry_run=options["dry_run"],
+            progress=progress,
+        )
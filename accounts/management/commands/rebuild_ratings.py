@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Avg, Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from accounts.models import Accounts, Review
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute rating_sum / rating_count / avg_rating on every account from the "
+        "Review table. The signal handlers keep these in sync; run this after bulk "
+        "imports, raw SQL edits or if the summary is suspected to have drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            dest="user_id",
+            help="Only rebuild the summary for this account id.",
+        )
+
+    def handle(self, *args, **options):
+        accounts = Accounts.objects.all()
+        if options.get("user_id"):
+            accounts = accounts.filter(pk=options["user_id"])
+
+        per_pro = Review.objects.filter(professional=OuterRef("pk")).values("professional")
+
+        with transaction.atomic():
+            updated = accounts.update(
+                rating_sum=Coalesce(
+                    Subquery(per_pro.annotate(s=Sum("rating")).values("s")),
+                    Value(0),
+                    output_field=IntegerField(),
+                ),
+                rating_count=Coalesce(
+                    Subquery(per_pro.annotate(c=Count("id")).values("c")),
+                    Value(0),
+                    output_field=IntegerField(),
+                ),
+                avg_rating=Coalesce(
+                    Subquery(per_pro.annotate(a=Avg("rating")).values("a")),
+                    Value(0.0),
+                ),
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating summary for {updated} account(s)."))
@@ -0,0 +1,52 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from accounts import media_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Process queued uploads (see accounts.media_jobs): validate, strip EXIF, "
+        "resize and checksum in a pool of processes, then mark them ready. Runs "
+        "until interrupted; run several to share the queue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes", type=int, default=os.cpu_count() or 1,
+            help="Pool size (default: one per CPU).",
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=2.0,
+            help="Seconds to wait when the queue is empty (default: 2).",
+        )
+        parser.add_argument("--once", action="store_true", help="Drain the queue, then exit.")
+
+    def handle(self, *args, **options):
+        processes = options["processes"]
+        if processes <= 0:
+            raise CommandError("--processes must be positive.")
+
+        done = 0
+        started = time.perf_counter()
+        with media_jobs.make_pool(processes) as pool:
+            try:
+                while True:
+                    close_old_connections()
+                    # two per process, so the pool is not idle while results are written
+                    claimed = media_jobs.run_once(pool, limit=processes * 2)
+                    done += claimed
+                    if claimed:
+                        self.stdout.write(f"Processed {claimed} job(s).")
+                    elif options["once"]:
+                        break
+                    else:
+                        time.sleep(options["poll_interval"])
+            except KeyboardInterrupt:
+                pass
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Processed {done} job(s) in {elapsed:.2f}s."))
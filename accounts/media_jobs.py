@@ -0,0 +1,265 @@
+"""
+Background processing of uploaded photos and covers.
+
+Upload endpoints only store the file. The row starts out ``processing`` and
+``accounts.signals`` queues a ``MediaJob`` in the same transaction, so the
+request returns at once and no upload is lost if the process dies. The
+``run_media_worker`` command claims due jobs and runs the CPU-bound part in a
+process pool:
+
+- images: dimension validation, EXIF stripping (orientation is applied
+  first, the colour profile kept), the resized copies of ``accounts.images``
+  and a checksum;
+- audio and video: a checksum.
+
+Pool processes are given a model label and a storage name and never touch the
+database; the worker writes the results back and flips the row to ``ready``
+(or ``failed``), then deletes the job. Failed jobs are kept for inspection.
+
+Claiming is an UPDATE guarded by the job's current state, so several workers
+can share the queue on any backend. A claim is a lease: a job whose worker
+died is claimed again once ``LEASE`` has passed. Errors are retried with
+exponential backoff up to ``MAX_ATTEMPTS``; a rejected file (``MediaRejected``)
+fails at once.
+"""
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import ExifTags, Image, ImageOps
+
+from . import images
+
+# model label -> (file field, kind)
+MEDIA_FIELDS = {
+    "accounts.AccountPhoto": ("image", "image"),
+    "accounts.ProfessionalPhoto": ("image", "image"),
+    "accounts.AudioAcapellaCover": ("audio_file", "audio"),
+    "accounts.VideoAcapellaCover": ("video_file", "video"),
+}
+
+MIN_IMAGE_SIDE = getattr(settings, "MEDIA_MIN_IMAGE_SIDE", 64)
+MAX_IMAGE_PIXELS = getattr(settings, "MEDIA_MAX_IMAGE_PIXELS", 40_000_000)
+
+LEASE = timedelta(minutes=10)
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(seconds=30)  # doubled after every failed attempt
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class MediaRejected(Exception):
+    """The file can never be processed (not an image, too small, too large)."""
+
+
+def enqueue(instance):
+    from .models import MediaJob
+
+    return MediaJob.objects.create(target=instance._meta.label, object_id=instance.pk)
+
+
+# ==================== Pool side ====================
+
+def _init_process():
+    # spawned (not forked) processes start without Django
+    if not apps.ready:
+        import django
+
+        django.setup()
+
+
+def _checksum(storage, name):
+    digest = hashlib.sha256()
+    with storage.open(name, "rb") as stream:
+        for chunk in stream.chunks(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _strip_metadata(fieldfile):
+    """
+    Validate the image's dimensions and write a copy without EXIF/XMP (GPS
+    position, camera serial...) next to it. Returns the copy's name, or the
+    original's if there was nothing to strip. The original is left in place:
+    ``finish()`` points the row at the copy and only then deletes it, so a
+    worker dying half-way never loses the upload.
+    """
+    storage, name = fieldfile.storage, fieldfile.name
+    try:
+        with storage.open(name, "rb") as stream:
+            image = Image.open(stream)
+            image.load()
+    except (OSError, Image.DecompressionBombError) as exc:
+        raise MediaRejected(f"not a readable image: {exc}")
+
+    width, height = image.size
+    if min(width, height) < MIN_IMAGE_SIDE:
+        raise MediaRejected(f"image is {width}x{height}, sides must be at least {MIN_IMAGE_SIDE}px")
+    if width * height > MAX_IMAGE_PIXELS:
+        raise MediaRejected(f"image is {width}x{height}, at most {MAX_IMAGE_PIXELS} pixels are allowed")
+
+    if not (image.getexif() or "xmp" in image.info or "XML:com.adobe.xmp" in image.info):
+        return name
+
+    fmt = image.format
+    options = {"format": fmt}
+    if image.info.get("icc_profile"):
+        options["icc_profile"] = image.info["icc_profile"]
+    if image.getexif().get(ExifTags.Base.Orientation, 1) != 1:
+        image = ImageOps.exif_transpose(image)
+        if fmt == "JPEG":
+            options["quality"] = 92
+    elif fmt == "JPEG":
+        # same pixels: re-use the original quantisation tables
+        options.update(quality="keep", subsampling="keep")
+    buffer = BytesIO()
+    image.save(buffer, **options)
+    return storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def process_file(label, name):
+    """
+    The CPU-bound work for one file; runs in a pool process. Returns the
+    results the worker stores: ``checksum``, and for images the possibly new
+    ``name`` (with the ``original`` it replaces) and the ``variants`` record.
+    """
+    field_name, kind = MEDIA_FIELDS[label]
+    field = apps.get_model(label)._meta.get_field(field_name)
+    result = {}
+    if kind == "image":
+        original, name = name, _strip_metadata(field.attr_class(None, field, name))
+        result.update(name=name, original=original)
+        try:
+            result["variants"] = images.generate(field.attr_class(None, field, name))
+            result["checksum"] = _checksum(field.storage, name)
+        except Exception:
+            if name != original:
+                field.storage.delete(name)
+            raise
+        return result
+    result["checksum"] = _checksum(field.storage, name)
+    return result
+
+
+def make_pool(processes=None):
+    return ProcessPoolExecutor(max_workers=processes, initializer=_init_process)
+
+
+# ==================== Worker side ====================
+
+def _claimable(now):
+    from .models import MediaJob
+
+    return Q(status=MediaJob.Status.PENDING, run_after__lte=now) | Q(
+        status=MediaJob.Status.RUNNING, locked_until__lt=now
+    )
+
+
+def claim(limit):
+    """Lease up to ``limit`` due jobs; a job another worker got first is skipped."""
+    from .models import MediaJob
+
+    now = timezone.now()
+    candidates = (
+        MediaJob.objects.filter(_claimable(now)).order_by("run_after", "pk").values_list("pk", flat=True)[:limit]
+    )
+    claimed = [
+        pk for pk in list(candidates)
+        if MediaJob.objects.filter(_claimable(now), pk=pk).update(
+            status=MediaJob.Status.RUNNING, locked_until=now + LEASE, attempts=F("attempts") + 1
+        )
+    ]
+    return list(MediaJob.objects.filter(pk__in=claimed).order_by("pk"))
+
+
+def finish(job, result):
+    from .models import MediaJob, MediaStatus
+
+    field, _kind = MEDIA_FIELDS[job.target]
+    model = apps.get_model(job.target)
+    rows = model.objects.filter(pk=job.object_id)
+    updates = {"status": MediaStatus.READY, "checksum": result["checksum"]}
+    if "variants" in result:
+        # swap the stripped copy in only if the row still points at the file
+        # it was made from; the file no longer in use is deleted after commit
+        rows = rows.filter(**{field: result["original"]})
+        updates[field] = result["name"]
+        updates[f"{field}_variants"] = result["variants"]
+    with transaction.atomic():
+        swapped = rows.update(**updates)
+        MediaJob.objects.filter(pk=job.pk).delete()
+        if result.get("original") not in (None, result.get("name")):
+            unused = result["original"] if swapped else result["name"]
+            storage = model._meta.get_field(field).storage
+            transaction.on_commit(lambda: storage.delete(unused))
+
+
+def fail(job, exc):
+    """Retry later with backoff, or give up on a rejected file or the last attempt."""
+    from .models import MediaJob, MediaStatus
+
+    error = f"{type(exc).__name__}: {exc}"
+    if isinstance(exc, MediaRejected) or job.attempts >= MAX_ATTEMPTS:
+        with transaction.atomic():
+            apps.get_model(job.target).objects.filter(pk=job.object_id).update(status=MediaStatus.FAILED)
+            MediaJob.objects.filter(pk=job.pk).update(status=MediaJob.Status.FAILED, locked_until=None, error=error)
+        return
+    MediaJob.objects.filter(pk=job.pk).update(
+        status=MediaJob.Status.PENDING,
+        locked_until=None,
+        run_after=timezone.now() + RETRY_DELAY * 2 ** (job.attempts - 1),
+        error=error,
+    )
+
+
+def run_once(pool=None, limit=8):
+    """
+    Claim and process up to ``limit`` jobs, in ``pool`` (see ``make_pool``)
+    or in this process. Returns the number of jobs claimed.
+    """
+    from .models import MediaJob
+
+    jobs = claim(limit)
+    tasks = []
+    for job in jobs:
+        field, _kind = MEDIA_FIELDS[job.target]
+        name = apps.get_model(job.target).objects.filter(pk=job.object_id).values_list(field, flat=True).first()
+        if name:
+            tasks.append((job, name))
+        else:  # deleted while queued
+            MediaJob.objects.filter(pk=job.pk).delete()
+
+    if pool is None:
+        for job, name in tasks:
+            try:
+                result = process_file(job.target, name)
+            except Exception as exc:
+                fail(job, exc)
+            else:
+                finish(job, result)
+        return len(jobs)
+
+    futures = {pool.submit(process_file, job.target, name): job for job, name in tasks}
+    for future in as_completed(futures):
+        try:
+            result = future.result()
+        except Exception as exc:
+            fail(futures[future], exc)
+        else:
+            finish(futures[future], result)
+    return len(jobs)
+
+
+def failed_error(instance):
+    """The last error of a failed row's job, or ""."""
+    from .models import MediaJob
+
+    job = MediaJob.objects.filter(target=instance._meta.label, object_id=instance.pk, status=MediaJob.Status.FAILED)
+    return job.values_list("error", flat=True).last() or ""
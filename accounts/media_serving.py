@@ -0,0 +1,232 @@
+"""
+Serving uploaded media (``MEDIA_URL``) in production.
+
+``static()`` only serves media with ``DEBUG`` on and cannot seek: a player
+asking for the middle of a video cover gets the whole file. ``serve_media``
+serves every file under ``MEDIA_ROOT`` with
+
+- access checks: a photo or cover (``media_jobs.MEDIA_FIELDS``) that is not
+  ``ready``, or whose owner is deactivated, is only served to its owner and
+  staff (404 for anyone else); that includes its resized copies. Other files
+  (avatars, news images) are public; dot-directories (``.chunked``) never are;
+- ``ETag`` (the row's checksum when known, else size and mtime) and
+  ``Last-Modified``, so ``If-None-Match``/``If-Modified-Since`` get a 304;
+- single ``Range`` requests (206/416), honouring ``If-Range``. Several ranges
+  get the whole file, which HTTP allows.
+
+The file is never read into memory. Django streams it, and behind a WSGI
+server with ``wsgi.file_wrapper`` (gunicorn, uWSGI) the server ``sendfile()``s
+it: a range is an open file positioned at its start plus a ``Content-Length``.
+With ``settings.MEDIA_SENDFILE`` the transfer is handed to the front proxy
+instead, after the access check:
+
+- ``"x-accel-redirect"`` (nginx): the response names the file under
+  ``MEDIA_ACCEL_REDIRECT_PREFIX``, an ``internal`` location aliased to
+  ``MEDIA_ROOT``;
+- ``"x-sendfile"`` (Apache mod_xsendfile, lighttpd): the absolute path.
+
+The proxy then answers ranges and conditional requests itself.
+"""
+import functools
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+from PIL import Image
+
+from .media_jobs import MEDIA_FIELDS
+
+# images.derivative_name(): "avatars/me.jpg" -> "avatars/me.320w.webp"
+DERIVATIVE_RE = re.compile(r"^(?P<root>.+)\.\d+w\.[a-z0-9]+$")
+RANGE_RE = re.compile(r"^bytes=(?P<start>\d*)-(?P<end>\d*)$")
+
+
+class MediaFileResponse(FileResponse):
+    block_size = 256 * 1024
+
+
+class FileRange:
+    """
+    An open file positioned at the start of a byte range that reads no
+    further than its end. ``fileno()`` lets a WSGI server's file_wrapper
+    ``sendfile()`` it: servers send ``Content-Length`` bytes from the
+    current position.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+@functools.cache
+def _image_extensions():
+    """Extensions Pillow reads, lower and upper case (".jpg", ".JPG", ...)."""
+    return tuple(sorted({case for ext in Image.registered_extensions() for case in (ext.lower(), ext.upper())}))
+
+
+def media_row(path):
+    """
+    The photo/cover row owning ``path`` (its file or one of its resized
+    copies) as ``{"user_id", "status", "checksum", "user__is_active",
+    "original"}``, or None.
+    """
+    derivative = DERIVATIVE_RE.match(path)
+    for label, (field_name, kind) in MEDIA_FIELDS.items():
+        model = apps.get_model(label)
+        upload_to = model._meta.get_field(field_name).upload_to
+        if not isinstance(upload_to, str) or not path.startswith(upload_to):
+            continue
+        rows = model.objects.values("user_id", "status", "checksum", "user__is_active", field_name)
+        row = rows.filter(**{field_name: path}).first()
+        if row:
+            return dict(row, original=True)
+        if derivative and kind == "image":
+            # the copy keeps the original's name minus its extension: try the
+            # image extensions as exact (indexed) names, and only scan by prefix
+            # for an extension in unusual case
+            root = derivative["root"]
+            row = rows.filter(**{f"{field_name}__in": [root + ext for ext in _image_extensions()]}).first()
+            if row:
+                return dict(row, original=False)
+            for row in rows.filter(**{f"{field_name}__startswith": f"{root}."}):
+                if os.path.splitext(row[field_name])[0] == root:
+                    return dict(row, original=False)
+    return None
+
+
+def _is_public(row):
+    from .models import MediaStatus
+
+    return row is None or (row["status"] == MediaStatus.READY and row["user__is_active"])
+
+
+def parse_range(header, size):
+    """
+    ``(start, length)`` of a single ``bytes=`` range; None to ignore the
+    header (malformed, several ranges, or the whole file); ValueError if it
+    cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if not match or not (match["start"] or match["end"]):
+        return None
+    if not match["start"]:  # suffix: the last N bytes
+        length = min(int(match["end"]), size)
+        if not length:
+            raise ValueError(header)
+        start = size - length
+    else:
+        start = int(match["start"])
+        end = min(int(match["end"]), size - 1) if match["end"] else size - 1
+        if start >= size:
+            raise ValueError(header)
+        if end < start:
+            return None
+        length = end - start + 1
+    if length == size:
+        return None
+    return start, length
+
+
+def _if_range_matches(request, etag, last_modified):
+    value = request.headers.get("If-Range")
+    if not value:
+        return True
+    if value.startswith(('"', "W/")):
+        return etag in parse_etags(value)  # ours are strong; a weak one never matches
+    return parse_http_date_safe(value) == last_modified
+
+
+def _file_response(request, full_path, size, etag, last_modified):
+    content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+
+    backend = getattr(settings, "MEDIA_SENDFILE", "")
+    if backend == "x-accel-redirect":
+        response = HttpResponse(content_type=content_type)
+        relative = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, "/")
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(relative)
+        return response
+    if backend == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = full_path
+        return response
+
+    byte_range = None
+    if "Range" in request.headers and _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers["Range"], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    file = open(full_path, "rb", buffering=0)  # no read-ahead past a range's end
+    if byte_range is None:
+        return MediaFileResponse(file, content_type=content_type)
+    start, length = byte_range
+    response = MediaFileResponse(FileRange(file, start, length), status=206, content_type=content_type)
+    response["Content-Length"] = length
+    response["Content-Range"] = f"bytes {start}-{start + length - 1}/{size}"
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    if any(part.startswith(".") for part in path.split("/")):
+        raise Http404
+    try:
+        full_path = default_storage.path(path)
+    except (NotImplementedError, SuspiciousFileOperation):
+        raise Http404
+
+    try:
+        info = os.stat(full_path)
+    except OSError:
+        raise Http404
+    if not stat.S_ISREG(info.st_mode):
+        raise Http404
+    # after the stat: requests for missing files never reach the database
+    row = media_row(path)
+    public = _is_public(row)
+    user = request.user
+    if not public and not (user.is_authenticated and (user.pk == row["user_id"] or user.is_staff)):
+        raise Http404
+
+    if row and row["original"] and row["checksum"]:
+        etag = quote_etag(row["checksum"])
+    else:
+        etag = f'"{info.st_size:x}-{info.st_mtime_ns:x}"'
+    last_modified = int(info.st_mtime)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _file_response(request, full_path, info.st_size, etag, last_modified)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    if not public:
+        patch_cache_control(response, private=True)
+    return response
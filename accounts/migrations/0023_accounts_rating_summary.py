@@ -0,0 +1,51 @@
+# Generated by Django 5.2.9 on 2026-10-16 19:52
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_summary(apps, schema_editor):
+    Accounts = apps.get_model("accounts", "Accounts")
+    Review = apps.get_model("accounts", "Review")
+
+    per_pro = Review.objects.filter(professional=OuterRef("pk")).values("professional")
+    Accounts.objects.update(
+        rating_sum=Coalesce(
+            Subquery(per_pro.annotate(s=Sum("rating")).values("s")),
+            Value(0),
+            output_field=IntegerField(),
+        ),
+        rating_count=Coalesce(
+            Subquery(per_pro.annotate(c=Count("id")).values("c")),
+            Value(0),
+            output_field=IntegerField(),
+        ),
+        avg_rating=Coalesce(Subquery(per_pro.annotate(a=Avg("rating")).values("a")), Value(0.0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0022_newsread"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="accounts",
+            name="avg_rating",
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name="accounts",
+            name="rating_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="accounts",
+            name="rating_sum",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:40
+
+from django.db import migrations
+
+SQLITE_TABLE = "accounts_professional_fts"
+POSTGRES_TABLE = "accounts_professional_search"
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} USING fts5("
+            "first_name, last_name, nickname, city, country, professions, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        names = "group_concat(p.name, ' ')"
+        insert = f"INSERT INTO {SQLITE_TABLE} (rowid, first_name, last_name, nickname, city, country, professions) "
+        select_wrap = "{select}"
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {POSTGRES_TABLE} ("
+            "account_id bigint PRIMARY KEY REFERENCES accounts_accounts (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {POSTGRES_TABLE}_document_gin "
+            f"ON {POSTGRES_TABLE} USING GIN (document)"
+        )
+        names = "string_agg(p.name, ' ')"
+        insert = f"INSERT INTO {POSTGRES_TABLE} (account_id, document) "
+        select_wrap = (
+            "SELECT d.id, "
+            "setweight(to_tsvector('simple', d.first_name), 'A') || "
+            "setweight(to_tsvector('simple', d.last_name), 'A') || "
+            "setweight(to_tsvector('simple', d.nickname), 'A') || "
+            "setweight(to_tsvector('simple', d.city), 'C') || "
+            "setweight(to_tsvector('simple', d.country), 'C') || "
+            "setweight(to_tsvector('simple', d.professions), 'B') "
+            "FROM ({select}) AS d(id, first_name, last_name, nickname, city, country, professions)"
+        )
+    else:
+        return
+
+    select = (
+        "SELECT a.id, a.first_name, a.last_name, COALESCE(a.nickname, ''), "
+        "COALESCE(a.city, ''), COALESCE(a.country, ''), "
+        f"COALESCE((SELECT {names} FROM accounts_accounts_professions ap "
+        "JOIN accounts_profession p ON p.id = ap.profession_id "
+        "WHERE ap.accounts_id = a.id), '') "
+        "FROM accounts_accounts a WHERE a.account_type = 'professional' AND a.is_active"
+    )
+    schema_editor.execute(insert + select_wrap.format(select=select))
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SQLITE_TABLE}")
+    elif vendor == "postgresql":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {POSTGRES_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0023_accounts_rating_summary"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
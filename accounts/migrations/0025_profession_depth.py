@@ -0,0 +1,27 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:06
+
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.db.models.functions import Length, Replace
+
+
+def backfill_depth(apps, schema_editor):
+    Profession = apps.get_model("accounts", "Profession")
+    # depth = number of "/" separators in the stored path
+    Profession.objects.update(depth=Length("path") - Length(Replace(F("path"), Value("/"), Value(""))))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0024_professional_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profession",
+            name="depth",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_depth, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:40
+
+from django.db import migrations, models
+
+from accounts.rates import base_amount_expression, load_matrix
+
+
+def backfill_cost_per_hour_base(apps, schema_editor):
+    matrix = load_matrix(
+        apps.get_model("accounts", "Currency"),
+        apps.get_model("accounts", "ExchangeRate"),
+    )
+    apps.get_model("accounts", "Accounts").objects.update(
+        cost_per_hour_base=base_amount_expression("cost_per_hour", matrix=matrix)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0025_profession_depth"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="accounts",
+            name="cost_per_hour_base",
+            field=models.DecimalField(
+                blank=True,
+                db_index=True,
+                decimal_places=2,
+                editable=False,
+                max_digits=14,
+                null=True,
+            ),
+        ),
+        migrations.RunPython(backfill_cost_per_hour_base, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:47
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def compact_news_reads(apps, schema_editor):
+    """
+    Move each reader's watermark up to the newest post before their first
+    unread one and drop the NewsRead rows it covers (what accounts.news.compact
+    did when this migration was written; kept here so later changes to it do
+    not change the migration).
+    """
+    Accounts = apps.get_model("accounts", "Accounts")
+    NewsPost = apps.get_model("accounts", "NewsPost")
+    NewsRead = apps.get_model("accounts", "NewsRead")
+    user_ids = NewsRead.objects.order_by().values_list("user_id", flat=True).distinct()
+    dated = NewsPost.objects.filter(is_published=True, published_at__isnull=False)
+    for user_id in list(user_ids):
+        first_unread = (
+            dated.exclude(reads__user_id=user_id).order_by("published_at").values_list("published_at", flat=True).first()
+        )
+        read = dated if first_unread is None else dated.filter(published_at__lt=first_unread)
+        newest_read = read.aggregate(newest=Max("published_at"))["newest"]
+        if newest_read is None:
+            continue
+        Accounts.objects.filter(pk=user_id).update(news_read_up_to=newest_read)
+        NewsRead.objects.filter(user_id=user_id, post__published_at__lte=newest_read).delete()
+
+
+def expand_news_reads(apps, schema_editor):
+    Accounts = apps.get_model("accounts", "Accounts")
+    NewsPost = apps.get_model("accounts", "NewsPost")
+    NewsRead = apps.get_model("accounts", "NewsRead")
+    watermarks = Accounts.objects.filter(news_read_up_to__isnull=False).values_list("pk", "news_read_up_to")
+    for user_id, watermark in watermarks.iterator():
+        post_ids = NewsPost.objects.filter(published_at__lte=watermark).values_list("pk", flat=True)
+        NewsRead.objects.bulk_create(
+            [NewsRead(user_id=user_id, post_id=post_id, read_at=watermark) for post_id in post_ids],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0026_base_currency_amounts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="accounts",
+            name="news_read_up_to",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(compact_news_reads, expand_news_reads),
+    ]
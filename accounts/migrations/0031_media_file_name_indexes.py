@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-16 22:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0030_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='accountphoto',
+            name='image',
+            field=models.ImageField(db_index=True, upload_to='normal_pictures/'),
+        ),
+        migrations.AlterField(
+            model_name='audioacapellacover',
+            name='audio_file',
+            field=models.FileField(db_index=True, upload_to='acapella/audio/'),
+        ),
+        migrations.AlterField(
+            model_name='professionalphoto',
+            name='image',
+            field=models.ImageField(db_index=True, upload_to='professional_pictures/'),
+        ),
+        migrations.AlterField(
+            model_name='videoacapellacover',
+            name='video_file',
+            field=models.FileField(db_index=True, upload_to='acapella/video/'),
+        ),
+    ]
@@ -7,6 +7,12 @@ from django.conf import settings
 from django.db.models import Q
 import hashlib
 import hmac
+import uuid
+
+from showdan.tree import TreeNode
+
+from . import rates
+
 class AccountsManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -52,54 +58,20 @@ class FavoriteProfessional(models.Model):
     def __str__(self):
         return f"{self.user_id} -> {self.professional_id}"
 
-class Profession(models.Model):
+class Profession(TreeNode):
     name = models.CharField(max_length=120)
-    parent = models.ForeignKey(
-        "self",
-        null=True,
-        blank=True,
-        related_name="children",
-        on_delete=models.CASCADE,
-    )
-
-    # NEW: sortable tree path
-    path = models.CharField(max_length=600, blank=True, db_index=True)
 
     class Meta:
         unique_together = ("name", "parent")
         ordering = ["path"]  # ✅ tree order, not global name
 
-    def get_depth(self):
-        depth = 0
-        p = self.parent
-        while p:
-            depth += 1
-            p = p.parent
-        return depth
-
     def __str__(self):
-        indent = "— " * self.get_depth()
+        indent = "— " * self.depth
         return f"{indent}{self.name}"
 
-    def save(self, *args, **kwargs):
-        # build hierarchical path like: "000001.music/000002.live/000003.acapella"
-        super().save(*args, **kwargs)  # ensure self.pk exists
-
-        if self.parent_id:
-            parent_path = Profession.objects.filter(pk=self.parent_id).values_list("path", flat=True).first() or ""
-            new_path = f"{parent_path}/{self.pk:06d}.{self.name.lower()}"
-        else:
-            new_path = f"{self.pk:06d}.{self.name.lower()}"
-
-        # update only if changed (avoid infinite recursion)
-        if self.path != new_path:
-            Profession.objects.filter(pk=self.pk).update(path=new_path)
-
-            # IMPORTANT: if name or parent changes, children paths must update too
-            for child in self.children.all():
-                child.save()
 
 class NewsRead(models.Model):
+    """A post read ahead of the user's ``news_read_up_to`` watermark (see accounts.news)."""
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -127,6 +99,8 @@ class NewsPost(models.Model):
     excerpt = models.CharField(max_length=320, blank=True, default="")
     body = models.TextField(blank=True, default="")
     image = models.ImageField(upload_to="news/", blank=True, null=True)
+    # resized copies of image (see accounts.images)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     is_published = models.BooleanField(default=False)
     published_at = models.DateTimeField(null=True, blank=True)
@@ -158,9 +132,16 @@ class NewsPost(models.Model):
                 slug = f"{base}-{i}"
             self.slug = slug
 
-        # auto publish timestamp if toggled on
-        if self.is_published and not self.published_at:
+        # stamped on every unpublished -> published transition, never kept or
+        # backdated: news read watermarks (accounts.news) compare against it, so
+        # a post published now must sort after every post already read
+        if self.is_published and not (
+            self.pk and NewsPost.objects.filter(pk=self.pk, is_published=True).exists()
+        ):
             self.published_at = timezone.now()
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "published_at"}
 
         super().save(*args, **kwargs)
 
@@ -243,6 +224,9 @@ class Accounts(AbstractBaseUser, PermissionsMixin):
         null=True,
         default="professional_pictures/default_professional.png",
     )
+    # resized copies of the pictures above (see accounts.images)
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
+    professional_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
     communication_languages = models.ManyToManyField(
         "accounts.Language",
         blank=True,
@@ -306,6 +290,25 @@ class Accounts(AbstractBaseUser, PermissionsMixin):
         null=True,
         blank=True,
     )
+    # cost_per_hour in the base currency, for cross-currency filters and
+    # sorting (set on save, recomputed when exchange rates change)
+    cost_per_hour_base = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+    )
+    # Review summary (maintained by accounts.signals, rebuilt by `rebuild_ratings`)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    avg_rating = models.FloatField(default=0, db_index=True)
+
+    # News read state (accounts.news): every post published up to this moment
+    # counts as read; NewsRead rows only record reads of later posts
+    news_read_up_to = models.DateTimeField(null=True, blank=True, editable=False)
+
     # Django required-ish fields
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
@@ -338,38 +341,69 @@ class Accounts(AbstractBaseUser, PermissionsMixin):
 
     def _generate_public_id(self, attempt=0) -> str:
         """
-        Deterministic 8-digit ID derived from (id + date_joined) + SECRET_KEY.
+        Deterministic 8-digit ID derived from (email + date_joined) + SECRET_KEY,
+        so it can be assigned before the row exists.
         attempt is used only to break extremely rare collisions.
         """
-        uid = str(self.id or "")
+        email = (self.email or "").lower()
         dj = self.date_joined.isoformat() if self.date_joined else ""
-        msg = f"{uid}|{dj}|{attempt}".encode("utf-8")
+        msg = f"{email}|{dj}|{attempt}".encode("utf-8")
         key = settings.SECRET_KEY.encode("utf-8")
 
         digest = hmac.new(key, msg, hashlib.sha256).hexdigest()
         num = int(digest[:16], 16) % 100_000_000  # 0..99,999,999
         return str(num).zfill(8)
 
+    @classmethod
+    def assign_public_ids(cls, accounts):
+        """
+        Give every account without a public_id one, checking a whole batch for
+        collisions in one query (plus one per retry round, which is rare).
+        """
+        pending = {id(account): account for account in accounts if not account.public_id}
+        attempts = dict.fromkeys(pending, 0)
+        taken = set()
+        while pending:
+            for account in pending.values():
+                if not account.date_joined:
+                    account.date_joined = timezone.now()
+                account.public_id = account._generate_public_id(attempt=attempts[id(account)])
+            candidates = {account.public_id for account in pending.values()}
+            taken |= set(cls.objects.filter(public_id__in=candidates).values_list("public_id", flat=True))
+            retry = {}
+            for key, account in pending.items():
+                if account.public_id in taken:
+                    retry[key] = account
+                    attempts[key] += 1
+                else:
+                    taken.add(account.public_id)  # later ones in this batch must not reuse it
+            pending = retry
+
     def save(self, *args, **kwargs):
         # Ensure date_joined exists early (your model already defaults it, but safe)
         if not self.date_joined:
             self.date_joined = timezone.now()
 
-        is_new = self.pk is None
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"cost_per_hour", "currency"}.intersection(update_fields):
+            self.cost_per_hour_base = rates.to_base(self.cost_per_hour, self.currency_id, fresh=True)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "cost_per_hour_base"}
 
-        # After first save: we have self.id, so we can create public_id and persist it
+        # Assigned before the INSERT, so a new account costs one write
         if not self.public_id:
-            attempt = 0
-            pid = self._generate_public_id(attempt=attempt)
+            Accounts.assign_public_ids([self])
+            if update_fields is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "public_id"}
+
+        super().save(*args, **kwargs)
 
-            # Collision-safe loop
-            while Accounts.objects.filter(public_id=pid).exclude(pk=self.pk).exists():
-                attempt += 1
-                pid = self._generate_public_id(attempt=attempt)
 
-            Accounts.objects.filter(pk=self.pk).update(public_id=pid)
-            self.public_id = pid
+class MediaStatus(models.TextChoices):
+    """Where an uploaded photo or cover is in background processing (see accounts.media_jobs)."""
+    PROCESSING = "processing", "Processing"
+    READY = "ready", "Ready"
+    FAILED = "failed", "Failed"
 
 
 class AccountPhoto(models.Model):
@@ -379,7 +413,10 @@ class AccountPhoto(models.Model):
         on_delete=models.CASCADE,
         related_name="normal_photos",
     )
-    image = models.ImageField(upload_to="normal_pictures/")
+    image = models.ImageField(upload_to="normal_pictures/", db_index=True)  # looked up by name when served (media_serving)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    status = models.CharField(max_length=12, choices=MediaStatus.choices, default=MediaStatus.PROCESSING)
+    checksum = models.CharField(max_length=64, blank=True, default="", editable=False)  # sha256, set when ready
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -394,7 +431,10 @@ class ProfessionalPhoto(models.Model):
         on_delete=models.CASCADE,
         related_name="professional_photos",
     )
-    image = models.ImageField(upload_to="professional_pictures/")
+    image = models.ImageField(upload_to="professional_pictures/", db_index=True)  # looked up by name when served (media_serving)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    status = models.CharField(max_length=12, choices=MediaStatus.choices, default=MediaStatus.PROCESSING)
+    checksum = models.CharField(max_length=64, blank=True, default="", editable=False)  # sha256, set when ready
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -411,7 +451,9 @@ class AudioAcapellaCover(models.Model):
         related_name="audio_acapella_covers",
     )
     title = models.CharField(max_length=150, blank=True)
-    audio_file = models.FileField(upload_to="acapella/audio/")
+    audio_file = models.FileField(upload_to="acapella/audio/", db_index=True)  # looked up by name when served (media_serving)
+    status = models.CharField(max_length=12, choices=MediaStatus.choices, default=MediaStatus.PROCESSING)
+    checksum = models.CharField(max_length=64, blank=True, default="", editable=False)  # sha256, set when ready
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -428,7 +470,9 @@ class VideoAcapellaCover(models.Model):
         related_name="video_acapella_covers",
     )
     title = models.CharField(max_length=150, blank=True)
-    video_file = models.FileField(upload_to="acapella/video/")
+    video_file = models.FileField(upload_to="acapella/video/", db_index=True)  # looked up by name when served (media_serving)
+    status = models.CharField(max_length=12, choices=MediaStatus.choices, default=MediaStatus.PROCESSING)
+    checksum = models.CharField(max_length=64, blank=True, default="", editable=False)  # sha256, set when ready
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -439,6 +483,54 @@ class VideoAcapellaCover(models.Model):
 
 
 
+class UploadSession(models.Model):
+    """A resumable audio/video cover upload in progress (see accounts.chunked_uploads)."""
+    class Kind(models.TextChoices):
+        AUDIO = "audio", "Audio"
+        VIDEO = "video", "Video"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        "accounts.Accounts",
+        on_delete=models.CASCADE,
+        related_name="upload_sessions",
+    )
+    kind = models.CharField(max_length=5, choices=Kind.choices)
+    filename = models.CharField(max_length=255)
+    title = models.CharField(max_length=150, blank=True)
+    size = models.PositiveBigIntegerField()  # declared by the client
+    received = models.PositiveBigIntegerField(default=0)  # bytes stored so far: the next chunk's offset
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id} {self.kind} upload {self.received}/{self.size}"
+
+
+class MediaJob(models.Model):
+    """A queued background job for one uploaded file (see accounts.media_jobs)."""
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        FAILED = "failed", "Failed"
+
+    target = models.CharField(max_length=100)  # model label, e.g. "accounts.AccountPhoto"
+    object_id = models.PositiveBigIntegerField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    # a running job whose lease ran out (worker died) is claimed again
+    locked_until = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_after"])]
+
+    def __str__(self):
+        return f"{self.target} #{self.object_id} ({self.status})"
+
+
 class ExchangeRate(models.Model):
     """
     Stores conversion rate from one currency to another.
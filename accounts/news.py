@@ -0,0 +1,156 @@
+"""
+News read state and cached per-user unread counts.
+
+Read state is a watermark plus exceptions rather than a row per user per
+post: ``Accounts.news_read_up_to`` says "every post published up to here is
+read", and ``NewsRead`` only holds posts read ahead of it. ``mark_read()``
+moves the watermark over every leading run of read posts and drops the rows it
+now covers (``compact()``), ``mark_all_read()`` moves it to the newest post,
+and ``read_post_ids()`` answers read status for a page of posts in at most
+one query.
+
+Unread counts are cached: the news badge in ``base.html`` is on every page,
+including each HTMX partial rendered by the dashboard, so counting unread
+posts on every render is wasted work. Instead:
+
+- a user's count is cached together with the news version it was computed
+  against; publishing, unpublishing or deleting a published post bumps the
+  version (``accounts.signals``), which makes every cached count stale at once;
+- a read (a new ``NewsRead`` row or a moved watermark) drops only that
+  reader's entry;
+- the context processor hands templates a callable, so pages that never show
+  the badge do not even touch the cache.
+
+Counts and the version live in the default cache, which ``settings.CACHES``
+shares between worker processes: a read or publish handled by one worker
+invalidates the badge every other worker serves.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Q
+
+VERSION_KEY = "news:version"
+
+# entries also expire, so a count cached while a read was committing is not kept for long
+CACHE_TIMEOUT = 60 * 60
+
+
+def _user_key(user_id):
+    return f"news:unread:{user_id}"
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns() // 1_000_000, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """Published news changed: every cached count is stale."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns() // 1_000_000, None)
+
+
+def forget(user_id):
+    """The user's reads changed: drop their cached count."""
+    cache.delete(_user_key(user_id))
+
+
+def unread_queryset(user):
+    from .models import NewsPost
+
+    posts = NewsPost.objects.filter(is_published=True)
+    if user.news_read_up_to is not None:
+        posts = posts.filter(Q(published_at__gt=user.news_read_up_to) | Q(published_at__isnull=True))
+    return posts.exclude(reads__user=user)
+
+
+def unread_count(user):
+    """Published posts ``user`` has not read, from the cache when still current."""
+    key = _user_key(user.pk)
+    found = cache.get_many([VERSION_KEY, key])
+    version = found.get(VERSION_KEY)
+    if version is None:
+        version = get_version()
+    entry = found.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    count = unread_queryset(user).count()
+    cache.set(key, (version, count), CACHE_TIMEOUT)
+    return count
+
+
+# ==================== Read state ====================
+
+def _covered(post, watermark):
+    return watermark is not None and post.published_at is not None and post.published_at <= watermark
+
+
+def read_post_ids(user, posts):
+    """Ids of ``posts`` the user has read: the watermark, then one query for the rest."""
+    from .models import NewsRead
+
+    watermark = user.news_read_up_to
+    read = {post.pk for post in posts if _covered(post, watermark)}
+    rest = [post.pk for post in posts if post.pk not in read]
+    if rest:
+        read.update(NewsRead.objects.filter(user=user, post_id__in=rest).values_list("post_id", flat=True))
+    return read
+
+
+def compact(user_id, watermark=None):
+    """
+    Move the user's watermark up to the newest post before their first unread
+    one and delete the ``NewsRead`` rows it now covers. Returns the watermark.
+    """
+    from .models import Accounts, NewsPost, NewsRead
+
+    dated = NewsPost.objects.filter(is_published=True, published_at__isnull=False)
+    if watermark is not None:
+        dated = dated.filter(published_at__gt=watermark)
+    first_unread = (
+        dated.exclude(reads__user_id=user_id).order_by("published_at").values_list("published_at", flat=True).first()
+    )
+    if first_unread is not None:
+        dated = dated.filter(published_at__lt=first_unread)
+    newest_read = dated.aggregate(newest=Max("published_at"))["newest"]
+    if newest_read is None:
+        return watermark
+
+    Accounts.objects.filter(pk=user_id).update(news_read_up_to=newest_read)
+    NewsRead.objects.filter(user_id=user_id, post__published_at__lte=newest_read).delete()
+    return newest_read
+
+
+def mark_read(user, post):
+    """Record that ``user`` read ``post``, compacting their read state."""
+    from .models import NewsRead
+
+    if _covered(post, user.news_read_up_to):
+        return
+    with transaction.atomic():
+        NewsRead.objects.get_or_create(user=user, post=post)
+        user.news_read_up_to = compact(user.pk, user.news_read_up_to)
+    forget(user.pk)
+
+
+def mark_all_read(user):
+    """Move the watermark to the newest published post and drop every exception it covers."""
+    from .models import Accounts, NewsPost, NewsRead
+
+    newest = NewsPost.objects.filter(is_published=True).aggregate(newest=Max("published_at"))["newest"]
+    if newest is None or (user.news_read_up_to is not None and newest <= user.news_read_up_to):
+        return
+    with transaction.atomic():
+        Accounts.objects.filter(pk=user.pk).update(news_read_up_to=newest)
+        NewsRead.objects.filter(user=user, post__published_at__lte=newest).delete()
+    user.news_read_up_to = newest
+    forget(user.pk)
+    transaction.on_commit(lambda: forget(user.pk))
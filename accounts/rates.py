@@ -0,0 +1,304 @@
+"""
+Process-local exchange-rate matrix.
+
+``ExchangeRate`` holds a few dozen rows that change rarely but are read for
+every offer conversion. Instead of one or two queries per conversion, each
+process loads all rows once into a ``RateMatrix`` and answers from memory:
+
+- direct pairs, then inverse pairs (``1 / rate``), as before;
+- any other pair by triangulating through a base currency: every currency
+  reachable from the base through the stored rates gets a rate to it, and
+  ``A -> B = (A -> base) / (B -> base)``. The base is
+  ``settings.EXCHANGE_RATE_BASE_CURRENCY`` (a currency name) or, by default,
+  the currency with the most stored rates.
+
+Invalidation uses a version stamp in the default cache, which
+``settings.CACHES`` shares between worker processes, like
+``showdan.filter_options``: ``ExchangeRate`` signals call ``bump_version()``,
+which drops this process's matrix at once and moves the stamp so other
+workers rebuild theirs. For display and filtering, workers compare their stamp
+at most every ``EXCHANGE_RATE_CHECK_INTERVAL`` seconds, so a cache round trip
+is not paid per conversion; amounts that get stored (``to_base(...,
+fresh=True)``) always check it first.
+
+Prices are also stored normalized to the base currency
+(``Accounts.cost_per_hour_base``, ``Event.event_budget_base``, indexed) so
+cross-currency filters, sorting and slider bounds are plain column
+comparisons. Models fill them on save with ``to_base()``; when rates change
+``rates_changed`` is sent and each app recomputes its column in one UPDATE
+built by ``base_amount_expression()``. Amounts without a currency are taken
+to be in the base currency.
+"""
+import threading
+import time
+from collections import Counter, deque
+from decimal import Decimal, DecimalException
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, DecimalField, F, Value, When
+from django.db.models.functions import Round
+from django.dispatch import Signal
+
+ONE = Decimal("1")
+CENT = Decimal("0.01")
+# largest amount the *_base columns (max_digits=14, decimal_places=2) hold
+MAX_BASE_AMOUNT = Decimal("999999999999.99")
+
+VERSION_KEY = "exchange_rates:version"
+
+
+def _currency_id(currency):
+    return getattr(currency, "pk", currency)
+
+
+class RateMatrix:
+    """All stored rates of one version, plus rates to the base currency."""
+
+    def __init__(self, rows, base_id=None):
+        # (from_id, to_id) -> rate; zero rates are unusable and skipped
+        self.direct = {(from_id, to_id): rate for from_id, to_id, rate in rows if rate}
+        self.base_id = base_id if base_id is not None else self._hub()
+        self.to_base = self._rates_to_base()
+        self._triangulated = {}
+
+    def _hub(self):
+        degree = Counter()
+        for from_id, to_id in self.direct:
+            degree[from_id] += 1
+            degree[to_id] += 1
+        if not degree:
+            return None
+        return min(degree, key=lambda pk: (-degree[pk], pk))
+
+    def _rates_to_base(self):
+        """``{currency_id: units of base per unit}``, breadth first from the base."""
+        if self.base_id is None:
+            return {}
+        edges = {}
+        for (from_id, to_id), rate in self.direct.items():
+            # 1 from = rate to, so value(from) = rate * value(to)
+            edges.setdefault(to_id, []).append((from_id, rate))
+            edges.setdefault(from_id, []).append((to_id, ONE / rate))
+        to_base = {self.base_id: ONE}
+        queue = deque([self.base_id])
+        while queue:
+            known = queue.popleft()
+            for other, factor in edges.get(known, ()):
+                if other not in to_base:
+                    to_base[other] = factor * to_base[known]
+                    queue.append(other)
+        return to_base
+
+    def rate(self, from_currency, to_currency):
+        """Units of ``to_currency`` per unit of ``from_currency``, or None."""
+        from_id, to_id = _currency_id(from_currency), _currency_id(to_currency)
+        if from_id == to_id:
+            return ONE
+        rate = self.direct.get((from_id, to_id))
+        if rate is not None:
+            return rate
+        inverse = self.direct.get((to_id, from_id))
+        if inverse is not None:
+            return ONE / inverse
+        key = (from_id, to_id)
+        if key not in self._triangulated:
+            source, target = self.to_base.get(from_id), self.to_base.get(to_id)
+            self._triangulated[key] = None if source is None or target is None else source / target
+        return self._triangulated[key]
+
+    def convert_many(self, items, to_currency, quantum=None):
+        """
+        Convert ``(amount, from_currency)`` pairs to ``to_currency``. Returns
+        a list of amounts, None where no rate is known; rounded to
+        ``quantum`` (e.g. ``Decimal("0.01")``) when given.
+        """
+        to_id = _currency_id(to_currency)
+        rates = {}
+        converted = []
+        for amount, from_currency in items:
+            from_id = _currency_id(from_currency)
+            if from_id not in rates:
+                rates[from_id] = self.rate(from_id, to_id)
+            rate = rates[from_id]
+            if rate is None or amount is None:
+                converted.append(None)
+                continue
+            value = amount * rate
+            converted.append(value.quantize(quantum) if quantum is not None else value)
+        return converted
+
+
+def load_matrix(currency_model=None, rate_model=None):
+    """Build the matrix from the database (historical models can be passed in migrations)."""
+    from .models import Currency, ExchangeRate
+
+    Currency, ExchangeRate = currency_model or Currency, rate_model or ExchangeRate
+    rows = list(ExchangeRate.objects.values_list("from_currency_id", "to_currency_id", "rate"))
+    base_name = getattr(settings, "EXCHANGE_RATE_BASE_CURRENCY", None)
+    base_id = Currency.objects.filter(name=base_name).values_list("pk", flat=True).first() if base_name else None
+    return RateMatrix(rows, base_id)
+
+
+# ==================== Version stamp ====================
+
+_lock = threading.Lock()
+# generation counts local bumps, so a matrix loaded before one is never kept
+_state = {"matrix": None, "version": None, "checked_at": 0.0, "generation": 0}
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns() // 1_000_000, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+# sent after bump_version() when stored rates changed; receivers recompute
+# their base-currency columns
+rates_changed = Signal()
+
+
+def bump_version():
+    """Drop this process's matrix and tell the other workers to rebuild theirs."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns() // 1_000_000, None)
+    with _lock:
+        _state["matrix"] = None
+        _state["generation"] += 1
+
+
+def get_matrix(fresh=False):
+    """
+    The current matrix, rebuilt when the version stamp has moved. ``fresh``
+    checks the stamp now instead of trusting a check made within the interval.
+    """
+    now = time.monotonic()
+    interval = getattr(settings, "EXCHANGE_RATE_CHECK_INTERVAL", 5)
+    matrix, generation = _state["matrix"], _state["generation"]
+    if matrix is not None and not fresh and now - _state["checked_at"] < interval:
+        return matrix
+
+    version = get_version()
+    if matrix is None or version != _state["version"]:
+        matrix = load_matrix()
+    with _lock:
+        if generation == _state["generation"]:
+            _state.update(matrix=matrix, version=version, checked_at=now)
+    return matrix
+
+
+def get_rate(from_currency, to_currency):
+    return get_matrix().rate(from_currency, to_currency)
+
+
+def convert_many(items, to_currency, quantum=None):
+    return get_matrix().convert_many(items, to_currency, quantum)
+
+
+# ==================== Base-currency amounts ====================
+
+def base_currency_id():
+    return get_matrix().base_id
+
+
+def _base_value(amount, currency, fresh=False):
+    """``amount`` times the rate to the base currency, unrounded; None without a rate."""
+    matrix = get_matrix(fresh=fresh)
+    if currency is None or matrix.base_id is None:
+        return amount
+    rate = matrix.rate(currency, matrix.base_id)
+    return None if rate is None else amount * rate
+
+
+def to_base(amount, currency, fresh=False):
+    """
+    ``amount`` in ``currency`` (object or id) expressed in the base currency,
+    or None, also when the base columns cannot hold it. Pass ``fresh=True``
+    when the result is stored, so another worker's rate change is never
+    persisted as the old rate.
+    """
+    if amount is None:
+        return None
+    try:
+        if not isinstance(amount, Decimal):
+            amount = Decimal(str(amount))  # e.g. an int assigned before save
+        value = _base_value(amount, currency, fresh)
+        if value is None or abs(value) > MAX_BASE_AMOUNT:
+            return None
+        return value.quantize(CENT)
+    except DecimalException:
+        return None
+
+
+def from_base(amount, currency):
+    """A base-currency ``amount`` expressed in ``currency``, or None."""
+    if amount is None:
+        return None
+    matrix = get_matrix()
+    if currency is None or matrix.base_id is None:
+        return amount
+    rate = matrix.rate(matrix.base_id, currency)
+    return None if rate is None else (amount * rate).quantize(CENT)
+
+
+def base_amount_expression(amount_field, currency_field="currency", matrix=None):
+    """
+    Per-row ``to_base()`` as SQL: one CASE over the currencies with a known
+    rate. Rows in other currencies, or too large for the base column, get
+    NULL.
+    """
+    matrix = matrix or get_matrix()
+    if matrix.base_id is None:
+        return F(amount_field)
+    whens = [When(**{f"{currency_field}__isnull": True}, then=F(amount_field))]
+    for currency_id in sorted(matrix.to_base):
+        rate = matrix.rate(currency_id, matrix.base_id)
+        # amounts whose base value overflows the column get NULL, like to_base()
+        limit = MAX_BASE_AMOUNT / rate
+        whens.append(When(
+            **{f"{currency_field}_id": currency_id, f"{amount_field}__range": (-limit, limit)},
+            then=F(amount_field) * Value(rate),
+        ))
+    output = DecimalField(max_digits=14, decimal_places=2)
+    return Round(Case(*whens, default=Value(None), output_field=output), 2, output_field=output)
+
+
+def requested_currency(request):
+    """
+    The currency prices are shown and entered in for this request:
+    ``?currency=<id>``, else the signed-in user's currency, else None (base).
+    """
+    value = request.GET.get("currency", "")
+    if value.isdigit():
+        return int(value)
+    return getattr(request.user, "currency_id", None)
+
+
+def base_amount_param(value, currency):
+    """
+    A price typed in ``currency`` (a query-string value) as a base amount;
+    None if empty or invalid. Amounts beyond what the base columns hold are
+    clamped to the column's range, so they still bound the filter.
+    """
+    try:
+        amount = Decimal(str(value).strip())
+        if not amount.is_finite():
+            return None
+        value = _base_value(amount, currency)
+        if value is None:
+            return None
+        return max(-MAX_BASE_AMOUNT, min(value, MAX_BASE_AMOUNT)).quantize(CENT)
+    except DecimalException:
+        return None
+
+
+def display_amount(base_amount, currency):
+    """``{"amount": ..., "currency": id}`` of a base amount shown in ``currency`` (default: the base)."""
+    if currency is None:
+        currency = base_currency_id()
+    amount = from_base(base_amount, currency)
+    return None if amount is None else {"amount": amount, "currency": currency}
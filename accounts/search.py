@@ -0,0 +1,284 @@
+"""
+Full-text search index for professionals.
+
+The list views used to OR six ``icontains`` lookups (one of them across the
+professions M2M), which forces ``.distinct()`` and a full scan. Instead every
+active professional gets one document in a dedicated index table:
+
+- SQLite: an FTS5 virtual table ranked with bm25()
+- PostgreSQL: a tsvector column with a GIN index ranked with ts_rank()
+
+Documents are kept in sync by ``accounts.signals`` and can be rebuilt with
+``python manage.py rebuild_search_index``. Every backend turns a query into a
+subquery over its index (the matching ids plus a rank correlated on the outer
+account row); ``search_professionals()`` applies both to a queryset, so the
+list views filter, order and paginate over the full match set in SQL.
+
+Backend selection: ``settings.PROFESSIONAL_SEARCH_BACKEND`` (dotted path) or,
+by default, the class registered for the database vendor in ``BACKENDS``.
+"""
+import re
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Accounts
+
+# Indexed text columns, in the order the index stores them
+DOCUMENT_FIELDS = ("first_name", "last_name", "nickname", "city", "country", "professions")
+
+# Accounts.save(update_fields=...) touching none of these can skip re-indexing
+INDEXED_MODEL_FIELDS = frozenset(
+    ("first_name", "last_name", "nickname", "city", "country", "account_type", "is_active")
+)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(query):
+    return _TOKEN_RE.findall((query or "").lower())
+
+
+def _document_select_sql():
+    """
+    SELECT producing (id, first_name, last_name, nickname, city, country,
+    professions) for active professionals. Profession names are aggregated in a
+    correlated subquery so one row per account comes back without DISTINCT.
+    """
+    accounts = Accounts._meta.db_table
+    through = Accounts.professions.through._meta.db_table
+    profession = Accounts.professions.field.related_model._meta.db_table
+    if connection.vendor == "postgresql":
+        names = "string_agg(p.name, ' ')"
+    else:
+        names = "group_concat(p.name, ' ')"
+    return f"""
+        SELECT a.id, a.first_name, a.last_name, COALESCE(a.nickname, ''),
+               COALESCE(a.city, ''), COALESCE(a.country, ''),
+               COALESCE((SELECT {names}
+                           FROM {through} ap
+                           JOIN {profession} p ON p.id = ap.profession_id
+                          WHERE ap.accounts_id = a.id), '')
+          FROM {accounts} a
+         WHERE a.account_type = %s AND a.is_active
+    """
+
+
+def _chunks(ids, size=500):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+class SearchBackend(ABC):
+    """Interface every search backend implements."""
+
+    @abstractmethod
+    def index(self, account_ids):
+        """(Re)index the given accounts; non-professionals are dropped."""
+
+    @abstractmethod
+    def remove(self, account_ids):
+        """Drop the given accounts' documents."""
+
+    @abstractmethod
+    def rebuild(self):
+        """Drop and recreate every document. Returns the number indexed."""
+
+    @abstractmethod
+    def matches(self, query):
+        """
+        Return ``(ids, rank)`` expressions for ``query``, or None when it has
+        nothing searchable. ``ids`` selects every matching account id; ``rank``
+        is correlated on the outer accounts row, lower is better.
+        """
+
+
+class SQLiteFTSBackend(SearchBackend):
+    table = "accounts_professional_fts"
+
+    # bm25() column weights, same order as DOCUMENT_FIELDS
+    weights = (10.0, 10.0, 8.0, 3.0, 3.0, 5.0)
+
+    def index(self, account_ids):
+        for chunk in _chunks(account_ids):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", chunk)
+                cursor.execute(
+                    f"INSERT INTO {self.table} (rowid, {', '.join(DOCUMENT_FIELDS)}) "
+                    f"{_document_select_sql()} AND a.id IN ({placeholders})",
+                    [Accounts.AccountType.PROFESSIONAL, *chunk],
+                )
+
+    def remove(self, account_ids):
+        for chunk in _chunks(account_ids):
+            placeholders = ", ".join(["%s"] * len(chunk))
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", chunk)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, {', '.join(DOCUMENT_FIELDS)}) "
+                f"{_document_select_sql()}",
+                [Accounts.AccountType.PROFESSIONAL],
+            )
+            cursor.execute(f"INSERT INTO {self.table}({self.table}) VALUES ('optimize')")
+            cursor.execute(f"SELECT count(*) FROM {self.table}")
+            return cursor.fetchone()[0]
+
+    def _match(self, query):
+        # every token must match, each as a prefix: "mus" finds "musician"
+        return " ".join(f'"{token}"*' for token in tokenize(query))
+
+    def _rank_sql(self):
+        return f"bm25({self.table}, {', '.join(str(w) for w in self.weights)})"
+
+    def matches(self, query):
+        match = self._match(query)
+        if not match:
+            return None
+        ids = RawSQL(f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", [match])
+        # the rowid constraint makes this one index probe per outer row
+        rank = RawSQL(
+            f"SELECT {self._rank_sql()} FROM {self.table} "
+            f"WHERE {self.table} MATCH %s AND rowid = {Accounts._meta.db_table}.id",
+            [match],
+            output_field=FloatField(),
+        )
+        return ids, rank
+
+
+class PostgresSearchBackend(SearchBackend):
+    table = "accounts_professional_search"
+
+    # setweight() class per column, same order as DOCUMENT_FIELDS
+    weights = ("A", "A", "A", "C", "C", "B")
+
+    def _document_sql(self):
+        parts = [
+            f"setweight(to_tsvector('simple', d.{name}), '{weight}')"
+            for name, weight in zip(DOCUMENT_FIELDS, self.weights)
+        ]
+        columns = ", ".join(("id",) + DOCUMENT_FIELDS)
+        return f"""
+            INSERT INTO {self.table} (account_id, document)
+            SELECT d.id, {' || '.join(parts)}
+              FROM ({{select}}) AS d({columns})
+            ON CONFLICT (account_id) DO UPDATE SET document = EXCLUDED.document
+        """
+
+    def index(self, account_ids):
+        for chunk in _chunks(account_ids):
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {self.table} WHERE account_id = ANY(%s)", [chunk])
+                cursor.execute(
+                    self._document_sql().format(select=_document_select_sql() + " AND a.id = ANY(%s)"),
+                    [Accounts.AccountType.PROFESSIONAL, chunk],
+                )
+
+    def remove(self, account_ids):
+        for chunk in _chunks(account_ids):
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {self.table} WHERE account_id = ANY(%s)", [chunk])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {self.table}")
+            cursor.execute(
+                self._document_sql().format(select=_document_select_sql()),
+                [Accounts.AccountType.PROFESSIONAL],
+            )
+            cursor.execute(f"SELECT count(*) FROM {self.table}")
+            return cursor.fetchone()[0]
+
+    def _tsquery(self, query):
+        # tokens are \w+ only, so they are safe inside a to_tsquery expression
+        return " & ".join(f"{token}:*" for token in tokenize(query))
+
+    def matches(self, query):
+        tsquery = self._tsquery(query)
+        if not tsquery:
+            return None
+        ids = RawSQL(
+            f"SELECT account_id FROM {self.table} WHERE document @@ to_tsquery('simple', %s)", [tsquery],
+        )
+        rank = RawSQL(
+            f"SELECT -ts_rank(document, to_tsquery('simple', %s)) FROM {self.table} "
+            f"WHERE account_id = {Accounts._meta.db_table}.id",
+            [tsquery],
+            output_field=FloatField(),
+        )
+        return ids, rank
+
+
+class DatabaseLikeBackend(SearchBackend):
+    """
+    Fallback for databases without a native index: the old icontains search
+    as an id subquery, unranked, so callers stay backend-agnostic.
+    """
+
+    def index(self, account_ids):
+        pass
+
+    def remove(self, account_ids):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def _matching(self, query):
+        return Accounts.objects.filter(
+            account_type=Accounts.AccountType.PROFESSIONAL, is_active=True,
+        ).filter(
+            Q(first_name__icontains=query) |
+            Q(last_name__icontains=query) |
+            Q(nickname__icontains=query) |
+            Q(city__icontains=query) |
+            Q(country__icontains=query) |
+            Q(professions__name__icontains=query)
+        ).values("id")
+
+    def matches(self, query):
+        query = (query or "").strip()
+        if not query:
+            return None
+        return self._matching(query), Value(0.0, output_field=FloatField())
+
+
+BACKENDS = {
+    "sqlite": SQLiteFTSBackend,
+    "postgresql": PostgresSearchBackend,
+}
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        path = getattr(settings, "PROFESSIONAL_SEARCH_BACKEND", None)
+        backend_class = import_string(path) if path else BACKENDS.get(connection.vendor, DatabaseLikeBackend)
+        _backend = backend_class()
+    return _backend
+
+
+def search_professionals(queryset, query, backend=None):
+    """
+    Restrict ``queryset`` to professionals matching ``query`` and annotate
+    ``search_rank`` (lower = better match) so callers can
+    ``order_by('search_rank', 'id')``. Both are subqueries against the index
+    of ``backend`` (default: ``get_backend()``), so any further filtering and
+    paging sees every match.
+    """
+    matched = (backend or get_backend()).matches(query)
+    if matched is None:
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+    ids, rank = matched
+    return queryset.filter(pk__in=ids).annotate(search_rank=rank)
@@ -0,0 +1,290 @@
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from showdan import filter_options
+
+from . import images, media_jobs, news, rates, search
+from .models import (
+    AccountPhoto, Accounts, AudioAcapellaCover, Currency, ExchangeRate, Language, MediaJob, MediaStatus, NewsPost,
+    NewsRead, Profession, ProfessionalPhoto, Review, VideoAcapellaCover,
+)
+
+
+def apply_rating_delta(professional_id, sum_delta, count_delta):
+    """
+    Shift a professional's rating summary by the given deltas in ONE UPDATE.
+    All right-hand sides read the pre-update row, so avg_rating is computed
+    from the new sum/count without a second round trip.
+    """
+    if not professional_id or (not sum_delta and not count_delta):
+        return
+
+    new_sum = F("rating_sum") + sum_delta
+    new_count = F("rating_count") + count_delta
+
+    Accounts.objects.filter(pk=professional_id).update(
+        rating_sum=new_sum,
+        rating_count=new_count,
+        avg_rating=Case(
+            When(
+                rating_count__gt=-count_delta,
+                then=Cast(new_sum, FloatField()) / Cast(new_count, FloatField()),
+            ),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+    )
+
+
+@receiver(pre_save, sender=Review)
+def review_remember_previous(sender, instance, raw=False, **kwargs):
+    # edits need the old (professional, rating) pair to move the summary correctly
+    instance._previous_rating = None
+    if instance.pk and not raw:
+        instance._previous_rating = (
+            Review.objects.filter(pk=instance.pk)
+            .values_list("professional_id", "rating")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    previous = getattr(instance, "_previous_rating", None)
+
+    with transaction.atomic():
+        if created or not previous:
+            apply_rating_delta(instance.professional_id, instance.rating, 1)
+            return
+
+        old_pro_id, old_rating = previous
+        if old_pro_id == instance.professional_id:
+            apply_rating_delta(instance.professional_id, instance.rating - old_rating, 0)
+        else:
+            apply_rating_delta(old_pro_id, -old_rating, -1)
+            apply_rating_delta(instance.professional_id, instance.rating, 1)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    apply_rating_delta(instance.professional_id, -instance.rating, -1)
+
+
+# ==================== Search index ====================
+
+@receiver(post_save, sender=Accounts)
+def account_saved_reindex(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # e.g. last_login updates on every sign-in: nothing indexed changed
+    if update_fields is not None and not search.INDEXED_MODEL_FIELDS.intersection(update_fields):
+        return
+    search.get_backend().index([instance.pk])
+
+
+@receiver(post_delete, sender=Accounts)
+def account_deleted_unindex(sender, instance, **kwargs):
+    search.get_backend().remove([instance.pk])
+
+
+@receiver(m2m_changed, sender=Accounts.professions.through)
+def account_professions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            search.get_backend().index([instance.pk])
+        return
+
+    # profession.accounts.add()/remove(): pk_set holds account ids; clear() does
+    # not report them, so remember who was attached before the rows go away
+    if action == "pre_clear":
+        instance._search_account_ids = list(instance.accounts.values_list("pk", flat=True))
+    elif action == "post_clear":
+        search.get_backend().index(getattr(instance, "_search_account_ids", []))
+    elif action in ("post_add", "post_remove") and pk_set:
+        search.get_backend().index(pk_set)
+
+
+@receiver(post_save, sender=Profession)
+def profession_saved_reindex(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    account_ids = list(instance.accounts.values_list("pk", flat=True))
+    if account_ids:
+        search.get_backend().index(account_ids)
+
+
+@receiver(pre_delete, sender=Profession)
+def profession_remember_accounts(sender, instance, **kwargs):
+    instance._search_account_ids = list(instance.accounts.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Profession)
+def profession_deleted_reindex(sender, instance, **kwargs):
+    account_ids = getattr(instance, "_search_account_ids", None)
+    if account_ids:
+        search.get_backend().index(account_ids)
+
+
+# ==================== Filter options versions ====================
+
+# Accounts columns feeding the professionals price range
+PRICE_FIELDS = ("cost_per_hour", "cost_per_hour_base", "account_type", "is_active")
+
+
+@receiver(pre_save, sender=Accounts)
+def account_remember_price(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._previous_price = None
+    if raw or not instance.pk:
+        return
+    if update_fields is not None and not set(PRICE_FIELDS).intersection(update_fields):
+        return
+    instance._previous_price = (
+        Accounts.objects.filter(pk=instance.pk).values_list(*PRICE_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=Accounts)
+def account_saved_bump_price_range(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    current = tuple(getattr(instance, name) for name in PRICE_FIELDS)
+    previous = getattr(instance, "_previous_price", None)
+    if created:
+        changed = instance.account_type == Accounts.AccountType.PROFESSIONAL
+    else:
+        changed = previous is not None and previous != current
+    if changed:
+        filter_options.bump_version(filter_options.PROFESSIONALS)
+
+
+@receiver(post_delete, sender=Accounts)
+def account_deleted_bump_price_range(sender, instance, **kwargs):
+    if instance.account_type == Accounts.AccountType.PROFESSIONAL:
+        filter_options.bump_version(filter_options.PROFESSIONALS)
+
+
+@receiver(m2m_changed, sender=Accounts.professions.through)
+def account_professions_bump_price_range(sender, action, **kwargs):
+    # per-profession price ranges depend on who holds which profession
+    if action in ("post_add", "post_remove", "post_clear"):
+        filter_options.bump_version(filter_options.PROFESSIONALS)
+
+
+@receiver(post_save, sender=Profession)
+@receiver(post_delete, sender=Profession)
+def profession_changed_bump(sender, **kwargs):
+    if kwargs.get("raw"):
+        return
+    # the profession tree is part of both bundles
+    filter_options.bump_version(filter_options.EVENTS, filter_options.PROFESSIONALS)
+
+
+@receiver(post_save, sender=Language)
+@receiver(post_delete, sender=Language)
+def language_changed_bump(sender, **kwargs):
+    if kwargs.get("raw"):
+        return
+    filter_options.bump_version(filter_options.PROFESSIONALS)
+
+
+# ==================== Exchange rate matrix ====================
+
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+@receiver(post_save, sender=Currency)
+def exchange_rates_changed_bump(sender, **kwargs):
+    # now, so this process stops using the old rates, and again after commit,
+    # in case another worker reloaded the old rows before the commit
+    rates.bump_version()
+    transaction.on_commit(rates.bump_version)
+    rates.rates_changed.send(sender=sender)
+
+
+@receiver(rates.rates_changed)
+def exchange_rates_changed_recompute_prices(sender, **kwargs):
+    Accounts.objects.filter(cost_per_hour__isnull=False).update(
+        cost_per_hour_base=rates.base_amount_expression("cost_per_hour"),
+    )
+    filter_options.bump_version(filter_options.PROFESSIONALS)
+
+
+# ==================== News unread counts ====================
+
+@receiver(pre_save, sender=NewsPost)
+def news_post_remember_published(sender, instance, raw=False, **kwargs):
+    instance._previous_published = None
+    if instance.pk and not raw:
+        instance._previous_published = (
+            NewsPost.objects.filter(pk=instance.pk).values_list("is_published", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=NewsPost)
+def news_post_saved_bump(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_published", None)
+    if instance.is_published != bool(previous):
+        news.bump_version()
+        transaction.on_commit(news.bump_version)
+
+
+@receiver(post_delete, sender=NewsPost)
+def news_post_deleted_bump(sender, instance, **kwargs):
+    if instance.is_published:
+        news.bump_version()
+        transaction.on_commit(news.bump_version)
+
+
+@receiver(post_save, sender=NewsRead)
+@receiver(post_delete, sender=NewsRead)
+def news_read_changed_forget(sender, instance, created=True, raw=False, **kwargs):
+    # re-reading a post only moves read_at
+    if raw or not created:
+        return
+    news.forget(instance.user_id)
+    transaction.on_commit(lambda: news.forget(instance.user_id))
+
+
+# ==================== Image derivatives ====================
+
+@receiver(post_save, sender=Accounts)
+@receiver(post_save, sender=AccountPhoto)
+@receiver(post_save, sender=ProfessionalPhoto)
+@receiver(post_save, sender=NewsPost)
+def image_saved_generate_derivatives(sender, instance, raw=False, update_fields=None, **kwargs):
+    # uploads still processing get theirs from the media worker
+    if raw or getattr(instance, "status", None) == MediaStatus.PROCESSING:
+        return
+    fields = [field for field, _variants in images.IMAGE_FIELDS[sender._meta.label]]
+    if update_fields is not None:
+        fields = [field for field in fields if field in update_fields]
+    if fields:
+        images.refresh(instance, fields)
+
+
+# ==================== Media processing queue ====================
+
+@receiver(post_save, sender=AccountPhoto)
+@receiver(post_save, sender=ProfessionalPhoto)
+@receiver(post_save, sender=AudioAcapellaCover)
+@receiver(post_save, sender=VideoAcapellaCover)
+def media_uploaded_enqueue(sender, instance, created, raw=False, **kwargs):
+    # same transaction as the row: a stored upload always has its job
+    if raw or not created or instance.status != MediaStatus.PROCESSING:
+        return
+    media_jobs.enqueue(instance)
+
+
+@receiver(post_delete, sender=AccountPhoto)
+@receiver(post_delete, sender=ProfessionalPhoto)
+@receiver(post_delete, sender=AudioAcapellaCover)
+@receiver(post_delete, sender=VideoAcapellaCover)
+def media_deleted_drop_jobs(sender, instance, **kwargs):
+    MediaJob.objects.filter(target=sender._meta.label, object_id=instance.pk).delete()
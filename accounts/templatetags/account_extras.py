@@ -1,4 +1,9 @@
 from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html, format_html_join
+
+from accounts import images
+from accounts.models import MediaStatus
 
 register = template.Library()
 
@@ -7,3 +12,33 @@ def get_item(d, key):
     if not d:
         return None
     return d.get(key)
+
+
+@register.filter
+def media_processing(items):
+    """True while any of the uploads in ``items`` is still being processed."""
+    return any(item.status == MediaStatus.PROCESSING for item in items)
+
+
+@register.simple_tag
+def picture(instance, field, sizes="100vw", alt="", **attrs):
+    """
+    ``<picture>`` for an image field with a ``srcset`` per derivative format
+    (see accounts.images); the original is the ``<img>`` fallback. Extra
+    keyword arguments (``class``, ``style``) become ``<img>`` attributes:
+
+        {% picture u "profile_picture" sizes="(min-width: 768px) 25vw, 50vw" alt=u.first_name %}
+    """
+    fieldfile = getattr(instance, field)
+    if not fieldfile:
+        return ""
+    variants = getattr(instance, f"{field}_variants", None)
+    sources = format_html_join(
+        "",
+        '<source type="image/{}" srcset="{}" sizes="{}">',
+        ((fmt, srcset, sizes) for fmt in images.FORMATS if (srcset := images.srcset(fieldfile, variants, fmt))),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" alt="{}" loading="lazy" decoding="async"{}></picture>',
+        sources, fieldfile.url, alt, flatatt(attrs),
+    )
@@ -1,3 +1,1301 @@
-from django.test import TestCase
+import hashlib
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient, APIRequestFactory
+
+from . import chunked_uploads, images, importer, media_jobs, news, rates
+from .api.serializers import AccountPhotoSerializer, annotate_media_counts
+from .api.views_professionals import ProfessionTreeView
+from .context_processors import news_unread_count
+from .importer import import_accounts
+from .media_serving import media_row, serve_media
+from .models import (
+    AccountPhoto, AudioAcapellaCover, Currency, ExchangeRate, FavoriteProfessional, Language,
+    MediaJob, MediaStatus, NewsPost, NewsRead, Profession, ProfessionalPhoto, Review, UploadSession,
+    VideoAcapellaCover,
+)
+from .search import search_professionals
+from .utils import convert_many, get_rate
+
+User = get_user_model()
+
+# For tests counting queries on a cache hit: the shared database cache would
+# add its own lookups to every count.
+LOCAL_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class ProfessionalListQueryCountTests(TestCase):
+    """
+    Listing endpoints must cost a constant number of queries per page:
+    requesting a bigger page may not add queries.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.currency = Currency.objects.create(name="US Dollar", sign="$")
+        cls.language = Language.objects.create(name="English")
+        cls.profession = Profession.objects.create(name="Singer")
+
+        cls.viewer = User.objects.create_user(
+            email="viewer@example.com",
+            first_name="View", last_name="Er", city="Yaounde",
+        )
+
+        cls.pros = []
+        for i in range(12):
+            pro = User.objects.create_user(
+                email=f"pro{i}@example.com",
+                first_name=f"Pro{i}", last_name="Test",
+                account_type=User.AccountType.PROFESSIONAL,
+                currency=cls.currency, city="Yaounde", cost_per_hour=50 + i,
+            )
+            pro.professions.add(cls.profession)
+            pro.communication_languages.add(cls.language)
+            AccountPhoto.objects.create(user=pro, image="normal_pictures/a.jpg", status=MediaStatus.READY)
+            ProfessionalPhoto.objects.create(user=pro, image="professional_pictures/a.jpg")
+            AudioAcapellaCover.objects.create(user=pro, audio_file="acapella/audio/a.mp3")
+            VideoAcapellaCover.objects.create(user=pro, video_file="acapella/video/a.mp4")
+            for j in range(3):
+                reviewer = User.objects.create_user(
+                    email=f"r{i}-{j}@example.com",
+                    first_name="R", last_name="R",
+                )
+                Review.objects.create(professional=pro, reviewer=reviewer, rating=5)
+            if i % 2:
+                FavoriteProfessional.objects.create(user=cls.viewer, professional=pro)
+            cls.pros.append(pro)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def _count_queries(self, url, params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(ctx), response
+
+    def assertConstantQueries(self, url, small, large, **extra):
+        self.client.get(url, {**extra, **small})  # fill the shared cache first
+        small_count, _ = self._count_queries(url, {**extra, **small})
+        large_count, response = self._count_queries(url, {**extra, **large})
+        self.assertEqual(
+            small_count, large_count,
+            f"{url}: {small_count} queries for {small}, {large_count} for {large}",
+        )
+        return response
+
+    def test_professionals_list(self):
+        self.assertConstantQueries(
+            reverse("api-professionals-list"), {"page_size": 2}, {"page_size": 12},
+        )
+
+    def test_professionals_top(self):
+        self.assertConstantQueries(
+            reverse("api-professionals-top"), {"limit": 2}, {"limit": 12},
+        )
+
+    def test_professionals_recommended(self):
+        self.assertConstantQueries(
+            reverse("api-professionals-recommended"), {"page_size": 2}, {"page_size": 12},
+        )
+
+    def test_search_professionals(self):
+        response = self.assertConstantQueries(
+            reverse("api-search-professionals"), {"page_size": 2}, {"page_size": 12},
+        )
+        results = response.json()["results"]
+        self.assertTrue(all(r["normal_photos_count"] == 1 for r in results))
+        favorites = {r["id"] for r in results if r["is_favorite"]}
+        self.assertEqual(favorites, {p.pk for i, p in enumerate(self.pros) if i % 2})
+
+    def test_public_profile_similar_professionals(self):
+        url = reverse("api-profile-detail", args=[self.pros[0].pk])
+        User.objects.filter(pk__in=[p.pk for p in self.pros[3:]]).update(is_active=False)
+        few_count, response = self._count_queries(url, {})
+        self.assertEqual(len(response.json()["similar_professionals"]), 2)
+
+        User.objects.filter(pk__in=[p.pk for p in self.pros]).update(is_active=True)
+        many_count, response = self._count_queries(url, {})
+        self.assertEqual(len(response.json()["similar_professionals"]), 8)
+        self.assertEqual(few_count, many_count)
+
+
+class RatingSummaryTests(TestCase):
+    def setUp(self):
+        pro = lambda name: User.objects.create_user(
+            email=f"{name}@example.com", first_name=name, last_name="P",
+            account_type=User.AccountType.PROFESSIONAL,
+        )
+        self.singer, self.drummer = pro("singer"), pro("drummer")
+        self.ann, self.ben, self.cat = [
+            User.objects.create_user(email=f"{name}@example.com", first_name=name, last_name="R")
+            for name in ("ann", "ben", "cat")
+        ]
+
+    def assertSummary(self, account, rating_sum, rating_count, avg_rating):
+        account.refresh_from_db()
+        self.assertEqual((account.rating_sum, account.rating_count), (rating_sum, rating_count))
+        self.assertAlmostEqual(account.avg_rating, avg_rating)
+
+    def test_create_edit_and_delete(self):
+        first = Review.objects.create(professional=self.singer, reviewer=self.ann, rating=5)
+        Review.objects.create(professional=self.singer, reviewer=self.ben, rating=2)
+        self.assertSummary(self.singer, 7, 2, 3.5)
+
+        first.rating = 3
+        first.save()
+        self.assertSummary(self.singer, 5, 2, 2.5)
+
+        first.delete()
+        self.assertSummary(self.singer, 2, 1, 2.0)
+        Review.objects.get().delete()
+        self.assertSummary(self.singer, 0, 0, 0.0)
+
+    def test_reviewer_and_professional_changes(self):
+        review = Review.objects.create(professional=self.singer, reviewer=self.ann, rating=4)
+        Review.objects.create(professional=self.drummer, reviewer=self.ann, rating=2)
+
+        review.reviewer = self.cat
+        review.save()
+        self.assertSummary(self.singer, 4, 1, 4.0)
+
+        review.professional = self.drummer
+        review.rating = 5
+        review.save()
+        self.assertSummary(self.singer, 0, 0, 0.0)
+        self.assertSummary(self.drummer, 7, 2, 3.5)
+
+    def test_rebuild_ratings_repairs_drift(self):
+        Review.objects.create(professional=self.singer, reviewer=self.ann, rating=5)
+        Review.objects.create(professional=self.singer, reviewer=self.ben, rating=4)
+        User.objects.filter(pk=self.singer.pk).update(rating_sum=1, rating_count=7, avg_rating=0.1)
+        User.objects.filter(pk=self.drummer.pk).update(rating_sum=3, rating_count=1, avg_rating=3.0)
+
+        out = StringIO()
+        call_command("rebuild_ratings", stdout=out)
+        self.assertIn("Rebuilt rating summary", out.getvalue())
+        self.assertSummary(self.singer, 9, 2, 4.5)
+        self.assertSummary(self.drummer, 0, 0, 0.0)
+
+
+def search_ids(query):
+    """Ids the professionals list shows for ``?q=query``, best match first."""
+    ranked = search_professionals(User.objects.all(), query).order_by("search_rank", "id")
+    return list(ranked.values_list("pk", flat=True))
+
+
+class ProfessionalSearchIndexTests(TestCase):
+    def setUp(self):
+        self.singer = Profession.objects.create(name="Singer")
+        self.pro = User.objects.create_user(
+            email="amina@example.com", first_name="Amina", last_name="Fotso",
+            account_type=User.AccountType.PROFESSIONAL, city="Douala",
+        )
+
+    def test_prefix_match_and_sync_on_profession_change(self):
+        self.assertEqual(search_ids("ami"), [self.pro.pk])
+        self.assertEqual(search_ids("sing"), [])
+
+        self.pro.professions.add(self.singer)
+        self.assertEqual(search_ids("douala sing"), [self.pro.pk])
+
+        self.singer.name = "Vocalist"
+        self.singer.save()
+        self.assertEqual(search_ids("sing"), [])
+        self.assertEqual(search_ids("vocal"), [self.pro.pk])
+
+    def test_inactive_or_personal_accounts_are_not_indexed(self):
+        self.pro.is_active = False
+        self.pro.save()
+        self.assertEqual(search_ids("amina"), [])
+
+        self.pro.is_active = True
+        self.pro.account_type = User.AccountType.PERSONAL
+        self.pro.save()
+        self.assertEqual(search_ids("amina"), [])
+
+    def test_ranking_prefers_name_over_city(self):
+        other = User.objects.create_user(
+            email="other@example.com", first_name="Paul", last_name="Kouam",
+            account_type=User.AccountType.PROFESSIONAL, city="Amina",
+        )
+        self.assertEqual(search_ids("amina"), [self.pro.pk, other.pk])
+
+        rows = APIClient().get(reverse("api-professionals-list"), {"q": "amina"}).data["results"]
+        self.assertEqual([row["id"] for row in rows], [self.pro.pk, other.pk])
+
+    def test_filters_and_pages_see_every_match(self):
+        others = [
+            User.objects.create_user(
+                email=f"d{i}@example.com", first_name=f"D{i}", last_name="K",
+                account_type=User.AccountType.PROFESSIONAL, city="Douala",
+            )
+            for i in range(4)
+        ]
+        others[-1].professions.add(self.singer)
+        url = reverse("api-professionals-list")
+
+        response = APIClient().get(url, {"q": "douala", "profession": self.singer.pk})
+        self.assertEqual([row["id"] for row in response.data["results"]], [others[-1].pk])
+
+        pages = [APIClient().get(url, {"q": "douala", "page_size": 2, "page": page}).data for page in (1, 2, 3)]
+        self.assertEqual(pages[0]["count"], 5)
+        self.assertEqual(
+            sorted(row["id"] for page in pages for row in page["results"]),
+            sorted([self.pro.pk] + [other.pk for other in others]),
+        )
+
+
+class ProfessionTreeTests(TestCase):
+    def setUp(self):
+        self.music = Profession.objects.create(name="Music")
+        self.live = Profession.objects.create(name="Live", parent=self.music)
+        self.choir = Profession.objects.create(name="Choir", parent=self.live)
+        self.acapella = Profession.objects.create(name="Acapella", parent=self.choir)
+        self.dance = Profession.objects.create(name="Dance")
+
+    def test_depth_and_path_are_stored(self):
+        self.assertEqual([p.depth for p in (self.music, self.live, self.choir, self.acapella)], [0, 1, 2, 3])
+        self.acapella.refresh_from_db()
+        self.assertEqual(self.acapella.depth, 3)
+        self.assertTrue(self.acapella.path.startswith(self.live.path + "/"))
+
+    def test_move_rewrites_subtree_in_one_update(self):
+        self.live.parent = self.dance
+        with CaptureQueriesContext(connection) as ctx:
+            self.live.save()
+        updates = [q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        # the row itself, the path/depth fix-up, and one statement for the subtree
+        self.assertEqual(len(updates), 3)
+
+        for node, depth in ((self.live, 1), (self.choir, 2), (self.acapella, 3)):
+            node.refresh_from_db()
+            self.assertEqual(node.depth, depth)
+            self.assertTrue(node.path.startswith(self.dance.path + "/"), node.path)
+
+        self.live.parent = None
+        self.live.save()
+        self.acapella.refresh_from_db()
+        self.assertEqual(self.acapella.depth, 2)
+        self.assertTrue(self.acapella.path.startswith(self.live.path + "/"))
+
+    def test_cannot_move_under_own_descendant(self):
+        self.music.parent = self.choir
+        with self.assertRaises(ValueError):
+            self.music.save()
+
+    def test_descendant_lookups(self):
+        self.assertEqual(
+            sorted(Profession.descendant_ids([self.live.pk])),
+            sorted([self.live.pk, self.choir.pk, self.acapella.pk]),
+        )
+        self.assertEqual(
+            list(self.music.descendants().values_list("pk", flat=True)),
+            [self.live.pk, self.choir.pk, self.acapella.pk],
+        )
+
+    def test_profession_filter_includes_descendants(self):
+        singer = User.objects.create_user(
+            email="acapella@example.com", first_name="A", last_name="C",
+            account_type=User.AccountType.PROFESSIONAL,
+        )
+        singer.professions.add(self.choir, self.acapella)  # two matches, one row
+        dancer = User.objects.create_user(
+            email="dancer@example.com", first_name="D", last_name="A",
+            account_type=User.AccountType.PROFESSIONAL,
+        )
+        dancer.professions.add(self.dance)
+
+        url = reverse("api-professionals-list")
+        ids = lambda pk: [row["id"] for row in APIClient().get(url, {"profession": pk}).data["results"]]
+        self.assertEqual(ids(self.music.pk), [singer.pk])
+        self.assertEqual(ids(self.acapella.pk), [singer.pk])
+        self.assertEqual(ids(self.dance.pk), [dancer.pk])
+
+        home = self.client.get(reverse("home"), {"profession": self.live.pk})
+        self.assertEqual([u.pk for u in home.context["pros"]], [singer.pk])
+
+    def test_tree_endpoint_and_options(self):
+        from .utils import profession_tree_options
+
+        # professions/tree/ is routed to ProfessionViewSet.tree: roots + one query for all children
+        with self.assertNumQueries(2):
+            tree = APIClient().get(reverse("api-professions-tree")).data
+        self.assertEqual([n["name"] for n in tree], ["Music", "Dance"])
+        self.assertEqual(tree[0]["children"][0]["children"][0]["children"][0]["name"], "Acapella")
+
+        with self.assertNumQueries(1):
+            flat_tree = ProfessionTreeView.as_view()(APIRequestFactory().get("/")).data
+        self.assertEqual(
+            [n["id"] for n in flat_tree[0]["children"]], [n["id"] for n in tree[0]["children"]],
+        )
+
+        labels = [label for _pk, label in profession_tree_options()]
+        self.assertEqual(labels[0], "Dance")
+        self.assertEqual(labels[-1], " " * 12 + "Acapella")
+
+
+class ProfessionalAvailabilityFilterTests(TestCase):
+    def setUp(self):
+        from datetime import datetime
+        from django.utils import timezone
+        from events.models import BusyTime, Event
+
+        at = lambda day, hour: timezone.make_aware(datetime(2030, 5, day, hour))
+        pro = lambda name: User.objects.create_user(
+            email=f"{name}@example.com", first_name=name, last_name="P",
+            account_type=User.AccountType.PROFESSIONAL,
+        )
+        self.free, self.busy, self.booked, self.pending = pro("free"), pro("busy"), pro("booked"), pro("pending")
+        client = User.objects.create_user(email="client@example.com", first_name="C", last_name="L")
+
+        BusyTime.objects.create(user=self.busy, start_datetime=at(10, 0), end_datetime=at(11, 0))
+        # ends exactly when the window starts: no clash
+        BusyTime.objects.create(user=self.free, start_datetime=at(9, 0), end_datetime=at(10, 12))
+        Event.objects.create(
+            name="Gig", created_by=client, is_locked=True, accepted_professional=self.booked,
+            start_datetime=at(10, 18), end_datetime=at(10, 23),
+        )
+        # an unlocked event does not block the professional
+        Event.objects.create(
+            name="Draft", created_by=client, accepted_professional=self.pending,
+            start_datetime=at(10, 12), end_datetime=at(10, 14),
+        )
+
+    def _api_ids(self, params):
+        rows = APIClient().get(reverse("api-professionals-list"), params).data["results"]
+        return sorted(row["id"] for row in rows)
+
+    def test_window_excludes_busy_and_booked(self):
+        everyone = sorted(u.pk for u in (self.free, self.busy, self.booked, self.pending))
+        available = sorted([self.free.pk, self.pending.pk])
+
+        window = {"available_from": "2030-05-10T12:00", "available_to": "2030-05-10T23:30"}
+        self.assertEqual(self._api_ids(window), available)
+        # a bare date covers the whole day, which also catches free's morning
+        self.assertEqual(
+            self._api_ids({"available_from": "2030-05-10", "available_to": "2030-05-10"}), [self.pending.pk],
+        )
+        self.assertEqual(
+            self._api_ids({"available_from": "2030-05-11", "available_to": "2030-05-11"}),
+            sorted(everyone),
+        )
+
+        # invalid or reversed windows are ignored
+        self.assertEqual(self._api_ids({"available_from": "soon", "available_to": "2030-05-10"}), everyone)
+        self.assertEqual(self._api_ids({"available_from": "2030-05-11", "available_to": "2030-05-10"}), everyone)
+
+        home = self.client.get(reverse("home"), window)
+        self.assertEqual(sorted(u.pk for u in home.context["pros"]), available)
+        self.assertEqual(home.context["f_available_from"], "2030-05-10T12:00")
+
+    def test_filter_is_an_anti_join(self):
+        from events.calendar_utils import availability_window, available_between
+
+        window = availability_window("2030-05-10", "2030-05-12")
+        sql = str(User.objects.filter(available_between(*window)).query)
+        self.assertEqual(sql.count("NOT EXISTS"), 2)
+
+        # one page query no matter how many professionals are busy
+        self._api_ids({})  # fill the shared cache first
+        with CaptureQueriesContext(connection) as ctx:
+            self._api_ids({"available_from": "2030-05-10", "available_to": "2030-05-12"})
+        page_queries = len(ctx.captured_queries)
+        with CaptureQueriesContext(connection) as ctx:
+            self._api_ids({})
+        self.assertEqual(page_queries, len(ctx.captured_queries))
+
+
+class ExchangeRateMatrixTests(TestCase):
+    def setUp(self):
+        self.usd, self.eur, self.ngn, self.gbp, self.jpy = [
+            Currency.objects.create(name=name, sign=sign)
+            for name, sign in (("US Dollar", "$"), ("Euro", "€"), ("Naira", "₦"), ("Pound", "£"), ("Yen", "¥"))
+        ]
+        ExchangeRate.objects.create(from_currency=self.usd, to_currency=self.eur, rate=Decimal("0.9"))
+        ExchangeRate.objects.create(from_currency=self.usd, to_currency=self.ngn, rate=Decimal("1500"))
+        ExchangeRate.objects.create(from_currency=self.gbp, to_currency=self.usd, rate=Decimal("1.25"))
+
+    def test_direct_inverse_and_triangulated_rates_from_memory(self):
+        get_rate(self.usd, self.eur)  # load
+        with self.assertNumQueries(0):
+            self.assertEqual(get_rate(self.usd, self.eur), Decimal("0.9"))
+            self.assertEqual(get_rate(self.ngn, self.usd), Decimal("1") / Decimal("1500"))
+            # no stored pair: through the US Dollar, which has the most rates
+            self.assertAlmostEqual(get_rate(self.eur, self.ngn), Decimal("1500") / Decimal("0.9"), places=10)
+            self.assertAlmostEqual(get_rate(self.gbp.pk, self.ngn.pk), Decimal("1875"), places=10)
+            self.assertIsNone(get_rate(self.eur, self.jpy))
+            self.assertEqual(get_rate(self.jpy, self.jpy), Decimal("1"))
+
+            self.assertEqual(
+                convert_many(
+                    [(Decimal("10"), self.usd), (Decimal("2"), self.gbp), (Decimal("5"), self.jpy), (None, self.usd)],
+                    self.ngn, Decimal("0.01"),
+                ),
+                [Decimal("15000.00"), Decimal("3750.00"), None, None],
+            )
+
+    def test_rate_changes_rebuild_the_matrix(self):
+        self.assertIsNone(get_rate(self.eur, self.jpy))
+        version = rates.get_version()
+
+        ExchangeRate.objects.create(from_currency=self.jpy, to_currency=self.usd, rate=Decimal("0.0066"))
+        self.assertNotEqual(rates.get_version(), version)
+        self.assertAlmostEqual(get_rate(self.jpy, self.eur), Decimal("0.0066") * Decimal("0.9"), places=10)
+
+        ExchangeRate.objects.filter(from_currency=self.usd, to_currency=self.eur).get().delete()
+        self.assertIsNone(get_rate(self.usd, self.eur))
+
+    def test_other_workers_notice_the_version_stamp(self):
+        get_rate(self.usd, self.eur)
+        # another process changed a rate: only the shared stamp moved
+        ExchangeRate.objects.filter(from_currency=self.usd, to_currency=self.eur).update(rate=Decimal("0.95"))
+        cache_version = rates.get_version()
+        rates.cache.incr(rates.VERSION_KEY)
+        self.assertEqual(get_rate(self.usd, self.eur), Decimal("0.9"))  # still within the check interval
+
+        # ...but a stored base price never uses the old rate
+        self.assertEqual(rates.to_base(Decimal("95"), self.eur, fresh=True), Decimal("100.00"))
+        ExchangeRate.objects.filter(from_currency=self.usd, to_currency=self.eur).update(rate=Decimal("0.5"))
+        rates.cache.incr(rates.VERSION_KEY)
+        pro = User.objects.create_user(
+            email="pro@example.com", first_name="P", last_name="R",
+            account_type=User.AccountType.PROFESSIONAL, cost_per_hour=Decimal("50"), currency=self.eur,
+        )
+        self.assertEqual(pro.cost_per_hour_base, Decimal("100.00"))
+
+        ExchangeRate.objects.filter(from_currency=self.usd, to_currency=self.eur).update(rate=Decimal("0.95"))
+        rates.cache.incr(rates.VERSION_KEY)
+        with self.settings(EXCHANGE_RATE_CHECK_INTERVAL=0):
+            self.assertEqual(get_rate(self.usd, self.eur), Decimal("0.95"))
+        self.assertNotEqual(rates.get_version(), cache_version)
+
+
+class BaseCurrencyAmountTests(TestCase):
+    def setUp(self):
+        self.usd, self.eur, self.ngn = [
+            Currency.objects.create(name=name, sign=sign)
+            for name, sign in (("US Dollar", "$"), ("Euro", "€"), ("Naira", "₦"))
+        ]
+        self.usd_eur = ExchangeRate.objects.create(from_currency=self.usd, to_currency=self.eur, rate=Decimal("0.5"))
+        ExchangeRate.objects.create(from_currency=self.usd, to_currency=self.ngn, rate=Decimal("1000"))
+
+        pro = lambda name, cost, currency: User.objects.create_user(
+            email=f"{name}@example.com", first_name=name, last_name="P",
+            account_type=User.AccountType.PROFESSIONAL, cost_per_hour=Decimal(cost), currency=currency,
+        )
+        self.dollars = pro("dollars", "100", self.usd)   # 100 USD
+        self.euros = pro("euros", "80", self.eur)        # 160 USD
+        self.naira = pro("naira", "50000", self.ngn)     # 50 USD
+
+    def _api_ids(self, params):
+        rows = APIClient().get(reverse("api-professionals-list"), params).data["results"]
+        return [row["id"] for row in rows]
+
+    def test_prices_are_stored_in_the_base_currency(self):
+        self.assertEqual(rates.base_currency_id(), self.usd.pk)
+        self.assertEqual(
+            dict(User.objects.filter(cost_per_hour__isnull=False).values_list("first_name", "cost_per_hour_base")),
+            {"dollars": Decimal("100.00"), "euros": Decimal("160.00"), "naira": Decimal("50.00")},
+        )
+        self.euros.cost_per_hour = Decimal("60")
+        self.euros.save(update_fields=["cost_per_hour"])
+        self.euros.refresh_from_db()
+        self.assertEqual(self.euros.cost_per_hour_base, Decimal("120.00"))
+
+    def test_filter_and_sort_across_currencies(self):
+        self.assertEqual(self._api_ids({"order_by": "price"}), [self.naira.pk, self.dollars.pk, self.euros.pk])
+        self.assertEqual(self._api_ids({"order_by": "-price"}), [self.euros.pk, self.dollars.pk, self.naira.pk])
+        self.assertEqual(
+            self._api_ids({"min_price": "60", "max_price": "150", "order_by": "price"}), [self.dollars.pk],
+        )
+        # typed in euros: 40-60 EUR is 80-120 USD
+        self.assertEqual(
+            self._api_ids({"min_price": "40", "max_price": "60", "currency": self.eur.pk}), [self.dollars.pk],
+        )
+        self.assertEqual(self._api_ids({"min_price": "lots"}), self._api_ids({}))
+
+        home = self.client.get(reverse("home"), {"currency": self.eur.pk})
+        self.assertEqual((home.context["pmin"], home.context["pmax"]), (25, 80))
+
+    def test_out_of_range_amounts(self):
+        everyone = sorted(self._api_ids({}))
+        for params in ({"min_price": "1e40"}, {"min_price": "1e40", "currency": self.eur.pk}):
+            self.assertEqual(self._api_ids(params), [])
+        self.assertEqual(sorted(self._api_ids({"max_price": "1e40", "currency": self.eur.pk})), everyone)
+        self.assertEqual(sorted(self._api_ids({"max_price": "1e999999999", "currency": self.eur.pk})), everyone)
+        response = APIClient().get(reverse("api-search-professionals"), {"min_price": "1e40", "currency": self.eur.pk})
+        self.assertEqual(response.status_code, 200)
+
+        # a price whose base value overflows the base column is left out, also on recompute
+        gold = Currency.objects.create(name="Gold", sign="g")
+        ExchangeRate.objects.create(from_currency=self.usd, to_currency=gold, rate=Decimal("0.00001"))
+        rich = User.objects.create_user(
+            email="rich@example.com", first_name="rich", last_name="P",
+            account_type=User.AccountType.PROFESSIONAL, cost_per_hour=Decimal("99999999"), currency=gold,
+        )
+        self.assertIsNone(rich.cost_per_hour_base)
+        self.usd_eur.rate = Decimal("0.4")
+        self.usd_eur.save()
+        rich.refresh_from_db()
+        self.assertIsNone(rich.cost_per_hour_base)
+
+    def test_display_price_in_the_viewer_currency(self):
+        rows = APIClient().get(reverse("api-professionals-list"), {"currency": self.ngn.pk}).data["results"]
+        shown = {row["id"]: row["display_price"] for row in rows}
+        self.assertEqual(shown[self.euros.pk], {"amount": Decimal("160000.00"), "currency": self.ngn.pk})
+
+    def test_rate_changes_recompute_stored_prices(self):
+        self.usd_eur.rate = Decimal("0.8")
+        self.usd_eur.save()
+        self.euros.refresh_from_db()
+        self.assertEqual(self.euros.cost_per_hour_base, Decimal("100.00"))
+        self.assertEqual(self._api_ids({"min_price": "90", "max_price": "110", "order_by": "price"}),
+                         [self.dollars.pk, self.euros.pk])
+
+        # without a rate the price drops out of price filters
+        self.usd_eur.delete()
+        self.euros.refresh_from_db()
+        self.assertIsNone(self.euros.cost_per_hour_base)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class NewsUnreadCountTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(email="reader@example.com", first_name="R", last_name="D", password="pw")
+        self.first = NewsPost.objects.create(title="First", is_published=True)
+        self.second = NewsPost.objects.create(title="Second", is_published=True)
+        NewsPost.objects.create(title="Draft")
+
+    def _badge(self):
+        from types import SimpleNamespace
+        return news_unread_count(SimpleNamespace(user=self.user))["news_unread_count"]
+
+    def test_badge_is_lazy_and_cached(self):
+        with self.assertNumQueries(0):
+            badge = self._badge()  # not evaluated: no cache or database work
+        with self.assertNumQueries(1):
+            self.assertEqual(badge(), 2)
+            self.assertEqual(badge(), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(self._badge()(), 2)
+
+        self.client.force_login(self.user)
+        page = self.client.get(reverse("accounts:news"))
+        self.assertEqual(page.context["news_unread_count"](), 2)
+
+    def test_publish_and_read_invalidate(self):
+        self.assertEqual(news.unread_count(self.user), 2)
+
+        NewsPost.objects.create(title="Third", is_published=True)
+        self.assertEqual(news.unread_count(self.user), 3)
+
+        NewsRead.objects.create(user=self.user, post=self.first)
+        self.assertEqual(news.unread_count(self.user), 2)
+        # editing a published post or re-reading it keeps the cached count
+        self.second.title = "Second, edited"
+        self.second.save()
+        NewsRead.objects.update_or_create(user=self.user, post=self.first)
+        with self.assertNumQueries(0):
+            self.assertEqual(news.unread_count(self.user), 2)
+
+        self.second.is_published = False
+        self.second.save()
+        self.assertEqual(news.unread_count(self.user), 1)
+
+        NewsRead.objects.filter(post=self.first).delete()
+        self.assertEqual(news.unread_count(self.user), 2)
+
+        api = APIClient()
+        api.force_authenticate(self.user)
+        self.assertEqual(api.get(reverse("api-dashboard")).data["stats"]["unread_news"], 2)
+
+
+class NewsUnreadSharedCacheTests(TestCase):
+    def test_other_workers_see_reads_and_publishes(self):
+        from django.core.cache import caches
+        from django.core.cache.backends.locmem import LocMemCache
+
+        # a per-process cache would keep other workers' badges stale
+        self.assertNotIsInstance(caches["default"], LocMemCache)
+        other_worker = caches.create_connection("default")
+
+        user = User.objects.create_user(email="reader@example.com", first_name="R", last_name="D")
+        post = NewsPost.objects.create(title="First", is_published=True)
+        self.assertEqual(news.unread_count(user), 1)
+        self.assertEqual(other_worker.get(f"news:unread:{user.pk}")[1], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            news.mark_read(user, post)
+        self.assertIsNone(other_worker.get(f"news:unread:{user.pk}"))
+
+        version = other_worker.get(news.VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            NewsPost.objects.create(title="Second", is_published=True)
+        self.assertNotEqual(other_worker.get(news.VERSION_KEY), version)
+
+
+class NewsReadWatermarkTests(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        start = timezone.now() - timedelta(days=10)
+        self.user = User.objects.create_user(email="reader@example.com", first_name="R", last_name="D")
+        self.posts = [NewsPost.objects.create(title=f"Post {i}", is_published=True) for i in range(4)]
+        for i, post in enumerate(self.posts):  # published over the last days
+            post.published_at = start + timedelta(days=i)
+            NewsPost.objects.filter(pk=post.pk).update(published_at=post.published_at)
+
+    def _reads(self):
+        return sorted(NewsRead.objects.filter(user=self.user).values_list("post_id", flat=True))
+
+    def test_reads_in_order_collapse_into_the_watermark(self):
+        first, second, third, fourth = self.posts
+        news.mark_read(self.user, third)
+        self.assertIsNone(self.user.news_read_up_to)
+        self.assertEqual(self._reads(), [third.pk])
+
+        news.mark_read(self.user, first)
+        self.assertEqual(self.user.news_read_up_to, first.published_at)
+        self.assertEqual(self._reads(), [third.pk])
+
+        news.mark_read(self.user, second)  # closes the gap: third is covered too
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.news_read_up_to, third.published_at)
+        self.assertEqual(self._reads(), [])
+        self.assertEqual(list(news.unread_queryset(self.user)), [fourth])
+        self.assertEqual(news.unread_count(self.user), 1)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(news.read_post_ids(self.user, self.posts), {first.pk, second.pk, third.pk})
+
+    def test_compact_existing_rows(self):
+        first, second, third, fourth = self.posts
+        for post in (first, second, fourth):
+            NewsRead.objects.create(user=self.user, post=post)
+        self.assertEqual(news.compact(self.user.pk), second.published_at)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.news_read_up_to, second.published_at)
+        self.assertEqual(self._reads(), [fourth.pk])
+        self.assertEqual(news.read_post_ids(self.user, self.posts), {first.pk, second.pk, fourth.pk})
+
+    def test_republished_or_backdated_posts_are_unread(self):
+        first, second, third, fourth = self.posts
+        news.mark_all_read(self.user)
+        self.assertEqual(news.unread_count(self.user), 0)
+
+        second.is_published = False
+        second.save()
+        second.is_published = True
+        second.save(update_fields=["is_published"])
+        second.refresh_from_db()
+        self.assertGreater(second.published_at, fourth.published_at)
+        self.assertEqual(list(news.unread_queryset(self.user)), [second])
+
+        staff = User.objects.create_user(email="staff@example.com", first_name="S", last_name="F", is_staff=True)
+        api = APIClient()
+        api.force_authenticate(staff)
+        created = api.post(reverse("admin-news-list"), {
+            "title": "Backdated", "is_published": True, "published_at": "2000-01-01T00:00:00Z",
+        })
+        self.assertEqual(created.status_code, 201, created.data)
+        backdated = NewsPost.objects.get(pk=created.data["id"])
+        self.assertGreater(backdated.published_at, second.published_at)
+        self.assertEqual(sorted(p.pk for p in news.unread_queryset(self.user)), [second.pk, backdated.pk])
+
+        api.patch(reverse("admin-news-detail", args=[backdated.pk]), {"published_at": "2000-01-01T00:00:00Z"})
+        self.assertEqual(NewsPost.objects.get(pk=backdated.pk).published_at, backdated.published_at)
+
+    def test_api_read_status_and_mark_all_read(self):
+        news.mark_read(self.user, self.posts[0])
+        news.mark_read(self.user, self.posts[2])
+        api = APIClient()
+        api.force_authenticate(self.user)
+
+        with CaptureQueriesContext(connection) as ctx:
+            rows = api.get(reverse("api-news-list")).data["results"]
+        self.assertEqual(
+            {row["id"]: row["read_status"] for row in rows},
+            {post.pk: post.pk in (self.posts[0].pk, self.posts[2].pk) for post in self.posts},
+        )
+        NewsPost.objects.create(title="Another", is_published=True)
+        with self.assertNumQueries(len(ctx.captured_queries)):
+            api.get(reverse("api-news-list"))
+
+        self.assertEqual(api.post(reverse("api-news-mark-all-read")).status_code, 200)
+        self.assertEqual(self._reads(), [])
+        self.assertEqual(news.unread_count(User.objects.get(pk=self.user.pk)), 0)
+        self.assertFalse(news.unread_queryset(User.objects.get(pk=self.user.pk)).exists())
+
+        self.client.force_login(self.user)
+        page = self.client.get(reverse("accounts:news"))
+        self.assertEqual(page.context["read_ids"], set(NewsPost.objects.values_list("pk", flat=True)))
+        self.assertRedirects(self.client.post(reverse("accounts:news_mark_all_read")), reverse("accounts:news"))
+
+
+class AccountImportTests(TestCase):
+    def setUp(self):
+        self.singer = Profession.objects.create(name="Singer")
+        self.drummer = Profession.objects.create(name="Drummer")
+        self.french = Language.objects.create(name="French")
+        self.usd = Currency.objects.create(name="USD", sign="$")
+        self.existing = User.objects.create_user(email="taken@example.com", first_name="T", last_name="K")
+
+    def test_public_ids_are_assigned_before_insert_in_one_check_per_round(self):
+        self.assertRegex(self.existing.public_id, r"^\d{8}$")
+        self.existing.refresh_from_db()
+        self.assertRegex(self.existing.public_id, r"^\d{8}$")
+
+        accounts = [User(email=f"u{i}@example.com", first_name="U", last_name=str(i)) for i in range(3)]
+        collide = lambda account, attempt=0: f"{attempt:08d}"  # every account wants the same ids
+        User.objects.filter(pk=self.existing.pk).update(public_id="00000001")
+        with mock.patch.object(User, "_generate_public_id", collide), self.assertNumQueries(4):
+            User.assign_public_ids(accounts)
+        self.assertEqual([account.public_id for account in accounts], ["00000000", "00000002", "00000003"])
+
+    def test_command_streams_csv_in_batches(self):
+        path = self._write(
+            "import.csv",
+            "email,first_name,last_name,professions,languages,currency,cost_per_hour,city\n"
+            "Ada@Example.com,Ada,Lovelace,Singer;drummer,French,USD,120,Douala\n"
+            "bob@example.com,Bob,Marley,Singer,,,,\n"
+            "taken@example.com,Taken,Again,,,,,\n"
+            "carl@example.com,Carl,Sagan,Astronomer,,,,\n"
+            "not-an-email,X,Y,,,,,\n"
+            "bob@example.com,Bob,Again,,,,,\n",
+        )
+        out, err = StringIO(), StringIO()
+        call_command("import_accounts", path, "--batch-size", "1", stdout=out, stderr=err)
+
+        self.assertIn("Created 2 of 6 rows", out.getvalue())
+        self.assertIn("rows/s", out.getvalue())
+        self.assertIn("line 5 (carl@example.com): unknown profession: Astronomer", err.getvalue())
+        self.assertIn("duplicate email in this file", err.getvalue())
+
+        ada = User.objects.get(email="Ada@example.com")
+        self.assertEqual(ada.account_type, User.AccountType.PROFESSIONAL)
+        self.assertFalse(ada.has_usable_password())
+        self.assertEqual(set(ada.professions.all()), {self.singer, self.drummer})
+        self.assertEqual(list(ada.communication_languages.all()), [self.french])
+        self.assertEqual(ada.cost_per_hour_base, Decimal("120.00"))
+        public_ids = list(User.objects.values_list("public_id", flat=True))
+        self.assertTrue(all(public_ids) and len(set(public_ids)) == len(public_ids))
+        self.assertEqual(search_ids("douala sing"), [ada.pk])
+        self.assertEqual(User.objects.get(email="taken@example.com").first_name, "T")
+
+    def test_staff_api_imports_jsonl(self):
+        body = "\n".join([
+            '{"email": "dee@example.com", "first_name": "Dee", "last_name": "Dee", "professions": ["Singer"]}',
+            '{"email": "eve@example.com", "first_name": "Eve", "last_name": "Eve", "gender": "robot"}',
+            "not json",
+            "",
+        ])
+        api = APIClient()
+        api.force_authenticate(self.existing)
+        url = reverse("api-admin-users-import")
+        upload = lambda: SimpleUploadedFile("roster.jsonl", body.encode(), content_type="application/x-ndjson")
+        self.assertEqual(api.post(url, {"file": upload()}).status_code, 403)
+
+        self.existing.is_staff = True
+        self.existing.save()
+        report = api.post(url, {"file": upload(), "dry_run": "true"}).data
+        self.assertEqual((report["rows"], report["created"], report["error_count"]), (3, 1, 2))
+        self.assertFalse(User.objects.filter(email="dee@example.com").exists())
+
+        report = api.post(url, {"file": upload()}).data
+        self.assertEqual(report["created"], 1)
+        self.assertEqual([error["line"] for error in report["errors"]], [2, 3])
+        self.assertEqual(list(User.objects.get(email="dee@example.com").professions.all()), [self.singer])
+        self.assertEqual(api.post(url, {"file": upload()}).data["skipped"], 1)
+
+    def test_values_beyond_the_model_fields_are_row_errors(self):
+        rows = [
+            (1, {"email": "big@example.com", "first_name": "B", "last_name": "G", "cost_per_hour": "123456789012.5"}, None),
+            (2, {"email": "huge@example.com", "first_name": "H", "last_name": "G", "cost_per_5_hours": "1e40"}, None),
+            (3, {"email": "old@example.com", "first_name": "O", "last_name": "D", "years_of_experience": "99999999"}, None),
+            (4, {"email": "long@example.com", "first_name": "L", "last_name": "G", "phone": "5" * 31}, None),
+            (5, {"email": "name@example.com", "first_name": "N" * 81, "last_name": "G"}, None),
+            (6, {"email": "ok@example.com", "first_name": "O", "last_name": "K", "currency": "USD", "cost_per_hour": "99.5"}, None),
+        ]
+        report = import_accounts(rows)
+
+        self.assertEqual((report["created"], report["error_count"]), (1, 5))
+        self.assertEqual([error["line"] for error in report["errors"]], [1, 2, 3, 4, 5])
+        self.assertTrue(report["errors"][0]["error"].startswith("cost_per_hour:"))
+        self.assertTrue(report["errors"][2]["error"].startswith("years_of_experience"))
+        self.assertTrue(report["errors"][3]["error"].startswith("phone:"))
+        self.assertTrue(report["errors"][4]["error"].startswith("first_name:"))
+        self.assertFalse(User.objects.filter(email="name@example.com").exists())
+        self.assertEqual(User.objects.get(email="ok@example.com").cost_per_hour_base, Decimal("99.50"))
+
+    def test_email_taken_during_the_batch_is_skipped_not_fatal(self):
+        real_write = importer._write_batch
+        calls = []
+
+        def racing_write(batch):
+            calls.append(len(batch))
+            if len(calls) == 1:  # another writer signs up with one of the emails first
+                User.objects.create_user(email="race@example.com", first_name="R", last_name="C")
+            return real_write(batch)
+
+        rows = [
+            (1, {"email": "race@example.com", "first_name": "R", "last_name": "A"}, None),
+            (2, {"email": "calm@example.com", "first_name": "C", "last_name": "A"}, None),
+        ]
+        with mock.patch.object(importer, "_write_batch", racing_write):
+            report = import_accounts(rows)
+
+        self.assertEqual(calls, [2, 1])
+        self.assertEqual((report["created"], report["skipped"], report["error_count"]), (1, 1, 0))
+        self.assertEqual(User.objects.get(email="race@example.com").last_name, "C")
+        self.assertTrue(User.objects.filter(email="calm@example.com").exists())
+
+    def _write(self, name, text):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, name)
+        with open(path, "w", encoding="utf-8") as stream:
+            stream.write(text)
+        return path
+
+
+class TempMediaTestCase(TestCase):
+    """Uploads go to a temporary MEDIA_ROOT, never the checked-in media/."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(images._default_records.clear)
+        self.user = User.objects.create_user(email="pics@example.com", first_name="P", last_name="X")
+
+    def _upload(self, name="photo.jpg", size=(1500, 1000), exif=None):
+        # noise, so the JPEG is camera-sized rather than a flat colour
+        buffer = BytesIO()
+        Image.effect_noise(size, 64).convert("RGB").save(buffer, format="JPEG", quality=92, exif=exif or b"")
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+class ImageDerivativeTests(TempMediaTestCase):
+    def _photo(self, **upload):
+        photo = AccountPhoto.objects.create(user=self.user, image=self._upload(**upload))
+        media_jobs.run_once()
+        photo.refresh_from_db()
+        return photo
+
+    def test_upload_gets_smaller_copies_at_each_width(self):
+        photo = self._photo()
+
+        variants = photo.image_variants
+        self.assertEqual(variants["name"], photo.image.name)
+        self.assertEqual((variants["width"], variants["height"]), (1500, 1000))
+        self.assertEqual(variants["widths"], [160, 320, 640, 1280])
+        self.assertEqual(variants["formats"], images.available_formats())
+        storage = photo.image.storage
+        for fmt in variants["formats"]:
+            card = images.derivative_name(photo.image.name, 320, fmt)
+            with storage.open(card) as stream:
+                self.assertEqual(Image.open(stream).size, (320, 213))
+            self.assertLess(storage.size(card) * 10, storage.size(photo.image.name))
+
+    def test_small_original_is_only_re_encoded(self):
+        photo = self._photo(size=(200, 100))
+        self.assertEqual(photo.image_variants["widths"], [160, 200])
+
+    def test_serializer_exposes_size_keyed_urls_and_replacement_invalidates(self):
+        photo = self._photo()
+        data = AccountPhotoSerializer(photo).data
+        self.assertEqual(data["image_url"], photo.image.url)
+        urls = data["image_urls"]
+        self.assertEqual(urls["original"], photo.image.url)
+        self.assertEqual(list(urls["sizes"]), ["160", "320", "640", "1280"])
+        self.assertTrue(urls["sizes"]["320"]["webp"].endswith(".320w.webp"))
+
+        # a record for another file is ignored until the new one is processed
+        AccountPhoto.objects.filter(pk=photo.pk).update(image="normal_pictures/other.jpg")
+        photo.refresh_from_db()
+        self.assertEqual(images.url_map(photo.image, photo.image_variants)["sizes"], {})
+        self.assertEqual(images.srcset(photo.image, photo.image_variants, "webp"), "")
+
+    def test_picture_tag_emits_srcset_per_format(self):
+        photo = self._photo()
+        html = Template(
+            '{% load account_extras %}{% picture photo "image" sizes="25vw" alt="Gig" class="thumb" %}'
+        ).render(Context({"photo": photo}))
+
+        self.assertIn('<source type="image/webp" srcset="', html)
+        self.assertIn(".160w.webp 160w, ", html)
+        self.assertIn('sizes="25vw"', html)
+        self.assertIn(f'<img src="{photo.image.url}" alt="Gig" loading="lazy" decoding="async" class="thumb">', html)
+
+    def test_default_pictures_are_left_to_the_command(self):
+        # saving an account must not write copies of the shared default avatar
+        self.assertEqual(self.user.profile_picture.name, "avatars/default.png")
+        self.assertEqual(self.user.profile_picture_variants, {})
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, "avatars")))
+
+        os.makedirs(os.path.join(self.media_root, "avatars"))
+        Image.new("RGB", (400, 400), "purple").save(os.path.join(self.media_root, "avatars", "default.png"))
+        out = StringIO()
+        with self.assertLogs("accounts.images", "WARNING"):  # no default_professional.png here
+            call_command("generate_image_derivatives", stdout=out)
+        self.assertIn("Updated 1 row(s)", out.getvalue())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_picture_variants["widths"], [160, 320, 400])
+
+        # later accounts reuse the copies without writing anything
+        other = User.objects.create_user(email="later@example.com", first_name="L", last_name="A")
+        other.refresh_from_db()
+        self.assertEqual(other.profile_picture_variants, self.user.profile_picture_variants)
+
+
+class MediaJobQueueTests(TempMediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def _post(self, media_type, *files):
+        response = self.api.post(reverse("api-media-upload", args=[media_type]), {"files": list(files)})
+        self.assertEqual(response.status_code, 201)
+        return response.data["items"]
+
+    def test_upload_returns_processing_and_the_worker_makes_it_ready(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # orientation: rotate 90° clockwise
+        exif[0x010F] = "PhoneCorp"  # make
+        [item] = self._post("normal_photos", self._upload(size=(300, 200), exif=exif))
+
+        self.assertEqual(item["status"], MediaStatus.PROCESSING)
+        photo = AccountPhoto.objects.get(pk=item["id"])
+        self.assertEqual(photo.image_variants, {})
+        self.assertEqual(MediaJob.objects.get().target, "accounts.AccountPhoto")
+        self.assertEqual(self.api.get(item["status_url"]).data["status"], MediaStatus.PROCESSING)
+        # not public yet: the EXIF (GPS etc.) is still in the file
+        public_count = lambda: annotate_media_counts(User.objects.filter(pk=self.user.pk)).get().normal_photos_count
+        self.assertEqual(public_count(), 0)
+
+        self.assertEqual(media_jobs.run_once(), 1)
+        photo.refresh_from_db()
+        self.assertEqual(photo.status, MediaStatus.READY)
+        self.assertFalse(MediaJob.objects.exists())
+        with photo.image.open("rb") as stream:
+            content = stream.read()
+        stored = Image.open(BytesIO(content))
+        self.assertEqual(stored.size, (200, 300))  # rotated, then the tag dropped
+        self.assertEqual(dict(stored.getexif()), {})
+        self.assertEqual(photo.checksum, hashlib.sha256(content).hexdigest())
+        self.assertEqual(photo.image_variants["widths"], [160, 200])
+        self.assertEqual(public_count(), 1)
+
+        status = self.api.get(item["status_url"]).data
+        self.assertEqual((status["status"], status["checksum"], status["error"]), ("ready", photo.checksum, None))
+
+    def test_original_is_kept_until_the_stripped_copy_is_swapped_in(self):
+        exif = Image.Exif()
+        exif[0x010F] = "PhoneCorp"  # make
+        [item] = self._post("normal_photos", self._upload(size=(300, 200), exif=exif))
+        photo = AccountPhoto.objects.get(pk=item["id"])
+        original, storage = photo.image.name, photo.image.storage
+
+        # the worker dies after writing the stripped copy, before finish()
+        with mock.patch.object(media_jobs, "finish", side_effect=RuntimeError("worker killed")):
+            with self.assertRaises(RuntimeError):
+                media_jobs.run_once()
+        photo.refresh_from_db()
+        self.assertEqual((photo.image.name, photo.status), (original, MediaStatus.PROCESSING))
+        with storage.open(original, "rb") as stream:
+            self.assertEqual(Image.open(stream).getexif()[0x010F], "PhoneCorp")
+
+        MediaJob.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(media_jobs.run_once(), 1)
+        photo.refresh_from_db()
+        self.assertEqual(photo.status, MediaStatus.READY)
+        self.assertNotEqual(photo.image.name, original)
+        self.assertFalse(storage.exists(original))
+        with photo.image.open("rb") as stream:
+            self.assertEqual(dict(Image.open(stream).getexif()), {})
+
+    def test_rejected_image_fails_without_retry(self):
+        [item] = self._post("professional_photos", self._upload(size=(40, 40)))
+        media_jobs.run_once()
+
+        status = self.api.get(item["status_url"]).data
+        self.assertEqual(status["status"], MediaStatus.FAILED)
+        self.assertIn("at least 64px", status["error"])
+        self.assertEqual(MediaJob.objects.get().status, MediaJob.Status.FAILED)
+        self.assertEqual(media_jobs.run_once(), 0)
+
+    def test_errors_are_retried_with_backoff_and_leases_expire(self):
+        [item] = self._post("audio", SimpleUploadedFile("take.mp3", b"ID3" + b"\0" * 4096))
+        with mock.patch.object(media_jobs, "process_file", side_effect=OSError("storage down")):
+            media_jobs.run_once()
+        job = MediaJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (MediaJob.Status.PENDING, 1))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(media_jobs.claim(5), [])  # not due yet
+
+        # a worker that claimed the job and died: the lease runs out
+        MediaJob.objects.update(
+            status=MediaJob.Status.RUNNING, locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(media_jobs.run_once(), 1)
+        cover = AudioAcapellaCover.objects.get(pk=item["id"])
+        self.assertEqual(cover.status, MediaStatus.READY)
+        self.assertEqual(cover.checksum, hashlib.sha256(b"ID3" + b"\0" * 4096).hexdigest())
+
+    def test_worker_command_uses_a_process_pool(self):
+        self._post("normal_photos", self._upload(name="a.jpg"), self._upload(name="b.jpg"))
+        AccountPhoto.objects.filter(pk=AccountPhoto.objects.first().pk).delete()  # deleted while queued
+
+        out = StringIO()
+        call_command("run_media_worker", "--once", "--processes", "2", stdout=out)
+        self.assertIn("Processed 1 job(s)", out.getvalue())
+        self.assertEqual(list(AccountPhoto.objects.values_list("status", flat=True)), [MediaStatus.READY])
+        self.assertEqual(AccountPhoto.objects.get().image_variants["widths"], [160, 320, 640, 1280])
+        self.assertFalse(MediaJob.objects.exists())
+
+
+class ChunkedUploadTests(TempMediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.video = os.urandom(300_000)
+
+    def _start(self, **data):
+        data = {"kind": "video", "filename": "take 1.mp4", "size": len(self.video), "title": "Live", **data}
+        response = self.api.post(reverse("api-upload-session-start"), data)
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+    def _put(self, session, offset, body):
+        return self.api.put(
+            session["upload_url"], body, content_type="application/offset+octet-stream",
+            headers={"Upload-Offset": str(offset)},
+        )
+
+    def test_resumed_upload_becomes_a_ready_cover_without_a_copy(self):
+        session = self._start()
+        self.assertEqual(self._put(session, 0, self.video[:100_000]).data["offset"], 100_000)
+
+        # the connection dropped mid-chunk: a retry at a stale offset is refused...
+        response = self._put(session, 0, self.video[:100_000])
+        self.assertEqual((response.status_code, response.data["offset"]), (409, 100_000))
+        self.assertEqual(response["Upload-Offset"], "100000")
+        # ...and the client resumes from the offset the server reports
+        self.assertEqual(self.api.get(session["upload_url"]).data["offset"], 100_000)
+        chunked_uploads._hashes.clear()  # next chunk served by another process: catches up from disk
+        self.assertEqual(self._put(session, 100_000, self.video[100_000:250_000]).status_code, 200)
+
+        response = self.api.post(session["finalize_url"], {})
+        self.assertEqual((response.status_code, response.data["offset"]), (409, 250_000))
+        self._put(session, 250_000, self.video[250_000:])
+
+        part = chunked_uploads.part_path(UploadSession.objects.get())
+        inode = os.stat(part).st_ino
+        checksum = hashlib.sha256(self.video).hexdigest()
+        response = self.api.post(session["finalize_url"], {"checksum": checksum.upper()})
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((response.data["status"], response.data["title"]), ("ready", "Live"))
+
+        cover = VideoAcapellaCover.objects.get()
+        self.assertEqual((cover.user, cover.checksum), (self.user, checksum))
+        self.assertTrue(cover.video_file.name.startswith("acapella/video/take"))
+        self.assertEqual(os.stat(cover.video_file.path).st_ino, inode)  # linked, not copied
+        with cover.video_file.open("rb") as stream:
+            self.assertEqual(stream.read(), self.video)
+        self.assertFalse(os.path.exists(part))
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(MediaJob.objects.exists())  # nothing left for the worker
+        self.assertEqual(self.api.get(session["upload_url"]).status_code, 404)
+
+    def test_overlapping_puts_at_the_same_offset_are_serialized(self):
+        session = UploadSession.objects.get(pk=self._start()["id"])
+        first, second = self.video[:120_000], os.urandom(50_000)
+
+        class SlowBody(BytesIO):
+            """The first request's body: the second PUT lands while it is still being read."""
+            def read(body, size=-1):
+                if body.tell() == 0:
+                    stale = UploadSession.objects.get(pk=session.pk)
+                    self.assertEqual(chunked_uploads.append(stale, 0, BytesIO(second)), 50_000)
+                return super().read(size)
+
+        with self.assertRaises(chunked_uploads.UploadConflict) as conflict:
+            chunked_uploads.append(session, 0, SlowBody(first))
+        self.assertEqual(conflict.exception.offset, 50_000)
+
+        part = chunked_uploads.part_path(session)
+        with open(part, "rb") as stream:
+            self.assertEqual(stream.read(), second)  # not cut short by the losing request
+        self.assertEqual(sorted(os.listdir(chunked_uploads.part_dir())), [os.path.basename(part)])
+
+        rest = self.video[50_000:]
+        self.assertEqual(chunked_uploads.append(session, 50_000, BytesIO(rest)), len(self.video))
+        cover = chunked_uploads.finalize(session)
+        with cover.video_file.open("rb") as stream:
+            content = stream.read()
+        self.assertEqual(content, second + rest)
+        self.assertEqual(cover.checksum, hashlib.sha256(content).hexdigest())
+
+    def test_rejected_requests(self):
+        url = reverse("api-upload-session-start")
+        self.assertEqual(self.api.post(url, {"kind": "photo", "filename": "a", "size": 1}).status_code, 400)
+        self.assertEqual(self.api.post(url, {"kind": "audio", "filename": "a", "size": "big"}).status_code, 400)
+
+        session = self._start(kind="audio", filename="../../etc/passwd")
+        self.assertEqual(UploadSession.objects.get().filename, "passwd")
+        self.assertEqual(self._put(session, 0, self.video + b"x").status_code, 400)  # over the declared size
+        no_offset = self.api.put(session["upload_url"], b"x", content_type="application/offset+octet-stream")
+        self.assertEqual(no_offset.status_code, 400)
+
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(email="other@example.com", first_name="O", last_name="T"))
+        self.assertEqual(other.get(session["upload_url"]).status_code, 404)
+
+        self._put(session, 0, self.video)
+        response = self.api.post(session["finalize_url"], {"checksum": "0" * 64})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(AudioAcapellaCover.objects.exists())
+
+    def test_abandoned_sessions_are_cleaned_up(self):
+        stale, fresh = self._start(), self._start()
+        self._put(stale, 0, self.video[:1000])
+        UploadSession.objects.filter(pk=stale["id"]).update(updated_at=timezone.now() - timedelta(days=2))
+        orphan = os.path.join(chunked_uploads.part_dir(), "gone.part")
+        open(orphan, "wb").close()
+        os.utime(orphan, (0, 0))
+
+        out = StringIO()
+        call_command("clean_upload_sessions", stdout=out)
+        self.assertIn("Removed 1 abandoned upload session(s) and 1 orphaned part file(s)", out.getvalue())
+        self.assertEqual([str(pk) for pk in UploadSession.objects.values_list("pk", flat=True)], [str(fresh["id"])])
+        self.assertEqual(os.listdir(chunked_uploads.part_dir()), [f"{fresh['id']}.part"])
+
+
+class MediaServingTests(TempMediaTestCase):
+    SIZE = 512 * 1024 * 1024
+
+    def setUp(self):
+        super().setUp()
+        # sparse: half a gigabyte on paper, a few bytes on disk
+        path = os.path.join(self.media_root, "acapella", "video", "big.mp4")
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as stream:
+            stream.truncate(self.SIZE)
+            stream.seek(400_000_000)
+            stream.write(b"keyframe")
+        self.cover = VideoAcapellaCover.objects.create(
+            user=self.user, video_file="acapella/video/big.mp4", status=MediaStatus.READY, checksum="ab" * 32
+        )
+        self.url = reverse("media", args=["acapella/video/big.mp4"])
+
+    def test_seeking_reads_only_the_requested_range(self):
+        # called directly: the test client re-wraps the stream and hides the file
+        request = RequestFactory().get(self.url, headers={"Range": "bytes=400000000-400000007"})
+        request.user = AnonymousUser()
+        response = serve_media(request, "acapella/video/big.mp4")
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 400000000-400000007/{self.SIZE}")
+        self.assertEqual((response["Content-Length"], response["Content-Type"]), ("8", "video/mp4"))
+        self.assertEqual(response["ETag"], f'"{"ab" * 32}"')
+        # what a sendfile()-ing WSGI server uses: the descriptor's position and Content-Length
+        fileno = response.file_to_stream.fileno()
+        self.assertEqual(os.lseek(fileno, 0, os.SEEK_CUR), 400_000_000)
+        self.assertEqual(b"".join(response.streaming_content), b"keyframe")
+        self.assertEqual(os.lseek(fileno, 0, os.SEEK_CUR), 400_000_008)  # nothing past the range was read
+        response.close()
+
+        response = self.client.get(self.url, headers={"Range": "bytes=-4"})
+        self.assertEqual(response["Content-Range"], f"bytes {self.SIZE - 4}-{self.SIZE - 1}/{self.SIZE}")
+        self.assertEqual(b"".join(response.streaming_content), b"\0" * 4)
+        response.close()
+
+        response = self.client.get(self.url, headers={"Range": f"bytes={self.SIZE}-"})
+        self.assertEqual((response.status_code, response["Content-Range"]), (416, f"bytes */{self.SIZE}"))
+
+    def test_conditional_requests(self):
+        etag = f'"{"ab" * 32}"'
+        self.assertEqual(self.client.get(self.url, headers={"If-None-Match": etag}).status_code, 304)
+        response = self.client.head(self.url)
+        since = {"If-Modified-Since": response["Last-Modified"]}
+        self.assertEqual(self.client.get(self.url, headers=since).status_code, 304)
+        self.assertEqual((response["Accept-Ranges"], response["Content-Length"]), ("bytes", str(self.SIZE)))
+
+        # the file changed since the client's copy: the whole file, not a range of the new one
+        response = self.client.get(self.url, headers={"Range": "bytes=0-99", "If-Range": '"stale"'})
+        self.assertEqual((response.status_code, response["Content-Length"]), (200, str(self.SIZE)))
+        response.close()
+        response = self.client.get(self.url, headers={"Range": "bytes=0-99", "If-Range": etag})
+        self.assertEqual(response.status_code, 206)
+        response.close()
+
+    def test_unpublished_media_is_only_served_to_its_owner(self):
+        VideoAcapellaCover.objects.filter(pk=self.cover.pk).update(status=MediaStatus.PROCESSING)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, headers={"Range": "bytes=0-0"})
+        self.assertEqual(response.status_code, 206)
+        self.assertIn("private", response["Cache-Control"])
+        response.close()
+
+        for path in (".chunked/x.part", "../db.sqlite3", "acapella/video/missing.mp4"):
+            self.assertEqual(self.client.get("/media/" + path).status_code, 404, path)
+
+    def test_resized_copies_are_matched_to_their_photo_by_exact_name(self):
+        os.makedirs(os.path.join(self.media_root, "normal_pictures"))
+        for name in ("pic.JPG", "pic.320w.webp", "odd.Jpg", "odd.320w.webp"):
+            with open(os.path.join(self.media_root, "normal_pictures", name), "wb") as stream:
+                stream.write(b"x")
+        photo = AccountPhoto.objects.create(user=self.user, image="normal_pictures/pic.JPG")
+        AccountPhoto.objects.create(user=self.user, image="normal_pictures/odd.Jpg")
+        self.assertEqual(AccountPhoto.objects.get(pk=photo.pk).status, MediaStatus.PROCESSING)
+
+        with CaptureQueriesContext(connection) as queries:
+            row = media_row("normal_pictures/pic.320w.webp")
+        self.assertEqual((row["user_id"], row["original"]), (self.user.pk, False))
+        self.assertFalse([q for q in queries if "LIKE" in q["sql"]])
+        self.assertEqual(media_row("normal_pictures/odd.320w.webp")["original"], False)  # prefix fallback
+
+        url = reverse("media", args=["normal_pictures/pic.320w.webp"])
+        self.assertEqual(self.client.get(url).status_code, 404)  # still processing
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse("media", args=["normal_pictures/gone.320w.webp"])).status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE="x-accel-redirect")
+    def test_offloads_to_the_front_proxy(self):
+        response = self.client.get(self.url, headers={"Range": "bytes=0-99"})
+
+        self.assertEqual(response.status_code, 200)  # nginx answers the range itself
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/acapella/video/big.mp4")
+        self.assertEqual(response.content, b"")
@@ -91,6 +91,7 @@ urlpatterns = [
     path("dashboard/media/<str:kind>/edit/", dv.dash_media_section_edit_view, name="dash_media_section_edit"),
 
     path("news/", dv.news_list_view, name="news"),
+    path("news/mark-all-read/", dv.news_mark_all_read_view, name="news_mark_all_read"),
     path("news/<slug:slug>/", dv.news_detail_view, name="news_detail"),
     path("dashboard/crud/news/", dv.dash_crud_news_list, name="dash_crud_news_list"),
     path("dashboard/crud/news/create/", dv.dash_crud_news_create, name="dash_crud_news_create"),
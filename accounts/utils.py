@@ -1,16 +1,26 @@
-from decimal import Decimal
-from .models import ExchangeRate
+from showdan.tree import tree_options
 
-def get_rate(from_currency, to_currency):
-    if from_currency == to_currency:
-        return Decimal("1")
+from . import rates
+from .models import Profession
+
+
+def profession_tree_options():
+    """
+    Returns list of tuples: (id, label_with_indent) in parent->children order,
+    siblings sorted by name.
+    """
+    return tree_options(Profession.objects.only("id", "name", "parent_id", "path"))
 
-    direct = ExchangeRate.objects.filter(from_currency=from_currency, to_currency=to_currency).first()
-    if direct:
-        return direct.rate
 
-    inverse = ExchangeRate.objects.filter(from_currency=to_currency, to_currency=from_currency).first()
-    if inverse and inverse.rate:
-        return Decimal("1") / inverse.rate
+def get_rate(from_currency, to_currency):
+    """
+    Units of ``to_currency`` per unit of ``from_currency`` (Currency objects
+    or ids): direct, inverse or triangulated through the base currency, from
+    the in-process matrix (``accounts.rates``). None if no rate is available.
+    """
+    return rates.get_rate(from_currency, to_currency)
+
 
-    return None  # no rate available
+def convert_many(items, to_currency, quantum=None):
+    """Batch form of ``amount * get_rate(...)`` for ``(amount, from_currency)`` pairs."""
+    return rates.convert_many(items, to_currency, quantum)
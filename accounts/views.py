@@ -6,10 +6,8 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.db.models import Avg, Count
 from django.contrib.auth import get_user_model
-import calendar
 from django.utils.translation import gettext_lazy as _
 from django.utils.text import format_lazy
-from datetime import date, datetime, timedelta
 from django.utils import timezone
 from .forms import (
     AccountsRegistrationForm,
@@ -23,8 +21,8 @@ from .forms import (
 )
 
 User = get_user_model()
-from events.models import Event, BusyTime
-from .models import Profession, AccountPhoto, ProfessionalPhoto, AudioAcapellaCover, VideoAcapellaCover, Review, FavoriteProfessional
+from events.calendar_projection import BOOKED, BUSY, avatar_url, get_month, month_grid
+from .models import Profession, AccountPhoto, ProfessionalPhoto, AudioAcapellaCover, VideoAcapellaCover, Review, FavoriteProfessional, MediaStatus
 
 @login_required
 def dashboard_view(request):
@@ -35,19 +33,6 @@ def dashboard_view(request):
         "is_pro": getattr(u, "account_type", None) == "professional",
     }
     return render(request, "accounts/dashboard.html", ctx)
-def month_start_end(year: int, month: int):
-    first = date(year, month, 1)
-    _, last_day = calendar.monthrange(year, month)
-    last = date(year, month, last_day)
-    return first, last
-
-
-def daterange(d1: date, d2: date):
-    cur = d1
-    while cur <= d2:
-        yield cur
-        cur += timedelta(days=1)
-
 def public_profile_detail_view(request, pk):
     prof = get_object_or_404(User, pk=pk, account_type="professional", is_active=True)
 
@@ -64,15 +49,14 @@ def public_profile_detail_view(request, pk):
     if tab not in valid_tabs:
         tab = "overview"
 
-    normal_photos = AccountPhoto.objects.filter(user=prof).order_by("-id")
-    professional_photos = ProfessionalPhoto.objects.filter(user=prof).order_by("-id")
-    audio_covers = AudioAcapellaCover.objects.filter(user=prof).order_by("-id")
-    video_covers = VideoAcapellaCover.objects.filter(user=prof).order_by("-id")
+    normal_photos = AccountPhoto.objects.filter(user=prof, status=MediaStatus.READY).order_by("-id")
+    professional_photos = ProfessionalPhoto.objects.filter(user=prof, status=MediaStatus.READY).order_by("-id")
+    audio_covers = AudioAcapellaCover.objects.filter(user=prof, status=MediaStatus.READY).order_by("-id")
+    video_covers = VideoAcapellaCover.objects.filter(user=prof, status=MediaStatus.READY).order_by("-id")
 
     reviews = Review.objects.filter(professional=prof).select_related("reviewer")
-    stats = reviews.aggregate(avg=Avg("rating"), cnt=Count("id"))
-    avg_rating = stats["avg"] or 0
-    review_count = stats["cnt"] or 0
+    avg_rating = prof.avg_rating
+    review_count = prof.rating_count
 
     review_form = None
     can_review = False
@@ -91,8 +75,6 @@ def public_profile_detail_view(request, pk):
         .exclude(pk=prof.pk)
         .prefetch_related("professions")
         .select_related("currency")
-        .annotate(avg_rating=Avg("reviews_received__rating"))
-        .annotate(review_count=Count("reviews_received"))
     )
 
     prof_profession_ids = list(prof.professions.values_list("id", flat=True))
@@ -117,104 +99,34 @@ def public_profile_detail_view(request, pk):
         year = int(request.GET.get("year", today.year))
         month = int(request.GET.get("month", today.month))
 
-        first_day, last_day = month_start_end(year, month)
-
-        cal = calendar.Calendar(firstweekday=0)  # Monday
-        weeks = cal.monthdatescalendar(year, month)
-
-        events_qs = (
-            Event.objects
-            .select_related("accepted_thread", "accepted_thread__professional", "created_by")
-            .filter(is_locked=True, accepted_thread__professional=prof)
-        )
-
-        avatar_url = ""
-        if getattr(prof, "profile_picture", None):
-            try:
-                avatar_url = prof.profile_picture.url
-            except Exception:
-                avatar_url = ""
-
-        booked_map = {}
-
-        for e in events_qs:
-            if not e.start_datetime or not e.end_datetime:
-                continue
-
-            start_local = timezone.localtime(e.start_datetime)
-            end_local = timezone.localtime(e.end_datetime)
-            d1 = start_local.date()
-            d2 = end_local.date()
-
-            accepted_name = ""
-            accepted_avatar = ""
-            if e.is_locked and getattr(e, "accepted_thread", None) and getattr(e.accepted_thread, "professional", None):
-                ap = e.accepted_thread.professional
-                accepted_name = f"{ap.first_name} {ap.last_name}"
-                if getattr(ap, "profile_picture", None):
-                    try:
-                        accepted_avatar = ap.profile_picture.url
-                    except Exception:
-                        accepted_avatar = ""
-
-            for d in daterange(d1, d2):
-                booked_map.setdefault(d, {"avatar_url": avatar_url, "ranges": []})
-
-                is_start = (d == d1)
-                is_end = (d == d2)
-
-                label = ""
-                if is_start and is_end:
-                    label = f"{start_local.strftime('%H:%M')}–{end_local.strftime('%H:%M')}"
-                elif is_start:
-                    label = f"{start_local.strftime('%H:%M')} →"
-                elif is_end:
-                    label = f"→ {end_local.strftime('%H:%M')}"
-
-                booked_map[d]["ranges"].append({
-                    "event_id": e.id,
-                    "name": e.name,
-                    "is_start": is_start,
-                    "is_end": is_end,
-                    "label": label,
-                    "is_locked": bool(e.is_locked),
-                    "accepted_name": accepted_name,
-                    "accepted_avatar": accepted_avatar,
-                })
-
-        busy_qs = BusyTime.objects.filter(
-            user=prof,
-            start_datetime__date__lte=last_day,
-            end_datetime__date__gte=first_day
-        )
-
-        busy_map = {}
-        for b in busy_qs:
-            s = timezone.localtime(b.start_datetime)
-            e = timezone.localtime(b.end_datetime)
-            for d in daterange(s.date(), e.date()):
-                busy_map.setdefault(d, []).append({
-                    "is_all_day": b.is_all_day,
-                    "start": s.strftime("%H:%M"),
-                    "end": e.strftime("%H:%M"),
-                })
+        projection = get_month(prof.pk, year, month, parts=(BOOKED, BUSY))
+
+        # bookings are the professional's own: they are the accepted professional
+        prof_avatar = avatar_url(prof)
+        accepted_name = f"{prof.first_name} {prof.last_name}"
+        booked_map = {
+            d: {
+                "avatar_url": prof_avatar,
+                "ranges": [
+                    {**segment, "accepted_name": accepted_name, "accepted_avatar": prof_avatar}
+                    for segment in segments
+                ],
+            }
+            for d, segments in projection[BOOKED].items()
+        }
 
-        prev_month = (date(year, month, 1) - timedelta(days=1)).replace(day=1)
-        next_month = (date(year, month, 28) + timedelta(days=10)).replace(day=1)
+        # busy notes are private to the owner
+        busy_map = {
+            d: [{k: v for k, v in item.items() if k != "note"} for item in items]
+            for d, items in projection[BUSY].items()
+        }
 
         calendar_ctx = {
-            "weeks": weeks,
-            "year": year,
-            "month": month,
-            "month_name": date(year, month, 1).strftime("%B"),
-            "prev_year": prev_month.year,
-            "prev_month": prev_month.month,
-            "next_year": next_month.year,
-            "next_month": next_month.month,
+            **month_grid(year, month),
             "today": today,
             "booked_map": booked_map,
             "busy_map": busy_map,
-            "avatar_url": avatar_url,
+            "avatar_url": prof_avatar,
         }
 
     return render(
@@ -264,22 +176,22 @@ def profile_media_hub_view(request, pk):
     }
 
     if tab == "studio":
-        context["items"] = ProfessionalPhoto.objects.filter(user=prof).order_by("-id")
+        context["items"] = ProfessionalPhoto.objects.filter(user=prof, status=MediaStatus.READY).order_by("-id")
         context["kind"] = "photos"
         context["title"] = "Studio photos"
 
     elif tab == "work":
-        context["items"] = AccountPhoto.objects.filter(user=prof).order_by("-id")
+        context["items"] = AccountPhoto.objects.filter(user=prof, status=MediaStatus.READY).order_by("-id")
         context["kind"] = "photos"
         context["title"] = "Work photos"
 
     elif tab == "audio":
-        context["items"] = AudioAcapellaCover.objects.filter(user=prof).order_by("-id")
+        context["items"] = AudioAcapellaCover.objects.filter(user=prof, status=MediaStatus.READY).order_by("-id")
         context["kind"] = "audio"
         context["title"] = "Audio"
 
     elif tab == "video":
-        context["items"] = VideoAcapellaCover.objects.filter(user=prof).order_by("-id")
+        context["items"] = VideoAcapellaCover.objects.filter(user=prof, status=MediaStatus.READY).order_by("-id")
         context["kind"] = "video"
         context["title"] = "Video"
 
@@ -12,9 +12,11 @@ from django.utils.text import format_lazy
 from django.utils.translation import gettext_lazy as _
 User = get_user_model()
 
+from . import news
 from .crud_forms import *
 from .models import *
 from events.models import EventCategory
+from .utils import profession_tree_options
 from django.middleware.csrf import get_token
 
 def _dash_render(request, template_name, ctx=None):
@@ -56,40 +58,6 @@ def dash_home(request):
         },
     )
 
-def _build_profession_tree_options():
-    """
-    Returns list of tuples: (id, label_with_indent) in parent->children order.
-    Keeps descendants under their parent (no confusing global alpha ordering).
-    """
-    all_items = list(Profession.objects.select_related("parent").all())
-
-    children_map = {}
-    roots = []
-
-    for p in all_items:
-        pid = p.parent_id
-        if pid is None:
-            roots.append(p)
-        children_map.setdefault(pid, []).append(p)
-
-    # sort siblings by name (but keep tree structure)
-    for pid, items in children_map.items():
-        items.sort(key=lambda x: (x.name or "").lower())
-    roots.sort(key=lambda x: (x.name or "").lower())
-
-    out = []
-
-    def walk(node, depth):
-        indent = "\u00A0" * (depth * 4)  # NBSP indentation works in HTML
-        out.append((node.id, f"{indent}{node.name}"))
-        for ch in children_map.get(node.id, []):
-            walk(ch, depth + 1)
-
-    for r in roots:
-        walk(r, 0)
-
-    return out
-
 
 @login_required
 @require_http_methods(["GET", "POST"])
@@ -103,7 +71,7 @@ def dash_switch_profile(request):
 
     current = getattr(u, "account_type", "personal") or "personal"
 
-    profession_options = _build_profession_tree_options()
+    profession_options = profession_tree_options()
     selected_prof_ids = set(u.professions.values_list("id", flat=True))
 
     if request.method == "POST":
@@ -816,8 +784,16 @@ def dash_media_section_edit_view(request, kind):
 
 
 def news_list_view(request):
-    qs = NewsPost.objects.filter(is_published=True).order_by("-published_at", "-created_at")
-    return render(request, "accounts/news_list.html", {"items": qs})
+    qs = list(NewsPost.objects.filter(is_published=True).order_by("-published_at", "-created_at"))
+    read_ids = news.read_post_ids(request.user, qs) if request.user.is_authenticated else set()
+    return render(request, "accounts/news_list.html", {"items": qs, "read_ids": read_ids})
+
+
+@login_required
+@require_http_methods(["POST"])
+def news_mark_all_read_view(request):
+    news.mark_all_read(request.user)
+    return redirect("accounts:news")
 
 
 def news_detail_view(request, slug):
@@ -828,11 +804,7 @@ def news_detail_view(request, slug):
     item = get_object_or_404(NewsPost, slug=slug, is_published=True)
 
     if request.user.is_authenticated:
-        NewsRead.objects.update_or_create(
-            user=request.user,
-            post=item,
-            defaults={"read_at": timezone.now()},
-        )
+        news.mark_read(request.user, item)
 
     return render(request, "accounts/news_detail.html", {"item": item})
 @staff_required
@@ -1,9 +1,12 @@
 # events/api/serializers.py
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db.models import Count
 from django.utils import timezone
 from ..models import Event, EventCategory, OfferThread, OfferMessage, BusyTime
 from accounts.models import Profession, Currency
+from accounts.rates import base_currency_id, display_amount, requested_currency
+from showdan.tree import children_by_parent
 from accounts.api.serializers import (
     UserBasicSerializer, ProfessionSerializer, CurrencySerializer
 )
@@ -15,18 +18,23 @@ User = get_user_model()
 
 class EventCategorySerializer(serializers.ModelSerializer):
     """Serializer for EventCategory model"""
-    depth = serializers.SerializerMethodField()
+    depth = serializers.IntegerField(read_only=True)
     children_count = serializers.SerializerMethodField()
 
     class Meta:
         model = EventCategory
         fields = ('id', 'name', 'parent', 'path', 'depth', 'children_count')
 
-    def get_depth(self, obj):
-        return obj.get_depth()
-
     def get_children_count(self, obj):
-        return obj.children.count()
+        # one grouped query per response, shared through the root context
+        counts = self.context.get('_category_children_count')
+        if counts is None:
+            counts = dict(
+                EventCategory.objects.filter(parent__isnull=False)
+                .values('parent').annotate(n=Count('id')).values_list('parent', 'n')
+            )
+            self.context['_category_children_count'] = counts
+        return counts.get(obj.pk, 0)
 
 
 class EventCategoryTreeSerializer(serializers.ModelSerializer):
@@ -38,8 +46,16 @@ class EventCategoryTreeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'path', 'children')
 
     def get_children(self, obj):
-        children = obj.children.all().order_by('name')
-        return EventCategoryTreeSerializer(children, many=True).data
+        children = self._children_by_parent().get(obj.pk)
+        return EventCategoryTreeSerializer(children, many=True, context=self.context).data if children else []
+
+    def _children_by_parent(self):
+        # the whole tree in one query, shared by every nested serializer
+        children_map = self.context.get('_category_children')
+        if children_map is None:
+            children_map = children_by_parent(EventCategory.objects.filter(parent__isnull=False).order_by('name'))
+            self.context['_category_children'] = children_map
+        return children_map
 
 
 # ============ Event Serializers ============
@@ -57,6 +73,7 @@ class EventListSerializer(serializers.ModelSerializer):
     time_status = serializers.SerializerMethodField()
     is_upcoming = serializers.SerializerMethodField()
     is_creator = serializers.SerializerMethodField()
+    display_budget = serializers.SerializerMethodField()
 
     class Meta:
         model = Event
@@ -66,7 +83,7 @@ class EventListSerializer(serializers.ModelSerializer):
             'event_type', 'event_type_info',
             'required_professions', 'required_professions_info',
             'currency', 'currency_info',
-            'event_budget', 'advance_payment',
+            'event_budget', 'display_budget', 'advance_payment',
             'is_locked', 'is_posted',
             'created_by', 'created_by_info',
             'accepted_thread', 'accepted_professional', 'accepted_professional_info',
@@ -75,7 +92,8 @@ class EventListSerializer(serializers.ModelSerializer):
         )
 
     def get_offers_received_count(self, obj):
-        return obj.offer_threads.count()
+        count = getattr(obj, 'offers_received_count', None)  # annotated by the list views
+        return obj.offer_threads.count() if count is None else count
 
     def get_time_status(self, obj):
         now = timezone.now()
@@ -95,6 +113,11 @@ class EventListSerializer(serializers.ModelSerializer):
             return obj.created_by_id == request.user.id
         return False
 
+    def get_display_budget(self, obj):
+        """event_budget in the viewer's currency (see accounts.rates.requested_currency)"""
+        request = self.context.get('request')
+        return display_amount(obj.event_budget_base, requested_currency(request) if request else None)
+
 
 class EventDetailSerializer(EventListSerializer):
     """Serializer for detailed event view"""
@@ -173,19 +196,15 @@ class OfferThreadSerializer(serializers.ModelSerializer):
         )
 
     def get_message_count(self, obj):
-        return obj.messages.count()
+        return obj.message_count
 
     def get_last_message(self, obj):
-        last_message = obj.messages.last()
-        if last_message:
-            return last_message.message[:100]  # First 100 chars
+        if obj.last_message_id:
+            return obj.last_message_preview  # first 100 chars
         return None
 
     def get_last_message_time(self, obj):
-        last_message = obj.messages.last()
-        if last_message:
-            return last_message.created_at
-        return None
+        return obj.last_message_at
 
 
 class OfferMessageSerializer(serializers.ModelSerializer):
@@ -277,7 +296,7 @@ class EventFilterSerializer(serializers.Serializer):
         required=False, max_digits=12, decimal_places=2, min_value=0
     )
     order_by = serializers.ChoiceField(
-        choices=['start_datetime', '-start_datetime', 'created_at', '-created_at', 'name'],
+        choices=['start_datetime', '-start_datetime', 'created_at', '-created_at', 'name', 'budget', '-budget'],
         required=False,
         default='start_datetime'
     )
@@ -297,8 +316,8 @@ class FilterOptionsSerializer(serializers.Serializer):
 
     def get_profession_options(self, obj):
         """Build hierarchical profession tree"""
-        from ..views import _build_profession_tree_options
-        options = _build_profession_tree_options()
+        from accounts.utils import profession_tree_options
+        options = profession_tree_options()
         return [{'id': id, 'label': label} for id, label in options]
 
     def get_budget_range(self, obj):
@@ -307,13 +326,14 @@ class FilterOptionsSerializer(serializers.Serializer):
 
         bounds = Event.objects.filter(
             is_posted=True,
-            event_budget__isnull=False
+            event_budget_base__isnull=False
         ).aggregate(
-            min_budget=Min('event_budget'),
-            max_budget=Max('event_budget')
+            min_budget=Min('event_budget_base'),
+            max_budget=Max('event_budget_base')
         )
 
         return {
             'min': bounds['min_budget'] or 0,
             'max': bounds['max_budget'] or 10000,
+            'currency': base_currency_id(),
         }
\ No newline at end of file
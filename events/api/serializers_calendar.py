@@ -1,19 +1,18 @@
 from rest_framework import serializers
 from django.utils import timezone
+from showdan.tree import children_by_parent
+from ..inbox import thread_unread_count
 from ..models import Event, EventCategory, BusyTime, OfferThread, OfferMessage
 
 
 class EventCategorySerializer(serializers.ModelSerializer):
     """Serializer for event categories"""
-    depth = serializers.SerializerMethodField()
+    depth = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = EventCategory
         fields = ['id', 'name', 'parent', 'path', 'depth']
 
-    def get_depth(self, obj):
-        return obj.get_depth()
-
 
 class EventCategoryTreeSerializer(serializers.ModelSerializer):
     """Serializer for hierarchical category tree"""
@@ -24,8 +23,16 @@ class EventCategoryTreeSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'children']
 
     def get_children(self, obj):
-        children = obj.children.all()
-        return EventCategoryTreeSerializer(children, many=True).data
+        children = self._children_by_parent().get(obj.pk)
+        return EventCategoryTreeSerializer(children, many=True, context=self.context).data if children else []
+
+    def _children_by_parent(self):
+        # the whole tree in one query, shared by every nested serializer
+        children_map = self.context.get('_category_children')
+        if children_map is None:
+            children_map = children_by_parent(EventCategory.objects.filter(parent__isnull=False))
+            self.context['_category_children'] = children_map
+        return children_map
 
 
 class EventCreateSerializer(serializers.ModelSerializer):
@@ -225,7 +232,7 @@ class OfferThreadSerializer(serializers.ModelSerializer):
         return UserProfileSerializer(obj.professional).data
 
     def get_last_message(self, obj):
-        last_message = obj.messages.last()
+        last_message = obj.last_message if obj.last_message_id else None
         if last_message:
             return {
                 'message': last_message.message[:100] + '...' if len(
@@ -236,9 +243,7 @@ class OfferThreadSerializer(serializers.ModelSerializer):
         return None
 
     def get_unread_count(self, obj):
-        user = self.context['request'].user
-        # Messages where user is not the sender and status is pending
-        return obj.messages.exclude(sender=user).filter(status='pending').count()
+        return thread_unread_count(obj, self.context['request'].user)
 
 
 class OfferMessageSerializer(serializers.ModelSerializer):
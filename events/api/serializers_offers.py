@@ -3,6 +3,7 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from ..inbox import thread_unread_count
 from ..models import Event, OfferThread, OfferMessage
 from accounts.models import Currency
 from accounts.api.serializers import UserBasicSerializer, CurrencySerializer
@@ -40,7 +41,8 @@ class OfferThreadDetailSerializer(serializers.ModelSerializer):
         return None
 
     def get_last_message(self, obj):
-        last_msg = obj.messages.last()
+        # denormalized on the thread; the inbox select_related()s it
+        last_msg = obj.last_message if obj.last_message_id else None
         if last_msg:
             return {
                 'id': last_msg.id,
@@ -56,8 +58,8 @@ class OfferThreadDetailSerializer(serializers.ModelSerializer):
         if not request or not request.user.is_authenticated:
             return 0
 
-        # This is a simple implementation - you might want to track read status
-        return obj.messages.count()  # Placeholder
+        # read cursor vs thread summary; annotated by the inbox
+        return thread_unread_count(obj, request.user)
 
     def get_can_message(self, obj):
         request = self.context.get('request')
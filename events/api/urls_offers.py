@@ -1,6 +1,7 @@
 # events/api/urls_offers.py
 from django.urls import path
 from . import views_offers
+from ..views_push import offers_stream_view
 
 urlpatterns = [
     # ============ Offer Threads ============
@@ -19,6 +20,7 @@ urlpatterns = [
     # ============ Inbox ============
     path('inbox/', views_offers.OffersInboxView.as_view(), name='api-offers-inbox'),
     path('inbox/stats/', views_offers.InboxStatsView.as_view(), name='api-inbox-stats'),
+    path('stream/', offers_stream_view, name='api-offers-stream'),
 
     # ============ Booking Requests ============
     path('booking-request/', views_offers.BookingRequestView.as_view(), name='api-booking-request'),
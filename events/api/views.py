@@ -5,6 +5,10 @@ from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.pagination import PageNumberPagination
+from showdan.pagination import KeysetPaginationMixin
+from showdan import filter_options
+from showdan.filter_options import bundle_response
+from showdan.tree import subtree_filter
 from django.contrib.auth import get_user_model
 from django.db.models import Q, Count, Min, Max
 from django.shortcuts import get_object_or_404
@@ -14,6 +18,7 @@ from django.utils.translation import gettext_lazy as _
 
 from ..models import Event, EventCategory, OfferThread, OfferMessage, BusyTime
 from accounts.models import Profession
+from accounts.rates import base_amount_param, requested_currency
 from .serializers import *
 from accounts.api.serializers import UserBasicSerializer
 
@@ -22,12 +27,14 @@ User = get_user_model()
 
 # ==================== Pagination Classes ====================
 
-class StandardPagination(PageNumberPagination):
+class StandardPagination(KeysetPaginationMixin, PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
 
     def get_paginated_response(self, data):
+        if self.cursor_mode:
+            return super().get_paginated_response(data)  # keyset payload
         return Response({
             'count': self.page.paginator.count,
             'next': self.get_next_link(),
@@ -49,17 +56,20 @@ class EventListView(generics.ListAPIView):
     Query Parameters:
     - show: 'upcoming', 'past', or 'all' (default: 'upcoming')
     - q: Search query
-    - category: EventCategory ID
-    - profession: Profession ID (required professions)
+    - category: EventCategory ID (includes sub-categories)
+    - profession: Profession ID (required professions, includes sub-professions)
     - country: Country filter
     - city: City filter
     - location: Location filter
     - near_me: 'true' or 'false' (requires authentication)
-    - min_budget: Minimum event budget
-    - max_budget: Maximum event budget
-    - order_by: 'start_datetime', '-start_datetime', 'created_at', '-created_at', 'name'
+    - min_budget: Minimum event budget (in `currency`)
+    - max_budget: Maximum event budget (in `currency`)
+    - currency: Currency ID budgets are entered and shown in (default: the user's, else the base currency)
+    - order_by: 'start_datetime', '-start_datetime', 'created_at', '-created_at', 'name', 'budget', '-budget'
     - page: Page number
     - page_size: Items per page
+    - cursor: Keyset mode instead of page numbers ('' for the first page, then next_cursor)
+    - with_count: 'true' to include the total count in keyset mode
 
     Example: /api/v1/events/?show=upcoming&category=1&near_me=true&order_by=start_datetime
     """
@@ -116,15 +126,15 @@ class EventListView(generics.ListAPIView):
                 Q(required_professions__name__icontains=q)
             )
 
-        # Category filter
+        # Category filter (the category and everything below it)
         category_id = params.get('category', '').strip()
         if category_id.isdigit():
-            queryset = queryset.filter(event_type__id=int(category_id))
+            queryset = queryset.filter(subtree_filter(Event, 'event_type', int(category_id)))
 
-        # Profession filter
+        # Profession filter (the profession and everything below it)
         profession_id = params.get('profession', '').strip()
         if profession_id.isdigit():
-            queryset = queryset.filter(required_professions__id=int(profession_id))
+            queryset = queryset.filter(subtree_filter(Event, 'required_professions', int(profession_id)))
 
         # Location filters
         country = params.get('country', '').strip()
@@ -168,51 +178,32 @@ class EventListView(generics.ListAPIView):
                     Q(created_by__city__iexact=u_city)
                 )
 
-        # Budget range filter
-        def to_decimal(s):
-            if not s:
-                return None
-            try:
-                return Decimal(s)
-            except (InvalidOperation, ValueError):
-                return None
-
-        min_budget = to_decimal(params.get('min_budget', ''))
-        max_budget = to_decimal(params.get('max_budget', ''))
+        # Budget range filter, typed in the viewer's currency and compared in the base currency
+        currency = requested_currency(self.request)
+        min_budget = base_amount_param(params.get('min_budget', ''), currency)
+        max_budget = base_amount_param(params.get('max_budget', ''), currency)
 
         if min_budget is not None:
-            queryset = queryset.filter(event_budget__isnull=False, event_budget__gte=min_budget)
+            queryset = queryset.filter(event_budget_base__isnull=False, event_budget_base__gte=min_budget)
 
         if max_budget is not None:
-            queryset = queryset.filter(event_budget__isnull=False, event_budget__lte=max_budget)
+            queryset = queryset.filter(event_budget_base__isnull=False, event_budget_base__lte=max_budget)
 
         # Apply ordering
         order_by = params.get('order_by', self.order_by)
         if order_by in ['start_datetime', '-start_datetime', 'created_at', '-created_at', 'name']:
             queryset = queryset.order_by(order_by)
+        elif order_by in ['budget', '-budget']:
+            queryset = queryset.order_by(order_by.replace('budget', 'event_budget_base'))
         else:
             queryset = queryset.order_by(self.order_by)
 
         return queryset.distinct()
 
     def list(self, request, *args, **kwargs):
-        # Get filter options for response
-        categories = EventCategory.objects.all().order_by('path')
-
-        # Build profession tree options
-        from ..views import _build_profession_tree_options
-        profession_options = _build_profession_tree_options()
-
-        # Get budget bounds
-        bounds = Event.objects.filter(
-            is_posted=True,
-            event_budget__isnull=False
-        ).aggregate(
-            bmin=Min('event_budget'),
-            bmax=Max('event_budget')
-        )
-        bmin = bounds['bmin'] or 0
-        bmax = bounds['bmax'] or 10000
+        # Filter options (categories, profession tree, budget range) are served
+        # by filter-options/ and only referenced here by version
+        options_version = filter_options.get_version(filter_options.EVENTS)
 
         # Get filtered and paginated events
         queryset = self.filter_queryset(self.get_queryset())
@@ -225,14 +216,7 @@ class EventListView(generics.ListAPIView):
             # Add metadata
             response.data['metadata'] = {
                 'show': self.request.query_params.get('show', 'upcoming'),
-                'filter_options': {
-                    'categories': EventCategorySerializer(categories, many=True).data,
-                    'profession_options': [{'id': id, 'label': label} for id, label in profession_options],
-                    'budget_range': {
-                        'min': int(bmin),
-                        'max': int(bmax),
-                    }
-                },
+                'filter_options_version': options_version,
                 'current_filters': {
                     'q': request.query_params.get('q', ''),
                     'category': request.query_params.get('category', ''),
@@ -253,14 +237,7 @@ class EventListView(generics.ListAPIView):
             'events': serializer.data,
             'metadata': {
                 'show': self.request.query_params.get('show', 'upcoming'),
-                'filter_options': {
-                    'categories': EventCategorySerializer(categories, many=True).data,
-                    'profession_options': [{'id': id, 'label': label} for id, label in profession_options],
-                    'budget_range': {
-                        'min': int(bmin),
-                        'max': int(bmax),
-                    }
-                }
+                'filter_options_version': options_version,
             }
         })
 
@@ -635,17 +612,16 @@ class OfferMessageUpdateStatusView(generics.UpdateAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Update the message status
-        instance.status = status_action
-        instance.save()
-
-        # If accepted, lock the event and set accepted thread
         if status_action == 'accepted':
-            event = instance.thread.event
-            event.is_locked = True
-            event.accepted_thread = instance.thread
-            event.accepted_professional = instance.thread.professional
-            event.save()
+            # Lock the event and accept the message; only one concurrent accept wins
+            if not instance.thread.event.accept_offer(instance.thread, instance):
+                return Response(
+                    {'error': _('This event is already locked or the offer is no longer the latest')},
+                    status=status.HTTP_409_CONFLICT
+                )
+        else:
+            instance.status = status_action
+            instance.save()
 
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
@@ -702,12 +678,13 @@ class EventFilterOptionsView(APIView):
     Get filter options for events
 
     GET /api/v1/events/filter-options/
+
+    Cached per version and language; send If-None-Match with the ETag to get 304.
     """
     permission_classes = [AllowAny]
 
     def get(self, request):
-        serializer = FilterOptionsSerializer({})
-        return Response(serializer.data)
+        return bundle_response(request, filter_options.EVENTS)
 
 
 # ==================== Quick Stats View ====================
@@ -3,14 +3,18 @@ from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
+from showdan.pagination import KeysetPaginationMixin
+from showdan.filter_options import bundle_response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q, Count, Max, Min
 from django.utils import timezone
 from datetime import datetime, date, timedelta
 from django.shortcuts import get_object_or_404
-import calendar
 
-from ..models import Event, EventCategory, BusyTime, OfferThread, OfferMessage
+from ..models import Event, EventCategory, BusyTime, InboxCounters, OfferThread, OfferMessage
+from ..calendar_projection import BOOKED, BUSY, CREATED, get_extra, get_month, month_grid
+from ..calendar_utils import overlapping
+from ..inbox import with_read_state
 from .serializers_calendar import (
     EventSerializer, EventListSerializer, EventCreateSerializer,
     EventCategorySerializer, EventCategoryTreeSerializer,
@@ -20,7 +24,7 @@ from .serializers_calendar import (
 )
 
 
-class StandardPagination(PageNumberPagination):
+class StandardPagination(KeysetPaginationMixin, PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
@@ -120,46 +124,25 @@ class EventViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['GET'])
     def filter_options(self, request):
-        """Get filter options for events"""
-        from django.db.models import Count
-
-        options = {
-            'categories': EventCategorySerializer(
-                EventCategory.objects.all(),
-                many=True
-            ).data,
-            'countries': list(Event.objects.filter(
-                is_posted=True
-            ).exclude(country='').values_list(
-                'country', flat=True
-            ).distinct()),
-            'cities': list(Event.objects.filter(
-                is_posted=True
-            ).exclude(city='').values_list(
-                'city', flat=True
-            ).distinct()),
-        }
-        return Response(options)
+        """Get filter options for events (cached, ETag / 304 aware)"""
+        return bundle_response(request, 'events_calendar')
 
     @action(detail=False, methods=['GET'])
     def stats(self, request):
         """Get event statistics for current user"""
         user = request.user
+        counters = InboxCounters.for_user(user.pk)
 
         stats = {
-            'total_created': Event.objects.filter(created_by=user).count(),
-            'total_booked': Event.objects.filter(
-                is_locked=True,
-                accepted_thread__professional=user
-            ).count() if user.account_type == 'professional' else 0,
+            'total_created': counters.events_created,
+            'total_booked': counters.accepted_as_professional if user.account_type == 'professional' else 0,
+            # time-dependent, so not kept in the counters
             'upcoming': Event.objects.filter(
                 Q(created_by=user) | Q(accepted_thread__professional=user),
                 start_datetime__gte=timezone.now()
             ).count(),
-            'pending_offers': OfferThread.objects.filter(
-                event__created_by=user,
-                messages__status='pending'
-            ).distinct().count(),
+            # offers on the user's events that are still open
+            'pending_offers': counters.open_offers,
         }
 
         return Response(stats)
@@ -177,59 +160,54 @@ def calendar_month_view(request):
     year = int(request.GET.get('year', today.year))
     month = int(request.GET.get('month', today.month))
 
-    # Calculate month range
-    first_day = date(year, month, 1)
-    _, last_day_num = calendar.monthrange(year, month)
-    last_day = date(year, month, last_day_num)
-
-    # Get events for the month
-    creator_events = Event.objects.filter(
-        created_by=user,
-        start_datetime__date__lte=last_day,
-        end_datetime__date__gte=first_day
-    ).select_related('currency', 'created_by')
+    is_professional = user.account_type == 'professional'
 
-    booked_events = Event.objects.none()
-    if user.account_type == 'professional':
-        booked_events = Event.objects.filter(
-            is_locked=True,
-            accepted_thread__professional=user,
-            start_datetime__date__lte=last_day,
-            end_datetime__date__gte=first_day
-        ).select_related('currency', 'created_by')
-
-    # Get busy times for the month
-    busy_times = BusyTime.objects.filter(
-        user=user,
-        start_datetime__date__lte=last_day,
-        end_datetime__date__gte=first_day
-    )
+    # Day-bucketed events and busy times of the visible grid (cached per month)
+    parts = (CREATED, BOOKED, BUSY) if is_professional else (CREATED, BUSY)
+    projection = get_month(user.pk, year, month, parts)
+    grid = month_grid(year, month)
 
-    # Prepare calendar weeks
-    cal = calendar.Calendar(firstweekday=0)  # Monday
-    weeks = cal.monthdatescalendar(year, month)
+    days = {}
+    event_ids = set()
+    for part in (CREATED, BOOKED):
+        for d, segments in projection.get(part, {}).items():
+            days.setdefault(d.isoformat(), {'events': [], 'busy': []})['events'].extend(
+                {**segment, 'source': part} for segment in segments
+            )
+            event_ids.update(segment['event_id'] for segment in segments)
+    for d, items in projection[BUSY].items():
+        days.setdefault(d.isoformat(), {'events': [], 'busy': []})['busy'] = items
+
+    def build_rows(first_day, last_day):
+        # serialized once per version: the grid's events and busy times. The
+        # version does not move when a category is renamed, so rows keep the
+        # category id and its name is looked up per request
+        events = list(Event.objects.filter(pk__in=event_ids).select_related(
+            'event_type', 'created_by', 'accepted_thread__professional',
+        ).order_by('start_datetime'))
+        serialized = CalendarEventSerializer(events, many=True, context={'request': request}).data
+        return {
+            'events': [
+                {**row, 'event_type': event.event_type_id} for event, row in zip(events, serialized)
+            ],
+            'busy_times': list(BusyTimeSerializer(
+                BusyTime.objects.filter(overlapping(first_day, last_day), user=user), many=True,
+            ).data),
+        }
 
-    # Month navigation
-    prev_month = (date(year, month, 1) - timedelta(days=1)).replace(day=1)
-    next_month = (date(year, month, 28) + timedelta(days=10)).replace(day=1)
+    rows = get_extra('api-rows' + ('-pro' if is_professional else ''), user.pk, year, month, build_rows)
+    category_ids = {row['event_type'] for row in rows['events'] if row['event_type']}
+    category_names = (
+        dict(EventCategory.objects.filter(pk__in=category_ids).values_list('pk', 'name')) if category_ids else {}
+    )
 
     response_data = {
-        'year': year,
-        'month': month,
-        'month_name': date(year, month, 1).strftime('%B'),
-        'prev_year': prev_month.year,
-        'prev_month': prev_month.month,
-        'next_year': next_month.year,
-        'next_month': next_month.month,
+        **grid,
         'today': today.isoformat(),
-        'weeks': weeks,
-        'events': CalendarEventSerializer(
-            creator_events.union(booked_events),
-            many=True,
-            context={'request': request}
-        ).data,
-        'busy_times': BusyTimeSerializer(busy_times, many=True).data,
-        'is_professional': user.account_type == 'professional',
+        'events': [{**row, 'event_type': category_names.get(row['event_type'])} for row in rows['events']],
+        'busy_times': rows['busy_times'],
+        'days': dict(sorted(days.items())),
+        'is_professional': is_professional,
     }
 
     return Response(response_data)
@@ -257,29 +235,17 @@ def calendar_events_by_date(request):
         )
 
     # Get events for the date
-    creator_events = Event.objects.filter(
-        created_by=user,
-        start_datetime__date__lte=target_date,
-        end_datetime__date__gte=target_date
-    )
+    on_date = overlapping(target_date, target_date)
+    creator_events = Event.objects.filter(on_date, created_by=user)
 
     booked_events = Event.objects.none()
     if user.account_type == 'professional':
-        booked_events = Event.objects.filter(
-            is_locked=True,
-            accepted_thread__professional=user,
-            start_datetime__date__lte=target_date,
-            end_datetime__date__gte=target_date
-        )
+        booked_events = Event.objects.filter(on_date, is_locked=True, accepted_professional=user)
 
     events = creator_events.union(booked_events)
 
     # Get busy times for the date
-    busy_times = BusyTime.objects.filter(
-        user=user,
-        start_datetime__date__lte=target_date,
-        end_datetime__date__gte=target_date
-    )
+    busy_times = BusyTime.objects.filter(on_date, user=user)
 
     response_data = {
         'date': target_date.isoformat(),
@@ -436,14 +402,15 @@ class OfferThreadViewSet(viewsets.ReadOnlyModelViewSet):
 
         if user.account_type == 'professional':
             # Professionals see threads where they are the professional
-            return OfferThread.objects.filter(
+            threads = OfferThread.objects.filter(
                 professional=user
-            ).select_related('event', 'professional')
+            ).select_related('event', 'professional', 'last_message')
         else:
             # Event creators see threads for their events
-            return OfferThread.objects.filter(
-                event__created_by=user
-            ).select_related('event', 'professional')
+            threads = OfferThread.objects.filter(
+                creator=user
+            ).select_related('event', 'professional', 'last_message')
+        return with_read_state(threads, user)
 
     @action(detail=True, methods=['GET'])
     def messages(self, request, pk=None):
@@ -459,22 +426,16 @@ class OfferThreadViewSet(viewsets.ReadOnlyModelViewSet):
         user = request.user
 
         if user.account_type == 'professional':
-            total = OfferThread.objects.filter(professional=user).count()
-            unread = OfferThread.objects.filter(
-                professional=user,
-                messages__status='pending'
-            ).distinct().count()
+            threads = OfferThread.objects.filter(professional=user)
         else:
-            total = OfferThread.objects.filter(event__created_by=user).count()
-            unread = OfferThread.objects.filter(
-                event__created_by=user,
-                messages__status='pending'
-            ).distinct().count()
+            threads = OfferThread.objects.filter(event__created_by=user)
+        total = threads.count()
+        pending = threads.filter(messages__status='pending').distinct().count()
 
         return Response({
             'total': total,
-            'unread': unread,
-            'pending_offers': unread
+            'unread': with_read_state(threads, user).filter(unread_count__gt=0).count(),
+            'pending_offers': pending
         })
 
 
@@ -513,16 +474,13 @@ class OfferMessageViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # Update message status
-        message.status = 'accepted'
-        message.save()
-
-        # Lock the event and set accepted professional
+        # Lock the event and accept the message; only one concurrent accept wins
         event = message.thread.event
-        event.is_locked = True
-        event.accepted_thread = message.thread
-        event.accepted_professional = message.thread.professional
-        event.save()
+        if not event.accept_offer(message.thread, message):
+            return Response(
+                {'error': 'This event is already locked or the offer is no longer the latest'},
+                status=status.HTTP_409_CONFLICT
+            )
 
         # Reject all other pending offers for this event
         OfferMessage.objects.filter(
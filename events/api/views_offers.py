@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.pagination import PageNumberPagination
+from showdan.pagination import KeysetPaginationMixin
 from django.contrib.auth import get_user_model
 from django.db.models import Q, Max, Count, Prefetch, F
 from django.shortcuts import get_object_or_404
@@ -12,7 +13,11 @@ from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.db import transaction
 
-from ..models import Event, OfferThread, OfferMessage
+from ..inbox import (
+    MAX_MESSAGE_WINDOW, inbox_threads, message_window, participant_q, serializer_threads, unread_summary,
+    with_read_state,
+)
+from ..models import Event, InboxCounters, OfferThread, OfferMessage, OfferReadCursor
 from accounts.models import Currency
 from .serializers_offers import *
 from .serializers import OfferMessageSerializer, OfferThreadSerializer
@@ -23,12 +28,14 @@ User = get_user_model()
 
 # ==================== Pagination ====================
 
-class OffersPagination(PageNumberPagination):
+class OffersPagination(KeysetPaginationMixin, PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
 
     def get_paginated_response(self, data):
+        if self.cursor_mode:
+            return super().get_paginated_response(data)  # keyset payload
         return Response({
             'count': self.page.paginator.count,
             'next': self.get_next_link(),
@@ -301,36 +308,33 @@ class OfferActionView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        with transaction.atomic():
-            if action == 'accept':
-                # Accept the offer
-                event.is_locked = True
-                event.accepted_thread = thread
-                event.accepted_professional = thread.professional
-                event.save(update_fields=['is_locked', 'accepted_thread', 'accepted_professional'])
-
-                last_offer.status = OfferMessage.Status.ACCEPTED
-                last_offer.save(update_fields=['status'])
-
-                message = _('Offer accepted successfully')
-                response_data = {
-                    'message': message,
-                    'event_locked': True,
-                    'accepted_professional': UserBasicSerializer(thread.professional).data,
-                    'offer_status': 'accepted'
-                }
+        if action == 'accept':
+            # Conditional lock: of concurrent accepts only one wins
+            if not event.accept_offer(thread, last_offer):
+                return Response(
+                    {'error': _('This event is already locked or a newer offer arrived')},
+                    status=status.HTTP_409_CONFLICT
+                )
 
-            else:  # reject
-                # Reject the offer
-                last_offer.status = OfferMessage.Status.REJECTED
-                last_offer.save(update_fields=['status'])
+            message = _('Offer accepted successfully')
+            response_data = {
+                'message': message,
+                'event_locked': True,
+                'accepted_professional': UserBasicSerializer(thread.professional).data,
+                'offer_status': 'accepted'
+            }
 
-                message = _('Offer rejected')
-                response_data = {
-                    'message': message,
-                    'event_locked': event.is_locked,
-                    'offer_status': 'rejected'
-                }
+        else:  # reject
+            # Reject the offer
+            last_offer.status = OfferMessage.Status.REJECTED
+            last_offer.save(update_fields=['status'])
+
+            message = _('Offer rejected')
+            response_data = {
+                'message': message,
+                'event_locked': event.is_locked,
+                'offer_status': 'rejected'
+            }
 
         return Response(response_data)
 
@@ -345,11 +349,15 @@ class OffersInboxView(generics.ListAPIView):
 
     Query Parameters:
     - thread: Specific thread ID to view
+    - messages_before: Only messages older than this cursor (active_thread_older_cursor)
+    - messages_limit: Messages of the active thread returned (default 30, max 100)
     - event: Event ID (for professionals to create/view thread)
     - status: Filter by status (pending, accepted, rejected, all)
     - unread_only: Only show threads with unread messages
     - page: Page number
     - page_size: Items per page
+    - cursor: Keyset mode instead of page numbers ('' for the first page, then next_cursor)
+    - with_count: 'true' to include the total count in keyset mode
     """
     serializer_class = OfferThreadDetailSerializer
     permission_classes = [IsAuthenticated]
@@ -358,16 +366,9 @@ class OffersInboxView(generics.ListAPIView):
     def get_queryset(self):
         user = self.request.user
 
-        # Base queryset: threads where user is professional or creator
-        threads = OfferThread.objects.select_related(
-            'event', 'event__created_by', 'event__currency', 'professional'
-        ).filter(
-            Q(professional=user) | Q(event__created_by=user)
-        ).annotate(
-            last_msg_at=Max('messages__created_at'),
-            message_count=Count('messages'),
-            # REMOVED: has_unread=Count('messages', filter=Q(messages__read=False))
-        ).order_by('-last_msg_at', '-created_at')
+        # Threads where user is professional or creator, sorted on the stored
+        # conversation summary (no aggregation over the messages)
+        threads = with_read_state(serializer_threads(inbox_threads(user)), user)
 
         # Apply filters
         status = self.request.query_params.get('status', 'all')
@@ -383,10 +384,10 @@ class OffersInboxView(generics.ListAPIView):
                 # You might need to track rejected status differently
                 pass
 
-        # Unread only filter - REMOVED since read field doesn't exist
-        # unread_only = self.request.query_params.get('unread_only', '').lower() == 'true'
-        # if unread_only:
-        #     threads = threads.filter(has_unread__gt=0)
+        # Unread only (read cursor vs thread summary)
+        unread_only = self.request.query_params.get('unread_only', '').lower() in ('true', '1')
+        if unread_only:
+            threads = threads.filter(unread_count__gt=0)
 
         return threads
 
@@ -436,6 +437,7 @@ class OffersInboxView(generics.ListAPIView):
         thread_id = request.query_params.get('thread')
         active_thread = None
         thread_messages = []
+        older_cursor = None
 
         if thread_id:
             try:
@@ -451,10 +453,12 @@ class OffersInboxView(generics.ListAPIView):
                         status=status.HTTP_403_FORBIDDEN
                     )
 
-                # Get messages for active thread
-                thread_messages = OfferMessage.objects.filter(
-                    thread=active_thread
-                ).select_related('sender', 'proposed_currency', 'event_currency').order_by('created_at')
+                # Newest window of the active thread's messages
+                limit = request.query_params.get('messages_limit', '')
+                limit = min(int(limit), MAX_MESSAGE_WINDOW) if limit.isdigit() else None
+                thread_messages, older_cursor = message_window(
+                    active_thread, request.query_params.get('messages_before'), limit,
+                )
 
             except OfferThread.DoesNotExist:
                 pass
@@ -475,6 +479,7 @@ class OffersInboxView(generics.ListAPIView):
                 response.data['active_thread_messages'] = OfferMessageSerializer(
                     thread_messages, many=True, context={'request': request}
                 ).data
+                response.data['active_thread_older_cursor'] = older_cursor
 
                 # Add form availability
                 response.data['forms'] = {
@@ -502,40 +507,27 @@ class OffersInboxView(generics.ListAPIView):
             'active_thread_messages': OfferMessageSerializer(
                 thread_messages, many=True, context={'request': request}
             ).data if active_thread else [],
+            'active_thread_older_cursor': older_cursor,
             'stats': self._get_inbox_stats(user),
         })
 
     def _get_inbox_stats(self, user):
-        """Get inbox statistics for the user"""
-        threads = OfferThread.objects.filter(
-            Q(professional=user) | Q(event__created_by=user)
-        )
-
-        total_threads = threads.count()
-
-        # Count pending offers (events not locked)
-        pending_offers = threads.filter(event__is_locked=False).count()
+        """Get inbox statistics for the user (one read of the counters row)"""
+        counters = InboxCounters.for_user(user.pk)
 
         # Count accepted offers (user's threads that are accepted)
         if user.account_type == User.AccountType.PROFESSIONAL:
-            accepted_offers = threads.filter(
-                event__is_locked=True,
-                event__accepted_thread_id=F('id')
-            ).count()
+            accepted_offers = counters.accepted_threads
         else:
-            accepted_offers = threads.filter(event__is_locked=True).count()
-
-        # Get most recent activity
-        recent_activity = threads.aggregate(
-            last_activity=Max('messages__created_at')
-        )['last_activity']
+            accepted_offers = counters.locked_threads
 
         return {
-            'total_threads': total_threads,
-            'pending_offers': pending_offers,
+            'total_threads': counters.total_threads,
+            'pending_offers': counters.pending_threads,
             'accepted_offers': accepted_offers,
-            'recent_activity': recent_activity,
-            'unread_count': 0,
+            'recent_activity': counters.last_activity,
+            'unread_threads': counters.unread_threads,
+            'unread_count': counters.unread_count,
         }
 
 
@@ -544,43 +536,31 @@ class InboxStatsView(APIView):
     Get inbox statistics
 
     GET /api/v1/offers/inbox/stats/
+
+    Served from the user's ``InboxCounters`` row.
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         user = request.user
+        counters = InboxCounters.for_user(user.pk)
 
-        threads = OfferThread.objects.filter(
-            Q(professional=user) | Q(event__created_by=user)
-        )
-
-        # Calculate statistics
         stats = {
-            'total_threads': threads.count(),
-            'pending_threads': threads.filter(event__is_locked=False).count(),
-            'accepted_threads': threads.filter(
-                event__is_locked=True,
-                event__accepted_thread_id=F('id')
-            ).count(),
-            'recent_activity': threads.aggregate(
-                last_activity=Max('messages__created_at')
-            )['last_activity'],
+            'total_threads': counters.total_threads,
+            'pending_threads': counters.pending_threads,
+            'accepted_threads': counters.accepted_threads,
+            'recent_activity': counters.last_activity,
+            'unread_threads': counters.unread_threads,
+            'unread_count': counters.unread_count,
         }
 
         # Add role-specific stats
         if user.account_type == User.AccountType.PROFESSIONAL:
-            stats['events_applied_to'] = threads.filter(professional=user).count()
-            stats['events_accepted'] = threads.filter(
-                professional=user,
-                event__is_locked=True,
-                event__accepted_thread_id=F('id')
-            ).count()
+            stats['events_applied_to'] = counters.threads_as_professional
+            stats['events_accepted'] = counters.accepted_as_professional
         else:
-            stats['events_created'] = Event.objects.filter(created_by=user, is_posted=True).count()
-            stats['open_offers'] = threads.filter(
-                event__created_by=user,
-                event__is_locked=False
-            ).count()
+            stats['events_created'] = counters.events_posted
+            stats['open_offers'] = counters.open_offers
 
         return Response(stats)
 
@@ -689,6 +669,11 @@ class OfferThreadMessagesView(generics.ListAPIView):
     Get messages for a specific offer thread
 
     GET /api/v1/offers/threads/{thread_id}/messages/
+
+    Query Parameters:
+    - page / page_size: Page-number mode (default)
+    - cursor: Keyset mode ('' for the first page, then next_cursor)
+    - with_count: 'true' to include the total count in keyset mode
     """
     serializer_class = OfferMessageSerializer
     permission_classes = [IsAuthenticated]
@@ -729,13 +714,13 @@ class MarkMessagesReadView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # Note: This endpoint won't work until you add a 'read' field to OfferMessage
-        # thread.messages.filter(read=False).update(read=True)
+        OfferReadCursor.mark_read(thread.id, user.id)
 
         return Response({
             'success': True,
             'message': _('Messages marked as read'),
-            'thread_id': thread_id
+            'thread_id': thread_id,
+            **unread_summary(user),
         })
 
 
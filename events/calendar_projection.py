@@ -0,0 +1,207 @@
+"""
+Calendar month projection shared by the HTML and API calendars.
+
+A month view needs every event and busy time touching the visible grid bucketed
+per local day, with "HH:MM →" style labels. ``get_month()`` builds that in one
+pass over the intervals sorted by start (labels are formatted once per
+interval, not once per day) and caches it per (user, year, month, timezone):
+
+    {
+        "created": {date: [segment, ...]},  # events the user created
+        "booked":  {date: [segment, ...]},  # locked events the user is booked for
+        "busy":    {date: [busy, ...]},
+    }
+
+Each part is cached separately so public profiles never load a professional's
+own (created) events. ``get_extra()`` caches other per-month data (the API's
+serialized rows) under the same version; like segments it must only hold data
+that changes with the user's events and busy times (ids, not category names). ``events.signals`` calls
+``invalidate(user_id)`` whenever a BusyTime or an Event touching that user's
+calendar changes; once the transaction commits the user's version moves,
+orphaning all their cached months at once. Versions live in the shared
+default cache, so every worker sees the move.
+
+Segments hold ids only (``accepted_professional_id``); names and avatars are
+resolved by the views so profile changes never serve stale calendars.
+"""
+import calendar
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .calendar_utils import daterange, overlapping
+from .models import BusyTime, Event
+
+CREATED = "created"
+BOOKED = "booked"
+BUSY = "busy"
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+# ==================== Grid ====================
+
+def month_grid(year, month):
+    """Weeks (Monday first) plus the month navigation shared by every calendar."""
+    weeks = calendar.Calendar(firstweekday=0).monthdatescalendar(year, month)
+    prev_month = (date(year, month, 1) - timedelta(days=1)).replace(day=1)
+    next_month = (date(year, month, 28) + timedelta(days=10)).replace(day=1)
+    return {
+        "weeks": weeks,
+        "year": year,
+        "month": month,
+        "month_name": date(year, month, 1).strftime("%B"),
+        "prev_year": prev_month.year,
+        "prev_month": prev_month.month,
+        "next_year": next_month.year,
+        "next_month": next_month.month,
+    }
+
+
+def avatar_url(user):
+    pic = getattr(user, "profile_picture", None) if user else None
+    if not pic:
+        return ""
+    try:
+        return pic.url
+    except Exception:
+        return ""
+
+
+def avatar_urls(user_ids):
+    """``{user_id: avatar url}`` for the given ids, in one query."""
+    user_ids = {pk for pk in user_ids if pk}
+    if not user_ids:
+        return {}
+    users = get_user_model().objects.filter(pk__in=user_ids).only("id", "profile_picture")
+    return {user.pk: avatar_url(user) for user in users}
+
+
+# ==================== Projection ====================
+
+def _bucket(intervals, first_day, last_day, make_item):
+    """
+    ``intervals`` are ``(start, end, obj)`` with aware datetimes. Every interval
+    is converted to local time once and added to each visible day it covers.
+    """
+    days = {}
+    for start, end, obj in sorted(intervals, key=lambda row: row[0]):
+        start_local = timezone.localtime(start)
+        end_local = timezone.localtime(end)
+        d1, d2 = start_local.date(), end_local.date()
+        start_hm, end_hm = start_local.strftime("%H:%M"), end_local.strftime("%H:%M")
+        for d in daterange(max(d1, first_day), min(d2, last_day)):
+            days.setdefault(d, []).append(make_item(obj, d == d1, d == d2, start_hm, end_hm))
+    return days
+
+
+def _segment(event, is_start, is_end, start_hm, end_hm):
+    label = ""
+    if is_start and is_end:
+        label = f"{start_hm}–{end_hm}"
+    elif is_start:
+        label = f"{start_hm} →"
+    elif is_end:
+        label = f"→ {end_hm}"
+    return {
+        "event_id": event.id,
+        "name": event.name,
+        "is_start": is_start,
+        "is_end": is_end,
+        "label": label,
+        "is_locked": bool(event.is_locked),
+        "accepted_professional_id": event.accepted_professional_id,
+    }
+
+
+def _busy_item(busy, is_start, is_end, start_hm, end_hm):
+    return {
+        "is_all_day": busy.is_all_day,
+        "start": start_hm,
+        "end": end_hm,
+        "note": busy.note,
+    }
+
+
+def _build_part(part, user_id, first_day, last_day):
+    in_range = overlapping(first_day, last_day)
+    if part == BUSY:
+        rows = BusyTime.objects.filter(in_range, user_id=user_id).only(
+            "start_datetime", "end_datetime", "is_all_day", "note",
+        )
+        return _bucket(((b.start_datetime, b.end_datetime, b) for b in rows), first_day, last_day, _busy_item)
+
+    if part == CREATED:
+        rows = Event.objects.filter(in_range, created_by_id=user_id)
+    else:
+        rows = Event.objects.filter(in_range, is_locked=True, accepted_professional_id=user_id)
+    rows = rows.exclude(start_datetime=None).exclude(end_datetime=None).only(
+        "name", "start_datetime", "end_datetime", "is_locked", "accepted_professional_id",
+    )
+    return _bucket(((e.start_datetime, e.end_datetime, e) for e in rows), first_day, last_day, _segment)
+
+
+def _version_key(user_id):
+    return f"calendar:version:{user_id}"
+
+
+def get_version(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        cache.add(_version_key(user_id), time.time_ns() // 1_000_000, None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def _bump(user_ids):
+    for user_id in user_ids:
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            cache.set(_version_key(user_id), time.time_ns() // 1_000_000, None)
+
+
+def invalidate(*user_ids):
+    """Move the users' versions once the current transaction commits."""
+    user_ids = {pk for pk in user_ids if pk}
+    if user_ids:
+        transaction.on_commit(lambda: _bump(user_ids))
+
+
+def _grid_bounds(year, month):
+    weeks = calendar.Calendar(firstweekday=0).monthdatescalendar(year, month)
+    return weeks[0][0], weeks[-1][-1]
+
+
+def _cached(name, user_id, year, month, version, build):
+    key = f"calendar:{name}:{user_id}:{year}:{month}:{timezone.get_current_timezone_name()}:{version}"
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
+
+
+def get_month(user_id, year, month, parts=(CREATED, BOOKED, BUSY)):
+    """Day-bucketed calendar parts for the grid of (year, month), active timezone."""
+    first_day, last_day = _grid_bounds(year, month)
+    version = get_version(user_id)
+    return {
+        part: _cached(
+            part, user_id, year, month, version, lambda part=part: _build_part(part, user_id, first_day, last_day),
+        )
+        for part in parts
+    }
+
+
+def get_extra(name, user_id, year, month, build):
+    """
+    ``build(first_day, last_day)`` for the grid of (year, month), cached and
+    invalidated together with the user's month projection.
+    """
+    first_day, last_day = _grid_bounds(year, month)
+    return _cached(f"extra:{name}", user_id, year, month, get_version(user_id), lambda: build(first_day, last_day))
@@ -0,0 +1,104 @@
+"""
+Date helpers shared by the calendar views.
+
+Calendars work in local dates while the columns hold UTC timestamps. Filtering
+with ``start_datetime__date__lte=...`` casts every row to a local date in SQL,
+so no index can serve it. Instead ``local_day_range()`` converts the local date
+span into aware datetimes once, in the active (user's) timezone, and
+``overlapping()`` compares the raw columns against them:
+
+    start_datetime < <midnight after last_day> AND end_datetime >= <midnight of first_day>
+
+which is exactly the old ``__date`` predicate, answered by the
+``(user, start_datetime, end_datetime)`` style indexes on ``BusyTime`` and
+booked ``Event`` rows.
+
+``available_between()`` uses the same indexes the other way round: an anti-join
+(NOT EXISTS) keeping professionals with no busy time or locked booking
+overlapping a window.
+"""
+import calendar
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+def month_start_end(year: int, month: int):
+    first = date(year, month, 1)
+    _, last_day = calendar.monthrange(year, month)
+    last = date(year, month, last_day)
+    return first, last
+
+
+def daterange(d1: date, d2: date):
+    cur = d1
+    while cur <= d2:
+        yield cur
+        cur += timedelta(days=1)
+
+
+def local_day_range(first_day: date, last_day: date, tz=None):
+    """``[start, end)`` aware datetimes covering the local days first_day..last_day."""
+    tz = tz or timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(first_day, time.min), tz)
+    end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def overlapping(first_day: date, last_day: date, tz=None):
+    """``Q`` for rows whose [start_datetime, end_datetime] touches those local days."""
+    start, end = local_day_range(first_day, last_day, tz)
+    return Q(start_datetime__lt=end, end_datetime__gte=start)
+
+
+def parse_local_datetime(value, end_of_day=False):
+    """
+    ISO datetime or date from a query string, in the active timezone. A bare
+    date means the start of that day, or the start of the next one with
+    ``end_of_day``. Returns None for empty or invalid values.
+    """
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        # dates first: parse_datetime() also accepts a bare date (as midnight)
+        day = parse_date(value)
+        if day is not None:
+            parsed = datetime.combine(day + timedelta(days=1) if end_of_day else day, time.min)
+        else:
+            parsed = parse_datetime(value)
+    except ValueError:
+        return None
+    if parsed is None:
+        return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def availability_window(available_from, available_to):
+    """``(start, end)`` from the available_from / available_to params, or None."""
+    start = parse_local_datetime(available_from)
+    end = parse_local_datetime(available_to, end_of_day=True)
+    if start is None or end is None or end <= start:
+        return None
+    return start, end
+
+
+def available_between(start, end, user_ref="pk"):
+    """
+    Filter keeping users (``OuterRef(user_ref)``) with no BusyTime and no locked
+    booking overlapping ``[start, end)``. Back-to-back intervals do not clash.
+    """
+    from .models import BusyTime, Event
+
+    busy = BusyTime.objects.filter(
+        user=OuterRef(user_ref), start_datetime__lt=end, end_datetime__gt=start,
+    )
+    booked = Event.objects.filter(
+        accepted_professional=OuterRef(user_ref), is_locked=True,
+        start_datetime__lt=end, end_datetime__gt=start,
+    )
+    return ~Exists(busy) & ~Exists(booked)
@@ -0,0 +1,145 @@
+"""
+Offer inbox queries shared by the HTML inbox and the offers API.
+
+Threads carry their own conversation summary (``last_message_at``,
+``last_message``, ``last_message_preview``, ``message_count``,
+``latest_proposal``; kept current by ``OfferMessage.save()``), so the inbox is
+a plain scan of the ``(participant, last_message_at)`` indexes and never
+aggregates the message table.
+
+Read state works the same way: each participant has an ``OfferReadCursor``
+(one row per thread and user, unique index on ``(user, thread)``), and unread
+counts are the thread's ``message_count`` minus the cursor's ``read_count``.
+
+The active thread's history is windowed: only the newest ``MESSAGE_WINDOW``
+messages are loaded, older ones page in through an opaque ``(created_at, id)``
+cursor read off the ``offermessage_thread_recent_idx`` index.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Count, F, IntegerField, OuterRef, Prefetch, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Event, InboxCounters, OfferReadCursor, OfferThread
+
+
+def participant_q(user):
+    """Threads ``user`` takes part in, as the professional or the event creator."""
+    return Q(professional=user) | Q(creator=user)
+
+
+def inbox_threads(user):
+    """The user's threads, most recent conversation first."""
+    return (
+        OfferThread.objects
+        .filter(participant_q(user))
+        .select_related("event", "event__created_by", "event__currency", "professional")
+        .order_by("-last_message_at", "-created_at")
+    )
+
+
+def serializer_threads(queryset):
+    """
+    Load everything ``OfferThreadDetailSerializer`` reads, in a constant
+    number of queries for the whole page.
+    """
+    events = (
+        Event.objects
+        .select_related("created_by", "currency", "event_type", "accepted_professional")
+        .prefetch_related("required_professions")
+        .annotate(offers_received_count=Count("offer_threads", distinct=True))
+    )
+    return (
+        queryset
+        .select_related(None)
+        .select_related("professional", "last_message", "latest_proposal")
+        .prefetch_related(Prefetch("event", queryset=events))
+    )
+
+
+def unread_count_expression(user):
+    """
+    Unread messages of a thread for ``user``: one probe of the cursor index
+    per thread. Threads without a cursor are unread in full.
+    """
+    read_count = Subquery(
+        OfferReadCursor.objects.filter(thread=OuterRef("pk"), user=user).values("read_count")[:1],
+        output_field=IntegerField(),
+    )
+    return Greatest(F("message_count") - Coalesce(read_count, Value(0)), Value(0))
+
+
+def with_read_state(queryset, user):
+    """Annotate ``unread_count`` for ``user``."""
+    return queryset.annotate(unread_count=unread_count_expression(user))
+
+
+def unread_threads(user):
+    """The user's threads with unread messages."""
+    return with_read_state(OfferThread.objects.filter(participant_q(user)), user).filter(unread_count__gt=0)
+
+
+def unread_summary(user):
+    """
+    ``{'unread_threads': ..., 'unread_count': ...}`` for the inbox badge, read
+    off the user's ``InboxCounters`` row.
+    """
+    counters = InboxCounters.for_user(user.pk)
+    return {"unread_threads": counters.unread_threads, "unread_count": counters.unread_count}
+
+
+def thread_unread_count(thread, user):
+    """Unread messages in one thread, from the annotation when present."""
+    unread = getattr(thread, "unread_count", None)
+    if unread is not None:
+        return unread
+    read_count = (
+        OfferReadCursor.objects.filter(thread=thread, user=user).values_list("read_count", flat=True).first()
+    )
+    return max(thread.message_count - (read_count or 0), 0)
+
+
+# ==================== Message history window ====================
+
+# messages of the active thread loaded at once; older ones load on demand
+MESSAGE_WINDOW = 30
+MAX_MESSAGE_WINDOW = 100
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_message_cursor(message):
+    """``<microseconds since epoch>.<id>``: URL safe and exact."""
+    return f"{(message.created_at - _EPOCH) // timedelta(microseconds=1)}.{message.pk}"
+
+
+def decode_message_cursor(value):
+    """``(created_at, id)`` from a cursor, or None when it is malformed."""
+    micros, _sep, pk = (value or "").partition(".")
+    if not (micros.lstrip("-").isdigit() and pk.isdigit()):
+        return None
+    try:
+        return _EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except OverflowError:
+        return None
+
+
+def message_window(thread, before=None, limit=None):
+    """
+    The newest ``limit`` messages of ``thread`` older than the ``before``
+    cursor (the newest overall without one), oldest first, and the cursor of
+    the window before them, None once the conversation start is reached.
+    """
+    limit = limit or MESSAGE_WINDOW
+    messages = (
+        thread.messages
+        .select_related("sender", "proposed_currency", "event_currency")
+        .order_by("-created_at", "-id")
+    )
+    position = decode_message_cursor(before)
+    if position is not None:
+        created_at, pk = position
+        messages = messages.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    rows = list(messages[:limit + 1])
+    older = encode_message_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit][::-1], older
@@ -0,0 +1,194 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.models import Accounts
+from events.models import Event, OfferMessage, OfferThread
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark offer acceptance under contention: fire simultaneous accepts and "
+        "new offers at one event from a thread pool and check that exactly one accept "
+        "wins, with an offer no newer offer had superseded. Compares the conditional "
+        "lock (Event.accept_offer) with the previous read-modify-save. Workers need their own connections, so the synthetic rows "
+        "are committed and deleted afterwards; run it against a copy of the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--accepts", type=int, default=300, help="Concurrent accepts (default: 300).")
+        parser.add_argument("--offers", type=int, default=300, help="Concurrent new offers (default: 300).")
+        parser.add_argument("--workers", type=int, default=32, help="Worker threads (default: 32).")
+        parser.add_argument("--rounds", type=int, default=3, help="Events contended per strategy (default: 3).")
+
+    def handle(self, *args, **options):
+        if min(options["accepts"], options["workers"], options["rounds"]) <= 0:
+            raise CommandError("--accepts, --workers and --rounds must be positive.")
+        if options["offers"] < 0:
+            raise CommandError("--offers must be non-negative.")
+
+        creator, pros = self._populate_users(options["accepts"])
+        try:
+            self.stdout.write(
+                f"{options['accepts']} accepts + {options['offers']} offers per event, "
+                f"{options['workers']} workers, {connection.vendor}\n"
+            )
+            self.stdout.write(
+                f"{'strategy':<16}{'ops/s':>9}{'p50 ms':>9}{'max ms':>9}{'won':>6}"
+                f"{'accepted':>10}{'stale':>7}{'offers':>8}{'errors':>8}{'ok':>5}"
+            )
+            for name, accept in (("conditional", self._accept_conditional), ("read-then-save", self._accept_legacy)):
+                for _ in range(options["rounds"]):
+                    row = self._round(creator, pros, accept, options)
+                    self.stdout.write(
+                        f"{name:<16}{row['throughput']:>9.0f}{row['p50']:>9.1f}{row['max']:>9.1f}{row['won']:>6}"
+                        f"{row['accepted']:>10}{row['stale']:>7}{row['offers']:>8}{row['errors']:>8}{'yes' if row['ok'] else 'NO':>5}"
+                    )
+        finally:
+            Event.objects.filter(created_by=creator).delete()
+            Accounts.objects.filter(email__endswith="@bench-accept.invalid").delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            "\nwon: accepts told they succeeded; accepted: ACCEPTED messages left on the event; "
+            "stale: accepted offers a newer offer in their thread had already superseded; "
+            "offers: new offers stored before the lock; ok: one winner, one accepted message, "
+            "not stale, accepted_thread/professional agree.\nDone (synthetic data deleted)."
+        ))
+
+    # ---- scenario ----
+
+    def _populate_users(self, count):
+        creator = Accounts.objects.create(
+            email="creator@bench-accept.invalid", first_name="B", last_name="C", password="!",
+        )
+        pros = Accounts.objects.bulk_create([
+            Accounts(
+                email=f"pro-{i}@bench-accept.invalid", first_name="B", last_name=str(i),
+                account_type=Accounts.AccountType.PROFESSIONAL, password="!",
+            )
+            for i in range(count)
+        ])
+        return creator, pros
+
+    def _round(self, creator, pros, accept, options):
+        start = timezone.now() + timedelta(days=30)
+        event = Event.objects.create(
+            name="bench-accept", created_by=creator, start_datetime=start, end_datetime=start + timedelta(hours=3),
+        )
+        threads = [OfferThread.objects.create(event=event, professional=pro) for pro in pros]
+        offers = [
+            OfferMessage.objects.create(
+                thread=thread, sender_id=thread.professional_id, sender_type=OfferMessage.SenderType.PROFESSIONAL,
+                proposed_amount=Decimal("100"),
+            )
+            for thread in threads
+        ]
+
+        jobs = [(accept, (event.pk, thread.pk, offer.pk)) for thread, offer in zip(threads, offers)]
+        jobs += [(self._send_offer, (event.pk, threads[i % len(threads)].pk)) for i in range(options["offers"])]
+        random.Random(event.pk).shuffle(jobs)
+
+        gate = threading.Barrier(min(options["workers"], len(jobs)), timeout=60)
+        local = threading.local()
+
+        def run(job):
+            func, args = job
+            if not getattr(local, "started", False):
+                local.started = True
+                try:
+                    gate.wait()  # first job of every worker starts together
+                except threading.BrokenBarrierError:
+                    pass
+            started = time.perf_counter()
+            try:
+                outcome = func(*args)
+            except OperationalError:
+                outcome = "error"
+            finally:
+                connection.close()
+            return func, outcome, (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            results = list(pool.map(run, jobs))
+        elapsed = time.perf_counter() - started
+
+        event.refresh_from_db()
+        won = sum(1 for func, outcome, _ms in results if func != self._send_offer and outcome is True)
+        accepted = OfferMessage.objects.filter(thread__event=event, status=OfferMessage.Status.ACCEPTED)
+        # no offer is stored once the event is locked (_send_offer), so a newer
+        # offer in the thread was there before the accept: it superseded the accepted one
+        stale = accepted.exclude(thread__latest_proposal=F("pk")).count()
+        accepted = accepted.count()
+        stored = sum(1 for func, outcome, _ms in results if func == self._send_offer and outcome == "stored")
+        latencies = sorted(ms for _func, _outcome, ms in results)
+        consistent = (
+            event.is_locked
+            and event.accepted_thread is not None
+            and event.accepted_thread.professional_id == event.accepted_professional_id
+            and OfferMessage.objects.filter(
+                thread=event.accepted_thread, status=OfferMessage.Status.ACCEPTED,
+            ).count() == 1
+        )
+        return {
+            "throughput": len(jobs) / elapsed,
+            "p50": latencies[len(latencies) // 2],
+            "max": latencies[-1],
+            "won": won,
+            "accepted": accepted,
+            "stale": stale,
+            "offers": stored,
+            "errors": sum(1 for _func, outcome, _ms in results if outcome == "error"),
+            "ok": won == 1 and accepted == 1 and not stale and consistent,
+        }
+
+    # ---- operations, each on the worker's own connection ----
+
+    @staticmethod
+    def _accept_conditional(event_id, thread_id, offer_id):
+        event = Event.objects.get(pk=event_id)
+        thread = OfferThread.objects.get(pk=thread_id)
+        return event.accept_offer(thread, OfferMessage.objects.get(pk=offer_id))
+
+    @staticmethod
+    def _accept_legacy(event_id, thread_id, offer_id):
+        """The accept views before the conditional lock: read, then save, in one view-wide transaction."""
+        with transaction.atomic():
+            event = Event.objects.get(pk=event_id)
+            thread = OfferThread.objects.get(pk=thread_id)
+            offer = OfferMessage.objects.get(pk=offer_id)
+            event.is_locked = True
+            event.accepted_thread = thread
+            event.accepted_professional_id = thread.professional_id
+            event.save(update_fields=["is_locked", "accepted_thread", "accepted_professional"])
+            offer.status = OfferMessage.Status.ACCEPTED
+            offer.save(update_fields=["status"])
+        return True
+
+    @staticmethod
+    def _send_offer(event_id, thread_id):
+        """
+        SendOfferView's path: refuse once locked, otherwise store a pending
+        offer. The check runs after the insert, in its transaction: on SQLite,
+        where the insert holds the write lock, no offer is then stored after an
+        accept, so every offer newer than an accepted one was there when the
+        accept ran, which is what the stale column relies on.
+        """
+        thread = OfferThread.objects.get(pk=thread_id)
+        with transaction.atomic():
+            OfferMessage.objects.create(
+                thread=thread, sender_id=thread.professional_id, sender_type=OfferMessage.SenderType.PROFESSIONAL,
+                proposed_amount=Decimal("120"),
+            )
+            if Event.objects.filter(pk=event_id, is_locked=True).exists():
+                transaction.set_rollback(True)
+                return "refused"
+        return "stored"
@@ -0,0 +1,122 @@
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Accounts
+from events.calendar_utils import month_start_end, overlapping
+from events.models import BusyTime, Event, OfferThread
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark one month of calendar queries for professionals with several "
+        "years of bookings and busy times: the old __date / unbounded queries "
+        "against the timestamp-range ones. Synthetic rows are inserted inside a "
+        "transaction that is rolled back afterwards; still, do not run this "
+        "against production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--professionals", type=int, default=50, help="Professionals (default: 50).")
+        parser.add_argument("--years", type=int, default=5, help="Years of history each (default: 5).")
+        parser.add_argument(
+            "--per-week", type=int, default=4,
+            help="Bookings and busy times per professional per week (default: 4).",
+        )
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per query (default: 5).")
+
+    def handle(self, *args, **options):
+        if min(options["professionals"], options["years"], options["per_week"]) <= 0:
+            raise CommandError("--professionals, --years and --per-week must be positive.")
+
+        today = timezone.localdate()
+        history_start = today - timedelta(days=365 * options["years"])
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            pros = self._populate(options, history_start, today)
+            self.stdout.write(
+                f"{BusyTime.objects.filter(user__in=pros).count():,} busy times and "
+                f"{Event.objects.filter(accepted_professional__in=pros).count():,} bookings "
+                f"for {len(pros)} professionals ({time.perf_counter() - started:.1f}s)"
+            )
+
+            self.stdout.write(f"\n{'month':<10}{'query':<10}{'old ms':>10}{'new ms':>10}{'rows':>8}")
+            months = [(today.year, today.month), (history_start.year + 1, 6), (history_start.year, history_start.month)]
+            for year, month in months:
+                first_day, last_day = month_start_end(year, month)
+                pro = pros[0]
+
+                old_busy = lambda: list(BusyTime.objects.filter(
+                    user=pro, start_datetime__date__lte=last_day, end_datetime__date__gte=first_day,
+                ))
+                new_busy = lambda: list(BusyTime.objects.filter(overlapping(first_day, last_day), user=pro))
+                # the old booked query had no date bound at all
+                old_booked = lambda: list(Event.objects.filter(is_locked=True, accepted_thread__professional=pro))
+                new_booked = lambda: list(Event.objects.filter(
+                    overlapping(first_day, last_day), is_locked=True, accepted_professional=pro,
+                ))
+
+                label = f"{year}-{month:02d}"
+                for name, old, new in (("busy", old_busy, new_busy), ("booked", old_booked, new_booked)):
+                    old_ms = self._time(old, options["repeat"])
+                    new_ms = self._time(new, options["repeat"])
+                    self.stdout.write(f"{label:<10}{name:<10}{old_ms:>10.2f}{new_ms:>10.2f}{len(new()):>8}")
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("\nDone (synthetic data rolled back)."))
+
+    def _populate(self, options, history_start, today):
+        rng = random.Random(0)
+        creator = Accounts.objects.create(email="bench-cal-creator@bench.invalid", first_name="B", last_name="C", password="!")
+        pros = Accounts.objects.bulk_create([
+            Accounts(
+                email=f"bench-cal-{i}@bench.invalid", first_name="B", last_name=str(i),
+                account_type=Accounts.AccountType.PROFESSIONAL, password="!",
+            )
+            for i in range(options["professionals"])
+        ])
+        days = (today - history_start).days
+        per_pro = days * options["per_week"] // 7
+
+        def slot():
+            day = history_start + timedelta(days=rng.randrange(days))
+            start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+            start += timedelta(hours=rng.randrange(8, 20))
+            return start, start + timedelta(hours=rng.choice((2, 4, 30)))
+
+        for pro in pros:
+            busy = []
+            for _ in range(per_pro):
+                start, end = slot()
+                busy.append(BusyTime(user=pro, start_datetime=start, end_datetime=end))
+            BusyTime.objects.bulk_create(busy)
+
+            events = []
+            for i in range(per_pro):
+                start, end = slot()
+                events.append(Event(
+                    name=f"bench-{pro.pk}-{i}", created_by=creator, is_locked=True,
+                    accepted_professional=pro, start_datetime=start, end_datetime=end,
+                ))
+            events = Event.objects.bulk_create(events)
+            threads = OfferThread.objects.bulk_create([OfferThread(event=e, professional=pro) for e in events])
+            for event, thread in zip(events, threads):
+                event.accepted_thread = thread
+            Event.objects.bulk_update(events, ["accepted_thread"], batch_size=1_000)
+        return pros
+
+    @staticmethod
+    def _time(func, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
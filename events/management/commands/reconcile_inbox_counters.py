@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from events.models import InboxCounters
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare every stored InboxCounters row with the threads, read cursors and "
+        "events it summarises, report drift and repair it. Messages and reads adjust "
+        "the counters in place; run this after bulk imports, raw SQL edits or if the "
+        "inbox stats are suspected to have drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            dest="user_id",
+            help="Only reconcile the counters of this account id.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report drift without repairing it.",
+        )
+
+    def handle(self, *args, **options):
+        rows = InboxCounters.objects.order_by("pk")
+        if options.get("user_id"):
+            rows = rows.filter(pk=options["user_id"])
+
+        checked = drifted = 0
+        for counters in rows.iterator():
+            checked += 1
+            with transaction.atomic():
+                expected = InboxCounters.compute(counters.user_id)
+                diff = {
+                    name: (getattr(counters, name), value)
+                    for name, value in expected.items()
+                    if getattr(counters, name) != value
+                }
+                if not diff:
+                    continue
+                drifted += 1
+                self.stdout.write(
+                    f"user {counters.user_id}: "
+                    + ", ".join(f"{name} {stored} -> {value}" for name, (stored, value) in diff.items())
+                )
+                if not options["dry_run"]:
+                    InboxCounters.objects.filter(pk=counters.pk).update(updated_at=timezone.now(), **expected)
+
+        verb = "Found" if options["dry_run"] else "Repaired"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} counter row(s). {verb} drift in {drifted}."))
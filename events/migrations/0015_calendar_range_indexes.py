@@ -0,0 +1,54 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:10
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_accepted_professional(apps, schema_editor):
+    # the booked-events index is keyed on accepted_professional, which one of
+    # the accept paths used to leave empty
+    Event = apps.get_model("events", "Event")
+    OfferThread = apps.get_model("events", "OfferThread")
+    Event.objects.filter(
+        is_locked=True, accepted_thread__isnull=False, accepted_professional__isnull=True
+    ).update(
+        accepted_professional=Subquery(
+            OfferThread.objects.filter(pk=OuterRef("accepted_thread")).values("professional")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0025_profession_depth"),
+        ("events", "0014_eventcategory_depth"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_accepted_professional, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="busytime",
+            index=models.Index(
+                fields=["user", "start_datetime", "end_datetime"],
+                name="busytime_user_range_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["created_by", "start_datetime", "end_datetime"],
+                name="event_creator_range_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                condition=models.Q(("is_locked", True)),
+                fields=["accepted_professional", "start_datetime", "end_datetime"],
+                name="event_booked_range_idx",
+            ),
+        ),
+    ]
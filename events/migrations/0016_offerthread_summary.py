@@ -0,0 +1,119 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+
+
+def backfill_summary(apps, schema_editor):
+    OfferThread = apps.get_model("events", "OfferThread")
+    OfferMessage = apps.get_model("events", "OfferMessage")
+    Event = apps.get_model("events", "Event")
+
+    messages = OfferMessage.objects.filter(thread=OuterRef("pk")).order_by(
+        "-created_at", "-id"
+    )
+    OfferThread.objects.update(
+        creator=Subquery(
+            Event.objects.filter(pk=OuterRef("event")).values("created_by")[:1]
+        ),
+        last_message=Subquery(messages.values("pk")[:1]),
+        last_message_at=Subquery(messages.values("created_at")[:1]),
+        last_message_preview=Coalesce(
+            Substr(Subquery(messages.values("message")[:1]), 1, 100), Value("")
+        ),
+        message_count=Coalesce(
+            Subquery(
+                OfferMessage.objects.filter(thread=OuterRef("pk"))
+                .order_by()
+                .values("thread")
+                .annotate(n=Count("pk"))
+                .values("n")
+            ),
+            Value(0),
+        ),
+        latest_proposal=Subquery(
+            messages.filter(proposed_amount__isnull=False).values("pk")[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0015_calendar_range_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="offerthread",
+            name="creator",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="received_offer_threads",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="offerthread",
+            name="last_message",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="events.offermessage",
+            ),
+        ),
+        migrations.AddField(
+            model_name="offerthread",
+            name="last_message_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="offerthread",
+            name="last_message_preview",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=100
+            ),
+        ),
+        migrations.AddField(
+            model_name="offerthread",
+            name="latest_proposal",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="events.offermessage",
+            ),
+        ),
+        migrations.AddField(
+            model_name="offerthread",
+            name="message_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_summary, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="offerthread",
+            index=models.Index(
+                fields=["professional", "-last_message_at"],
+                name="offerthread_pro_inbox_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="offerthread",
+            index=models.Index(
+                fields=["creator", "-last_message_at"],
+                name="offerthread_creator_inbox_idx",
+            ),
+        ),
+    ]
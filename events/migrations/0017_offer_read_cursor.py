@@ -0,0 +1,94 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def start_read(apps, schema_editor):
+    # existing conversations start out read for both participants rather than
+    # flooding every inbox with unread badges
+    OfferThread = apps.get_model("events", "OfferThread")
+    OfferReadCursor = apps.get_model("events", "OfferReadCursor")
+    threads = OfferThread.objects.exclude(last_message__isnull=True).values_list(
+        "pk", "professional_id", "creator_id", "last_message_id", "message_count"
+    )
+    cursors = []
+    for (
+        pk,
+        professional_id,
+        creator_id,
+        last_message_id,
+        message_count,
+    ) in threads.iterator():
+        for user_id in {professional_id, creator_id} - {None}:
+            cursors.append(
+                OfferReadCursor(
+                    thread_id=pk,
+                    user_id=user_id,
+                    last_read_message_id=last_message_id,
+                    read_count=message_count,
+                )
+            )
+    OfferReadCursor.objects.bulk_create(cursors, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0016_offerthread_summary"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OfferReadCursor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("read_count", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "last_read_message",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="events.offermessage",
+                    ),
+                ),
+                (
+                    "thread",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="read_cursors",
+                        to="events.offerthread",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="offer_read_cursors",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "thread"), name="offer_read_cursor_unique"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(start_read, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0025_profession_depth"),
+        ("events", "0018_push_event"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InboxCounters",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="inbox_counters",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("threads_as_professional", models.PositiveIntegerField(default=0)),
+                ("threads_as_creator", models.PositiveIntegerField(default=0)),
+                ("locked_as_professional", models.PositiveIntegerField(default=0)),
+                ("locked_as_creator", models.PositiveIntegerField(default=0)),
+                ("accepted_as_professional", models.PositiveIntegerField(default=0)),
+                ("accepted_as_creator", models.PositiveIntegerField(default=0)),
+                ("events_created", models.PositiveIntegerField(default=0)),
+                ("events_posted", models.PositiveIntegerField(default=0)),
+                ("unread_threads", models.PositiveIntegerField(default=0)),
+                ("unread_count", models.PositiveIntegerField(default=0)),
+                ("last_activity", models.DateTimeField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0025_profession_depth"),
+        ("events", "0019_inbox_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="offermessage",
+            index=models.Index(
+                fields=["thread", "-created_at", "-id"],
+                name="offermessage_thread_recent_idx",
+            ),
+        ),
+    ]
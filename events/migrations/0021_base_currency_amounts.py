@@ -0,0 +1,39 @@
+# Generated by Django 5.2.9 on 2026-10-16 20:40
+
+from django.db import migrations, models
+
+from accounts.rates import base_amount_expression, load_matrix
+
+
+def backfill_event_budget_base(apps, schema_editor):
+    matrix = load_matrix(
+        apps.get_model("accounts", "Currency"),
+        apps.get_model("accounts", "ExchangeRate"),
+    )
+    apps.get_model("events", "Event").objects.update(
+        event_budget_base=base_amount_expression("event_budget", matrix=matrix)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0026_base_currency_amounts"),
+        ("events", "0020_offermessage_thread_recent_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="event_budget_base",
+            field=models.DecimalField(
+                blank=True,
+                db_index=True,
+                decimal_places=2,
+                editable=False,
+                max_digits=14,
+                null=True,
+            ),
+        ),
+        migrations.RunPython(backfill_event_budget_base, migrations.RunPython.noop),
+    ]
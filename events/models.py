@@ -1,51 +1,27 @@
 from django.conf import settings
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, Greatest, Substr
+from django.db.models.lookups import GreaterThan
 from django.core.validators import MinValueValidator
 from django.utils import timezone
-class EventCategory(models.Model):
-    name = models.CharField(max_length=120)
-    parent = models.ForeignKey(
-        "self",
-        null=True,
-        blank=True,
-        related_name="children",
-        on_delete=models.CASCADE,
-    )
 
-    path = models.CharField(max_length=600, blank=True, db_index=True)
+from accounts import rates
+from showdan.tree import TreeNode
+
+
+class EventCategory(TreeNode):
+    name = models.CharField(max_length=120)
 
     class Meta:
         verbose_name_plural = "Event categories"
         unique_together = ("name", "parent")
         ordering = ["path"]
 
-    def get_depth(self):
-        depth = 0
-        p = self.parent
-        while p:
-            depth += 1
-            p = p.parent
-        return depth
-
     def __str__(self):
-        indent = "— " * self.get_depth()
+        indent = "— " * self.depth
         return f"{indent}{self.name}"
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-
-        if self.parent_id:
-            parent_path = EventCategory.objects.filter(pk=self.parent_id).values_list("path", flat=True).first() or ""
-            new_path = f"{parent_path}/{self.pk:06d}.{self.name.lower()}"
-        else:
-            new_path = f"{self.pk:06d}.{self.name.lower()}"
-
-        if self.path != new_path:
-            EventCategory.objects.filter(pk=self.pk).update(path=new_path)
-            for child in self.children.all():
-                child.save()
-
-
 
 class Event(models.Model):
     name = models.CharField(max_length=200)
@@ -91,6 +67,16 @@ class Event(models.Model):
         null=True,
         blank=True,
     )
+    # event_budget in the base currency, for cross-currency filters and
+    # sorting (set on save, recomputed when exchange rates change)
+    event_budget_base = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+    )
     # ✅ lock event once an offer is accepted
     is_locked = models.BooleanField(default=False)
     is_posted = models.BooleanField(default=True)
@@ -117,12 +103,31 @@ class Event(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # calendar range scans: events a user created / was booked for
+            models.Index(
+                fields=["created_by", "start_datetime", "end_datetime"],
+                name="event_creator_range_idx",
+            ),
+            models.Index(
+                fields=["accepted_professional", "start_datetime", "end_datetime"],
+                condition=models.Q(is_locked=True),
+                name="event_booked_range_idx",
+            ),
+        ]
+
     def save(self, *args, **kwargs):
         if self.created_by:
             if not self.country:
                 self.country = getattr(self.created_by, "country", "") or ""
             if not self.city:
                 self.city = getattr(self.created_by, "city", "") or ""
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"event_budget", "currency"}.intersection(update_fields):
+            self.event_budget_base = rates.to_base(self.event_budget, self.currency_id, fresh=True)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "event_budget_base"}
         super().save(*args, **kwargs)
 
     def clean(self):
@@ -140,6 +145,48 @@ class Event(models.Model):
             from django.core.exceptions import ValidationError
             raise ValidationError({"advance_payment": "Advance payment cannot be greater than event budget."})
 
+    def accept_offer(self, thread, offer=None):
+        """
+        Lock the event for ``thread`` and mark ``offer`` accepted. Returns
+        False, changing nothing, when the event is already locked or ``offer``
+        is no longer the thread's latest pending proposal (a counter-offer
+        arrived, or it was rejected, after the caller read it).
+
+        The lock is one conditional ``UPDATE ... WHERE is_locked = false``
+        that also checks the offer: of any number of concurrent accepts
+        exactly one matches, without reading the row first or holding a
+        transaction across the request. ``.update()`` skips the save signals,
+        so their side effects (calendar cache, inbox counters, push) run
+        through ``signals.offer_accepted``, after commit: the transaction
+        holding the write lock covers only the two UPDATEs, however many
+        professionals bid on the event.
+        """
+        from .signals import offer_accepted
+
+        events = Event.objects.filter(pk=self.pk, is_locked=False)
+        if offer is not None:
+            events = events.filter(
+                models.Exists(OfferThread.objects.filter(pk=thread.pk, latest_proposal_id=offer.pk)),
+                models.Exists(OfferMessage.objects.filter(pk=offer.pk, status=OfferMessage.Status.PENDING)),
+            )
+        with transaction.atomic():
+            won = events.update(
+                is_locked=True, accepted_thread=thread, accepted_professional_id=thread.professional_id,
+            )
+            if not won:
+                return False
+            if offer is not None:
+                pending = OfferMessage.objects.filter(pk=offer.pk, status=OfferMessage.Status.PENDING)
+                if not pending.update(status=OfferMessage.Status.ACCEPTED):  # rejected meanwhile
+                    transaction.set_rollback(True)
+                    return False
+                offer.status = OfferMessage.Status.ACCEPTED
+            self.is_locked = True
+            self.accepted_thread = thread
+            self.accepted_professional_id = thread.professional_id
+            transaction.on_commit(lambda: offer_accepted(self, offer))
+        return True
+
     def __str__(self):
         return self.name
 
@@ -147,19 +194,87 @@ class Event(models.Model):
 class OfferThread(models.Model):
     """
     One private conversation thread per (event, professional).
+
+    The inbox summary (last message, preview, count, latest proposal) is kept
+    on the thread by ``OfferMessage.save()`` so listing threads never has to
+    aggregate the message table.
     """
+    PREVIEW_LENGTH = 100
+
     event = models.ForeignKey("events.Event", on_delete=models.CASCADE, related_name="offer_threads")
     professional = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="offer_threads")
+    # copy of event.created_by, so both participants have an inbox index
+    creator = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True, blank=True,
+        on_delete=models.CASCADE,
+        related_name="received_offer_threads",
+        editable=False,
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # conversation summary
+    last_message_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_message = models.ForeignKey(
+        "events.OfferMessage",
+        null=True, blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        editable=False,
+    )
+    last_message_preview = models.CharField(max_length=PREVIEW_LENGTH, blank=True, default="", editable=False)
+    message_count = models.PositiveIntegerField(default=0, editable=False)
+    latest_proposal = models.ForeignKey(
+        "events.OfferMessage",
+        null=True, blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        editable=False,
+    )
+
     class Meta:
         unique_together = ("event", "professional")
+        indexes = [
+            models.Index(fields=["professional", "-last_message_at"], name="offerthread_pro_inbox_idx"),
+            models.Index(fields=["creator", "-last_message_at"], name="offerthread_creator_inbox_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.creator_id is None and self.event_id:
+            self.creator_id = self.event.created_by_id
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Thread: {self.event_id} / {self.professional_id}"
 
 
+def summary_from_messages():
+    """
+    ``OfferThread`` summary columns as subqueries over the thread's messages,
+    for ``OfferThread.objects.filter(...).update(**summary_from_messages())``.
+    """
+    messages = OfferMessage.objects.filter(thread=models.OuterRef("pk")).order_by("-created_at", "-id")
+    return {
+        "last_message_id": models.Subquery(messages.values("pk")[:1]),
+        "last_message_at": models.Subquery(messages.values("created_at")[:1]),
+        "last_message_preview": Coalesce(
+            Substr(models.Subquery(messages.values("message")[:1]), 1, OfferThread.PREVIEW_LENGTH),
+            models.Value(""),
+        ),
+        "message_count": Coalesce(
+            models.Subquery(
+                OfferMessage.objects.filter(thread=models.OuterRef("pk")).order_by()
+                .values("thread").annotate(n=models.Count("pk")).values("n")
+            ),
+            models.Value(0),
+        ),
+        "latest_proposal_id": models.Subquery(
+            messages.filter(proposed_amount__isnull=False).values("pk")[:1]
+        ),
+    }
+
+
 class OfferMessage(models.Model):
     class SenderType(models.TextChoices):
         PROFESSIONAL = "professional", "Professional"
@@ -203,6 +318,44 @@ class OfferMessage(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            # newest-first history windows of a thread (events.inbox.message_window)
+            models.Index(fields=["thread", "-created_at", "-id"], name="offermessage_thread_recent_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+            if adding:
+                self._update_thread_summary()
+
+    def _update_thread_summary(self):
+        """
+        One UPDATE on the thread: bump the count and, unless a newer message
+        already got there first, point the summary at this message.
+        """
+        newer = models.Q(last_message_at__isnull=True) | models.Q(last_message_at__lte=self.created_at)
+
+        def if_newer(value, current):
+            return models.Case(
+                models.When(newer, then=models.Value(value)),
+                default=models.F(current),
+                output_field=OfferThread._meta.get_field(current),
+            )
+
+        fields = {
+            "message_count": models.F("message_count") + 1,
+            "last_message_at": if_newer(self.created_at, "last_message_at"),
+            "last_message": if_newer(self.pk, "last_message"),
+            "last_message_preview": if_newer(self.message[:OfferThread.PREVIEW_LENGTH], "last_message_preview"),
+        }
+        if self.proposed_amount is not None:
+            fields["latest_proposal"] = if_newer(self.pk, "latest_proposal")
+        OfferThread.objects.filter(pk=self.thread_id).update(**fields)
+        InboxCounters.message_added(self.thread_id, self.created_at)
+        # replying means the sender has read the thread
+        OfferReadCursor.mark_read(self.thread_id, self.sender_id)
 
     def __str__(self):
         return f"{self.thread_id} - {self.sender_type} - {self.status}"
@@ -225,6 +378,217 @@ class BusyTime(models.Model):
 
     class Meta:
         ordering = ["-start_datetime"]
+        indexes = [
+            models.Index(fields=["user", "start_datetime", "end_datetime"], name="busytime_user_range_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} busy {self.start_datetime} -> {self.end_datetime}"
+
+class OfferReadCursor(models.Model):
+    """
+    How far a participant has read an offer thread. Unread state is the
+    thread summary compared with the cursor: ``message_count - read_count``
+    unread messages, nothing unread once ``last_read_message`` reaches
+    ``thread.last_message``. Message rows are never counted.
+    """
+    thread = models.ForeignKey("events.OfferThread", on_delete=models.CASCADE, related_name="read_cursors")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="offer_read_cursors")
+
+    last_read_message = models.ForeignKey(
+        "events.OfferMessage",
+        null=True, blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    # thread.message_count when the cursor last moved
+    read_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "thread"], name="offer_read_cursor_unique"),
+        ]
+
+    @classmethod
+    def mark_read(cls, thread_id, user_id):
+        """Move ``user_id``'s cursor to the end of the thread (one upsert)."""
+        summary = OfferThread.objects.filter(pk=thread_id).values("last_message_id", "message_count").first()
+        if summary is None:
+            return
+        read_before = (
+            cls.objects.filter(thread_id=thread_id, user_id=user_id).values_list("read_count", flat=True).first() or 0
+        )
+        cls.objects.bulk_create(
+            [cls(
+                thread_id=thread_id, user_id=user_id,
+                last_read_message_id=summary["last_message_id"], read_count=summary["message_count"],
+                updated_at=timezone.now(),
+            )],
+            update_conflicts=True,
+            unique_fields=["user", "thread"],
+            update_fields=["last_read_message", "read_count", "updated_at"],
+        )
+        InboxCounters.thread_read(user_id, summary["message_count"] - read_before)
+
+    def __str__(self):
+        return f"{self.user_id} read {self.thread_id} up to {self.last_read_message_id}"
+
+
+class PushEvent(models.Model):
+    """
+    Outbox of pushed inbox events, used by ``events.push.SharedTableBroker``
+    to fan out across workers and to replay missed events. Rows are pruned
+    after a few minutes.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    kind = models.CharField(max_length=32)
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.kind} for {self.user_id}"
+
+
+class InboxCounters(models.Model):
+    """
+    Per-user offer inbox statistics, read in one primary-key lookup by the
+    stats endpoints instead of counting threads on every request.
+
+    New messages and reads adjust the counters in place (the hot paths);
+    rarer changes (threads created or deleted, events locked, posted or
+    deleted) recompute the affected users with ``refresh()``. Rows are built
+    on first read by ``for_user()``. ``manage.py reconcile_inbox_counters``
+    verifies and repairs drift.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name="inbox_counters",
+    )
+
+    threads_as_professional = models.PositiveIntegerField(default=0)
+    threads_as_creator = models.PositiveIntegerField(default=0)
+    # threads on locked events / threads that are the accepted one
+    locked_as_professional = models.PositiveIntegerField(default=0)
+    locked_as_creator = models.PositiveIntegerField(default=0)
+    accepted_as_professional = models.PositiveIntegerField(default=0)
+    accepted_as_creator = models.PositiveIntegerField(default=0)
+
+    events_created = models.PositiveIntegerField(default=0)
+    events_posted = models.PositiveIntegerField(default=0)
+
+    unread_threads = models.PositiveIntegerField(default=0)
+    unread_count = models.PositiveIntegerField(default=0)
+    last_activity = models.DateTimeField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    COUNTER_FIELDS = (
+        "threads_as_professional", "threads_as_creator",
+        "locked_as_professional", "locked_as_creator",
+        "accepted_as_professional", "accepted_as_creator",
+        "events_created", "events_posted",
+        "unread_threads", "unread_count", "last_activity",
+    )
+
+    @property
+    def total_threads(self):
+        return self.threads_as_professional + self.threads_as_creator
+
+    @property
+    def locked_threads(self):
+        return self.locked_as_professional + self.locked_as_creator
+
+    @property
+    def pending_threads(self):
+        return self.total_threads - self.locked_threads
+
+    @property
+    def accepted_threads(self):
+        return self.accepted_as_professional + self.accepted_as_creator
+
+    @property
+    def open_offers(self):
+        return self.threads_as_creator - self.locked_as_creator
+
+    # ---- full recompute ----
+
+    @staticmethod
+    def compute(user_id):
+        """The counters for ``user_id`` from the source tables (two queries)."""
+        from .inbox import participant_q, unread_count_expression
+
+        as_pro, as_creator = models.Q(professional_id=user_id), models.Q(creator_id=user_id)
+        locked = models.Q(event__is_locked=True)
+        accepted = locked & models.Q(event__accepted_thread=models.F("pk"))
+        # inlined rather than annotated: aggregating over an annotation would
+        # wrap the query in a subquery
+        unread = unread_count_expression(user_id)
+        values = OfferThread.objects.filter(participant_q(user_id)).aggregate(
+            threads_as_professional=models.Count("pk", filter=as_pro),
+            threads_as_creator=models.Count("pk", filter=as_creator),
+            locked_as_professional=models.Count("pk", filter=as_pro & locked),
+            locked_as_creator=models.Count("pk", filter=as_creator & locked),
+            accepted_as_professional=models.Count("pk", filter=as_pro & accepted),
+            accepted_as_creator=models.Count("pk", filter=as_creator & accepted),
+            unread_threads=models.Count("pk", filter=GreaterThan(unread, 0)),
+            unread_count=Coalesce(models.Sum(unread), 0),
+            last_activity=models.Max("last_message_at"),
+        )
+        values.update(Event.objects.filter(created_by_id=user_id).aggregate(
+            events_created=models.Count("pk"),
+            events_posted=models.Count("pk", filter=models.Q(is_posted=True)),
+        ))
+        return values
+
+    @classmethod
+    def for_user(cls, user_id):
+        counters = cls.objects.filter(user_id=user_id).first()
+        if counters is None:
+            counters = cls(user_id=user_id, **cls.compute(user_id))
+            cls.objects.bulk_create(
+                [counters], update_conflicts=True, unique_fields=["user"],
+                update_fields=[*cls.COUNTER_FIELDS, "updated_at"],
+            )
+        return counters
+
+    @classmethod
+    def refresh(cls, *user_ids):
+        """Recompute the existing rows of ``user_ids`` (missing rows are built on read)."""
+        existing = cls.objects.filter(user_id__in={pk for pk in user_ids if pk}).values_list("user_id", flat=True)
+        for user_id in list(existing):
+            cls.objects.filter(user_id=user_id).update(updated_at=timezone.now(), **cls.compute(user_id))
+
+    # ---- in-place updates ----
+
+    @classmethod
+    def message_added(cls, thread_id, created_at):
+        """A message was added to ``thread_id`` (after the thread summary moved)."""
+        thread = OfferThread.objects.filter(pk=thread_id).values("professional_id", "creator_id", "message_count").first()
+        if thread is None:
+            return
+        user_ids = {thread["professional_id"], thread["creator_id"]} - {None}
+        read = dict(
+            OfferReadCursor.objects.filter(thread_id=thread_id, user_id__in=user_ids).values_list("user_id", "read_count")
+        )
+        at = models.Value(created_at)
+        for user_id in user_ids:
+            # the thread just went from read to unread for this user
+            became_unread = thread["message_count"] - read.get(user_id, 0) == 1
+            cls.objects.filter(user_id=user_id).update(
+                unread_count=models.F("unread_count") + 1,
+                unread_threads=models.F("unread_threads") + int(became_unread),
+                last_activity=Greatest(Coalesce("last_activity", at), at),
+            )
+
+    @classmethod
+    def thread_read(cls, user_id, unread_before):
+        """``user_id`` read a thread that had ``unread_before`` unread messages."""
+        if unread_before <= 0:
+            return
+        cls.objects.filter(user_id=user_id).update(
+            unread_count=Greatest(models.F("unread_count") - unread_before, 0),
+            unread_threads=Greatest(models.F("unread_threads") - 1, 0),
+        )
 
     def __str__(self):
-        return f"{self.user_id} busy {self.start_datetime} -> {self.end_datetime}"
\ No newline at end of file
+        return f"Inbox counters of {self.user_id}"
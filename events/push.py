@@ -0,0 +1,195 @@
+"""
+Server push for the offers inbox.
+
+Committed offer activity (new messages, offer status changes, events getting
+locked) is published per user; ``events.views_push.offers_stream_view`` relays
+it to the user's open Server-Sent Events connections, so clients no longer
+poll the inbox to notice new messages.
+
+Events are ``{"id": ..., "kind": ..., "data": {...}}`` dicts. Kinds:
+
+- ``message``: a new message in one of the user's threads
+- ``offer_status``: a proposal was accepted or rejected
+- ``event_locked``: an event the user created or bid on got locked
+- ``resync``: the connection fell behind and dropped events; refetch
+
+Brokers:
+
+- ``InProcessBroker`` (default): subscribers live in this process. Enough
+  for a single ASGI worker, and for tests.
+- ``SharedTableBroker``: a local stand-in for a pub/sub server when several
+  workers serve the stream. ``publish()`` appends to the ``PushEvent`` table
+  and one poller thread per process fans new rows out to local subscribers.
+  Rows also let reconnecting clients replay what they missed (Last-Event-ID).
+
+``settings.OFFER_PUSH_BROKER`` (dotted path) selects the broker.
+"""
+import asyncio
+import itertools
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+MESSAGE = "message"
+OFFER_STATUS = "offer_status"
+EVENT_LOCKED = "event_locked"
+RESYNC = "resync"
+
+# events buffered per connection before it is told to resync
+QUEUE_SIZE = 100
+
+
+class Subscription:
+    """One open stream: a queue fed from any thread, drained on its event loop."""
+
+    def __init__(self, user_id, loop=None):
+        self.user_id = user_id
+        self.loop = loop or asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def push(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # the client is too slow: drop the backlog, ask it to refetch
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"id": None, "kind": RESYNC, "data": {}})
+
+    async def get(self, timeout):
+        """Next event, or None after ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InProcessBroker:
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, user_id, loop=None):
+        subscription = Subscription(user_id, loop)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_ids, kind, data):
+        self._deliver([(user_id, {"id": next(self._ids), "kind": kind, "data": data}) for user_id in user_ids])
+
+    def replay(self, user_id, last_event_id):
+        """Events after ``last_event_id`` (nothing is kept in process)."""
+        return []
+
+    def _deliver(self, events):
+        with self._lock:
+            targets = [
+                (subscription, event)
+                for user_id, event in events
+                for subscription in self._subscribers.get(user_id, ())
+            ]
+        for subscription, event in targets:
+            subscription.push(event)
+
+
+class SharedTableBroker(InProcessBroker):
+    poll_interval = 0.5
+    retention = 60 * 10  # seconds PushEvent rows are kept for replay
+
+    def __init__(self):
+        super().__init__()
+        self._last_id = None
+        self._poller = None
+
+    def subscribe(self, user_id, loop=None):
+        subscription = super().subscribe(user_id, loop)
+        self._ensure_poller()
+        return subscription
+
+    def publish(self, user_ids, kind, data):
+        from .models import PushEvent
+
+        PushEvent.objects.bulk_create([PushEvent(user_id=user_id, kind=kind, data=data) for user_id in user_ids])
+
+    def replay(self, user_id, last_event_id):
+        from .models import PushEvent
+
+        rows = PushEvent.objects.filter(user_id=user_id, pk__gt=last_event_id).order_by("pk")[:QUEUE_SIZE]
+        return [self._as_event(row) for row in rows]
+
+    def poll(self):
+        """Fan rows published since the last poll out to local subscribers."""
+        from .models import PushEvent
+
+        if self._last_id is None:
+            self._last_id = PushEvent.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+            return
+        rows = list(PushEvent.objects.filter(pk__gt=self._last_id).order_by("pk")[:1000])
+        if rows:
+            self._last_id = rows[-1].pk
+            self._deliver([(row.user_id, self._as_event(row)) for row in rows])
+
+    def prune(self):
+        from .models import PushEvent
+
+        PushEvent.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=self.retention)).delete()
+
+    def _ensure_poller(self):
+        with self._lock:
+            if self._poller is None or not self._poller.is_alive():
+                self._poller = threading.Thread(target=self._run_poller, name="offer-push-poller", daemon=True)
+                self._poller.start()
+
+    def _run_poller(self):
+        last_prune = 0
+        while True:
+            close_old_connections()
+            try:
+                self.poll()
+                if time.monotonic() - last_prune > self.retention:
+                    self.prune()
+                    last_prune = time.monotonic()
+            except Exception:
+                # a failed poll (e.g. the database restarting) is retried
+                pass
+            time.sleep(self.poll_interval)
+
+    @staticmethod
+    def _as_event(row):
+        return {"id": row.pk, "kind": row.kind, "data": row.data}
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        path = getattr(settings, "OFFER_PUSH_BROKER", None)
+        _broker = (import_string(path) if path else InProcessBroker)()
+    return _broker
+
+
+def publish(user_ids, kind, data):
+    """Publish to ``user_ids`` once the current transaction commits."""
+    user_ids = sorted({pk for pk in user_ids if pk})
+    if user_ids:
+        transaction.on_commit(lambda: get_broker().publish(user_ids, kind, data))
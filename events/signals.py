@@ -0,0 +1,226 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from accounts import rates
+from showdan import filter_options
+
+from . import calendar_projection, push
+from .models import BusyTime, Event, EventCategory, InboxCounters, OfferMessage, OfferThread, summary_from_messages
+
+# Event columns feeding the events filter options (budget range, locations)
+OPTION_FIELDS = ("event_budget", "event_budget_base", "is_posted", "country", "city")
+
+
+# ==================== Filter options versions ====================
+
+@receiver(post_save, sender=EventCategory)
+@receiver(post_delete, sender=EventCategory)
+def event_category_changed_bump(sender, **kwargs):
+    if kwargs.get("raw"):
+        return
+    filter_options.bump_version(filter_options.EVENTS)
+
+
+@receiver(pre_save, sender=Event)
+def event_remember_options(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._previous_options = None
+    if raw or not instance.pk:
+        return
+    if update_fields is not None and not set(OPTION_FIELDS).intersection(update_fields):
+        return
+    instance._previous_options = (
+        Event.objects.filter(pk=instance.pk).values_list(*OPTION_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=Event)
+def event_saved_bump(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_options", None)
+    current = tuple(getattr(instance, name) for name in OPTION_FIELDS)
+    if (created and instance.is_posted) or (previous is not None and previous != current):
+        filter_options.bump_version(filter_options.EVENTS)
+
+
+@receiver(post_delete, sender=Event)
+def event_deleted_bump(sender, instance, **kwargs):
+    if instance.is_posted:
+        filter_options.bump_version(filter_options.EVENTS)
+
+
+@receiver(rates.rates_changed)
+def exchange_rates_changed_recompute_budgets(sender, **kwargs):
+    Event.objects.filter(event_budget__isnull=False).update(
+        event_budget_base=rates.base_amount_expression("event_budget"),
+    )
+    filter_options.bump_version(filter_options.EVENTS)
+
+
+# ==================== Calendar month cache ====================
+
+@receiver(post_save, sender=BusyTime)
+@receiver(post_delete, sender=BusyTime)
+def busy_time_changed_invalidate(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    calendar_projection.invalidate(instance.user_id)
+
+
+@receiver(pre_save, sender=Event)
+def event_remember_booking(sender, instance, raw=False, **kwargs):
+    instance._previous_booking = None
+    if raw or not instance.pk:
+        return
+    instance._previous_booking = (
+        Event.objects.filter(pk=instance.pk)
+        .values_list("accepted_professional_id", "is_locked", "accepted_thread_id", "is_posted")
+        .first()
+    )
+
+
+@receiver(post_save, sender=Event)
+def event_saved_invalidate(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # the creator always sees their events; the professional only locked bookings
+    affected = [instance.created_by_id]
+    if instance.is_locked:
+        affected.append(instance.accepted_professional_id)
+    previous = getattr(instance, "_previous_booking", None)
+    if previous and previous[1]:
+        affected.append(previous[0])
+    calendar_projection.invalidate(*affected)
+
+
+@receiver(post_delete, sender=Event)
+def event_deleted_invalidate(sender, instance, **kwargs):
+    calendar_projection.invalidate(
+        instance.created_by_id, instance.accepted_professional_id if instance.is_locked else None,
+    )
+
+
+# ==================== Offer thread summary ====================
+
+@receiver(post_delete, sender=OfferMessage)
+def offer_message_deleted_refresh(sender, instance, **kwargs):
+    # creation is handled by OfferMessage.save(); on deletes recompute (a
+    # no-op UPDATE when the whole thread is being deleted)
+    OfferThread.objects.filter(pk=instance.thread_id).update(**summary_from_messages())
+
+
+# ==================== Inbox counters ====================
+# New messages and reads adjust the counters in place (see InboxCounters);
+# the rarer structural changes below recompute the users involved.
+
+@receiver(post_save, sender=OfferThread)
+@receiver(post_delete, sender=OfferThread)
+def offer_thread_changed_counters(sender, instance, created=True, raw=False, **kwargs):
+    if raw or not created:
+        return
+    InboxCounters.refresh(instance.professional_id, instance.creator_id)
+
+
+@receiver(post_delete, sender=OfferMessage)
+def offer_message_deleted_counters(sender, instance, **kwargs):
+    thread = OfferThread.objects.filter(pk=instance.thread_id).values_list("professional_id", "creator_id").first()
+    if thread:
+        InboxCounters.refresh(*thread)
+
+
+@receiver(post_save, sender=Event)
+def event_saved_counters(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_booking", None)
+    if created or previous is None:
+        InboxCounters.refresh(instance.created_by_id)
+        return
+    _, was_locked, was_accepted, was_posted = previous
+    if (was_locked, was_accepted) != (instance.is_locked, instance.accepted_thread_id):
+        # locking moves every thread of the event from pending to locked
+        bidders = OfferThread.objects.filter(event=instance).values_list("professional_id", flat=True)
+        InboxCounters.refresh(instance.created_by_id, *bidders)
+    elif was_posted != instance.is_posted:
+        InboxCounters.refresh(instance.created_by_id)
+
+
+@receiver(post_delete, sender=Event)
+def event_deleted_counters(sender, instance, **kwargs):
+    InboxCounters.refresh(instance.created_by_id)
+
+
+# ==================== Server push ====================
+
+def _message_payload(message):
+    return {
+        "thread": message.thread_id,
+        "event": message.thread.event_id,
+        "message": message.pk,
+        "sender": message.sender_id,
+        "sender_type": message.sender_type,
+        "preview": message.message[:OfferThread.PREVIEW_LENGTH],
+        "proposed_amount": message.proposed_amount,
+        "status": message.status,
+        "created_at": message.created_at,
+    }
+
+
+@receiver(pre_save, sender=OfferMessage)
+def offer_message_remember_status(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._previous_status = None
+    if raw or not instance.pk or (update_fields is not None and "status" not in update_fields):
+        return
+    instance._previous_status = OfferMessage.objects.filter(pk=instance.pk).values_list("status", flat=True).first()
+
+
+@receiver(post_save, sender=OfferMessage)
+def offer_message_saved_push(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    thread = instance.thread
+    previous = getattr(instance, "_previous_status", None)
+    if created:
+        push.publish([thread.professional_id, thread.creator_id], push.MESSAGE, _message_payload(instance))
+    elif previous is not None and previous != instance.status:
+        push.publish([thread.professional_id, thread.creator_id], push.OFFER_STATUS, _message_payload(instance))
+
+
+def _publish_event_locked(event, bidders):
+    # everyone who bid learns the event is taken
+    push.publish(
+        [event.created_by_id, *bidders],
+        push.EVENT_LOCKED,
+        {
+            "event": event.pk,
+            "accepted_thread": event.accepted_thread_id,
+            "accepted_professional": event.accepted_professional_id,
+        },
+    )
+
+
+@receiver(post_save, sender=Event)
+def event_saved_push(sender, instance, raw=False, **kwargs):
+    if raw or not instance.is_locked:
+        return
+    previous = getattr(instance, "_previous_booking", None)
+    if previous and previous[1]:
+        return  # already locked
+    _publish_event_locked(instance, OfferThread.objects.filter(event=instance).values_list("professional_id", flat=True))
+
+
+# ==================== Conditional accept ====================
+
+def offer_accepted(event, offer=None):
+    """
+    What the save signals would do for ``Event.accept_offer()``, whose
+    conditional ``.update()`` bypasses them. The event's filter options
+    columns do not change on lock, so the options version stays.
+    """
+    bidders = list(OfferThread.objects.filter(event=event).values_list("professional_id", flat=True))
+    calendar_projection.invalidate(event.created_by_id, event.accepted_professional_id)
+    InboxCounters.refresh(event.created_by_id, *bidders)
+    _publish_event_locked(event, bidders)
+    if offer is not None:
+        thread = offer.thread
+        push.publish([thread.professional_id, thread.creator_id], push.OFFER_STATUS, _message_payload(offer))
@@ -1,3 +1,892 @@
-from django.test import TestCase
+import asyncio
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from accounts.models import Profession
+from showdan import filter_options
+
+from .api.views import EventListView
+from . import calendar_projection, push
+from .calendar_utils import overlapping
+from .models import BusyTime, Event, EventCategory, InboxCounters, OfferMessage, OfferThread, PushEvent
+
+User = get_user_model()
+
+# For tests counting queries on a cache hit: the shared database cache would
+# add its own lookups to every count.
+LOCAL_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create_user(email="creator@example.com", first_name="C", last_name="R")
+        now = timezone.now()
+        # duplicate start times exercise the id tiebreak
+        cls.events = [
+            Event.objects.create(
+                name=f"Event {i}", created_by=cls.creator,
+                start_datetime=now + timedelta(days=1 + i // 3),
+                end_datetime=now + timedelta(days=2 + i // 3),
+            )
+            for i in range(11)
+        ]
+
+        cls.threads = []
+        for i in range(7):
+            pro = User.objects.create_user(
+                email=f"pro{i}@example.com", first_name="P", last_name=str(i),
+                account_type=User.AccountType.PROFESSIONAL,
+            )
+            thread = OfferThread.objects.create(event=cls.events[0], professional=pro)
+            if i % 2:  # threads without messages sort last (NULL last_msg_at)
+                OfferMessage.objects.create(
+                    thread=thread, sender=pro, sender_type=OfferMessage.SenderType.PROFESSIONAL,
+                    message=f"hello {i}",
+                )
+            cls.threads.append(thread)
+
+        for i in range(9):
+            OfferMessage.objects.create(
+                thread=cls.threads[1], sender=cls.creator,
+                sender_type=OfferMessage.SenderType.CREATOR, message=f"m{i}",
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.creator)
+
+    def get(self, url, params):
+        if url is EventListView:
+            # /api/v1/events/ is routed to EventViewSet first, so call the view directly
+            request = APIRequestFactory().get("/api/v1/events/", params)
+            force_authenticate(request, self.creator)
+            response = EventListView.as_view()(request)
+            response.render()
+            return response
+        return self.client.get(url, params)
+
+    def walk(self, url, **params):
+        ids, cursor = [], ""
+        while cursor is not None:
+            response = self.get(url, {**params, "cursor": cursor, "page_size": 3})
+            self.assertEqual(response.status_code, 200, response.content)
+            body = response.data
+            self.assertNotIn("count", body)
+            ids += [row["id"] for row in body["results"]]
+            cursor = body["next_cursor"]
+        self.assertEqual(len(ids), len(set(ids)), "keyset pages overlap")
+        return ids
+
+    def page_number_ids(self, url, **params):
+        response = self.get(url, {**params, "page_size": 100})
+        return [row["id"] for row in response.data["results"]]
+
+    def test_event_list_cursor_orders_by_sort_column_then_id(self):
+        by_start = sorted(self.events, key=lambda e: (e.start_datetime, e.pk))
+        self.assertEqual(self.walk(EventListView), [e.pk for e in by_start])
+        self.assertEqual(
+            self.walk(EventListView, order_by="-start_datetime"),
+            [e.pk for e in reversed(by_start)],
+        )
+
+    def test_event_viewset_cursor_matches_page_order(self):
+        url = reverse("event-list")
+        self.assertEqual(self.walk(url), self.page_number_ids(url))
+
+    def test_inbox_cursor_walks_every_thread(self):
+        url = reverse("api-offers-inbox")
+        ids = self.walk(url)
+        self.assertEqual(sorted(ids), sorted(t.pk for t in self.threads))
+        # threads with messages first, empty threads (NULL last message) last
+        with_messages = {t.pk for i, t in enumerate(self.threads) if i % 2}
+        self.assertEqual(set(ids[:len(with_messages)]), with_messages)
+
+    def test_thread_messages_cursor(self):
+        url = reverse("api-thread-messages", args=[self.threads[1].pk])
+        self.assertEqual(self.walk(url), self.page_number_ids(url))
+
+    def test_optional_count_and_invalid_cursor(self):
+        body = self.get(EventListView, {"cursor": "", "with_count": "true"}).data
+        self.assertEqual(body["count"], len(self.events))
+        self.assertEqual(self.get(EventListView, {"cursor": "garbage"}).status_code, 404)
+
+
+class FilterOptionsBundleTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("api-professionals-filter-options")
+
+    def test_etag_roundtrip_and_invalidation(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        etag = first["ETag"]
+
+        cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Profession.objects.create(name="Drummer")
+        fresh = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh["ETag"], etag)
+        self.assertIn("Drummer", [p["label"].strip() for p in fresh.data["professions"]])
+
+    def test_event_budget_change_bumps_events_version(self):
+        creator = User.objects.create_user(email="c@example.com", first_name="C", last_name="R")
+        event = Event.objects.create(
+            name="Gig", created_by=creator, end_datetime=timezone.now() + timedelta(days=1),
+        )
+        before = filter_options.get_version(filter_options.EVENTS)
+        event.name = "Renamed gig"
+        with self.captureOnCommitCallbacks(execute=True):
+            event.save()
+        self.assertEqual(filter_options.get_version(filter_options.EVENTS), before)
+
+        event.event_budget = 500
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            event.save()
+            self.assertEqual(filter_options.get_version(filter_options.EVENTS), before)  # not before commit
+        self.assertTrue(callbacks)
+        self.assertNotEqual(filter_options.get_version(filter_options.EVENTS), before)
+
+
+class CategoryTreeFilterTests(TestCase):
+    def test_category_and_profession_filters_include_descendants(self):
+        creator = User.objects.create_user(email="creator@example.com", first_name="C", last_name="R")
+        music = EventCategory.objects.create(name="Music")
+        concert = EventCategory.objects.create(name="Concert", parent=music)
+        jazz = EventCategory.objects.create(name="Jazz", parent=concert)
+        wedding = EventCategory.objects.create(name="Wedding")
+        singer = Profession.objects.create(name="Singer")
+        soprano = Profession.objects.create(name="Soprano", parent=singer)
+
+        end = timezone.now() + timedelta(days=3)
+        jazz_night = Event.objects.create(
+            name="Jazz night", created_by=creator, event_type=jazz, is_posted=True, end_datetime=end,
+        )
+        jazz_night.required_professions.add(singer, soprano)
+        Event.objects.create(
+            name="Wedding", created_by=creator, event_type=wedding, is_posted=True, end_datetime=end,
+        )
+
+        def api_ids(**params):
+            request = APIRequestFactory().get("/api/v1/events/", params)
+            force_authenticate(request, creator)
+            return [row["id"] for row in EventListView.as_view()(request).data["results"]]
+
+        self.assertEqual(api_ids(category=music.pk), [jazz_night.pk])
+        self.assertEqual(api_ids(category=jazz.pk), [jazz_night.pk])
+        self.assertEqual(api_ids(profession=singer.pk), [jazz_night.pk])
+        self.assertEqual(api_ids(category=concert.pk, show="all"), [jazz_night.pk])
+
+        self.client.force_login(creator)
+        page = self.client.get(reverse("events:list"), {"category": music.pk})
+        self.assertEqual([e.pk for e in page.context["events"]], [jazz_night.pk])
+
+
+class EventBudgetBaseCurrencyTests(TestCase):
+    def test_budget_filter_sort_and_bounds_in_the_base_currency(self):
+        from decimal import Decimal
+        from accounts.models import Currency, ExchangeRate
+
+        usd = Currency.objects.create(name="US Dollar", sign="$")
+        eur = Currency.objects.create(name="Euro", sign="€")
+        usd_eur = ExchangeRate.objects.create(from_currency=usd, to_currency=eur, rate=Decimal("0.5"))
+        creator = User.objects.create_user(email="c@example.com", first_name="C", last_name="R")
+        end = timezone.now() + timedelta(days=3)
+        gig = lambda budget, currency: Event.objects.create(
+            name="Gig", created_by=creator, is_posted=True, end_datetime=end,
+            event_budget=Decimal(budget), currency=currency,
+        )
+        dollars, euros, unpriced = gig("300", usd), gig("200", eur), gig("100", None)  # 300, 400, 100 USD
+        self.assertEqual(euros.event_budget_base, Decimal("400.00"))
+        self.assertEqual(unpriced.event_budget_base, Decimal("100.00"))
+
+        def api_rows(**params):
+            request = APIRequestFactory().get("/api/v1/events/", params)
+            force_authenticate(request, creator)
+            return EventListView.as_view()(request).data["results"]
+
+        api_ids = lambda **params: [row["id"] for row in api_rows(**params)]
+
+        self.assertEqual(api_ids(order_by="budget"), [unpriced.pk, dollars.pk, euros.pk])
+        self.assertEqual(api_ids(order_by="-budget"), [euros.pk, dollars.pk, unpriced.pk])
+        self.assertEqual(api_ids(min_budget="250", max_budget="350"), [dollars.pk])
+        self.assertEqual(api_ids(min_budget="175", currency=eur.pk, order_by="budget"), [euros.pk])
+        rows = api_rows(currency=eur.pk, order_by="budget")
+        self.assertEqual(rows[0]["display_budget"], {"amount": Decimal("50.00"), "currency": eur.pk})
+
+        page = self.client.get(reverse("events:list"), {"currency": eur.pk, "max_budget": "160"})
+        self.assertEqual(sorted(e.pk for e in page.context["events"]), sorted([dollars.pk, unpriced.pk]))
+        self.assertEqual((page.context["bmin"], page.context["bmax"]), (50, 200))
+
+        # a new rate moves every stored budget in that currency
+        usd_eur.rate = Decimal("0.25")
+        usd_eur.save()
+        euros.refresh_from_db()
+        self.assertEqual(euros.event_budget_base, Decimal("800.00"))
+        self.assertEqual(api_ids(order_by="-budget")[0], euros.pk)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class CalendarRangeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.pro = User.objects.create_user(
+            email="pro@example.com", first_name="P", last_name="R",
+            account_type=User.AccountType.PROFESSIONAL,
+        )
+        creator = User.objects.create_user(email="c@example.com", first_name="C", last_name="R")
+        utc = dt_timezone.utc
+        # instants around month and local-midnight boundaries
+        cls.instants = [
+            datetime(2025, 1, 31, 23, 30, tzinfo=utc),
+            datetime(2025, 2, 1, 3, 0, tzinfo=utc),
+            datetime(2025, 2, 1, 6, 0, tzinfo=utc),
+            datetime(2025, 2, 28, 23, 59, tzinfo=utc),
+            datetime(2025, 3, 1, 4, 0, tzinfo=utc),
+            datetime(2025, 3, 1, 12, 0, tzinfo=utc),
+        ]
+        for start in cls.instants:
+            for hours in (1, 30):
+                BusyTime.objects.create(
+                    user=cls.pro, start_datetime=start, end_datetime=start + timedelta(hours=hours),
+                )
+        for i, start in enumerate(cls.instants):
+            thread_event = Event.objects.create(
+                name=f"Gig {i}", created_by=creator,
+                start_datetime=start, end_datetime=start + timedelta(hours=2),
+            )
+            thread = OfferThread.objects.create(event=thread_event, professional=cls.pro)
+            Event.objects.filter(pk=thread_event.pk).update(
+                is_locked=True, accepted_thread=thread, accepted_professional=cls.pro,
+            )
+
+    def setUp(self):
+        # cached months are keyed by user id, which the test database reuses
+        cache.clear()
+
+    def test_range_predicate_matches_local_date_predicate(self):
+        for tz in ("UTC", "America/New_York", "Asia/Tokyo"):
+            with timezone.override(tz):
+                for first, last in ((date(2025, 2, 1), date(2025, 2, 28)), (date(2025, 3, 1), date(2025, 3, 1))):
+                    by_date = BusyTime.objects.filter(
+                        user=self.pro, start_datetime__date__lte=last, end_datetime__date__gte=first,
+                    )
+                    by_range = BusyTime.objects.filter(overlapping(first, last), user=self.pro)
+                    self.assertEqual(set(by_range), set(by_date), (tz, first))
+
+    def test_calendar_month_is_bounded_without_date_casts(self):
+        client = APIClient()
+        client.force_authenticate(self.pro)
+        with timezone.override("America/New_York"), CaptureQueriesContext(connection) as ctx:
+            data = client.get(reverse("calendar-month"), {"year": 2025, "month": 2}).data
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertNotIn("django_datetime_cast_date", sql)
+
+        # the grid runs Mon Jan 27 - Sun Mar 2; days are bucketed in New York time (UTC-5)
+        self.assertEqual(len(data["events"]), len(self.instants))
+        day_names = lambda day: sorted(e["name"] for e in data["days"][day]["events"])
+        self.assertEqual(day_names("2025-01-31"), ["Gig 0", "Gig 1"])
+        self.assertEqual(day_names("2025-02-28"), ["Gig 3", "Gig 4"])
+        self.assertEqual(day_names("2025-03-01"), ["Gig 4", "Gig 5"])
+
+        with timezone.override("America/New_York"):
+            april = client.get(reverse("calendar-month"), {"year": 2025, "month": 4}).data
+        self.assertEqual(april["events"], [])
+
+    def test_html_calendar_only_loads_visible_bookings(self):
+        self.client.force_login(self.pro)
+        page = self.client.get(reverse("events:calendar"), {"year": 2024, "month": 6})
+        self.assertEqual(page.context["booked_map"], {})
+        page = self.client.get(reverse("events:calendar"), {"year": 2025, "month": 2})
+        self.assertIn(date(2025, 2, 1), page.context["booked_map"])
+
+    def test_month_projection_is_cached_and_invalidated(self):
+        with timezone.override("UTC"):
+            first = calendar_projection.get_month(self.pro.pk, 2025, 2)
+            with self.assertNumQueries(0):
+                self.assertEqual(calendar_projection.get_month(self.pro.pk, 2025, 2), first)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                busy = BusyTime.objects.create(
+                    user=self.pro,
+                    start_datetime=datetime(2025, 2, 14, 9, tzinfo=dt_timezone.utc),
+                    end_datetime=datetime(2025, 2, 14, 17, tzinfo=dt_timezone.utc),
+                    note="dentist",
+                )
+                # readers before the commit keep the old version
+                self.assertEqual(calendar_projection.get_month(self.pro.pk, 2025, 2), first)
+            busy_day = calendar_projection.get_month(self.pro.pk, 2025, 2)[calendar_projection.BUSY]
+            self.assertEqual(busy_day[date(2025, 2, 14)][0]["note"], "dentist")
+
+            # a booking moving to another professional leaves this calendar
+            event = Event.objects.get(name="Gig 2")
+            other = User.objects.create_user(email="other@example.com", first_name="O", last_name="P")
+            event.accepted_professional = other
+            with self.captureOnCommitCallbacks(execute=True):
+                event.save()
+            booked = calendar_projection.get_month(self.pro.pk, 2025, 2)[calendar_projection.BOOKED]
+            self.assertNotIn(event.pk, [s["event_id"] for segs in booked.values() for s in segs])
+            self.assertIn(event.pk, [
+                s["event_id"] for segs in calendar_projection.get_month(other.pk, 2025, 2)[calendar_projection.BOOKED].values()
+                for s in segs
+            ])
+
+            with self.captureOnCommitCallbacks(execute=True):
+                busy.delete()
+            busy_day = calendar_projection.get_month(self.pro.pk, 2025, 2)[calendar_projection.BUSY]
+            self.assertNotIn(date(2025, 2, 14), busy_day)
+
+    def test_api_month_is_served_from_the_projection(self):
+        client = APIClient()
+        client.force_authenticate(self.pro)
+        url = reverse("calendar-month")
+        with timezone.override("UTC"):
+            first = client.get(url, {"year": 2025, "month": 2}).data
+            with self.assertNumQueries(0):
+                self.assertEqual(client.get(url, {"year": 2025, "month": 2}).data, first)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                BusyTime.objects.create(
+                    user=self.pro,
+                    start_datetime=datetime(2025, 2, 14, 9, tzinfo=dt_timezone.utc),
+                    end_datetime=datetime(2025, 2, 14, 17, tzinfo=dt_timezone.utc),
+                    note="dentist",
+                )
+            fresh = client.get(url, {"year": 2025, "month": 2}).data
+        self.assertEqual(len(fresh["busy_times"]), len(first["busy_times"]) + 1)
+        self.assertIn("dentist", [busy["note"] for busy in fresh["busy_times"]])
+
+    def test_api_month_shows_renamed_categories(self):
+        client = APIClient()
+        client.force_authenticate(self.pro)
+        url = reverse("calendar-month")
+        category = EventCategory.objects.create(name="Wedding")
+        Event.objects.filter(name="Gig 2").update(event_type=category)
+        with timezone.override("UTC"):
+            rows = client.get(url, {"year": 2025, "month": 2}).data["events"]
+            self.assertIn("Wedding", [row["event_type"] for row in rows])
+
+            category.name = "Reception"
+            category.save()
+            with self.assertNumQueries(1):  # rows from the cache, the name looked up
+                rows = client.get(url, {"year": 2025, "month": 2}).data["events"]
+        self.assertEqual([row["event_type"] for row in rows if row["name"] == "Gig 2"], ["Reception"])
+
+
+class OfferThreadSummaryTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(email="creator@example.com", first_name="C", last_name="R")
+        self.event = Event.objects.create(
+            name="Gig", created_by=self.creator,
+            start_datetime=timezone.now() + timedelta(days=3), end_datetime=timezone.now() + timedelta(days=4),
+        )
+
+    def _thread(self, i):
+        pro = User.objects.create_user(
+            email=f"pro{i}@example.com", first_name="P", last_name=str(i),
+            account_type=User.AccountType.PROFESSIONAL,
+        )
+        return OfferThread.objects.create(event=self.event, professional=pro)
+
+    def _send(self, thread, text, amount=None, **extra):
+        return OfferMessage.objects.create(
+            thread=thread, sender=thread.professional, sender_type=OfferMessage.SenderType.PROFESSIONAL,
+            message=text, proposed_amount=amount, **extra,
+        )
+
+    def test_summary_follows_messages(self):
+        thread = self._thread(0)
+        self.assertEqual(thread.creator_id, self.creator.pk)
+
+        offer = self._send(thread, "My offer", amount=100)
+        chat = self._send(thread, "x" * 150)
+        thread.refresh_from_db()
+        self.assertEqual(thread.message_count, 2)
+        self.assertEqual(thread.last_message_id, chat.pk)
+        self.assertEqual(thread.last_message_at, chat.created_at)
+        self.assertEqual(thread.last_message_preview, "x" * OfferThread.PREVIEW_LENGTH)
+        self.assertEqual(thread.latest_proposal_id, offer.pk)
+
+        # a late message carrying an older timestamp only bumps the count
+        self._send(thread, "late", created_at=offer.created_at - timedelta(minutes=5))
+        thread.refresh_from_db()
+        self.assertEqual((thread.message_count, thread.last_message_id), (3, chat.pk))
+
+        chat.delete()
+        thread.refresh_from_db()
+        self.assertEqual(thread.message_count, 2)
+        self.assertEqual((thread.last_message_id, thread.last_message_preview), (offer.pk, "My offer"))
+
+    def test_inbox_serializes_without_per_thread_queries(self):
+        client = APIClient()
+        client.force_authenticate(self.creator)
+        url = reverse("api-offers-inbox")
+
+        def inbox_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(url, {"page_size": 50})
+            self.assertEqual(response.status_code, 200)
+            return len(ctx.captured_queries), response.data["results"]
+
+        threads = [self._thread(i) for i in range(2)]
+        for thread in threads:
+            self._send(thread, "offer", amount=50)
+        InboxCounters.for_user(self.creator.pk)  # the stats row is built on first read
+        few, _results = inbox_queries()
+
+        threads += [self._thread(i) for i in range(2, 7)]
+        for thread in threads[2:]:
+            self._send(thread, "offer", amount=50)
+        self._send(threads[0], "newest")
+        many, results = inbox_queries()
+
+        self.assertEqual(few, many)
+        self.assertEqual(len(results), 7)
+        self.assertEqual(results[0]["id"], threads[0].pk)
+        self.assertEqual(results[0]["last_message"]["message"], "newest")
+        self.assertEqual(results[0]["event_info"]["offers_received_count"], 7)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.force_login(self.creator)
+            html = self.client.get(reverse("events:offers_inbox"))
+        self.assertEqual(list(html.context["threads"])[0], threads[0])
+        self.assertFalse(any('MAX("events_offermessage"' in q["sql"] for q in ctx.captured_queries))
+
+
+class OfferReadCursorTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(email="creator@example.com", first_name="C", last_name="R")
+        self.pro = User.objects.create_user(
+            email="pro@example.com", first_name="P", last_name="R", account_type=User.AccountType.PROFESSIONAL,
+        )
+        start = timezone.now() + timedelta(days=3)
+        self.threads = [
+            OfferThread.objects.create(
+                event=Event.objects.create(
+                    name=f"Gig {i}", created_by=self.creator, start_datetime=start, end_datetime=start + timedelta(hours=2),
+                ),
+                professional=self.pro,
+            )
+            for i in range(2)
+        ]
+        self.client = APIClient()
+
+    def _say(self, thread, sender, text="hi"):
+        OfferMessage.objects.create(
+            thread=thread, sender=sender, message=text,
+            sender_type=OfferMessage.SenderType.PROFESSIONAL if sender == self.pro else OfferMessage.SenderType.CREATOR,
+        )
+
+    def _inbox(self, user, **params):
+        self.client.force_authenticate(user)
+        return self.client.get(reverse("api-offers-inbox"), params).data
+
+    def test_unread_counts_follow_cursor(self):
+        first, second = self.threads
+        self._say(first, self.pro)
+        self._say(first, self.pro)
+        self._say(second, self.pro)
+
+        # the sender has read their own messages
+        self.assertEqual(self._inbox(self.pro)["stats"]["unread_count"], 0)
+
+        inbox = self._inbox(self.creator)
+        self.assertEqual(inbox["stats"]["unread_count"], 3)
+        self.assertEqual(inbox["stats"]["unread_threads"], 2)
+        self.assertEqual({row["id"]: row["unread_count"] for row in inbox["results"]}, {first.pk: 2, second.pk: 1})
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse("api-mark-read", args=[first.pk]))
+        self.assertEqual((response.data["unread_threads"], response.data["unread_count"]), (1, 1))
+        # the badge comes from the counters row, not an aggregate over threads
+        self.assertFalse(any("SUM(" in q["sql"] for q in ctx.captured_queries))
+        unread = self._inbox(self.creator, unread_only="true")
+        self.assertEqual([row["id"] for row in unread["results"]], [second.pk])
+
+        # replying marks the thread read for the creator, new messages reopen it for the pro
+        self._say(second, self.creator)
+        self.assertEqual(self._inbox(self.creator)["stats"]["unread_count"], 0)
+        self.assertEqual(self._inbox(self.pro, unread_only="true")["results"][0]["unread_count"], 1)
+
+        stats = self.client.get(reverse("api-inbox-stats")).data
+        self.assertEqual((stats["unread_threads"], stats["unread_count"]), (1, 1))
+
+    def test_opening_thread_in_html_inbox_marks_it_read(self):
+        self._say(self.threads[0], self.pro)
+        self.client.force_authenticate(None)
+        self.client.force_login(self.creator)
+        html = self.client.get(reverse("events:offers_inbox"), {"thread": self.threads[0].pk})
+        self.assertEqual(html.status_code, 200)
+        self.assertEqual(self._inbox(self.creator)["stats"]["unread_count"], 0)
+
+    def test_unread_filter_probes_the_cursor_index(self):
+        from .inbox import unread_threads
+
+        plan = unread_threads(self.creator).explain()
+        self.assertIn("(user_id=? AND thread_id=?)", plan)
+
+
+class OfferPushTests(TestCase):
+    def setUp(self):
+        self.broker = push.InProcessBroker()
+        self.addCleanup(setattr, push, "_broker", push._broker)
+        push._broker = self.broker
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+        self.creator = User.objects.create_user(email="creator@example.com", first_name="C", last_name="R")
+        self.pros = [
+            User.objects.create_user(
+                email=f"pro{i}@example.com", first_name="P", last_name=str(i),
+                account_type=User.AccountType.PROFESSIONAL,
+            )
+            for i in range(2)
+        ]
+        start = timezone.now() + timedelta(days=3)
+        self.event = Event.objects.create(
+            name="Gig", created_by=self.creator, start_datetime=start, end_datetime=start + timedelta(hours=2),
+        )
+        self.threads = [OfferThread.objects.create(event=self.event, professional=pro) for pro in self.pros]
+
+    def subscribe(self, user):
+        return self.broker.subscribe(user.pk, loop=self.loop)
+
+    def drain(self, subscription):
+        events = []
+        while (event := self.loop.run_until_complete(subscription.get(timeout=0.01))) is not None:
+            events.append((event["kind"], event["data"]))
+        return events
+
+    def test_events_are_published_on_commit_to_participants(self):
+        creator, pro, other = self.subscribe(self.creator), self.subscribe(self.pros[0]), self.subscribe(self.pros[1])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            offer = OfferMessage.objects.create(
+                thread=self.threads[0], sender=self.pros[0], sender_type=OfferMessage.SenderType.PROFESSIONAL,
+                message="My offer", proposed_amount=120,
+            )
+        self.assertEqual(self.drain(creator), [])  # nothing before commit
+        for callback in callbacks:
+            callback()
+
+        [(kind, data)] = self.drain(creator)
+        self.assertEqual((kind, data["thread"], data["message"], data["preview"]), ("message", self.threads[0].pk, offer.pk, "My offer"))
+        self.assertEqual([kind for kind, _data in self.drain(pro)], ["message"])
+        self.assertEqual(self.drain(other), [])
+
+        self.client.force_login(self.creator)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("events:offer_accept", args=[self.event.pk, self.pros[0].pk]))
+
+        self.assertEqual([kind for kind, _data in self.drain(creator)], ["event_locked", "offer_status"])
+        self.assertEqual([kind for kind, _data in self.drain(pro)], ["event_locked", "offer_status"])
+        [(kind, data)] = self.drain(other)
+        self.assertEqual((kind, data["accepted_professional"]), ("event_locked", self.pros[0].pk))
+
+    async def test_stream_relays_events(self):
+        from django.test import AsyncClient
+
+        client = AsyncClient()
+        await client.aforce_login(self.creator)
+        disabled = await client.get(reverse("api-offers-stream"))
+        self.assertEqual(disabled.status_code, 404)  # off under WSGI by default
+
+        with self.settings(OFFER_PUSH_ENABLED=True):
+            response = await client.get(reverse("api-offers-stream"))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b"retry: 3000\n\n")
+
+        self.broker.publish([self.creator.pk], push.MESSAGE, {"thread": 7})
+        self.assertEqual(await anext(chunks), b'id: 1\nevent: message\ndata: {"thread": 7}\n\n')
+
+        # closing the stream (client gone) drops the subscription
+        from .views_push import _stream
+
+        stream = _stream(self.creator.pk, None)
+        await anext(stream)
+        self.assertEqual(len(self.broker._subscribers[self.creator.pk]), 2)
+        await stream.aclose()
+        self.assertEqual(len(self.broker._subscribers[self.creator.pk]), 1)
+
+        with self.settings(OFFER_PUSH_ENABLED=True):
+            anonymous = await AsyncClient().get(reverse("api-offers-stream"))
+        self.assertEqual(anonymous.status_code, 401)
+
+    def test_inbox_only_opens_the_stream_when_enabled(self):
+        self.client.force_login(self.creator)
+        self.assertNotContains(self.client.get(reverse("events:offers_inbox")), "EventSource(")
+        with self.settings(OFFER_PUSH_ENABLED=True):
+            self.assertContains(self.client.get(reverse("events:offers_inbox")), "EventSource(")
+
+    def test_shared_table_broker_fans_out_and_replays(self):
+        with mock.patch.object(push.SharedTableBroker, "_ensure_poller"):
+            broker = push.SharedTableBroker()
+            subscription = broker.subscribe(self.creator.pk, loop=self.loop)
+        broker.poll()  # starts from the current end of the table
+
+        broker.publish([self.creator.pk, self.pros[0].pk], push.MESSAGE, {"thread": 1})
+        broker.poll()
+        self.assertEqual(self.drain(subscription), [("message", {"thread": 1})])
+        self.assertEqual(PushEvent.objects.count(), 2)
+
+        first = PushEvent.objects.get(user=self.creator).pk
+        broker.publish([self.creator.pk], push.OFFER_STATUS, {"thread": 1})
+        self.assertEqual([e["kind"] for e in broker.replay(self.creator.pk, first)], ["offer_status"])
+
+
+class InboxCountersTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(email="creator@example.com", first_name="C", last_name="R")
+        self.pros = [
+            User.objects.create_user(
+                email=f"pro{i}@example.com", first_name="P", last_name=str(i),
+                account_type=User.AccountType.PROFESSIONAL,
+            )
+            for i in range(2)
+        ]
+        start = timezone.now() + timedelta(days=3)
+        self.event = Event.objects.create(
+            name="Gig", created_by=self.creator, is_posted=True,
+            start_datetime=start, end_datetime=start + timedelta(hours=2),
+        )
+        self.client = APIClient()
+
+    def _say(self, thread, sender):
+        return OfferMessage.objects.create(
+            thread=thread, sender=sender, message="hi",
+            sender_type=OfferMessage.SenderType.CREATOR if sender == self.creator else OfferMessage.SenderType.PROFESSIONAL,
+        )
+
+    def _assert_consistent(self, *users):
+        for user in users or (self.creator, *self.pros):
+            counters = InboxCounters.objects.get(user=user)
+            stored = {name: getattr(counters, name) for name in InboxCounters.COUNTER_FIELDS}
+            self.assertEqual(stored, InboxCounters.compute(user.pk), user.email)
+
+    def test_counters_follow_threads_messages_reads_and_locks(self):
+        for user in (self.creator, *self.pros):
+            InboxCounters.for_user(user.pk)
+
+        threads = [OfferThread.objects.create(event=self.event, professional=pro) for pro in self.pros]
+        self._say(threads[0], self.pros[0])
+        self._say(threads[0], self.pros[0])
+        self._say(threads[1], self.pros[1])
+        self._say(threads[1], self.creator)
+        self._assert_consistent()
+        counters = InboxCounters.objects.get(user=self.creator)
+        self.assertEqual((counters.unread_threads, counters.unread_count, counters.open_offers), (1, 2, 2))
+
+        self.client.force_authenticate(self.creator)
+        self.client.post(reverse("api-mark-read", args=[threads[0].pk]))
+        self.assertEqual(InboxCounters.objects.get(user=self.creator).unread_count, 0)
+
+        self.event.is_locked = True
+        self.event.accepted_thread = threads[0]
+        self.event.accepted_professional = self.pros[0]
+        self.event.save()
+        threads[1].messages.all().delete()
+        self._assert_consistent()
+        self.assertEqual(InboxCounters.objects.get(user=self.pros[0]).accepted_as_professional, 1)
+        self.assertEqual(InboxCounters.objects.get(user=self.pros[1]).locked_as_professional, 1)
+
+    def test_stats_endpoints_read_the_counters_row(self):
+        thread = OfferThread.objects.create(event=self.event, professional=self.pros[0])
+        self._say(thread, self.pros[0])
+        self.client.force_authenticate(self.creator)
+
+        first = self.client.get(reverse("api-inbox-stats")).data  # builds the row
+        with CaptureQueriesContext(connection) as queries:
+            stats = self.client.get(reverse("api-inbox-stats")).data
+        self.assertEqual(len(queries), 1)
+        self.assertIn("events_inboxcounters", queries[0]["sql"])
+        self.assertEqual(stats, first)
+        self.assertEqual(
+            (stats["total_threads"], stats["pending_threads"], stats["open_offers"], stats["events_created"]),
+            (1, 1, 1, 1),
+        )
+        self.assertEqual((stats["unread_threads"], stats["unread_count"]), (1, 1))
+
+        inbox_stats = self.client.get(reverse("api-offers-inbox")).data["stats"]
+        self.assertEqual(inbox_stats["unread_count"], 1)
+        self.assertEqual(inbox_stats["pending_offers"], 1)
+
+    def test_reconcile_command_repairs_drift(self):
+        thread = OfferThread.objects.create(event=self.event, professional=self.pros[0])
+        self._say(thread, self.pros[0])
+        InboxCounters.for_user(self.creator.pk)
+        InboxCounters.objects.filter(user=self.creator).update(unread_count=7, threads_as_creator=0)
+
+        out = StringIO()
+        call_command("reconcile_inbox_counters", "--dry-run", stdout=out)
+        self.assertIn("unread_count 7 -> 1", out.getvalue())
+        self.assertEqual(InboxCounters.objects.get(user=self.creator).unread_count, 7)
+
+        call_command("reconcile_inbox_counters", stdout=StringIO())
+        self._assert_consistent(self.creator)
+
+
+class MessageWindowTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(email="creator@example.com", first_name="C", last_name="R")
+        self.pro = User.objects.create_user(
+            email="pro@example.com", first_name="P", last_name="R", account_type=User.AccountType.PROFESSIONAL,
+        )
+        start = timezone.now() + timedelta(days=3)
+        self.event = Event.objects.create(
+            name="Gig", created_by=self.creator, start_datetime=start, end_datetime=start + timedelta(hours=2),
+        )
+        self.thread = OfferThread.objects.create(event=self.event, professional=self.pro)
+        sent = timezone.now() - timedelta(hours=1)
+        # pairs share a timestamp, so paging has to break ties on id
+        self.messages = [
+            OfferMessage.objects.create(
+                thread=self.thread, sender=self.pro, sender_type=OfferMessage.SenderType.PROFESSIONAL,
+                message=f"m{i}", created_at=sent + timedelta(minutes=i // 2),
+            )
+            for i in range(7)
+        ]
+
+    def test_api_pages_back_through_history(self):
+        client = APIClient()
+        client.force_authenticate(self.creator)
+        url = reverse("api-offers-inbox")
+
+        seen, before = [], ""
+        for expected in (3, 3, 1):
+            data = client.get(url, {"thread": self.thread.pk, "messages_limit": 3, "messages_before": before}).data
+            page = [row["message"] for row in data["active_thread_messages"]]
+            self.assertEqual(len(page), expected)
+            seen = page + seen
+            before = data["active_thread_older_cursor"]
+        self.assertIsNone(before)
+        self.assertEqual(seen, [f"m{i}" for i in range(7)])
+
+        # malformed cursors are ignored
+        data = client.get(url, {"thread": self.thread.pk, "messages_before": "x.y"}).data
+        self.assertEqual(len(data["active_thread_messages"]), 7)
+        self.assertIsNone(data["active_thread_older_cursor"])
+
+    def test_html_inbox_windows_messages_and_threads(self):
+        self.client.force_login(self.creator)
+        url = reverse("events:offers_inbox")
+        with mock.patch("events.inbox.MESSAGE_WINDOW", 4), mock.patch("events.views_offers.THREADS_PER_PAGE", 1):
+            OfferThread.objects.create(
+                event=self.event,
+                professional=User.objects.create_user(email="pro2@example.com", first_name="P", last_name="2"),
+            )
+            page = self.client.get(url, {"thread": self.thread.pk})
+            self.assertEqual([m.message for m in page.context["msgs"]], ["m3", "m4", "m5", "m6"])
+            self.assertContains(page, "Load older messages")
+            self.assertEqual(len(page.context["threads"]), 1)
+            self.assertEqual(page.context["next_threads_page"], 2)
+
+            older = self.client.get(
+                url, {"thread": self.thread.pk, "before": page.context["older_cursor"]}, HTTP_HX_REQUEST="true",
+            )
+            self.assertTemplateUsed(older, "events/partials/offer_messages.html")
+            self.assertEqual([m.message for m in older.context["msgs"]], ["m0", "m1", "m2"])
+            self.assertNotContains(older, "Load older messages")
+
+            more = self.client.get(url, {"threads_page": 2}, HTTP_HX_REQUEST="true")
+            self.assertTemplateUsed(more, "events/partials/offer_thread_items.html")
+            self.assertEqual(len(more.context["threads"]), 1)
+            self.assertIsNone(more.context["next_threads_page"])
+
+
+class ConditionalAcceptTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(email="creator@example.com", first_name="C", last_name="R")
+        self.pros = [
+            User.objects.create_user(
+                email=f"pro{i}@example.com", first_name="P", last_name=str(i),
+                account_type=User.AccountType.PROFESSIONAL,
+            )
+            for i in range(2)
+        ]
+        start = timezone.now() + timedelta(days=3)
+        self.event = Event.objects.create(
+            name="Gig", created_by=self.creator, start_datetime=start, end_datetime=start + timedelta(hours=2),
+        )
+        self.threads = [OfferThread.objects.create(event=self.event, professional=pro) for pro in self.pros]
+        self.offers = [
+            OfferMessage.objects.create(
+                thread=thread, sender=thread.professional, sender_type=OfferMessage.SenderType.PROFESSIONAL,
+                proposed_amount=100,
+            )
+            for thread in self.threads
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.creator)
+
+    def _action(self, pro):
+        url = reverse("api-offer-action", args=[self.event.pk, pro.pk])
+        return self.client.post(url, {"action": "accept"})
+
+    def test_only_the_first_accept_locks_the_event(self):
+        stale = Event.objects.get(pk=self.event.pk)  # read before either accept, like a racing request
+        self.assertEqual(self._action(self.pros[0]).status_code, 200)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(stale.accept_offer(self.threads[1], self.offers[1]))
+        [update] = [q["sql"] for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertIn('"is_locked"', update.split("WHERE")[1])
+        self.assertEqual(self._action(self.pros[1]).status_code, 409)
+
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.accepted_thread_id, self.event.accepted_professional_id), (self.threads[0].pk, self.pros[0].pk))
+        self.assertEqual(
+            list(OfferMessage.objects.filter(status=OfferMessage.Status.ACCEPTED).values_list("pk", flat=True)),
+            [self.offers[0].pk],
+        )
+
+    def test_accept_runs_the_side_effects_its_update_bypasses(self):
+        InboxCounters.for_user(self.pros[0].pk)
+        InboxCounters.for_user(self.pros[1].pk)
+        with mock.patch.object(calendar_projection, "invalidate") as invalidate:
+            with self.captureOnCommitCallbacks() as callbacks, CaptureQueriesContext(connection) as locked:
+                self.assertTrue(self.event.accept_offer(self.threads[0], self.offers[0]))
+            # only the lock and the offer status run inside the transaction
+            self.assertEqual(len([q for q in locked if q["sql"].startswith(("UPDATE", "SELECT"))]), 2)
+            invalidate.assert_not_called()
+            self.assertEqual(len(callbacks), 1)
+
+            with self.captureOnCommitCallbacks() as published:
+                callbacks[0]()
+        invalidate.assert_called_once_with(self.creator.pk, self.pros[0].pk)
+        self.assertEqual(len(published), 2)  # event_locked + offer_status
+        self.assertEqual(InboxCounters.objects.get(user=self.pros[0]).accepted_as_professional, 1)
+        self.assertEqual(InboxCounters.objects.get(user=self.pros[1]).locked_as_professional, 1)
+        self.assertEqual(self.offers[0].status, OfferMessage.Status.ACCEPTED)
+
+    def test_a_proposal_superseded_or_rejected_after_it_was_read_is_not_accepted(self):
+        read = self.offers[0]  # what the accept view read as the latest proposal
+        counter = OfferMessage.objects.create(
+            thread=self.threads[0], sender=self.creator, sender_type=OfferMessage.SenderType.CREATOR,
+            proposed_amount=90,
+        )
+        self.assertFalse(self.event.accept_offer(self.threads[0], read))
+        self.assertFalse(Event.objects.get(pk=self.event.pk).is_locked)
+        self.assertEqual(OfferMessage.objects.get(pk=read.pk).status, OfferMessage.Status.PENDING)
+
+        OfferMessage.objects.filter(pk=counter.pk).update(status=OfferMessage.Status.REJECTED)
+        url = reverse("api-offer-message-update-status", args=[counter.pk])
+        self.assertEqual(self.client.put(url, {"status": "accepted"}).status_code, 409)
+        self.assertFalse(Event.objects.get(pk=self.event.pk).is_locked)
+
+        # the current proposal of the other thread still goes through
+        self.assertTrue(self.event.accept_offer(self.threads[1], self.offers[1]))
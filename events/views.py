@@ -1,3 +1,5 @@
+import math
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
@@ -5,43 +7,11 @@ from .forms import EventForm, EventCategoryForm
 from django.utils import timezone
 from .models import Event, OfferThread, OfferMessage, EventCategory
 from django.db.models import Count, Q, Min, Max
-from decimal import Decimal, InvalidOperation
 
 from accounts.models import Profession
-
-def _build_profession_tree_options():
-    """
-    Returns a list of tuples: (id, label_with_indent)
-    where children are indented under their parents.
-    """
-    all_items = list(Profession.objects.select_related("parent").all())
-
-    children_map = {}
-    roots = []
-
-    for p in all_items:
-        pid = p.parent_id
-        if pid is None:
-            roots.append(p)
-        children_map.setdefault(pid, []).append(p)
-
-    # Keep descendants under their parent, but sort siblings by name.
-    for pid, items in children_map.items():
-        items.sort(key=lambda x: (x.name or "").lower())
-    roots.sort(key=lambda x: (x.name or "").lower())
-
-    out = []
-
-    def walk(node, depth):
-        indent = "\u00A0" * (depth * 4)  # 4 non-breaking spaces per level
-        out.append((node.id, f"{indent}{node.name}"))
-        for ch in children_map.get(node.id, []):
-            walk(ch, depth + 1)
-
-    for r in roots:
-        walk(r, 0)
-
-    return out
+from accounts.rates import base_amount_param, from_base, requested_currency
+from accounts.utils import profession_tree_options
+from showdan.tree import subtree_filter
 
 
 def events_list_view(request):
@@ -105,16 +75,16 @@ def events_list_view(request):
         )
 
     # ----------------------------
-    # Category (EventCategory)
+    # Category (EventCategory), sub-categories included
     # ----------------------------
     if category_id.isdigit():
-        qs = qs.filter(event_type__id=int(category_id))
+        qs = qs.filter(subtree_filter(Event, "event_type", int(category_id)))
 
     # ----------------------------
-    # Required profession (M2M)
+    # Required profession (M2M), sub-professions included
     # ----------------------------
     if profession_id.isdigit():
-        qs = qs.filter(required_professions__id=int(profession_id))
+        qs = qs.filter(subtree_filter(Event, "required_professions", int(profession_id)))
 
     # ----------------------------
     # Location filters (Event OR creator fallback)
@@ -159,25 +129,19 @@ def events_list_view(request):
         # if both empty -> do nothing
 
     # ----------------------------
-    # Budget range filter (event_budget)
+    # Budget range filter (event_budget_base)
+    # Typed in the viewer's currency, compared in the base currency.
     # IMPORTANT: exclude NULL budgets from comparisons so it doesn't wipe results
     # ----------------------------
-    def to_decimal(s: str):
-        if not s:
-            return None
-        try:
-            return Decimal(s)
-        except (InvalidOperation, ValueError):
-            return None
-
-    min_budget = to_decimal(min_budget_raw)
-    max_budget = to_decimal(max_budget_raw)
+    currency = requested_currency(request)
+    min_budget = base_amount_param(min_budget_raw, currency)
+    max_budget = base_amount_param(max_budget_raw, currency)
 
     if min_budget is not None:
-        qs = qs.filter(event_budget__isnull=False, event_budget__gte=min_budget)
+        qs = qs.filter(event_budget_base__isnull=False, event_budget_base__gte=min_budget)
 
     if max_budget is not None:
-        qs = qs.filter(event_budget__isnull=False, event_budget__lte=max_budget)
+        qs = qs.filter(event_budget_base__isnull=False, event_budget_base__lte=max_budget)
 
     qs = qs.distinct().order_by(order_by)
 
@@ -187,13 +151,15 @@ def events_list_view(request):
     categories = EventCategory.objects.all().order_by("path")
 
     # Professions: indented tree options (tuples: (id, label))
-    profession_options = _build_profession_tree_options()
+    profession_options = profession_tree_options()
 
-    # Slider bounds: compute from base (stable), not filtered qs
+    # Slider bounds: compute from base (stable), not filtered qs; in the viewer's currency
     base_for_bounds = base
-    bounds = base_for_bounds.aggregate(bmin=Min("event_budget"), bmax=Max("event_budget"))
-    bmin = bounds["bmin"] if bounds["bmin"] is not None else 0
-    bmax = bounds["bmax"] if bounds["bmax"] is not None else 600
+    bounds = base_for_bounds.aggregate(bmin=Min("event_budget_base"), bmax=Max("event_budget_base"))
+    bmin = from_base(bounds["bmin"], currency)
+    bmax = from_base(bounds["bmax"], currency)
+    bmin = bmin if bmin is not None else 0
+    bmax = math.ceil(bmax) if bmax is not None else 600
     if int(bmax) <= int(bmin):
         bmax = int(bmin) + 1
 
@@ -216,6 +182,7 @@ def events_list_view(request):
         "f_min_budget": min_budget_raw,
         "f_max_budget": max_budget_raw,
         "f_near_me": near_me,
+        "f_currency": request.GET.get("currency", ""),
 
         # slider bounds
         "bmin": int(bmin),
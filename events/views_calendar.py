@@ -1,26 +1,14 @@
-import calendar
-from datetime import date, datetime, timedelta, time
+from datetime import datetime, time, timedelta
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect
 from django.utils import timezone
 from django.urls import reverse
-from .models import Event, BusyTime
+from .models import BusyTime
+from .calendar_projection import BOOKED, BUSY, CREATED, avatar_url, avatar_urls, get_month, month_grid
 from django.db import transaction
 
-def month_start_end(year: int, month: int):
-    first = date(year, month, 1)
-    _, last_day = calendar.monthrange(year, month)
-    last = date(year, month, last_day)
-    return first, last
-
-
-def daterange(d1: date, d2: date):
-    cur = d1
-    while cur <= d2:
-        yield cur
-        cur += timedelta(days=1)
 
 @login_required
 def calendar_view(request):
@@ -33,153 +21,44 @@ def calendar_view(request):
     hours = [f"{h:02d}" for h in range(24)]
     minutes = ["00", "15", "30", "45"]
 
-    first_day, last_day = month_start_end(year, month)
-
-    cal = calendar.Calendar(firstweekday=0)  # Monday
-    weeks = cal.monthdatescalendar(year, month)
-
     is_pro = getattr(user, "account_type", None) == "professional"
 
     # ===============================
-    # 1) Events to show on calendar
+    # Events and busy times per day (cached, see events.calendar_projection)
     # - Always show events CREATED by user
-    # - If professional: also show events BOOKED by them (accepted_thread.professional=user)
+    # - If professional: also show events BOOKED by them (accepted_professional=user)
     # ===============================
-    creator_events = (
-        Event.objects
-        .select_related("currency", "created_by", "accepted_thread", "accepted_thread__professional")
-        .filter(created_by=user)
-    )
-
-    booked_events = Event.objects.none()
-    if is_pro:
-        booked_events = (
-            Event.objects
-            .select_related("currency", "created_by", "accepted_thread", "accepted_thread__professional")
-            .filter(is_locked=True, accepted_thread__professional=user)
-        )
-
-    booked_map = {}  # date -> {"avatar_url": "", "ranges": [...]}
-
-    def ensure_day(d):
-        booked_map.setdefault(d, {"avatar_url": "", "ranges": []})
-
-    def safe_avatar(u):
-        if not u:
-            return ""
-        pic = getattr(u, "profile_picture", None)
-        if not pic:
-            return ""
-        try:
-            return pic.url
-        except Exception:
-            return ""
-
-    my_avatar_url = safe_avatar(user)
+    grid = month_grid(year, month)
+    parts = (CREATED, BOOKED, BUSY) if is_pro else (CREATED, BUSY)
+    projection = get_month(user.pk, year, month, parts)
 
     # ---------- A) Creator events ----------
     # show name always; avatar only if locked (accepted professional)
-    for e in creator_events:
-        if not e.start_datetime or not e.end_datetime:
-            continue
-
-        start_local = timezone.localtime(e.start_datetime)
-        end_local = timezone.localtime(e.end_datetime)
-        d1 = start_local.date()
-        d2 = end_local.date()
-
-        accepted_avatar_url = ""
-        if e.is_locked and e.accepted_thread and getattr(e.accepted_thread, "professional", None):
-            accepted_avatar_url = safe_avatar(e.accepted_thread.professional)
-
-        for d in daterange(d1, d2):
-            ensure_day(d)
-
-            # Only apply accepted avatar for locked events
-            if accepted_avatar_url:
-                booked_map[d]["avatar_url"] = accepted_avatar_url
-
-            is_start = (d == d1)
-            is_end = (d == d2)
-
-            # label logic
-            label = ""
-            if is_start and is_end:
-                label = f"{start_local.strftime('%H:%M')}–{end_local.strftime('%H:%M')}"
-            elif is_start:
-                label = f"{start_local.strftime('%H:%M')} →"
-            elif is_end:
-                label = f"→ {end_local.strftime('%H:%M')}"
-
-            booked_map[d]["ranges"].append({
-                "event_id": e.id,
-                "name": e.name,
-                "is_start": is_start,
-                "is_end": is_end,
-                "label": label,
-                "is_locked": bool(e.is_locked),
-                "source": "created",
-            })
+    accepted_avatars = avatar_urls(
+        segment["accepted_professional_id"]
+        for segments in projection[CREATED].values()
+        for segment in segments
+        if segment["is_locked"]
+    )
+    booked_map = {}  # date -> {"avatar_url": "", "ranges": [...]}
+    for d, segments in projection[CREATED].items():
+        day = booked_map.setdefault(d, {"avatar_url": "", "ranges": []})
+        for segment in segments:
+            if segment["is_locked"] and accepted_avatars.get(segment["accepted_professional_id"]):
+                day["avatar_url"] = accepted_avatars[segment["accepted_professional_id"]]
+            day["ranges"].append({**segment, "source": "created"})
 
     # ---------- B) Professional accepted bookings ----------
     # show name; avatar is ALWAYS the professional's own avatar
-    for e in booked_events:
-        if not e.start_datetime or not e.end_datetime:
-            continue
+    my_avatar_url = avatar_url(user)
+    for d, segments in projection.get(BOOKED, {}).items():
+        day = booked_map.setdefault(d, {"avatar_url": "", "ranges": []})
+        # only set avatar if not already set by a locked created event
+        if my_avatar_url and not day["avatar_url"]:
+            day["avatar_url"] = my_avatar_url
+        day["ranges"].extend({**segment, "source": "booked"} for segment in segments)
 
-        start_local = timezone.localtime(e.start_datetime)
-        end_local = timezone.localtime(e.end_datetime)
-        d1 = start_local.date()
-        d2 = end_local.date()
-
-        for d in daterange(d1, d2):
-            ensure_day(d)
-
-            # only set avatar if not already set by a locked created event
-            if my_avatar_url and not booked_map[d]["avatar_url"]:
-                booked_map[d]["avatar_url"] = my_avatar_url
-
-            is_start = (d == d1)
-            is_end = (d == d2)
-
-            label = ""
-            if is_start and is_end:
-                label = f"{start_local.strftime('%H:%M')}–{end_local.strftime('%H:%M')}"
-            elif is_start:
-                label = f"{start_local.strftime('%H:%M')} →"
-            elif is_end:
-                label = f"→ {end_local.strftime('%H:%M')}"
-
-            booked_map[d]["ranges"].append({
-                "event_id": e.id,
-                "name": e.name,
-                "is_start": is_start,
-                "is_end": is_end,
-                "label": label,
-                "is_locked": True,
-                "source": "booked",
-            })
-
-    # ===============================
-    # 2) Busy times (unavailable)
-    # ===============================
-    busy_qs = BusyTime.objects.filter(
-        user=user,
-        start_datetime__date__lte=last_day,
-        end_datetime__date__gte=first_day
-    )
-
-    busy_map = {}  # date -> [busy items]
-    for b in busy_qs:
-        s = timezone.localtime(b.start_datetime)
-        e = timezone.localtime(b.end_datetime)
-        for d in daterange(s.date(), e.date()):
-            busy_map.setdefault(d, []).append({
-                "is_all_day": b.is_all_day,
-                "start": s.strftime("%H:%M"),
-                "end": e.strftime("%H:%M"),
-                "note": b.note,
-            })
+    busy_map = projection[BUSY]  # date -> [busy items]
 
     # ===============================
     # POST: create busy time
@@ -235,21 +114,10 @@ def calendar_view(request):
         messages.success(request, "Busy time saved.")
         return redirect(f"{request.path}?year={year}&month={month}")
 
-    # Month nav
-    prev_month = (date(year, month, 1) - timedelta(days=1)).replace(day=1)
-    next_month = (date(year, month, 28) + timedelta(days=10)).replace(day=1)
-
     return render(request, "events/calendar.html", {
         "hours": hours,
         "minutes": minutes,
-        "weeks": weeks,
-        "year": year,
-        "month": month,
-        "month_name": date(year, month, 1).strftime("%B"),
-        "prev_year": prev_month.year,
-        "prev_month": prev_month.month,
-        "next_year": next_month.year,
-        "next_month": next_month.month,
+        **grid,
         "today": today,
         "booked_map": booked_map,
         "busy_map": busy_map,
@@ -5,8 +5,8 @@ from django.db import transaction
 from django.urls import reverse
 from accounts.models import Currency
 from accounts.utils import get_rate
-from django.db.models import Max, Q
-from .models import Event, OfferThread, OfferMessage
+from .inbox import inbox_threads, message_window, with_read_state
+from .models import Event, OfferReadCursor, OfferThread, OfferMessage
 from .forms_offers import OfferCreateForm, CounterOfferForm, ChatMessageForm
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.conf import settings
@@ -179,7 +179,6 @@ def counter_offer_view(request, event_id, pro_id):
     return redirect(safe_next_url(request, f"/events/my-offers/?thread={thread.id}"))
 
 @login_required
-@transaction.atomic
 def accept_offer_view(request, event_id, pro_id):
     event = get_object_or_404(Event, id=event_id, created_by=request.user)
     thread = get_object_or_404(OfferThread, event=event, professional_id=pro_id)
@@ -195,20 +194,15 @@ def accept_offer_view(request, event_id, pro_id):
         messages.error(request, "No offer to accept.")
         return redirect(f"{reverse('events:offer_thread', args=[event.id])}?pro={pro_id}")
 
-    # Lock event + record accepted thread
-    event.is_locked = True
-    event.accepted_thread = thread
-    event.save(update_fields=["is_locked", "accepted_thread"])
-
-    # Mark this message accepted
-    last.status = OfferMessage.Status.ACCEPTED
-    last.save(update_fields=["status"])
+    # Lock event + record accepted thread, unless another accept won or a newer offer arrived
+    if not event.accept_offer(thread, last):
+        messages.error(request, "This event is already locked, or a newer offer arrived: please review it.")
+        return redirect(safe_next_url(request, f"/events/my-offers/?thread={thread.id}"))
 
     messages.success(request, "Offer accepted.")
     return redirect(safe_next_url(request, f"/events/my-offers/?thread={thread.id}"))
 
 @login_required
-@transaction.atomic
 def reject_offer_view(request, event_id, pro_id):
     event = get_object_or_404(Event, id=event_id, created_by=request.user)
     thread = get_object_or_404(OfferThread, event=event, professional_id=pro_id)
@@ -226,20 +220,36 @@ def reject_offer_view(request, event_id, pro_id):
 
 
 
+# threads per lazily loaded page of the inbox sidebar
+THREADS_PER_PAGE = 30
+
+
+def _thread_page(threads, page, active_thread_id):
+    """One page of the sidebar, fetched without a COUNT (one extra row tells if more follow)."""
+    page = int(page) if str(page).isdigit() and int(page) > 0 else 1
+    start = (page - 1) * THREADS_PER_PAGE
+    rows = list(threads[start:start + THREADS_PER_PAGE + 1])
+    return {
+        "threads": rows[:THREADS_PER_PAGE],
+        "next_threads_page": page + 1 if len(rows) > THREADS_PER_PAGE else None,
+        "active_thread_id": active_thread_id,
+    }
+
+
 @login_required
 def offers_inbox_view(request):
+    """
+    The offers inbox. Besides the full page it answers two HTMX requests:
+    ``?threads_page=N`` (the next page of the sidebar, loaded on scroll) and
+    ``?thread=<id>&before=<cursor>`` (older messages of a thread).
+    """
     user = request.user
+    htmx = request.headers.get("HX-Request") == "true"
 
     # threads where:
     # - user is the professional (offers you sent)
     # - OR user is the creator of the event (offers sent to your events)
-    threads = (
-        OfferThread.objects
-        .select_related("event", "event__created_by", "event__currency", "professional")
-        .filter(Q(professional=user) | Q(event__created_by=user))
-        .annotate(last_msg_at=Max("messages__created_at"))
-        .order_by("-last_msg_at", "-created_at")
-    )
+    threads = with_read_state(inbox_threads(user), user)
 
     # Optional: allow opening by event id for professionals (creates thread if needed)
     event_id = request.GET.get("event")
@@ -261,6 +271,13 @@ def offers_inbox_view(request):
     thread_id = request.GET.get("thread")
     active_thread = None
 
+    if htmx and "threads_page" in request.GET:
+        active_thread_id = int(thread_id) if thread_id and thread_id.isdigit() else None
+        return render(
+            request, "events/partials/offer_thread_items.html",
+            _thread_page(threads, request.GET["threads_page"], active_thread_id),
+        )
+
     if thread_id:
         active_thread = get_object_or_404(
             OfferThread.objects.select_related("event", "event__created_by", "event__currency", "professional"),
@@ -275,13 +292,16 @@ def offers_inbox_view(request):
     if not active_thread and threads.exists():
         active_thread = threads.first()
 
-    msgs = []
+    msgs, older_cursor = [], None
     if active_thread:
-        msgs = (
-            active_thread.messages
-            .select_related("sender", "proposed_currency", "event_currency")
-            .all()
-        )
+        msgs, older_cursor = message_window(active_thread, request.GET.get("before"))
+        if htmx and "before" in request.GET:
+            return render(request, "events/partials/offer_messages.html", {
+                "active_thread": active_thread,
+                "msgs": msgs,
+                "older_cursor": older_cursor,
+            })
+        OfferReadCursor.mark_read(active_thread.id, user.id)
 
     # Forms
     offer_form = None
@@ -297,13 +317,15 @@ def offers_inbox_view(request):
         counter_form = CounterOfferForm()
 
     return render(request, "events/offers_inbox.html", {
-        "threads": threads,
+        **_thread_page(threads, 1, active_thread.id if active_thread else None),
         "active_thread": active_thread,
         "msgs": msgs,
+        "older_cursor": older_cursor,
         "offer_form": offer_form,
         "counter_form": counter_form,
         "is_pro": is_pro,
         "is_creator": is_creator,
+        "offer_push_enabled": getattr(settings, "OFFER_PUSH_ENABLED", False),
     })
 
 
@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.translation import gettext as _
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from . import push
+
+# comment line sent when nothing happened, keeps proxies from timing out
+HEARTBEAT_SECONDS = getattr(settings, "OFFER_PUSH_HEARTBEAT", 15)
+# streams are closed after this long; EventSource reconnects by itself
+STREAM_MAX_AGE = getattr(settings, "OFFER_PUSH_MAX_AGE", 60 * 5)
+
+
+def _sse(event):
+    lines = []
+    if event["id"] is not None:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['kind']}")
+    lines.append(f"data: {json.dumps(event['data'], cls=DjangoJSONEncoder)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _jwt_user(request):
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+async def _stream(user_id, last_event_id):
+    broker = push.get_broker()
+    subscription = broker.subscribe(user_id)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + STREAM_MAX_AGE
+    try:
+        yield "retry: 3000\n\n"
+        if last_event_id is not None:
+            for event in await sync_to_async(broker.replay)(user_id, last_event_id):
+                yield _sse(event)
+        while loop.time() < deadline:
+            event = await subscription.get(timeout=min(HEARTBEAT_SECONDS, deadline - loop.time()))
+            yield _sse(event) if event else ": keep-alive\n\n"
+    finally:
+        broker.unsubscribe(subscription)
+
+
+@require_GET
+async def offers_stream_view(request):
+    """
+    Server-Sent Events stream of the user's inbox activity
+
+    GET /api/v1/events/offers/stream/
+
+    Authenticated by session (browsers) or a JWT ``Authorization`` header
+    (mobile). Events: ``message``, ``offer_status``, ``event_locked`` and
+    ``resync``; see ``events.push``. Reconnecting with ``Last-Event-ID``
+    replays missed events when the broker keeps them.
+
+    Serve it through ``showdan.asgi``: under WSGI every open stream holds a
+    worker thread, so the stream answers 404 unless
+    ``settings.OFFER_PUSH_ENABLED`` is on (EventSource does not retry a 404).
+    """
+    if not getattr(settings, "OFFER_PUSH_ENABLED", False):
+        return JsonResponse({"error": _("Live updates are not enabled")}, status=404)
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        user = await sync_to_async(_jwt_user)(request)
+    if user is None or not user.is_authenticated:
+        return JsonResponse({"error": _("Authentication required")}, status=401)
+
+    last_event_id = request.headers.get("Last-Event-ID", "")
+    last_event_id = int(last_event_id) if last_event_id.isdigit() else None
+
+    response = StreamingHttpResponse(_stream(user.pk, last_event_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: do not buffer the stream
+    return response
@@ -3,6 +3,10 @@ ASGI config for showdan project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the site through it (e.g. ``uvicorn showdan.asgi:application``) so the
+offers push stream (``events.views_push``) holds no worker thread per open
+connection.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -0,0 +1,149 @@
+"""
+Versioned, cached "filter options" bundles for the events and professionals
+listings.
+
+Building the options means walking the whole profession tree, serializing every
+event category and running Min/Max aggregates. They change rarely, so each kind
+of bundle is built once per (version, language) and kept in the default cache:
+
+- ``get_bundle(kind)`` returns ``(version, data)`` for the active language;
+- ``bump_version(*kinds)`` is called from model signals (``accounts.signals``,
+  ``events.signals``) whenever an input changes, which orphans every cached
+  entry of that kind at once. The bump runs when the transaction commits, so
+  a concurrent reader cannot cache pre-commit data under the new version;
+- ``bundle_response(request, kind)`` serves a bundle with an ETag and answers
+  ``If-None-Match`` with 304, so clients can keep their copy until the version
+  moves. List endpoints only return the version (``filter_options_version``).
+
+Versions and bundles live in the default cache, which ``settings.CACHES``
+shares between worker processes; a bump made by one worker is seen by all.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_vary_headers
+from django.utils.translation import get_language
+from rest_framework import status
+from rest_framework.response import Response
+
+EVENTS = 'events'
+PROFESSIONALS = 'professionals'
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _build_events(extra=None):
+    from events.api.serializers import FilterOptionsSerializer
+    return FilterOptionsSerializer({}).data
+
+
+def _build_events_calendar(extra=None):
+    from events.api.serializers_calendar import EventCategorySerializer
+    from events.models import Event, EventCategory
+    posted = Event.objects.filter(is_posted=True)
+    return {
+        'categories': EventCategorySerializer(EventCategory.objects.all(), many=True).data,
+        'countries': list(posted.exclude(country='').values_list('country', flat=True).distinct()),
+        'cities': list(posted.exclude(city='').values_list('city', flat=True).distinct()),
+    }
+
+
+def _build_professionals(extra=None):
+    from accounts.api.serializers_professionals import FilterOptionsSerializer
+    return FilterOptionsSerializer({}).data
+
+
+def _build_price_range(profession_id=None):
+    from django.contrib.auth import get_user_model
+    from django.db.models import Max, Min
+
+    from accounts.rates import base_currency_id
+
+    from .tree import subtree_filter
+
+    User = get_user_model()
+    queryset = User.objects.filter(
+        account_type=User.AccountType.PROFESSIONAL,
+        is_active=True,
+        cost_per_hour_base__isnull=False
+    )
+    if profession_id:
+        queryset = queryset.filter(subtree_filter(User, 'professions', profession_id))
+    bounds = queryset.aggregate(min_price=Min('cost_per_hour_base'), max_price=Max('cost_per_hour_base'))
+    return {
+        'min': bounds['min_price'] or 0,
+        'max': bounds['max_price'] or 1000,
+        'currency': base_currency_id(),  # bounds are base-currency amounts
+    }
+
+
+# part name -> (version kind, builder)
+PARTS = {
+    EVENTS: (EVENTS, _build_events),
+    'events_calendar': (EVENTS, _build_events_calendar),
+    PROFESSIONALS: (PROFESSIONALS, _build_professionals),
+    'price_range': (PROFESSIONALS, _build_price_range),
+}
+
+
+def _version_key(kind):
+    return f'filter_options:version:{kind}'
+
+
+def get_version(kind):
+    version = cache.get(_version_key(kind))
+    if version is None:
+        # seeded from the clock so a cold cache never reuses an old ETag
+        cache.add(_version_key(kind), time.time_ns() // 1_000_000, None)
+        version = cache.get(_version_key(kind))
+    return str(version)
+
+
+def _bump(kinds):
+    for kind in kinds:
+        try:
+            cache.incr(_version_key(kind))
+        except ValueError:
+            cache.set(_version_key(kind), time.time_ns() // 1_000_000, None)
+
+
+def bump_version(*kinds):
+    """Move the version of ``kinds`` once the current transaction commits."""
+    transaction.on_commit(lambda: _bump(kinds))
+
+
+def get_bundle(part, extra=None):
+    """Return ``(version, data)`` for ``part`` in the active language."""
+    kind, builder = PARTS[part]
+    version = get_version(kind)
+    key = f'filter_options:{part}:{version}:{get_language() or ""}:{extra or ""}'
+    data = cache.get(key)
+    if data is None:
+        data = builder(extra)
+        cache.set(key, data, CACHE_TIMEOUT)
+    return version, data
+
+
+def bundle_etag(part, version, extra=None):
+    return f'"{part}-{version}-{get_language() or ""}{f"-{extra}" if extra else ""}"'
+
+
+def bundle_response(request, part, extra=None):
+    """Serve a bundle with ETag / If-None-Match (304) support."""
+    version = get_version(PARTS[part][0])
+    etag = bundle_etag(part, version, extra)
+
+    if_none_match = request.headers.get('If-None-Match', '')
+    if if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]:
+        # the client's copy is current: skip building/loading the bundle
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        version, data = get_bundle(part, extra)
+        etag = bundle_etag(part, version, extra)
+        response = Response(data)
+
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    patch_vary_headers(response, ['Accept-Language'])
+    return response
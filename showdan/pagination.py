@@ -0,0 +1,171 @@
+"""
+Opt-in keyset ("cursor") pagination shared by the list APIs.
+
+Page-number pagination runs COUNT(*) over the whole filtered queryset on every
+request and walks ever larger OFFSETs. Mixing ``KeysetPaginationMixin`` into a
+``PageNumberPagination`` subclass keeps the page-number behaviour as the default
+and adds a second mode, selected by the presence of ``?cursor=``:
+
+- the page is fetched with ``WHERE (sort columns) > (last row's values)``
+  using the queryset's own ordering plus an ``id`` tiebreak, so every page
+  costs the same no matter how deep the client scrolls;
+- the total count is skipped unless ``?with_count=true`` is passed.
+
+``?cursor=`` (empty) returns the first page; each response carries
+``next_cursor`` / ``next`` for the following one. DRF's CursorPagination is not
+used because it only keys on a single field and cannot order by annotations
+(ratings, search rank, last message time) the list views sort on.
+"""
+import base64
+import binascii
+import datetime
+import decimal
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()  # full precision, unlike DjangoJSONEncoder
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPaginationMixin:
+    cursor_query_param = 'cursor'
+    count_query_param = 'with_count'
+    invalid_cursor_message = _('Invalid cursor')
+
+    cursor_mode = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        self.keys = self._get_keys(queryset)
+
+        self.total_count = None
+        if request.query_params.get(self.count_query_param, '').lower() == 'true':
+            self.total_count = queryset.count()
+
+        queryset = queryset.order_by(*[
+            (F(name).desc(nulls_last=True) if desc else F(name).asc(nulls_last=True))
+            if nullable else (f'-{name}' if desc else name)
+            for name, desc, nullable, _field in self.keys
+        ])
+
+        position = self._decode_cursor(request.query_params.get(self.cursor_query_param))
+        if position is not None:
+            queryset = queryset.filter(self._after(position))
+
+        rows = list(queryset[:self.page_size_value + 1])
+        self.has_next = len(rows) > self.page_size_value
+        self.page_rows = rows[:self.page_size_value]
+        return self.page_rows
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        payload = {
+            'next': self.get_next_link(),
+            'next_cursor': self.get_next_cursor(),
+            'results': data,
+        }
+        if self.total_count is not None:
+            payload['count'] = self.total_count
+        return Response(payload)
+
+    def get_next_cursor(self):
+        if not self.has_next or not self.page_rows:
+            return None
+        last = self.page_rows[-1]
+        values = [_encode_value(getattr(last, name)) for name, _desc, _null, _field in self.keys]
+        raw = json.dumps({'o': self._signature(), 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        cursor = self.get_next_cursor()
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    # ---- internals ----
+
+    def _get_keys(self, queryset):
+        """(name, descending, nullable, field) per sort column, id tiebreak last."""
+        opts = queryset.model._meta
+        ordering = list(queryset.query.order_by) or list(opts.ordering)
+        keys = []
+        for item in ordering:
+            if not isinstance(item, str) or item == '?' or '__' in item:
+                raise NotFound(_('Cursor pagination is not available for this ordering'))
+            desc = item.startswith('-')
+            name = item.lstrip('-')
+            if name == 'pk':
+                name = opts.pk.attname
+            annotation = queryset.query.annotations.get(name)
+            if annotation is not None:
+                # aggregates (e.g. Max over an empty relation) can be NULL
+                field, nullable = annotation.output_field, True
+            else:
+                field = opts.get_field(name)
+                nullable = field.null
+            keys.append((name, desc, nullable, field))
+
+        if not any(name == opts.pk.attname for name, *_rest in keys):
+            keys.append((opts.pk.attname, keys[-1][1] if keys else False, False, opts.pk))
+        return keys
+
+    def _signature(self):
+        return [f"{'-' if desc else ''}{name}" for name, desc, _null, _field in self.keys]
+
+    def _decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            if data['o'] != self._signature() or len(data['v']) != len(self.keys):
+                raise ValueError
+            return [
+                None if value is None else field.to_python(value)
+                for value, (_name, _desc, _null, field) in zip(data['v'], self.keys)
+            ]
+        except (binascii.Error, UnicodeDecodeError, KeyError, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _after(self, position):
+        """
+        Rows strictly after ``position`` in (k1, k2, ..., id) order:
+        k1 > v1 OR (k1 = v1 AND k2 > v2) OR ... with NULLs sorting last.
+        """
+        condition = None
+        equal = Q()
+        for (name, desc, nullable, _field), value in zip(self.keys, position):
+            if value is None:
+                # NULLs sort last: only rows tied on NULL can still follow
+                greater = None
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                greater = Q(**{f"{name}__{'lt' if desc else 'gt'}": value})
+                if nullable:
+                    greater |= Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+            if greater is not None:
+                step = equal & greater
+                condition = step if condition is None else condition | step
+            equal &= same
+        return condition if condition is not None else Q(pk__in=[])
@@ -91,6 +91,23 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "showdan.wsgi.application"
+ASGI_APPLICATION = "showdan.asgi.application"
+
+# Offer inbox push (events.push) needs an ASGI server (see README): under WSGI,
+# runserver included, every open stream holds a worker thread and receives
+# nothing until it closes. The inbox only opens the stream when this is on.
+OFFER_PUSH_ENABLED = os.getenv("OFFER_PUSH_ENABLED", "False").lower() == "true"
+# The default broker only reaches streams served by the same process; with
+# several ASGI workers use the shared table:
+# OFFER_PUSH_BROKER = "events.push.SharedTableBroker"
+OFFER_PUSH_BROKER = os.getenv("OFFER_PUSH_BROKER", "events.push.InProcessBroker")
+
+# Exchange rates (accounts.rates): pairs without a stored rate are converted
+# through this currency (by name; default: the one with the most rates).
+# Workers notice rate changes made by other processes through the shared
+# cache (CACHES below) within the interval, and before storing a price.
+EXCHANGE_RATE_BASE_CURRENCY = os.getenv("EXCHANGE_RATE_BASE_CURRENCY") or None
+EXCHANGE_RATE_CHECK_INTERVAL = 5  # seconds
 
 
 
@@ -106,6 +123,26 @@ DATABASES = {
     }
 }
 
+# The default cache holds version stamps that every worker process must see
+# (showdan.filter_options, ...), so it is shared: a table in the main database
+# (created by `python manage.py createcachetable`) or Redis when REDIS_URL is
+# set (needs the `redis` package). A per-process LocMemCache would let workers
+# keep serving data another process already invalidated.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "showdan_cache",
+        }
+    }
+
 
 
 
@@ -156,6 +193,13 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Media is served by accounts.media_serving (access checks, ranges). Set to
+# "x-accel-redirect" (nginx, with an internal location at the prefix below
+# aliased to MEDIA_ROOT) or "x-sendfile" (Apache, lighttpd) to let the front
+# proxy send the file; empty streams it from Django.
+MEDIA_SENDFILE = os.getenv("MEDIA_SENDFILE", "")
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/")
+
 
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
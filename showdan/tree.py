@@ -0,0 +1,233 @@
+"""
+Materialized-path trees shared by ``accounts.Profession`` and
+``events.EventCategory``.
+
+Every node stores its ``path`` ("000001.music/000004.live/000009.acapella") and
+its ``depth`` (number of ancestors). That makes the common reads cheap:
+
+- depth is a column, not a walk up the parents (one query per level);
+- a subtree is ``path = X OR X/ <= path < X0`` (``"0"`` is the character
+  after ``"/"``), a range scan on the indexed ``path`` column, see
+  ``TreeNode.descendants()`` and ``subtree_filter()``;
+- a whole tree is built in one pass over the nodes ordered by ``path``
+  (parents always sort before their children), see ``build_tree()`` and
+  ``tree_options()``.
+
+Renaming or moving a node rewrites its subtree's paths with a single UPDATE
+instead of re-saving every descendant one by one.
+"""
+from django.core.exceptions import ValidationError
+from django.db import connection, models, transaction
+from django.db.models import Exists, F, OuterRef, Q, Value
+from django.db.models.functions import Concat, Substr
+from django.utils.translation import gettext_lazy as _
+
+PATH_SEPARATOR = "/"
+# first character sorting after PATH_SEPARATOR: upper bound of a subtree range
+PATH_UPPER_BOUND = chr(ord(PATH_SEPARATOR) + 1)
+
+# indentation used by the flat <select> options
+OPTION_INDENT = "\u00A0" * 4
+
+
+def _is_within(path, ancestor_path):
+    return path == ancestor_path or path.startswith(ancestor_path + PATH_SEPARATOR)
+
+
+def _below_q(lookup, path):
+    """Nodes strictly below ``path``, as a lookup the ``path`` index can serve."""
+    if connection.vendor == "sqlite":
+        # SQLite never uses an index for LIKE ... ESCAPE; a BINARY range it does
+        return Q(**{
+            f"{lookup}__gte": path + PATH_SEPARATOR,
+            f"{lookup}__lt": path + PATH_UPPER_BOUND,
+        })
+    # PostgreSQL serves LIKE 'x%' from the varchar_pattern_ops index Django
+    # adds for db_index CharFields; a range would follow the locale collation
+    return Q(**{f"{lookup}__startswith": path + PATH_SEPARATOR})
+
+
+class TreeNode(models.Model):
+    parent = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        related_name="children",
+        on_delete=models.CASCADE,
+    )
+
+    # sortable tree path, e.g. "000001.music/000002.live/000003.acapella"
+    path = models.CharField(max_length=600, blank=True, db_index=True)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def get_depth(self):
+        return self.depth
+
+    def path_segment(self):
+        return f"{self.pk:06d}.{self.name.lower()}"
+
+    def _parent_row(self):
+        if not self.parent_id:
+            return "", -1
+        row = type(self)._default_manager.filter(pk=self.parent_id).values_list("path", "depth").first()
+        return row or ("", -1)
+
+    def clean(self):
+        super().clean()
+        if self.pk and self.parent_id:
+            parent_path, _depth = self._parent_row()
+            own = type(self)._default_manager.filter(pk=self.pk).values_list("path", flat=True).first()
+            if self.parent_id == self.pk or (own and _is_within(parent_path, own)):
+                raise ValidationError({"parent": _("A node cannot be moved under itself or its descendants.")})
+
+    def save(self, *args, **kwargs):
+        manager = type(self)._default_manager
+        with transaction.atomic(using=kwargs.get("using")):
+            # path/depth as currently stored, before this save
+            old_path, old_depth = "", 0
+            if self.pk:
+                old_path, old_depth = (
+                    manager.filter(pk=self.pk).values_list("path", "depth").first() or ("", 0)
+                )
+            parent_path, parent_depth = self._parent_row()
+            if old_path and _is_within(parent_path, old_path):
+                raise ValueError("A node cannot be moved under itself or its descendants.")
+
+            # keep the stored path while saving the other fields
+            self.path, self.depth = old_path, old_depth
+            super().save(*args, **kwargs)  # ensure self.pk exists
+
+            new_path = self.path_segment()
+            if parent_path:
+                new_path = f"{parent_path}{PATH_SEPARATOR}{new_path}"
+            new_depth = parent_depth + 1
+
+            if old_path == new_path and old_depth == new_depth:
+                return
+
+            manager.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+            self.path, self.depth = new_path, new_depth
+
+            if old_path:
+                # re-root the whole subtree in one statement
+                manager.filter(_below_q("path", old_path)).update(
+                    path=Concat(Value(new_path), Substr("path", len(old_path) + 1)),
+                    depth=F("depth") + (new_depth - old_depth),
+                )
+
+    # ---- subtree lookups ----
+
+    def subtree_q(self, include_self=True, prefix=""):
+        return self.path_q([self.path], include_self=include_self, prefix=prefix)
+
+    def descendants(self, include_self=False):
+        return type(self)._default_manager.filter(self.subtree_q(include_self=include_self))
+
+    @staticmethod
+    def path_q(paths, include_self=True, prefix=""):
+        """
+        ``Q`` matching every node below any of ``paths``. ``prefix`` points the
+        lookup through a relation, e.g. ``prefix="professions__"``.
+        """
+        condition = Q(pk__in=[])
+        for path in paths:
+            condition |= _below_q(f"{prefix}path", path)
+            if include_self:
+                condition |= Q(**{f"{prefix}path": path})
+        return condition
+
+    @classmethod
+    def descendant_ids(cls, pks, include_self=True):
+        """Ids of the nodes ``pks`` and everything below them."""
+        paths = list(cls._default_manager.filter(pk__in=pks).values_list("path", flat=True))
+        if not paths:
+            return []
+        return list(
+            cls._default_manager.filter(cls.path_q(paths, include_self=include_self))
+            .values_list("pk", flat=True)
+        )
+
+
+def subtree_filter(model, field_name, node_pk, include_self=True):
+    """
+    Filter for ``model`` rows whose ``field_name`` (a FK or M2M to a
+    ``TreeNode``) points at ``node_pk`` or any node below it::
+
+        Event.objects.filter(subtree_filter(Event, "event_type", category_id))
+
+    The selected node's path is read once; the subtree itself stays in SQL (a
+    path range subquery), so no id list is built in Python. M2M relations use
+    EXISTS on the through table, so rows never come back duplicated.
+    """
+    field = model._meta.get_field(field_name)
+    node_model = field.related_model
+    path = node_model._default_manager.filter(pk=node_pk).values_list("path", flat=True).first()
+    if path is None:
+        return Q(pk__in=[])
+    nodes = node_model._default_manager.filter(node_model.path_q([path], include_self=include_self))
+
+    if not field.many_to_many:
+        return Q(**{f"{field.attname}__in": nodes.values("pk")})
+    through = field.remote_field.through
+    return Exists(through._default_manager.filter(**{
+        field.m2m_field_name(): OuterRef("pk"),
+        f"{field.m2m_reverse_field_name()}__in": nodes.values("pk"),
+    }))
+
+
+def children_by_parent(nodes):
+    """``{parent_id: [child, ...]}`` in the order of ``nodes``, built in one pass."""
+    children = {}
+    for obj in nodes:
+        if obj.parent_id is not None:
+            children.setdefault(obj.parent_id, []).append(obj)
+    return children
+
+
+def build_tree(nodes, make_node, sort_key=None):
+    """
+    Build a nested tree in one pass.
+
+    ``nodes`` must be ordered by ``path`` so every parent comes before its
+    children. ``make_node(obj)`` returns a dict; its ``"children"`` list is
+    filled in here. ``sort_key`` optionally re-sorts siblings. Nodes whose
+    parent is not in ``nodes`` become roots.
+    """
+    by_id = {}
+    roots = []
+    for obj in nodes:
+        node = make_node(obj)
+        node.setdefault("children", [])
+        by_id[obj.pk] = node
+        parent = by_id.get(obj.parent_id)
+        (parent["children"] if parent is not None else roots).append(node)
+
+    if sort_key is not None:
+        stack = [roots]
+        while stack:
+            siblings = stack.pop()
+            siblings.sort(key=sort_key)
+            stack.extend(node["children"] for node in siblings)
+    return roots
+
+
+def tree_options(nodes):
+    """
+    ``(id, label)`` pairs for a flat <select>: depth-first, siblings sorted by
+    name, labels indented by depth.
+    """
+    tree = build_tree(
+        nodes,
+        lambda obj: {"id": obj.pk, "name": obj.name},
+        sort_key=lambda node: node["name"].lower(),
+    )
+    options = []
+    stack = [(node, 0) for node in reversed(tree)]
+    while stack:
+        node, depth = stack.pop()
+        options.append((node["id"], f"{OPTION_INDENT * depth}{node['name']}"))
+        stack.extend((child, depth + 1) for child in reversed(node["children"]))
+    return options
@@ -1,13 +1,16 @@
+import re
+
 from django.conf import settings
 from .views import home_view
 from django.contrib import admin
-from django.urls import path, include
-from django.conf.urls.static import static
+from django.urls import path, include, re_path
+from accounts.media_serving import serve_media
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 from rest_framework_simplejwt.views import TokenRefreshView
 from django.conf.urls.i18n import i18n_patterns
 urlpatterns = [
     path("i18n/", include("django.conf.urls.i18n")),
+    re_path(r"^%s(?P<path>.+)$" % re.escape(settings.MEDIA_URL.lstrip("/")), serve_media, name="media"),
 ]
 
 urlpatterns += i18n_patterns(
@@ -28,6 +31,3 @@ urlpatterns += i18n_patterns(
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 )
 
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
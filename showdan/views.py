@@ -1,49 +1,18 @@
+import math
+
 from django.shortcuts import render
 from django.contrib.auth import get_user_model
 from django.db.models import Avg, Count, Q, Min, Max
 
-from accounts.models import Profession, Language
-
-User = get_user_model()
-
-
-def _build_profession_tree_options():
-    """
-    Returns a list of tuples: (id, label_with_indent)
-    where children are indented under their parents.
-    """
-    all_items = list(Profession.objects.select_related("parent").all())
-
-    children_map = {}
-    roots = []
-
-    for p in all_items:
-        pid = p.parent_id
-        if pid is None:
-            roots.append(p)
-        children_map.setdefault(pid, []).append(p)
-
-    # sort siblings by name (keeps descendants under their parent)
-    for pid, items in children_map.items():
-        items.sort(key=lambda x: (x.name or "").lower())
+from accounts.models import Currency, Profession, Language
+from accounts.rates import base_amount_param, base_currency_id, from_base, requested_currency
+from accounts.search import search_professionals
+from accounts.utils import profession_tree_options
+from events.calendar_utils import availability_window, available_between
 
-    roots.sort(key=lambda x: (x.name or "").lower())
+from .tree import subtree_filter
 
-    out = []
-
-    def walk(node, depth):
-        # indent using spaces (works inside <option>)
-        indent = "\u00A0" * (depth * 4)  # 4 non-breaking spaces per level
-        label = f"{indent}{node.name}"
-        out.append((node.id, label))
-
-        for ch in children_map.get(node.id, []):
-            walk(ch, depth + 1)
-
-    for r in roots:
-        walk(r, 0)
-
-    return out
+User = get_user_model()
 
 
 def home_view(request):
@@ -63,34 +32,26 @@ def home_view(request):
     max_price = request.GET.get("max_price") or ""
     lang_ids = request.GET.getlist("lang")  # multiple
     gender = request.GET.get("gender") or ""  # optional
+    available_from = (request.GET.get("available_from") or "").strip()
+    available_to = (request.GET.get("available_to") or "").strip()
 
-    # Search (name, nickname, location, professions)
+    # Search (name, nickname, location, professions) via the full-text index
     if q:
-        qs = qs.filter(
-            Q(first_name__icontains=q) |
-            Q(last_name__icontains=q) |
-            Q(nickname__icontains=q) |
-            Q(city__icontains=q) |
-            Q(country__icontains=q) |
-            Q(professions__name__icontains=q)
-        )
-
-    # ✅ Profession only
+        qs = search_professionals(qs, q)
+
+    # ✅ Profession and its sub-professions
     if profession_id.isdigit():
-        qs = qs.filter(professions__id=int(profession_id))
+        qs = qs.filter(subtree_filter(User, "professions", int(profession_id)))
 
-    # Price range
-    if min_price:
-        try:
-            qs = qs.filter(cost_per_hour__gte=float(min_price))
-        except ValueError:
-            pass
+    # Price range, typed in the viewer's currency and compared in the base currency
+    currency = requested_currency(request)
+    min_base = base_amount_param(min_price, currency)
+    if min_base is not None:
+        qs = qs.filter(cost_per_hour_base__gte=min_base)
 
-    if max_price:
-        try:
-            qs = qs.filter(cost_per_hour__lte=float(max_price))
-        except ValueError:
-            pass
+    max_base = base_amount_param(max_price, currency)
+    if max_base is not None:
+        qs = qs.filter(cost_per_hour_base__lte=max_base)
 
     # Languages (communication_languages)
     lang_ids_int = [int(x) for x in lang_ids if x.isdigit()]
@@ -101,22 +62,23 @@ def home_view(request):
     if gender and hasattr(User, "gender"):
         qs = qs.filter(gender=gender)
 
+    # Free for the whole window: no busy time or locked booking overlapping it
+    window = availability_window(available_from, available_to)
+    if window:
+        qs = qs.filter(available_between(*window))
+
     qs = qs.distinct()
 
-    pros = (
-        qs.annotate(avg_rating=Avg("reviews_received__rating"))
-          .annotate(review_count=Count("reviews_received"))
-          .order_by("-id")
-    )
+    pros = qs.order_by("search_rank", "id") if q else qs.order_by("-id")
 
     # Options for UI
-    profession_options = _build_profession_tree_options()
+    profession_options = profession_tree_options()
     languages = Language.objects.all().order_by("name")
 
-    # Slider bounds
-    bounds = qs.aggregate(pmin=Min("cost_per_hour"), pmax=Max("cost_per_hour"))
-    pmin = bounds["pmin"] or 0
-    pmax = bounds["pmax"] or 600
+    # Slider bounds, in the viewer's currency
+    bounds = qs.aggregate(pmin=Min("cost_per_hour_base"), pmax=Max("cost_per_hour_base"))
+    pmin = from_base(bounds["pmin"], currency) or 0
+    pmax = from_base(bounds["pmax"], currency) or 600
 
     return render(request, "home.html", {
         "pros": pros,
@@ -130,7 +92,11 @@ def home_view(request):
         "f_max_price": max_price,
         "f_lang_ids": lang_ids_int,
         "f_gender": gender,
+        "f_available_from": available_from,
+        "f_available_to": available_to,
 
         "pmin": int(pmin) if pmin is not None else 0,
-        "pmax": int(pmax) if pmax is not None else 600,
+        "pmax": math.ceil(pmax) if pmax is not None else 600,
+        "price_currency": Currency.objects.filter(pk=currency or base_currency_id()).first(),
+        "f_currency": request.GET.get("currency", ""),
     })
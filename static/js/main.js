@@ -909,6 +909,102 @@
     });
   }
 
+  /* -------------------------
+     11) Resumable cover uploads (dashboard audio/video edit form)
+     Files go to /api/v1/upload-sessions/ in chunks; after a dropped
+     connection (or a reload) the upload resumes at the server's offset.
+  ------------------------- */
+  function initChunkedUploads(root) {
+    qa(root, "form[data-chunked-upload]").forEach((form) => {
+      if (form.dataset.chunkedInit === "1") return;
+      form.dataset.chunkedInit = "1";
+
+      const input = q(form, 'input[type="file"]');
+      const status = q(form, "[data-chunked-status]");
+      const csrf = (q(form, 'input[name="csrfmiddlewaretoken"]') || {}).value || "";
+      if (!input) return;
+
+      async function api(method, url, body, headers) {
+        const res = await fetch(url, {
+          method,
+          body,
+          credentials: "same-origin",
+          headers: Object.assign({ "X-CSRFToken": csrf, Accept: "application/json" }, headers || {}),
+        });
+        const data = await res.json().catch(() => ({}));
+        return { res, data };
+      }
+
+      function wait(ms) {
+        return new Promise((resolve) => setTimeout(resolve, ms));
+      }
+
+      async function upload(file) {
+        // remembered per file, so a reload picks the same session up again
+        const key = ["showdan:upload", form.dataset.chunkedUpload, file.name, file.size, file.lastModified].join(":");
+        let session = null;
+        const saved = localStorage.getItem(key);
+        if (saved) {
+          const { res, data } = await api("GET", saved);
+          if (res.ok) session = data;
+        }
+        if (!session) {
+          const body = new FormData();
+          body.append("kind", form.dataset.chunkedUpload);
+          body.append("filename", file.name);
+          body.append("size", file.size);
+          const { res, data } = await api("POST", form.dataset.chunkedStart, body);
+          if (!res.ok) throw new Error(data.error || "Upload failed");
+          session = data;
+          localStorage.setItem(key, session.upload_url);
+        }
+
+        let offset = session.offset;
+        let failures = 0;
+        while (offset < file.size) {
+          try {
+            const { res, data } = await api("PUT", session.upload_url, file.slice(offset, offset + session.chunk_size), {
+              "Upload-Offset": String(offset),
+              "Content-Type": "application/offset+octet-stream",
+            });
+            // 409: the server has a different offset, carry on from there
+            if (!res.ok && res.status !== 409) throw new Error(data.error || "Upload failed");
+            offset = data.offset;
+            failures = 0;
+          } catch (err) {
+            if (++failures > 5) throw err;
+            await wait(1000 * failures);
+            const { res, data } = await api("GET", session.upload_url);
+            if (!res.ok) throw err;
+            offset = data.offset;
+          }
+          if (status) status.textContent = file.name + ": " + Math.floor((offset * 100) / file.size) + "%";
+        }
+
+        const { res, data } = await api("POST", session.finalize_url);
+        localStorage.removeItem(key);
+        if (!res.ok) throw new Error(data.error || "Upload failed");
+      }
+
+      // runs before HTMX posts the form: upload the files first, then let it
+      // submit the rest (deletions) and re-render the section
+      form.addEventListener("htmx:confirm", (evt) => {
+        if (evt.target !== form || !input.files.length) return;
+        evt.preventDefault();
+        const files = Array.from(input.files);
+        (async () => {
+          try {
+            for (const file of files) await upload(file);
+            input.value = "";
+            evt.detail.issueRequest();
+          } catch (err) {
+            if (status) status.textContent = err.message;
+          }
+        })();
+      });
+    });
+  }
+
   /* -------------------------
      Main initializer
   ------------------------- */
@@ -928,6 +1024,8 @@
     initPublicCalendarModal(r);
 
     initDashboardSidebar(r);
+
+    initChunkedUploads(r);
   };
 
   /* -------------------------